@@ -13,7 +13,43 @@ a = Analysis(
         'excel_table',
         'sheet_manager',
         'file_manager',
-        'dialogs'
+        'dialogs',
+        'xls_reader',
+        'xls_importer',
+        'statement_importer',
+        'statement_import_dialog',
+        'xlsx_writer',
+        'xlsx_exporter',
+        'statements',
+        'statement_manager',
+        'exchange_rates',
+        'exchange_rate_dialog',
+        'period_close',
+        'date_index',
+        'search_index',
+        'search_manager',
+        'search_dialog',
+        'sheet_view',
+        'undo_stack',
+        'formula_engine',
+        'formula_manager',
+        'span_registry',
+        'cell_index',
+        'workbook_format',
+        'history_store',
+        'history_dialog',
+        'workbook_diff',
+        'diff_dialog',
+        'memory_report',
+        'memory_dialog',
+        'derived_sheet',
+        'provenance',
+        'sheet_name_index',
+        'sheet_navigator',
+        'sheet_cache',
+        'trial_balance',
+        'trial_balance_dialog',
+        'currencies'
     ],
     hookspath=[],
     hooksconfig={},
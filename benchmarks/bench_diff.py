@@ -0,0 +1,54 @@
+"""Benchmark the workbook diff: two bank sheets of 200k rows with scattered edits.
+
+    python benchmarks/bench_diff.py [rows]
+
+The new workbook has rows inserted and deleted near the top (shifting every
+later row), some amounts and 对方科目 edited, and a changed exchange rate.
+Rows are aligned by key through hashing, so the diff should take seconds.
+"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from workbook_diff import diff_workbooks  # noqa: E402
+
+
+def bank_sheet(rows, rate):
+    cells = {}
+    for r, (date, account, debit, credit, text) in enumerate(rows):
+        for col, value in ((0, str(r + 1)), (1, date), (2, account), (4, debit), (5, credit), (8, text)):
+            if value:
+                cells[(r, col)] = value
+    return {"name": "HSBC-USD", "type": "bank", "exchange_rate": rate, "data": {"cells": cells, "cols": 9}}
+
+
+def workbook(sheet, order):
+    return {"company": "bench", "tab_order": order, "sheets": [sheet]}
+
+
+def run(count):
+    rows = [(f"2025/{r % 12 + 1:02d}/{r % 28 + 1:02d}", f"应付账款-供应商{r % 500}",
+             f"{r * 1.25:.2f}" if r % 2 else "", "" if r % 2 else f"{r * 0.75:.2f}", f"Payment ref {r}")
+            for r in range(count)]
+    edited = list(rows)
+    for r in range(100, count, count // 50):
+        date, account, debit, credit, text = edited[r]
+        edited[r] = (date, account + "X", debit, credit, text) if r % 3 else (date, account, "1.00", credit, text)
+    del edited[10:20]
+    edited[5:5] = [("2025/01/01", "新科目", "9.99", "", f"Inserted {i}") for i in range(5)]
+    old = workbook(bank_sheet(rows, 7.8), ["HSBC-USD", "+"])
+    new = workbook(bank_sheet(edited, 7.75), ["+", "HSBC-USD"])
+
+    start = time.perf_counter()
+    diff = diff_workbooks(old, new)
+    elapsed = time.perf_counter() - start
+    sheet = diff.sheets[0]
+    print(f"{count:,} rows: {elapsed:.2f}s, +{len(sheet.added_rows)} rows, -{len(sheet.removed_rows)} rows, "
+          f"{len(sheet.modified_cells)} cells modified, rate {sheet.exchange_rate}, "
+          f"tab order changed: {diff.tab_order is not None}")
+
+
+if __name__ == "__main__":
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else 200_000)
@@ -0,0 +1,191 @@
+"""Benchmark ExcelTable painting offscreen, and check rendering against golden images.
+
+    python benchmarks/bench_paint.py [--rows N] [--frames N] [--size WxH]
+                                     [--golden DIR] [--update-golden]
+
+One sheet of each type (bank, non_bank, payable_detail, aggregate) is
+filled with N rows and rendered into a QImage: first while scrolling from
+top to bottom, then while resizing. Per-frame paint times are reported per
+sheet type.
+
+With --update-golden, a few fixed frames of each sheet (top, middle, bottom)
+are written to DIR as PNG; later runs compare against them and report the
+number of differing pixels, so a rendering optimization can be checked to
+draw exactly what it drew before. Golden images depend on the fonts of the
+machine, so create them on the machine that compares them. Runs Qt
+offscreen unless QT_QPA_PLATFORM is set.
+"""
+import argparse
+import contextlib
+import io
+import os
+import statistics
+import sys
+import time
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from PySide6.QtCore import QSize  # noqa: E402
+from PySide6.QtGui import QImage  # noqa: E402
+from PySide6.QtWidgets import QApplication, QTableWidgetItem  # noqa: E402
+
+from currencies import LEGACY_CURRENCIES  # noqa: E402
+from excel_like import ExcelLike  # noqa: E402
+from excel_table import ExcelTable  # noqa: E402
+
+GOLDEN_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "paint_golden")
+CURRENCIES = LEGACY_CURRENCIES
+
+
+def fill(sheet, count, values):
+    """Write ``values(row)`` -> {col: text} into ``count`` rows, as a bulk load would"""
+    first = getattr(sheet, "_frozen_row_count", 0)
+    sheet.setRowCount(first + count + 5)
+    sheet.blockSignals(True)
+    for r in range(count):
+        for col, text in values(r).items():
+            sheet.setItem(first + r, col, QTableWidgetItem(text))
+    sheet.blockSignals(False)
+
+
+def date(r):
+    return f"2025/{r % 12 + 1:02d}/{r % 28 + 1:02d}"
+
+
+def build_sheets(window, count):
+    manager = window.sheet_manager
+    # Every currency column, as in the widest layouts
+    window.currencies.reset(CURRENCIES)
+    bank = manager.create_bank_sheet("BENCH-USD")
+    fill(bank, count, lambda r: {0: str(r + 1), 1: date(r), 2: "应付账款", 3: f"供应商{r % 97}",
+                                 4 if r % 2 else 5: f"{r * 1.25:,.2f}", 7: f"INV-{r:06d}", 8: f"Payment {r}"})
+    bank.recalculate_balances()
+
+    non_bank = manager.create_non_bank_sheet("BENCH-非银行")
+    fill(non_bank, count, lambda r: {0: str(r + 1), 1: date(r), 2: "应付账款", 4: "销售收入",
+                                     6 + r % 10: f"{r * 0.5:,.2f}", 16 + r % 10: f"{r * 0.5:,.2f}", 26: f"备注 {r}"})
+
+    payable = manager.create_payable_detail_sheet("BENCH-应付")
+    fill(payable, count, lambda r: {0: str(r + 1), 1: date(r), 2: "应付账款", 3: f"供应商{r % 97}",
+                                    4: f"INV-{r:06d}", 5 + r % 10: f"{r * 2.0:,.2f}", 27: f"摘要 {r}"})
+
+    aggregate = ExcelTable("aggregate", name="BENCH-匯總")
+    main = ["序号", "日期", "对方科目", "子科目", "发票号码"] + ["借方"] * 10 + ["贷方"] * 10 + ["余额", "摘要"]
+    sub = [""] * 5 + [f"原币({c})" for c in CURRENCIES] * 2 + ["", ""]
+    with contextlib.redirect_stdout(io.StringIO()):
+        aggregate.setup_two_row_headers(main, sub, [(5, 14), (15, 24)])
+    fill(aggregate, count, lambda r: {0: str(r + 1), 1: date(r), 2: "销售收入", 5 + r % 20: f"{r * 3.0:,.2f}"})
+    return {"bank": bank, "non_bank": non_bank, "payable_detail": payable, "aggregate": aggregate}
+
+
+def render(sheet, size):
+    image = QImage(size, QImage.Format_ARGB32)
+    image.fill(0xFFFFFFFF)
+    # Some paint paths print debug output; keep it out of the report (its cost is still measured)
+    with contextlib.redirect_stdout(io.StringIO()):
+        sheet.render(image)
+    return image
+
+
+def timed_frames(sheet, size, frames):
+    """Per-frame ms while scrolling top to bottom, then while resizing"""
+    app = QApplication.instance()
+    bar = sheet.verticalScrollBar()
+    sheet.resize(size)
+    app.processEvents()
+    scrolling = []
+    for i in range(frames):
+        bar.setValue(bar.maximum() * i // max(frames - 1, 1))
+        start = time.perf_counter()
+        render(sheet, size)
+        scrolling.append((time.perf_counter() - start) * 1000)
+    bar.setValue(0)
+    resizing = []
+    for i in range(frames):
+        frame = QSize(size.width() - 300 + (i * 37) % 300, size.height() - 200 + (i * 23) % 200)
+        sheet.resize(frame)
+        start = time.perf_counter()
+        render(sheet, frame)
+        resizing.append((time.perf_counter() - start) * 1000)
+    sheet.resize(size)
+    return scrolling, resizing
+
+
+def golden_frames(sheet, size):
+    """(label, image) of the fixed frames compared against golden images"""
+    bar = sheet.verticalScrollBar()
+    sheet.resize(size)
+    QApplication.instance().processEvents()
+    for label, fraction in (("top", 0), ("middle", 0.5), ("bottom", 1)):
+        bar.setValue(int(bar.maximum() * fraction))
+        yield label, render(sheet, size)
+    bar.setValue(0)
+
+
+def differing_pixels(image, golden):
+    if image.size() != golden.size():
+        return image.width() * image.height()
+    image = image.convertToFormat(QImage.Format_ARGB32)
+    golden = golden.convertToFormat(QImage.Format_ARGB32)
+    a, b = bytes(image.constBits()), bytes(golden.constBits())
+    if a == b:
+        return 0
+    stride = image.bytesPerLine()
+    width = image.width() * 4
+    count = 0
+    for y in range(image.height()):
+        row_a, row_b = a[y * stride:y * stride + width], b[y * stride:y * stride + width]
+        if row_a != row_b:
+            count += sum(row_a[x:x + 4] != row_b[x:x + 4] for x in range(0, width, 4))
+    return count
+
+
+def summary(times):
+    ordered = sorted(times)
+    p95 = ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))]
+    return f"median {statistics.median(ordered):6.2f}  p95 {p95:6.2f}  max {ordered[-1]:6.2f} ms"
+
+
+def run(args):
+    app = QApplication.instance() or QApplication([])
+    window = ExcelLike()
+    width, height = (int(v) for v in args.size.lower().split("x"))
+    size = QSize(width, height)
+    sheets = build_sheets(window, args.rows)
+    print(f"{args.rows:,} rows per sheet, {width}x{height}, {args.frames} frames per pass")
+    failed = False
+    for sheet_type, sheet in sheets.items():
+        scrolling, resizing = timed_frames(sheet, size, args.frames)
+        print(f"{sheet_type:>15}  scroll {summary(scrolling)}")
+        print(f"{'':>15}  resize {summary(resizing)}")
+        folder = args.golden or GOLDEN_DIR
+        if not args.update_golden and not os.path.isdir(folder):
+            continue
+        os.makedirs(folder, exist_ok=True)
+        for label, image in golden_frames(sheet, size):
+            path = os.path.join(folder, f"{sheet_type}_{label}_{args.rows}_{width}x{height}.png")
+            if args.update_golden:
+                image.save(path)
+                continue
+            golden = QImage(path)
+            if golden.isNull():
+                print(f"{'':>15}  {label}: no golden image {path} (run with --update-golden)")
+                failed = True
+                continue
+            diff = differing_pixels(image, golden)
+            print(f"{'':>15}  {label}: {'matches golden' if diff == 0 else f'{diff} pixels differ'}")
+            failed = failed or diff > args.tolerance
+    app.processEvents()
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=5000)
+    parser.add_argument("--frames", type=int, default=60)
+    parser.add_argument("--size", default="1280x800")
+    parser.add_argument("--golden", help=f"golden image folder (default {GOLDEN_DIR})")
+    parser.add_argument("--update-golden", action="store_true", help="write golden images instead of comparing")
+    parser.add_argument("--tolerance", type=int, default=0, help="differing pixels allowed per frame")
+    sys.exit(run(parser.parse_args()))
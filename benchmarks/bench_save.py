@@ -0,0 +1,58 @@
+"""Benchmark workbook saves: full save, clean save, and a save with one dirty sheet.
+
+    python benchmarks/bench_save.py [rows per sheet]
+
+Fills every bank and non-bank sheet of a new workbook, then times
+FileManager.save_to_path. A clean save should cost well under a millisecond
+per sheet, and a save after editing one cell should only encode that sheet.
+Runs Qt offscreen unless QT_QPA_PLATFORM is set.
+"""
+import os
+import sys
+import tempfile
+import time
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from PySide6.QtWidgets import QApplication, QTableWidgetItem  # noqa: E402
+
+from excel_like import ExcelLike  # noqa: E402
+
+
+def fill(sheet, count):
+    sheet.setRowCount(max(sheet.rowCount(), count + 10))
+    sheet.blockSignals(True)
+    for r in range(count):
+        for col, text in ((0, f"2025/{r % 12 + 1:02d}/{r % 28 + 1:02d}"), (1, f"摘要 {r}"), (4, f"{r * 1.25:.2f}")):
+            sheet.setItem(r, col, QTableWidgetItem(text))
+    sheet.blockSignals(False)
+
+
+def timed(label, save):
+    start = time.perf_counter()
+    written = save()
+    print(f"  {label:<22} {(time.perf_counter() - start) * 1000:8.1f} ms  ({'written' if written else 'skipped'})")
+
+
+def run(count):
+    app = QApplication.instance() or QApplication([])
+    window = ExcelLike()
+    sheets = [s for s in window.sheets if s.type in ("bank", "non_bank")]
+    for sheet in sheets:
+        fill(sheet, count)
+    path = os.path.join(tempfile.mkdtemp(), "bench.exl")
+    save = lambda: window.file_manager.save_to_path(path)  # noqa: E731
+    print(f"{len(sheets)} sheets x {count:,} rows")
+    timed("full save", save)
+    print(f"  file size {os.path.getsize(path) / 1e6:.1f} MB")
+    timed("clean save", save)
+    sheets[0].setItem(0, 1, QTableWidgetItem("edited"))
+    timed("one dirty sheet", save)
+    timed("clean save", save)
+    os.remove(path)
+    app.processEvents()
+
+
+if __name__ == "__main__":
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else 20_000)
@@ -0,0 +1,39 @@
+"""Benchmark the workbook search index: index 1M cells, then time typical queries.
+
+    python benchmarks/bench_search.py [rows]
+
+Each row has four indexed cells (对方科目, 子科目, 发票号码, 摘要), so the default
+250,000 rows is 1M cells. Queries should answer in milliseconds.
+"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from search_index import SearchIndex  # noqa: E402
+
+ACCOUNTS = ["应付账款", "销售收入", "银行费用", "董事往来"]
+QUERIES = ["INV-00123456", "供应商4321", "supplier 976", "应付", "12345", "ref 99", "pay", "no such text"]
+
+
+def run(count):
+    index = SearchIndex()
+    start = time.perf_counter()
+    for r in range(count):
+        index.set_row(1, r, {
+            2: ACCOUNTS[r % len(ACCOUNTS)],
+            3: f"供应商{r % 5000}公司",
+            7: f"INV-{r:08d}",
+            8: f"Payment ref {r} supplier {r % 977}",
+        })
+    elapsed = time.perf_counter() - start
+    print(f"indexed {len(index):,} cells in {elapsed:.2f}s ({len(index) / elapsed / 1e3:.0f}k cells/s)")
+    for query in QUERIES:
+        start = time.perf_counter()
+        results = index.search(query)
+        print(f"  {query!r:>16}: {len(results):>5} results in {(time.perf_counter() - start) * 1000:6.1f} ms")
+
+
+if __name__ == "__main__":
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else 250_000)
@@ -0,0 +1,59 @@
+"""Benchmark the consolidated trial balance over a million source rows.
+
+    python benchmarks/bench_trial_balance.py [rows]
+
+Rows of four bank sheets are loaded into the statement engine once, as
+Update or editing does; the report is then read from the engine's
+per-(account, currency) aggregates. Editing a row and re-reading the report
+should take milliseconds, independent of the row count.
+"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from statements import StatementEngine, bank_row_contributions  # noqa: E402
+from trial_balance import hkd_totals, trial_balance  # noqa: E402
+
+SHEETS = (("HSBC-USD", "USD"), ("HSBC-EUR", "EUR"), ("HSBC-HKD", "HKD"), ("HSBC-JPY", "JPY"))
+RATES = {"USD": 7.8, "EUR": 8.5, "HKD": 1.0, "JPY": 0.052}
+
+
+def row_cells(r):
+    amount = f"{r % 9973 * 1.25:,.2f}"
+    return {"对方科目": ("应付账款", "销售收入", "银行费用", "应收账款")[r % 4],
+            "子科目": f"客户{r % 500}",
+            "借方": amount if r % 2 else "", "贷方": "" if r % 2 else amount}
+
+
+def run(count):
+    engine = StatementEngine(views=[])
+    per_sheet = count // len(SHEETS)
+    start = time.perf_counter()
+    for name, currency in SHEETS:
+        rows = {}
+        for r in range(per_sheet):
+            cells = row_cells(r)
+            rows[r] = bank_row_contributions(name, currency, r, lambda label, occurrence=0: cells.get(label, ""))
+        engine.set_sheet(name, rows)
+    loaded = time.perf_counter() - start
+
+    start = time.perf_counter()
+    lines = trial_balance(engine.totals(), RATES)
+    report = time.perf_counter() - start
+
+    start = time.perf_counter()
+    cells = dict(row_cells(7), 借方="1,000,000.00")
+    get = lambda label, occurrence=0: cells.get(label, "")  # noqa: E731
+    engine.set_row("HSBC-USD", 7, bank_row_contributions("HSBC-USD", "USD", 7, get))
+    lines = trial_balance(engine.totals(), RATES)
+    edited = time.perf_counter() - start
+
+    debit, credit = hkd_totals(lines)
+    print(f"{count:,} rows loaded in {loaded:.2f}s; trial balance of {len(lines):,} lines in {report * 1000:.1f} ms, "
+          f"after an edit in {edited * 1000:.1f} ms; HKD debit {debit:,.2f} credit {credit:,.2f}")
+
+
+if __name__ == "__main__":
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000)
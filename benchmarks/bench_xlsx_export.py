@@ -0,0 +1,61 @@
+"""Benchmark the streaming .xlsx writer: export 1M cells and report time and peak memory.
+
+    python benchmarks/bench_xlsx_export.py [rows] [cols]
+
+The process peak RSS should stay flat as the row count grows (Unix only;
+tracemalloc is not used because it slows the writer down ten-fold).
+"""
+import os
+import sys
+import tempfile
+import time
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+import zipfile
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from xlsx_writer import XlsxWriter, STYLE_AMOUNT, STYLE_HEADER  # noqa: E402
+
+
+def rows(count, cols):
+    yield [("借方" if c % 2 else "贷方", STYLE_HEADER) for c in range(cols)]
+    for r in range(count):
+        row = [f"2025/{r % 12 + 1:02d}/{r % 28 + 1:02d}", f"摘要 {r}"]
+        row.extend((r * 1.25 + c, STYLE_AMOUNT) for c in range(cols - 2))
+        yield row
+
+
+def peak_rss_mb():
+    # ru_maxrss is in KB on Linux and bytes on macOS
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss / 1e6 if sys.platform == "darwin" else rss / 1e3
+
+
+def run(count, cols):
+    path = os.path.join(tempfile.mkdtemp(), "bench.xlsx")
+    start = time.perf_counter()
+    with XlsxWriter(path) as writer:
+        writer.write_sheet("bench", rows(count, cols), merges=[(0, 0, 1, 2)], freeze_rows=1)
+    elapsed = time.perf_counter() - start
+    with zipfile.ZipFile(path) as z:
+        assert z.testzip() is None
+    size = os.path.getsize(path)
+    os.remove(path)
+    cells = count * cols
+    peak = f"{peak_rss_mb():.1f} MB" if resource else "n/a"
+    print(f"{count:>9} rows x {cols} cols = {cells:>9} cells: {elapsed:6.2f}s "
+          f"({cells / elapsed / 1e6:.2f}M cells/s), peak RSS {peak}, file {size / 1e6:.1f} MB")
+
+
+if __name__ == "__main__":
+    cols = int(sys.argv[2]) if len(sys.argv) > 2 else 10
+    if len(sys.argv) > 1:
+        run(int(sys.argv[1]), cols)
+    else:
+        # 100k and 1M cells: peak RSS should not change between the two runs
+        run(10_000, cols)
+        run(100_000, cols)
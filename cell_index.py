@@ -0,0 +1,97 @@
+"""Sparse index of a sheet's populated cells.
+
+``rows`` maps a row to the set of its columns holding non-blank text. It only
+holds rows that have something, so walking it costs O(populated cells) however
+many rows the sheet has. Row and column insertion/removal shift it like the view.
+The last populated row (optionally ignoring some columns, such as a computed
+余额) is cached, so the first free row below the data is found in O(1)
+between structural changes.
+"""
+
+
+def _shift(mapping, start, delta, end=None):
+    """Keys >= ``start`` move by ``delta``; keys in [start, end) are dropped first"""
+    shifted = {}
+    for key, value in mapping.items():
+        if key < start:
+            shifted[key] = value
+        elif end is None or key >= end:
+            shifted[key + delta] = value
+    return shifted
+
+
+class CellIndex:
+    def __init__(self):
+        self.rows = {}  # row -> set of populated columns
+        self._last = {}  # ignored columns -> last populated row; dropped when it must be recomputed
+
+    def __len__(self):
+        return sum(len(cols) for cols in self.rows.values())
+
+    def __contains__(self, cell):
+        row, col = cell
+        return col in self.rows.get(row, ())
+
+    def set(self, row, col, populated):
+        if populated:
+            self.rows.setdefault(row, set()).add(col)
+            for ignore, last in self._last.items():
+                if row > last and col not in ignore:
+                    self._last[ignore] = row
+        else:
+            cols = self.rows.get(row)
+            if cols is not None:
+                cols.discard(col)
+                if not cols:
+                    del self.rows[row]
+                for ignore, last in list(self._last.items()):
+                    if row == last and cols <= ignore:
+                        del self._last[ignore]
+
+    def cells(self):
+        """(row, col) of populated cells in row-major order"""
+        for row in sorted(self.rows):
+            for col in sorted(self.rows[row]):
+                yield row, col
+
+    def columns(self):
+        """Columns with at least one populated cell"""
+        return set().union(*self.rows.values())
+
+    def last_row(self, ignore=frozenset()):
+        """Last row with a populated column not in ``ignore``, or -1"""
+        ignore = frozenset(ignore)
+        last = self._last.get(ignore)
+        if last is None:
+            last = max((row for row, cols in self.rows.items() if not cols <= ignore), default=-1)
+            self._last[ignore] = last
+        return last
+
+    def clear(self):
+        self.rows = {}
+        self._last = {}
+
+    def insert_rows(self, row, count=1):
+        self.rows = _shift(self.rows, row, count)
+        self._last = {}
+
+    def remove_rows(self, row, count=1):
+        self.rows = _shift(self.rows, row, -count, row + count)
+        self._last = {}
+
+    def insert_columns(self, col, count=1):
+        for row, cols in self.rows.items():
+            if any(c >= col for c in cols):
+                self.rows[row] = {c + count if c >= col else c for c in cols}
+        self._last = {}
+
+    def remove_columns(self, col, count=1):
+        end = col + count
+        for row, cols in list(self.rows.items()):
+            if any(c >= col for c in cols):
+                cols = {c - count if c >= end else c for c in cols if c < col or c >= end}
+                if cols:
+                    self.rows[row] = cols
+                else:
+                    del self.rows[row]
+        self._last = {}
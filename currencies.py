@@ -0,0 +1,97 @@
+"""The workbook's currencies, for sheet layouts, dialogs and importers.
+
+KNOWN_CURRENCIES are offered wherever a currency is picked and fix the order
+of 借方(CCY) / 贷方(CCY) columns. Non-bank and payable detail sheets only get
+columns for the currencies the workbook uses (HKD, the bank sheet currencies
+and any currency an amount is booked in); the CurrencyRegistry keeps that set
+and reports each new currency so existing sheets can add its columns.
+"""
+
+BASE_CURRENCY = "HKD"
+KNOWN_CURRENCIES = ("USD", "EUR", "JPY", "GBP", "CHF", "CAD", "AUD", "CNY", "HKD", "NZD", "SGD", "INR", "MXN")
+# Every one of these had a column pair in 非银行交易 sheets saved before sparse layouts
+LEGACY_CURRENCIES = KNOWN_CURRENCIES[:10]
+SIDES = ("借方", "贷方")
+
+
+def sort_currencies(currencies):
+    """Known currencies in their usual order, then the others alphabetically"""
+    order = {currency: i for i, currency in enumerate(KNOWN_CURRENCIES)}
+    return sorted(set(currencies), key=lambda c: (order.get(c, len(order)), c))
+
+
+def currency_columns(currencies):
+    """借方(CCY) labels of every currency, then the 贷方(CCY) labels"""
+    currencies = sort_currencies(currencies)
+    return tuple(f"{side}({currency})" for side in SIDES for currency in currencies)
+
+
+def parse_currency_column(label):
+    """'借方(USD)' -> ('借方', 'USD'); None for other labels"""
+    label = label.replace(" ", "").replace("貸方", "贷方")
+    for side in SIDES:
+        if label.startswith(side + "(") and label.endswith(")") and len(label) > len(side) + 2:
+            return side, label[len(side) + 1:-1]
+    return None
+
+
+def column_currencies(labels):
+    """Currencies with a 借方 or 贷方 column among ``labels``"""
+    return {parsed[1] for parsed in map(parse_currency_column, labels) if parsed}
+
+
+def insert_position(labels, side, currency):
+    """Index at which the ``side`` column of ``currency`` goes among ``labels``.
+
+    Columns stay in currency order within their side; a first 贷方 column goes
+    after the 借方 group, and a sheet without currency columns gets it at the end.
+    """
+    order = sort_currencies(column_currencies(labels) | {currency})
+    rank = order.index(currency)
+    position = first = None
+    other = []
+    for col, label in enumerate(labels):
+        parsed = parse_currency_column(label)
+        if parsed is None:
+            continue
+        if parsed[0] != side:
+            other.append(col)
+        elif order.index(parsed[1]) < rank:
+            position = col + 1
+        elif first is None:
+            first = col
+    if position is None:
+        position = first
+    if position is None and other:
+        position = other[-1] + 1 if side == "贷方" else other[0]
+    return len(labels) if position is None else position
+
+
+class CurrencyRegistry:
+    def __init__(self, added_callback=None):
+        self.added_callback = added_callback  # called with each currency the workbook starts using
+        self._used = {BASE_CURRENCY}
+
+    def __contains__(self, currency):
+        return currency in self._used
+
+    def used(self):
+        return sort_currencies(self._used)
+
+    def choices(self):
+        """Currencies to offer in a picker: the known ones, then any other the workbook uses"""
+        return list(KNOWN_CURRENCIES) + [c for c in self.used() if c not in KNOWN_CURRENCIES]
+
+    def reset(self, currencies=()):
+        """Start over (new or loaded workbook) without reporting the currencies as added"""
+        self._used = {BASE_CURRENCY} | {c.strip().upper() for c in currencies if c and c.strip()}
+
+    def add(self, currency):
+        """Start using ``currency``; returns True when it is new to the workbook"""
+        currency = (currency or "").strip().upper()
+        if not currency or currency in self._used:
+            return False
+        self._used.add(currency)
+        if self.added_callback is not None:
+            self.added_callback(currency)
+        return True
@@ -1,4 +1,4 @@
-from PySide6.QtWidgets import QDialog, QVBoxLayout, QFormLayout, QComboBox, QLineEdit, QLabel, QPushButton, QHBoxLayout, QMessageBox, QDateEdit, QTableWidgetItem
+from PySide6.QtWidgets import QDialog, QVBoxLayout, QFormLayout, QComboBox, QLineEdit, QLabel, QPushButton, QHBoxLayout, QMessageBox, QDateEdit
 from PySide6.QtCore import QDate, Qt
 import uuid
 
@@ -118,31 +118,6 @@ class CurrencyExchangePLDialog(QDialog):
         self.accept()
 
     def add_bank_row(self, sheet, date, amount, other_sheet_name, unique_str, is_debit=True):
-        # Find columns
-        headers = [sheet.horizontalHeaderItem(j).text() for j in range(sheet.columnCount())]
-        idx_date = next((i for i, h in enumerate(headers) if '日期' in h), None)
-        idx_debit = next((i for i, h in enumerate(headers) if '借方' in h), None)
-        idx_credit = next((i for i, h in enumerate(headers) if '貸方' in h or '贷方' in h), None)
-        idx_duifang = next((i for i, h in enumerate(headers) if '对方科目' in h or '對方科目' in h), None)
-        idx_zike = next((i for i, h in enumerate(headers) if '子科目' in h), None)
-        idx_zhaiyao = next((i for i, h in enumerate(headers) if '摘要' in h), None)
-        # Find the first empty data row (all key columns empty), else append before pinned rows
-        def is_empty_row(r):
-            cols = [idx_date, idx_duifang, idx_zike, idx_debit, idx_credit]
-            for c in cols:
-                if c is not None:
-                    item = sheet.item(r, c)
-                    if item and item.text().strip():
-                        return False
-            return True
-        # Exclude pinned rows (last 2 rows)
-        data_row_count = sheet.rowCount() - 2 if sheet.rowCount() > 2 else sheet.rowCount()
-        row = data_row_count  # Default to append before pinned rows
-        for r in range(data_row_count):
-            if is_empty_row(r):
-                row = r
-                break
-        sheet.insertRow(row)
         # Format date as yyyy/MM/dd (e.g., 2025/08/23)
         from datetime import datetime
         try:
@@ -150,21 +125,12 @@ class CurrencyExchangePLDialog(QDialog):
             date_str_fmt = dt.strftime("%Y/%m/%d")
         except Exception:
             date_str_fmt = date.replace("-", "/")  # fallback
-        if idx_date is not None:
-            sheet.setItem(row, idx_date, QLineEditItem(date_str_fmt))
-        if is_debit and idx_debit is not None:
-            sheet.setItem(row, idx_debit, QLineEditItem(f"{amount:.2f}"))
-        if not is_debit and idx_credit is not None:
-            sheet.setItem(row, idx_credit, QLineEditItem(f"{amount:.2f}"))
-        if idx_duifang is not None:
-            sheet.setItem(row, idx_duifang, QLineEditItem(other_sheet_name))
-        if idx_zike is not None:
-            sheet.setItem(row, idx_zike, QLineEditItem("中转"))
-        if idx_zhaiyao is not None:
-            sheet.setItem(row, idx_zhaiyao, QLineEditItem(unique_str))
-        sheet.viewport().update()
-
-class QLineEditItem(QTableWidgetItem):
-    def __init__(self, text):
-        super().__init__(text)
-        self.setFlags(self.flags() | Qt.ItemIsEditable)
+        record = {
+            "日期": date_str_fmt,
+            "借方" if is_debit else "贷方": f"{amount:.2f}",
+            "对方科目": other_sheet_name,
+            "子科目": "中转",
+            "摘要": unique_str,
+        }
+        # Below the last populated row: one insert, one 序号/余额 pass and one auto-save
+        sheet.insert_records(sheet._first_free_row(), [record])
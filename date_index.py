@@ -0,0 +1,54 @@
+"""Sorted index over a sheet's 日期 column for period (From/To) queries.
+
+Dated rows are kept as a sorted list of (date, row) pairs, so the rows of a
+period are found with two binary searches. Rows whose 日期 is empty or not a
+date are kept apart: they cannot be placed in a period and are never hidden.
+"""
+from bisect import bisect_left, bisect_right, insort
+
+
+class DateIndex:
+    def __init__(self):
+        self._entries = []  # sorted [(date, row)]
+        self._dates = {}  # row -> date, for dated rows
+        self._undated = set()
+
+    def rebuild(self, row_dates):
+        """Replace the index from an iterable of (row, date or None)"""
+        self._dates = {}
+        self._undated = set()
+        for row, value in row_dates:
+            if value is None:
+                self._undated.add(row)
+            else:
+                self._dates[row] = value
+        self._entries = sorted((value, row) for row, value in self._dates.items())
+
+    def set_row(self, row, value):
+        """Update the date of one row (``value`` None when the row has no date)"""
+        old = self._dates.pop(row, None)
+        if old is not None:
+            i = bisect_left(self._entries, (old, row))
+            if i < len(self._entries) and self._entries[i] == (old, row):
+                del self._entries[i]
+        self._undated.discard(row)
+        if value is None:
+            self._undated.add(row)
+        else:
+            self._dates[row] = value
+            insort(self._entries, (value, row))
+
+    def date_of(self, row):
+        return self._dates.get(row)
+
+    def rows_between(self, start=None, end=None):
+        """Dated rows with start <= date <= end (either bound may be None), in date order"""
+        lo = 0 if start is None else bisect_left(self._entries, (start, -1))
+        hi = len(self._entries) if end is None else bisect_right(self._entries, (end, float("inf")))
+        return [row for _, row in self._entries[lo:hi]]
+
+    def undated_rows(self):
+        return self._undated
+
+    def __len__(self):
+        return len(self._entries)
@@ -0,0 +1,169 @@
+"""Payable detail sheets as read-only views over bank and non-bank rows.
+
+A DerivedSheet holds one (source sheet, source row id, source column)
+reference per row in compact arrays, a few bytes each, instead of a copy of
+every field. Rows are referred to by their stable RowIds (see provenance.py),
+so rows inserted or deleted above a source row do not break the reference.
+Cells are rendered on demand from the source, so the view shows the source's
+current text; which rows belong to the sheet is decided when Update builds it.
+The routing rules of Update apply when rendering: a bank amount goes to the
+借方(CCY) or 贷方(CCY) column of the sheet currency, and
+销售收入 / 利息收入 (creditor) and 销售成本 / 银行费用 (debit) sheets take
+debit + credit in their own column.
+"""
+from array import array
+
+CREDITOR_SHEETS = ("销售收入", "銷售收入", "利息收入")
+DEBIT_SHEETS = ("销售成本", "銷售成本", "银行费用", "銀行費用")
+
+
+def _amount(text):
+    text = text.strip().replace(",", "")
+    try:
+        return float(text) if text else 0
+    except ValueError:
+        return 0
+
+
+def _currency_columns(headers, prefix):
+    return {h.split("(")[1].split(")")[0]: col for col, h in enumerate(headers) if h.startswith(prefix + "(")}
+
+
+class _Source:
+    """How the rows of one source sheet map onto the derived sheet's columns"""
+
+    def __init__(self, sheet, headers):
+        self.sheet = sheet
+        self.is_bank = sheet.type == "bank"
+        self.map_columns(headers)
+
+    def map_columns(self, headers):
+        """Re-read the source headers and map them onto the derived sheet's ``headers``"""
+        sheet = self.sheet
+        source_headers = [sheet.horizontalHeaderItem(c).text() if sheet.horizontalHeaderItem(c) else ""
+                          for c in range(sheet.columnCount())]
+        by_label = {}
+        for col, label in enumerate(source_headers):
+            by_label[label] = col  # later duplicates win, as Update's row dicts did
+        self.columns = [(col, by_label[h]) for col, h in enumerate(headers)
+                        if h in by_label and "余额" not in h
+                        and (self.is_bank or not ("借方(" in h or "贷方(" in h))]
+        self.debit_col = by_label.get("借方")
+        self.credit_col = by_label.get("贷方")
+
+
+class DerivedSheet:
+    def __init__(self, name, headers):
+        self.name = name
+        self.mode = "credit" if name in CREDITOR_SHEETS else "debit" if name in DEBIT_SHEETS else None
+        self._sources = []
+        self._source_ids = {}
+        self._refs = array("H")  # per row: index into _sources
+        self._ids = array("q")  # per row: source row id
+        self._cols = array("h")  # per row: source amount column (non-bank), -1 for bank rows
+        self._cache = None  # ((row, source revision, source name), cells) of the last row rendered
+        self.set_headers(headers)
+
+    def __len__(self):
+        return len(self._ids)
+
+    def set_headers(self, headers):
+        """The derived sheet's columns changed (a currency was added): route the cells by the new ``headers``"""
+        self.headers = list(headers)
+        self._debit = _currency_columns(self.headers, "借方")
+        self._credit = _currency_columns(self.headers, "贷方")
+        self._origin_col = self.headers.index("来源") if "来源" in self.headers else None
+        for source in self._sources:
+            source.map_columns(self.headers)
+        self._cache = None
+
+    def columns_inserted(self, sheet, col, count=1):
+        """``count`` columns were inserted at ``col`` of a source ``sheet``: shift the columns read from it"""
+        index = self._source_ids.get(id(sheet))
+        if index is None:
+            return
+        self._sources[index].map_columns(self.headers)
+        refs, cols = self._refs, self._cols
+        for row in range(len(cols)):
+            if refs[row] == index and cols[row] >= col:
+                cols[row] += count
+        self._cache = None
+
+    def add(self, sheet, row, col=-1):
+        """Append a view of ``row`` of ``sheet``"""
+        index = self._source_ids.get(id(sheet))
+        if index is None:
+            index = self._source_ids[id(sheet)] = len(self._sources)
+            self._sources.append(_Source(sheet, self.headers))
+        self._refs.append(index)
+        self._ids.append(sheet.row_ids.id_at(row))
+        self._cols.append(col)
+        self._cache = None
+
+    def source_of(self, row):
+        """(source sheet, current source row) shown in ``row``, or None (also once the source row is deleted)"""
+        if not 0 <= row < len(self._ids):
+            return None
+        sheet = self._sources[self._refs[row]].sheet
+        source_row = sheet.row_ids.row_of(self._ids[row])
+        return (sheet, source_row) if source_row is not None else None
+
+    def source_column(self, row, col):
+        """Column of the source sheet that ``col`` of ``row`` is drawn from, or None"""
+        if not 0 <= row < len(self._ids):
+            return None
+        source = self._sources[self._refs[row]]
+        for derived_col, source_col in source.columns:
+            if derived_col == col:
+                return source_col
+        if source.is_bank and (col in self._debit.values() or col in self._credit.values()):
+            return source.debit_col if col in self._debit.values() else source.credit_col
+        return None
+
+    def source_ids(self):
+        """(row, source row id) of every row"""
+        return enumerate(self._ids)
+
+    def sources(self):
+        return [source.sheet for source in self._sources]
+
+    def row_cells(self, row):
+        """{column: text} of ``row``, read from its source now"""
+        origin = self.source_of(row)
+        if origin is None:
+            return {}
+        source = self._sources[self._refs[row]]
+        sheet, source_row = origin
+        key = (row, getattr(sheet, "revision", None), sheet.name)
+        if self._cache is not None and self._cache[0] == key:
+            return self._cache[1]
+        cells = {}
+
+        def text(col):
+            item = sheet.item(source_row, col) if col is not None else None
+            return item.text() if item else ""
+
+        for col, source_col in source.columns:
+            value = text(source_col)
+            if value:
+                cells[col] = value
+        if source.is_bank:
+            self._route_amounts(cells, sheet.currency, _amount(text(source.debit_col)),
+                                _amount(text(source.credit_col)))
+            if self._origin_col is not None:
+                cells[self._origin_col] = f"{sheet.name}:{source_row + 1}"
+        self._cache = (key, cells)
+        return cells
+
+    def _route_amounts(self, cells, currency, debit, credit):
+        if self.mode == "credit" and currency in self._credit:
+            cells[self._credit[currency]] = str(debit + credit)
+        elif self.mode == "debit" and currency in self._debit:
+            cells[self._debit[currency]] = str(debit + credit)
+        elif debit != 0 and currency in self._debit:
+            cells[self._debit[currency]] = str(debit)
+        elif credit != 0 and currency in self._credit:
+            cells[self._credit[currency]] = str(credit)
+
+    def cell(self, row, col):
+        return self.row_cells(row).get(col, "")
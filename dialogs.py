@@ -1,7 +1,8 @@
 from PySide6.QtWidgets import QDialog, QVBoxLayout, QLineEdit, QComboBox, QDialogButtonBox, QLabel, QRadioButton, QButtonGroup, QMessageBox
+from currencies import KNOWN_CURRENCIES
 
 class AddSheetDialog(QDialog):
-    def __init__(self, parent=None):
+    def __init__(self, parent=None, currencies=KNOWN_CURRENCIES):
         super().__init__(parent)
         self.setWindowTitle("Add Sheet")
         layout = QVBoxLayout(self)
@@ -22,7 +23,7 @@ class AddSheetDialog(QDialog):
 
         self.currency_label = QLabel("Currency:")
         self.currency_combo = QComboBox()
-        self.currency_combo.addItems(["USD", "EUR", "JPY", "GBP", "AUD", "CAD", "CHF", "CNY", "HKD", "NZD"])
+        self.currency_combo.addItems(list(currencies))
         layout.addWidget(self.currency_label)
         layout.addWidget(self.currency_combo)
         self.currency_combo.setEnabled(False)
@@ -0,0 +1,81 @@
+from PySide6.QtWidgets import (QDialog, QVBoxLayout, QLabel, QTableWidget, QTableWidgetItem, QAbstractItemView)
+from PySide6.QtCore import Qt
+
+
+class DiffDialog(QDialog):
+    """File -> Compare With: differences between another workbook and the open one; click a row to jump to it."""
+
+    def __init__(self, parent=None, search_manager=None):
+        super().__init__(parent)
+        self.setWindowTitle("Compare Workbooks")
+        self.search_manager = search_manager
+        self._targets = []
+        layout = QVBoxLayout(self)
+
+        self.summary_label = QLabel("")
+        self.summary_label.setWordWrap(True)
+        layout.addWidget(self.summary_label)
+
+        self.results_table = QTableWidget(0, 6)
+        self.results_table.setHorizontalHeaderLabels(["工作表", "变更", "行", "列", "原值", "新值"])
+        self.results_table.verticalHeader().setVisible(False)
+        self.results_table.setEditTriggers(QAbstractItemView.NoEditTriggers)
+        self.results_table.setSelectionBehavior(QAbstractItemView.SelectRows)
+        self.results_table.horizontalHeader().setStretchLastSection(True)
+        self.results_table.cellClicked.connect(self._jump_to)
+        self.results_table.cellActivated.connect(self._jump_to)
+        layout.addWidget(self.results_table)
+        self.resize(760, 480)
+
+    def show_diff(self, diff, old_name, sheets):
+        """Fill from a WorkbookDiff; ``sheets`` are the open workbook's sheets, for jumping to rows"""
+        by_name = {sheet.name: sheet for sheet in sheets}
+        lines = []
+        for field, (before, after) in diff.fields.items():
+            lines.append(f"{field}: {before} -> {after}" if field != "exchange_rates" else "汇率表已更改")
+        if diff.tab_order is not None:
+            lines.append("工作表顺序已更改")
+        entries = []
+        for sheet in diff.sheets:
+            if sheet.status != "changed":
+                entries.append((sheet.name, "工作表新增" if sheet.status == "added" else "工作表删除", None, "", "", ""))
+            if sheet.exchange_rate is not None:
+                entries.append((sheet.name, "汇率", None, "exchange_rate", str(sheet.exchange_rate[0]),
+                                str(sheet.exchange_rate[1])))
+            for row, cells in sheet.removed_rows:
+                entries.append((sheet.name, "删除行", None, f"原第{row + 1}行", _row_text(cells), ""))
+            for row, cells in sheet.added_rows:
+                entries.append((sheet.name, "新增行", row, "", "", _row_text(cells)))
+            for _, row, label, before, after in sheet.modified_cells:
+                entries.append((sheet.name, "修改", row, label, before, after))
+        self.summary_label.setText(
+            f"Compared {old_name} with the open workbook: {len(diff.sheets)} sheets changed, "
+            f"{len(entries)} differences." + ("\n" + "\n".join(lines) if lines else ""))
+
+        self._targets = []
+        self.results_table.setRowCount(len(entries))
+        for i, (name, kind, row, label, before, after) in enumerate(entries):
+            table = by_name.get(name)
+            self._targets.append((table, row, _column(table, label)) if table is not None and row is not None else None)
+            values = (name, kind, str(row + 1) if row is not None else "", label, before, after)
+            for j, value in enumerate(values):
+                item = QTableWidgetItem(value)
+                if j == 2:
+                    item.setTextAlignment(Qt.AlignRight | Qt.AlignVCenter)
+                self.results_table.setItem(i, j, item)
+
+    def _jump_to(self, result_row, _col=0):
+        if 0 <= result_row < len(self._targets) and self._targets[result_row] is not None:
+            self.search_manager.jump_to(*self._targets[result_row])
+
+
+def _row_text(cells):
+    return "  ".join(f"{label}={text}" for label, text in cells.items())
+
+
+def _column(table, label):
+    for col in range(table.columnCount()):
+        header = table.horizontalHeaderItem(col)
+        if header is not None and header.text() == label:
+            return col
+    return 0
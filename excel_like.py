@@ -1,17 +1,36 @@
 from PySide6.QtWidgets import (
     QMainWindow, QTabWidget, QLineEdit, QLabel, QHBoxLayout, QVBoxLayout,
     QWidget, QInputDialog, QDateEdit, QDialog, QMenu, QMessageBox, QDoubleSpinBox,
-    QToolButton, QTabBar, QApplication, QPushButton, QTableWidgetItem
+    QToolButton, QTabBar, QApplication, QPushButton, QTableWidgetItem, QFileDialog
 )
-from PySide6.QtGui import QAction, QPalette
+from PySide6.QtGui import QAction, QKeySequence, QPalette
 from PySide6.QtCore import Qt, QDate, qInstallMessageHandler
 from dialogs import AddSheetDialog
 from sheet_manager import SheetManager
 from file_manager import FileManager
+from xls_importer import XlsImporter
+from statement_importer import StatementImporter
+from xlsx_exporter import XlsxExporter
+from derived_sheet import DerivedSheet
+from provenance import ProvenanceIndex
+from sheet_navigator import SheetNavigator
+from sheet_cache import SheetCache
+from currencies import CurrencyRegistry, parse_currency_column
+from statement_manager import StatementManager
+from statements import REVALUATION_SOURCE
+from exchange_rates import ExchangeRateRegistry
+from period_close import PeriodCloseManager
+from search_manager import SearchManager
+from undo_stack import UndoStack
+from formula_manager import FormulaManager
 from utils import format_number
+import logging
+import os
 import platform
 import time
 
+logger = logging.getLogger(__name__)
+
 def qt_message_handler(mode, context, message):
     if "single cell span won't be added" in message:
         return  # Ignore this specific warning
@@ -37,6 +56,25 @@ class ExcelLike(QMainWindow):
         # Initialize managers
         self.sheet_manager = SheetManager(self)
         self.file_manager = FileManager(self)
+        self.xls_importer = XlsImporter(self)
+        self.statement_importer = StatementImporter(self)
+        self.xlsx_exporter = XlsxExporter(self)
+        self.statement_manager = StatementManager(self)
+        self.search_manager = SearchManager(self)
+        self.provenance = ProvenanceIndex()  # source rows <-> payable detail rows drawn from them
+        self.sheet_cache = SheetCache(self)  # dehydrates sheets not viewed recently
+        self.search_dialog = None
+        self.history_dialog = None
+        self.memory_threshold_mb = None  # File -> Memory Report warning threshold (main.py --memory-threshold)
+        self.formula_manager = FormulaManager(self)
+        self.exchange_rates = ExchangeRateRegistry(period_provider=self.current_period)
+        self.currencies = CurrencyRegistry(added_callback=self.on_currency_added)
+        self.statement_mappings = {}  # bank sheet name -> saved CSV column mapping
+        self.period_close = PeriodCloseManager(self)
+        self.period_snapshots = []  # closing snapshots of closed periods, oldest first
+        self.undo_stack = UndoStack(changed_callback=self.update_undo_actions)
+        self.undo_action = None
+        self.redo_action = None
 
         # Top bar for company name and period
         self.setup_top_bar()
@@ -51,6 +89,9 @@ class ExcelLike(QMainWindow):
         self.sales_sheet = None
         self.cost_sheet = None
         self.user_added_rows = None
+        # Every sheet by type and account; generated sheets are only opened as tabs on demand
+        self.sheet_navigator = SheetNavigator(self)
+        self.addDockWidget(Qt.LeftDockWidgetArea, self.sheet_navigator)
 
         self._add_plus_tab()
         self.tabs.currentChanged.connect(self._on_tab_or_plus_clicked)
@@ -59,6 +100,11 @@ class ExcelLike(QMainWindow):
         self.company_input.editingFinished.connect(self.auto_save)
         self.period_from_input.dateChanged.connect(self.auto_save)
         self.period_to_input.dateChanged.connect(self.auto_save)
+        # Rates are kept per period: a new period may mean new rates
+        self.period_from_input.dateChanged.connect(self.on_rates_changed)
+        self.period_to_input.dateChanged.connect(self.on_rates_changed)
+        self.period_from_input.dateChanged.connect(self.on_period_changed)
+        self.period_to_input.dateChanged.connect(self.on_period_changed)
         self.update_button.clicked.connect(self.on_update_clicked)  # Connect to a handler method
 
         # Connect tab signals
@@ -80,6 +126,8 @@ class ExcelLike(QMainWindow):
         self._add_plus_tab()
 
     def on_update_clicked(self):
+        # Payable detail sheets need a column for every currency booked, before rows are collected
+        self._register_booked_currencies()
         # 1. Collect data from all sheets
         bank_data = []
         non_bank_data = []
@@ -98,7 +146,7 @@ class ExcelLike(QMainWindow):
                 idx_debit = headers.index("借方") if "借方" in headers else -1
                 idx_credit = headers.index("贷方") if "贷方" in headers else -1
                 idx_zhaiyao = headers.index("摘要") if "摘要" in headers else -1
-                for row in range(sheet.rowCount()):
+                for row in sheet.period_rows():
                     zike = sheet.item(row, idx_zike).text() if idx_zike >= 0 and sheet.item(row, idx_zike) else ""
                     if zike == "中转":
                         duifang = sheet.item(row, idx_duifang).text() if idx_duifang >= 0 and sheet.item(row, idx_duifang) else ""
@@ -160,8 +208,6 @@ class ExcelLike(QMainWindow):
                     break
             if not detail_sheet:
                 detail_sheet = self.sheet_manager.create_payable_detail_sheet(detail_name)
-                self.sheets.append(detail_sheet)
-                self.tabs.addTab(detail_sheet, detail_name)
             # Prepare headers
             headers = [detail_sheet.horizontalHeaderItem(j).text() for j in range(detail_sheet.columnCount())]
             idx_date = headers.index("日期") if "日期" in headers else -1
@@ -222,6 +268,22 @@ class ExcelLike(QMainWindow):
                     zhaiyao_detail = f"{from_currency}和{to_currency}互转 ({from_sheet_name}:{from_row_num}:{from_amt:.2f}→{to_sheet_name}:{to_row_num}:{to_amt:.2f})"
                     detail_sheet.setItem(row_idx, idx_zhaiyao, QTableWidgetItem(zhaiyao_detail))
                 row_idx += 1
+        # 4b. Period-end revaluation of foreign-currency balances at the 期末 rate
+        revaluation = self.statement_manager.revaluation_rows()
+        if revaluation:
+            detail_name = "汇兑损益"
+            detail_sheet = None
+            for s in self.sheets:
+                if getattr(s, 'name', None) == detail_name:
+                    detail_sheet = s
+                    break
+            if not detail_sheet:
+                detail_sheet = self.sheet_manager.create_payable_detail_sheet(detail_name)
+            if not summary_map:
+                # No transfer rows were written: drop the revaluation rows of the previous update
+                detail_sheet.clearContents()
+                row_idx = 0
+            self._write_revaluation_rows(detail_sheet, row_idx, revaluation)
         # 5. Remove these rows from bank_data
         remove_keys = set(summary_map.keys())
         # ...existing code for collecting bank_data and non_bank_data, but skip rows with 摘要 in remove_keys for bank_data...
@@ -232,9 +294,9 @@ class ExcelLike(QMainWindow):
                 idx_zike = headers.index("子科目") if "子科目" in headers else -1
                 idx_debit = headers.index("借方") if "借方" in headers else -1
                 idx_credit = headers.index("贷方") if "贷方" in headers else -1
-                idx_balance = headers.index("余额") if "余额" in headers else -1
+                idx_date = headers.index("日期") if "日期" in headers else -1
                 idx_zhaiyao = headers.index("摘要") if "摘要" in headers else -1
-                for row in range(sheet.rowCount()):
+                for row in sheet.period_rows():
                     key = None
                     if idx_duifang >= 0 and idx_zike >= 0:
                         duifang = sheet.item(row, idx_duifang).text() if sheet.item(row, idx_duifang) else ""
@@ -254,20 +316,12 @@ class ExcelLike(QMainWindow):
                         credit_val = 0
                     # Only add if not a 汇兑损益 (中转) row
                     if (debit_val != 0 or credit_val != 0) and key and (sheet.item(row, idx_zhaiyao).text() if idx_zhaiyao >= 0 and sheet.item(row, idx_zhaiyao) else "") not in remove_keys:
-                        row_dict = {}
-                        for c, h in enumerate(headers):
-                            if c == idx_balance:
-                                continue
-                            val = sheet.item(row, c).text() if sheet.item(row, c) else ""
-                            row_dict[h] = val
+                        # The payable detail sheet renders the row from the bank sheet; only keep a reference
                         bank_data.append({
-                            "row_dict": row_dict,
-                            "currency": getattr(sheet, "currency", ""),
-                            "debit": debit_val,
-                            "credit": credit_val,
+                            "date": sheet.item(row, idx_date).text() if idx_date >= 0 and sheet.item(row, idx_date) else "",
+                            "sheet": sheet,
+                            "row": row,
                             "key": key,
-                            "sheet_name": getattr(sheet, "name", ""),
-                            "row_number": row + 1
                         })
             elif getattr(sheet, 'type', None) == 'non_bank':
                 if not non_bank_header:
@@ -277,7 +331,8 @@ class ExcelLike(QMainWindow):
                 idx_duifang = headers.index("借方科目") if "借方科目" in headers else -1
                 idx_zike = headers.index("子科目") if "子科目" in headers else -1
                 idx_daifang = headers.index("贷方科目") if "贷方科目" in headers else -1
-                for row in range(sheet.rowCount()):
+                idx_date = headers.index("日期") if "日期" in headers else -1
+                for row in sheet.period_rows():
                     key = None
                     if idx_daifang >= 0 and sheet.item(row, idx_daifang) and sheet.item(row, idx_daifang).text():
                         daifang = sheet.item(row, idx_daifang).text()
@@ -298,27 +353,29 @@ class ExcelLike(QMainWindow):
                         except Exception:
                             fval = 0
                         if fval != 0 and key:
-                            if "(" in h and ")" in h:
-                                currency = h.split("(")[1].split(")")[0]
-                            else:
-                                currency = ""
-                            row_dict = {}
-                            for c, hh in enumerate(headers):
-                                row_dict[hh] = sheet.item(row, c).text() if sheet.item(row, c) else ""
                             non_bank_data.append({
-                                "row_dict": row_dict,
-                                "currency": currency,
+                                "date": sheet.item(row, idx_date).text() if idx_date >= 0 and sheet.item(row, idx_date) else "",
+                                "sheet": sheet,
+                                "row": row,
                                 "col": col,
-                                "value": fval,
                                 "key": key,
-                                "sheet_name": getattr(sheet, "name", ""),
-                                "row_number": row + 1
                             })
         # 2. For each key, create a payable detail sheet if not exists
-        all_data = bank_data + non_bank_data
-        keys = set(item["key"] for item in all_data)
-        print(f"[DEBUG] Start payable detail update for {len(keys)} keys at", time.time())
-        for key in keys:
+        by_key = {}
+        for item in bank_data + non_bank_data:
+            by_key.setdefault(item["key"], []).append(item)
+        print(f"[DEBUG] Start payable detail update for {len(by_key)} keys at", time.time())
+
+        def date_key(item):
+            from datetime import datetime
+            for fmt in ("%Y/%m/%d", "%m/%d/%y", "%Y-%m-%d", "%m-%d-%y"):
+                try:
+                    return datetime.strptime(item["date"], fmt)
+                except Exception:
+                    continue
+            return datetime(1900, 1, 1)
+
+        for key, items in by_key.items():
             payable_sheet_name = key
             payable_sheet = None
             for s in self.sheets:
@@ -328,87 +385,193 @@ class ExcelLike(QMainWindow):
             if not payable_sheet:
                 if non_bank_header:
                     print(f"[DEBUG] Creating payable detail sheet: {payable_sheet_name} at", time.time())
-                    payable_sheet = self.sheet_manager.create_payable_detail_sheet(payable_sheet_name)
+                    payable_sheet = self.sheet_manager.create_payable_detail_sheet(payable_sheet_name, open_tab=False)
                 else:
                     QMessageBox.warning(self, "Error", "No non-bank sheet found to create payable detail sheet header.")
                     continue
-            else:
-                print(f"[DEBUG] Erasing data in payable sheet: {payable_sheet_name} at", time.time())
-                payable_sheet.clearContents()
-                print(f"[DEBUG] Finished erasing data in {payable_sheet_name} at", time.time())
-            print(f"[DEBUG] Building headers and mapping for {payable_sheet_name} at", time.time())
             headers = [payable_sheet.horizontalHeaderItem(j).text() for j in range(payable_sheet.columnCount())]
-            mapping = {"debit": {}, "credit": {}}
-            for idx, h in enumerate(headers):
-                if "借方(" in h:
-                    currency = h.split("(")[1].split(")")[0]
-                    mapping["debit"][currency] = idx
-                elif "贷方(" in h:
-                    currency = h.split("(")[1].split(")")[0]
-                    mapping["credit"][currency] = idx
-            print(f"[DEBUG] Filtering and sorting data for {payable_sheet_name} at", time.time())
-            filtered_bank_data = [item for item in bank_data if item["key"] == key]
-            filtered_non_bank_data = [item for item in non_bank_data if item["key"] == key]
-            all_rows = []
-            for item in filtered_bank_data:
-                row_dict = item["row_dict"]
-                date_val = row_dict.get("日期", "")
-                all_rows.append((date_val, 'bank', item))
-            for item in filtered_non_bank_data:
-                row_dict = item["row_dict"]
-                date_val = row_dict.get("日期", "")
-                all_rows.append((date_val, 'non_bank', item))
-            def date_key(x):
-                from datetime import datetime
-                for fmt in ("%Y/%m/%d", "%m/%d/%y", "%Y-%m-%d", "%m-%d-%y"):
-                    try:
-                        return datetime.strptime(x[0], fmt)
-                    except Exception:
-                        continue
-                return datetime(1900, 1, 1)
-            all_rows.sort(key=date_key)
-            print(f"[DEBUG] Finished sorting data for {payable_sheet_name} at", time.time())
-            payable_sheet.setRowCount(max(100, len(all_rows) + 10))
-            row_idx = 0
-            print(f"[DEBUG] Writing data to payable sheet {payable_sheet_name} at", time.time())
-            # Determine if special handling is needed for this sheet name
-            is_creditor = payable_sheet_name in ["销售收入", "銷售收入", "利息收入"]
-            is_debit = payable_sheet_name in ["销售成本", "銷售成本", "银行费用", "銀行費用"]
-            for date_val, typ, item in all_rows:
-                row_dict = item["row_dict"]
-                currency = item["currency"]
-                source_col_idx = None
-                for idx, h in enumerate(headers):
-                    if h == "来源":
-                        source_col_idx = idx
-                        break
-                if typ == 'bank':
-                    for h, v in row_dict.items():
-                        if h in headers and not ("余额" in h):
-                            col_idx = headers.index(h)
-                            payable_sheet.setItem(row_idx, col_idx, QTableWidgetItem(v))
-                    # Special handling for payable detail sheets
-                    if is_creditor and currency in mapping["credit"]:
-                        payable_sheet.setItem(row_idx, mapping["credit"][currency], QTableWidgetItem(str(item["debit"] + item["credit"])))
-                    elif is_debit and currency in mapping["debit"]:
-                        payable_sheet.setItem(row_idx, mapping["debit"][currency], QTableWidgetItem(str(item["debit"] + item["credit"])))
-                    else:
-                        if item["debit"] != 0 and currency in mapping["debit"]:
-                            payable_sheet.setItem(row_idx, mapping["debit"][currency], QTableWidgetItem(str(item["debit"])))
-                        elif item["credit"] != 0 and currency in mapping["credit"]:
-                            payable_sheet.setItem(row_idx, mapping["credit"][currency], QTableWidgetItem(str(item["credit"])))
-                    if source_col_idx is not None:
-                        payable_sheet.setItem(row_idx, source_col_idx, QTableWidgetItem(f"{item.get('sheet_name', '')}:{item.get('row_number', '')}"))
-                else:
-                    for h, v in row_dict.items():
-                        if h in headers and not ("余额" in h or "借方(" in h or "贷方(" in h):
-                            col_idx = headers.index(h)
-                            payable_sheet.setItem(row_idx, col_idx, QTableWidgetItem(v))
-                row_idx += 1
-            print(f"[DEBUG] Finished writing data to {payable_sheet_name} at", time.time())
+            # A read-only view over the source rows, by date; bank rows first among equal dates
+            derived = DerivedSheet(payable_sheet_name, headers)
+            for item in sorted(items, key=date_key):
+                derived.add(item["sheet"], item["row"], item.get("col", -1))
+            payable_sheet.set_derived(derived)
+            self.provenance.register(payable_sheet, derived)
+            print(f"[DEBUG] Finished {payable_sheet_name}: {len(derived)} rows at", time.time())
         print(f"[DEBUG] Finished payable detail update at", time.time())
+        self.statement_manager.generate()
         self._add_plus_tab()
 
+    def _write_revaluation_rows(self, detail_sheet, row_idx, revaluation):
+        """Append one 汇兑损益 row per revalued balance: gain = amount × (期末 rate − 本期 rate)"""
+        headers = [detail_sheet.horizontalHeaderItem(j).text() for j in range(detail_sheet.columnCount())]
+        columns = {h: j for j, h in reversed(list(enumerate(headers)))}
+        period_end = self.period_to_input.date().toString("yyyy/MM/dd")
+        if detail_sheet.rowCount() < row_idx + len(revaluation) + 10:
+            detail_sheet.setRowCount(row_idx + len(revaluation) + 10)
+        for account, currency, amount, gain in revaluation:
+            account_name, _, sub_account = account.partition("-")
+            current = self.exchange_rates.current_rate(currency)
+            closing = self.exchange_rates.closing_rate(currency)
+            values = {
+                "日期": period_end,
+                "对方科目": account_name,
+                "子科目": sub_account,
+                "借方(HKD)": format_number(gain),
+                "摘要": f"期末重估 {currency} {format_number(amount)} × ({closing:g} - {current:g})",
+                "来源": REVALUATION_SOURCE,
+            }
+            for header, text in values.items():
+                if header in columns:
+                    detail_sheet.setItem(row_idx, columns[header], QTableWidgetItem(text))
+            row_idx += 1
+
+    def current_period(self):
+        """Key of the workbook period in the rate registry, e.g. 2025/01/01-2025/12/31"""
+        return (f"{self.period_from_input.date().toString('yyyy/MM/dd')}-"
+                f"{self.period_to_input.date().toString('yyyy/MM/dd')}")
+
+    def on_rows_changed(self, table, rows=None):
+        """Sheet callback: pass changed rows on to the statements, the search index and the derived rows showing them"""
+        self.statement_manager.on_rows_changed(table, rows)
+        self.search_manager.on_rows_changed(table, rows)
+        affected = self.provenance.affected(table, rows)
+        if affected:
+            sheets = set(self.sheets)
+            for derived_table, derived_rows in affected.items():
+                if derived_table in sheets:
+                    derived_table.viewport().update()
+                    self.search_manager.on_rows_changed(derived_table, derived_rows)
+
+    def on_currency_added(self, currency):
+        """A currency is new to the workbook: add its columns to the non-bank and payable detail sheets"""
+        for sheet in list(self.sheets):
+            if sheet.type not in ("non_bank", "payable_detail"):
+                continue
+            inserted = self.sheet_manager.add_currency_columns(sheet, currency)
+            if not inserted:
+                continue
+            logger.debug(f"Added {currency} columns to {sheet.name}")
+            # Derived sheets refer to columns by position: move them along
+            for table in self.sheets:
+                derived = getattr(table, "derived", None)
+                if derived is None:
+                    continue
+                if table is sheet:
+                    derived.set_headers([sheet.horizontalHeaderItem(c).text() for c in range(sheet.columnCount())])
+                for col in inserted:
+                    derived.columns_inserted(sheet, col)
+                table.viewport().update()
+
+    def _register_booked_currencies(self):
+        """Currencies with amounts in non-bank sheets (e.g. typed into a column kept from an older layout)"""
+        for sheet in list(self.sheets):
+            if sheet.type != "non_bank":
+                continue
+            populated = sheet.cell_index.columns()
+            for col in range(sheet.columnCount()):
+                header_item = sheet.horizontalHeaderItem(col)
+                parsed = parse_currency_column(header_item.text()) if header_item else None
+                if parsed and col in populated:
+                    self.currencies.add(parsed[1])
+
+    def show_search(self):
+        """Ctrl+F: search the text columns of every sheet"""
+        from search_dialog import SearchDialog
+        if self.search_dialog is None:
+            self.search_dialog = SearchDialog(self, search_manager=self.search_manager)
+        self.search_dialog.show()
+        self.search_dialog.raise_()
+        self.search_dialog.activateWindow()
+        self.search_dialog.focus_query()
+
+    def show_history(self):
+        """File -> History: browse and restore saved versions of the workbook"""
+        from history_dialog import HistoryDialog
+        if self.file_manager.current_path is None:
+            QMessageBox.information(self, "Workbook History", "Save the workbook first; versions are recorded on save.")
+            return
+        if self.history_dialog is None:
+            self.history_dialog = HistoryDialog(self, file_manager=self.file_manager)
+        self.history_dialog.refresh()
+        self.history_dialog.show()
+        self.history_dialog.raise_()
+        self.history_dialog.activateWindow()
+
+    def compare_workbook(self, path=None):
+        """File -> Compare With: list what changed between another .exl file and the open workbook"""
+        from diff_dialog import DiffDialog
+        from workbook_diff import diff_workbooks
+        from workbook_format import read_workbook
+        if not path:
+            path, _ = QFileDialog.getOpenFileName(self, "Compare With", "", "ExcelLike (*.exl)")
+            if not path:
+                return
+        try:
+            with open(path, "rb") as f:
+                old = read_workbook(f)
+        except Exception as e:
+            QMessageBox.warning(self, "Compare Workbooks", f"Failed to read file: {e}")
+            return
+        diff = diff_workbooks(old, self.file_manager.workbook_data())
+        dialog = DiffDialog(self, search_manager=self.search_manager)
+        dialog.show_diff(diff, os.path.basename(path), self.sheets)
+        dialog.show()
+        return dialog
+
+    def show_memory_report(self):
+        """File -> Memory Report: estimated memory of every sheet"""
+        from memory_dialog import MemoryReportDialog
+        from memory_report import DEFAULT_THRESHOLD_MB
+        dialog = MemoryReportDialog(self, threshold_mb=self.memory_threshold_mb or DEFAULT_THRESHOLD_MB)
+        dialog.show_report(self.sheets)
+        dialog.show()
+        return dialog
+
+    def show_trial_balance(self):
+        """File -> Trial Balance: every account's totals per currency, with HKD equivalents"""
+        from trial_balance_dialog import TrialBalanceDialog
+        dialog = TrialBalanceDialog(self, statement_manager=self.statement_manager)
+        dialog.refresh()
+        dialog.show()
+        return dialog
+
+    def period_range(self):
+        """(Period From, Period To) as datetime.date; sheets and statements are restricted to it"""
+        return self.period_from_input.date().toPython(), self.period_to_input.date().toPython()
+
+    def on_period_changed(self, *_):
+        """Re-aggregate the rows that moved in or out of the period"""
+        self.statement_manager.set_period(*self.period_range())
+
+    def on_rates_changed(self, *_):
+        """Repaint HKD totals and revalue statements after a rate or period change"""
+        index = self.tabs.currentIndex()
+        current_tab = self.tabs.widget(index) if index >= 0 else None
+        if getattr(current_tab, "type", None) == "bank":
+            self.exchange_rate_input.setValue(current_tab.exchange_rate)
+        for sheet in self.sheets:
+            if hasattr(sheet, "exchange_rate_input"):
+                sheet.exchange_rate_input.blockSignals(True)
+                sheet.exchange_rate_input.setValue(sheet.exchange_rate)
+                sheet.exchange_rate_input.blockSignals(False)
+            sheet.viewport().update()
+        self.formula_manager.rates_changed()
+        self.statement_manager.schedule_refresh()
+
+    def show_exchange_rates(self):
+        """Edit the 本期 / 期末 rates of all currencies for the current period"""
+        from exchange_rate_dialog import ExchangeRateDialog
+        currencies = set()
+        for sheet in self.sheets:
+            if getattr(sheet, "type", None) == "bank" and sheet.currency:
+                currencies.add(sheet.currency)
+        currencies |= self.statement_manager.engine.currencies()
+        dialog = ExchangeRateDialog(self, registry=self.exchange_rates, currencies=currencies,
+                                    period=self.current_period())
+        if dialog.exec() == QDialog.Accepted:
+            self.on_rates_changed()
+            self.auto_save()
+
     def setup_top_bar(self):
         """Setup the top bar with company name, exchange rate, and period inputs"""
         self.top_bar = QHBoxLayout()
@@ -420,9 +583,9 @@ class ExcelLike(QMainWindow):
         # Exchange rate input
         self.exchange_rate_label = QLabel("Exchange Rate:")
         self.exchange_rate_input = QDoubleSpinBox()
-        self.exchange_rate_input.setDecimals(2)
-        self.exchange_rate_input.setMinimum(0.01)
-        self.exchange_rate_input.setMaximum(99)
+        self.exchange_rate_input.setDecimals(4)
+        self.exchange_rate_input.setMinimum(0.0001)
+        self.exchange_rate_input.setMaximum(100000)
         self.exchange_rate_input.setValue(1.0)
         self.exchange_rate_input.setSingleStep(0.01)
         self.exchange_rate_input.setEnabled(False)  # Disabled by default
@@ -479,6 +642,7 @@ class ExcelLike(QMainWindow):
                 self.exchange_rate_input.setEnabled(False)
                 self.exchange_rate_input.setValue(1.0)
                 return
+            self.sheet_cache.touch(current_tab)
             # Enable/disable main exchange rate input
             if current_tab.type == "bank":
                 self.exchange_rate_input.setEnabled(True)
@@ -507,8 +671,19 @@ class ExcelLike(QMainWindow):
                 self.tabs.setTabText(i, new_name)
                 if hasattr(tab, 'name'):
                     tab.name = new_name
+                self.sheet_navigator.schedule_refresh()
                 break
 
+    def update_undo_actions(self):
+        """Enable Undo/Redo and name the step they act on"""
+        if self.undo_action is None:
+            return
+        stack = self.undo_stack
+        self.undo_action.setEnabled(stack.can_undo())
+        self.undo_action.setText(f"Undo {stack.undo_label()}".strip())
+        self.redo_action.setEnabled(stack.can_redo())
+        self.redo_action.setText(f"Redo {stack.redo_label()}".strip())
+
     def setup_menu_bar(self):
         """Initialize the menu bar with actions"""
         self.menu = self.menuBar()
@@ -520,7 +695,16 @@ class ExcelLike(QMainWindow):
             ("Add Sheet", self.add_sheet_dialog),
             ("Delete Sheet", self.delete_sheet),
             ("Save", self.file_manager.save_file),
-            ("Load", self.file_manager.load_file)
+            ("Load", self.file_manager.load_file),
+            ("History...", self.show_history),
+            ("Compare With...", self.compare_workbook),
+            ("Memory Report...", self.show_memory_report),
+            ("Trial Balance...", self.show_trial_balance),
+            ("Import .xls...", self.xls_importer.import_file),
+            ("Import Statement...", self.statement_importer.import_statement),
+            ("Export .xlsx...", self.xlsx_exporter.export_file),
+            ("Exchange Rates...", self.show_exchange_rates),
+            ("Close Period...", self.period_close.close_period)
         ]
 
         for text, callback in actions:
@@ -531,12 +715,30 @@ class ExcelLike(QMainWindow):
             if text == "Delete Sheet":
                 file_menu.addSeparator()
 
+        edit_menu = self.menu.addMenu("Edit")
+        self.undo_action = QAction("Undo", self)
+        self.undo_action.setShortcut(QKeySequence.Undo)
+        self.undo_action.triggered.connect(self.undo_stack.undo)
+        edit_menu.addAction(self.undo_action)
+        self.redo_action = QAction("Redo", self)
+        self.redo_action.setShortcut(QKeySequence.Redo)
+        self.redo_action.triggered.connect(self.undo_stack.redo)
+        edit_menu.addAction(self.redo_action)
+        self.update_undo_actions()
+
         # Add tab switcher to menu
         navigate_menu = self.menu.addMenu("Navigate")
         switch_tab_action = QAction("Switch Tab...", self)
         switch_tab_action.setShortcut("Ctrl+K")
         switch_tab_action.triggered.connect(self.show_tab_switcher)
         navigate_menu.addAction(switch_tab_action)
+        navigator_action = self.sheet_navigator.toggleViewAction()
+        navigator_action.setText("Sheet Navigator")
+        navigate_menu.addAction(navigator_action)
+        find_action = QAction("Find in Workbook...", self)
+        find_action.setShortcut("Ctrl+F")
+        find_action.triggered.connect(self.show_search)
+        navigate_menu.addAction(find_action)
 
         # Add right-click context menu for tab switching
         self.tabs.setContextMenuPolicy(Qt.CustomContextMenu)
@@ -545,10 +747,8 @@ class ExcelLike(QMainWindow):
         self.tabs.setTabBarAutoHide(False)
         self.tabs.setUsesScrollButtons(True)
         self.tabs.tabBar().setElideMode(Qt.ElideRight)
-        # Set tooltips for all tabs
+        # Set tooltips for all tabs; later tabs get theirs when they are shown
         self.tabs.currentChanged.connect(self.update_tab_tooltips)
-        self.update_tab_tooltips()
-        # Set tab width to fit sheet name
         self.adjust_tab_widths()
 
     def adjust_tab_widths(self):
@@ -558,11 +758,25 @@ class ExcelLike(QMainWindow):
             text = tab_bar.tabText(i)
             tab_bar.setTabToolTip(i, text)  # Set tooltip for full name
 
-    def update_tab_tooltips(self):
-        for i in range(self.tabs.count()):
-            name = self.tabs.tabText(i)
-            self.tabs.setTabToolTip(i, name)
-        self.adjust_tab_widths()
+    def update_tab_tooltips(self, index=None):
+        """Tooltip of the current tab (every tab without ``index``)"""
+        if index is None:
+            self.adjust_tab_widths()
+        elif 0 <= index < self.tabs.count():
+            self.tabs.setTabToolTip(index, self.tabs.tabText(index))
+
+    def open_sheet(self, sheet):
+        """Show ``sheet``, opening a tab for it (before the + tab) when it has none"""
+        index = self.tabs.indexOf(sheet)
+        if index < 0:
+            suppress = getattr(self, '_suppress_plus_tab', False)
+            self._suppress_plus_tab = True  # Inserting must not select the + tab
+            plus = self.tabs.count() - 1
+            position = plus if plus >= 0 and self.tabs.tabText(plus) == "+" else self.tabs.count()
+            index = self.tabs.insertTab(position, sheet, sheet.name)
+            self.tabs.setTabToolTip(index, sheet.name)
+            self._suppress_plus_tab = suppress
+        self.tabs.setCurrentIndex(index)
 
     def show_tab_context_menu(self, pos):
         menu = QMenu(self)
@@ -600,7 +814,7 @@ class ExcelLike(QMainWindow):
     def add_sheet_dialog(self):
         """Show dialog to add a new sheet"""
         print(f"DEBUG ADD: Starting add sheet dialog, current tabs: {self.tabs.count()}")
-        dlg = AddSheetDialog(self)
+        dlg = AddSheetDialog(self, currencies=self.currencies.choices())
         if dlg.exec() == QDialog.Accepted:
             result = dlg.get_result()
             if len(result) == 3:
@@ -664,7 +878,7 @@ class ExcelLike(QMainWindow):
         if self.tabs.count() > 1:
             self._suppress_plus_tab = True  # Suppress add sheet dialog after delete
             sheet_name = self.tabs.tabText(idx)
-            sheet_to_delete = self.sheets[idx]
+            sheet_to_delete = self.tabs.widget(idx)
             reply = QMessageBox.question(
                 self,
                 "Delete Sheet",
@@ -676,7 +890,10 @@ class ExcelLike(QMainWindow):
                 is_bank_sheet = hasattr(sheet_to_delete, 'type') and sheet_to_delete.type == "bank"
 
                 self.tabs.removeTab(idx)
-                del self.sheets[idx]
+                self.sheets.remove(sheet_to_delete)
+                self.undo_stack.discard(sheet_to_delete)
+                self.provenance.unregister(sheet_to_delete)
+                self.formula_manager.rebuild()
                 self._add_plus_tab()
 
                 self.auto_save()
@@ -697,8 +914,13 @@ class ExcelLike(QMainWindow):
                 QMessageBox.Yes | QMessageBox.No
             )
             if reply == QMessageBox.Yes:
+                sheet = self.tabs.widget(idx)
                 self.tabs.removeTab(idx)
-                del self.sheets[idx]
+                if getattr(sheet, 'derived', None) is None:
+                    # Generated sheets stay in the workbook (and the navigator); only their tab closes
+                    self.undo_stack.discard(sheet)
+                    self.sheets.remove(sheet)
+                    self.formula_manager.rebuild()
                 self._add_plus_tab()
                 self.auto_save()
             self._suppress_plus_tab = False
@@ -707,6 +929,13 @@ class ExcelLike(QMainWindow):
         """Create a new file with default sheet"""
         self.tabs.clear()
         self.sheets = []
+        self.provenance.clear()
+        self.exchange_rates.load_list([])
+        self.currencies.reset()
+        self.period_snapshots = []
+        self.undo_stack.clear()
+        self.formula_manager.rebuild()
+        self.statement_manager.set_opening_balances({})
         # Set default company name if empty
         self.company_input.setText(self.company_input.text() or "company_name")
         self.period_from_input.setDate(QDate.currentDate().addMonths(-1))
@@ -757,6 +986,7 @@ class ExcelLike(QMainWindow):
         self.tabs.tabBar().setTabButton(self.tabs.count()-1, QTabBar.RightSide, None)
         self.tabs.tabBar().setTabButton(plus_index, QTabBar.LeftSide, None)
         self.tabs.tabBar().setTabButton(plus_index, QTabBar.RightSide, None)
+        self.sheet_navigator.schedule_refresh()
 
     def _on_tab_or_plus_clicked(self, index):
         # If last tab (the plus tab) is clicked, open add sheet dialog and revert to previous tab immediately
@@ -768,7 +998,7 @@ class ExcelLike(QMainWindow):
                 prev_index = 0
             if self.tabs.count() > 1:
                 self.tabs.setCurrentIndex(prev_index)
-            dlg = AddSheetDialog(self)
+            dlg = AddSheetDialog(self, currencies=self.currencies.choices())
             if dlg.exec() == QDialog.Accepted:
                 result = dlg.get_result()
                 if len(result) == 3:
@@ -897,14 +1127,7 @@ class ExcelLike(QMainWindow):
                 }
             """)
     def show_tab_switcher(self):
-        """Show a dropdown dialog to quickly jump to any tab by name."""
-        from PySide6.QtWidgets import QInputDialog
-        tab_names = [self.tabs.tabText(i) for i in range(self.tabs.count()) if self.tabs.tabText(i) != "+"]
-        if not tab_names:
-            return
-        name, ok = QInputDialog.getItem(self, "Switch Tab", "Select a sheet:", tab_names, 0, False)
-        if ok and name:
-            for i in range(self.tabs.count()):
-                if self.tabs.tabText(i) == name:
-                    self.tabs.setCurrentIndex(i)
-                    break
+        """Ctrl+K: search any sheet by name in the sheet navigator"""
+        self.sheet_navigator.show()
+        self.sheet_navigator.raise_()
+        self.sheet_navigator.focus_query()
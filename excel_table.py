@@ -1,11 +1,27 @@
 import logging
-from PySide6.QtCore import Qt, QTimer
+import pickle
+import zlib
+from bisect import bisect_left
+from contextlib import nullcontext
+from PySide6.QtCore import QByteArray, QDataStream, QIODevice, Qt, QTimer
 from PySide6.QtGui import QAction, QColor, QKeySequence, QPainter
-from PySide6.QtWidgets import QApplication, QMenu, QTableWidget, QTableWidgetItem
-from utils import format_number
+from PySide6.QtWidgets import (QApplication, QLineEdit, QMenu, QStyledItemDelegate, QStyleOptionViewItem,
+                               QTableWidget, QTableWidgetItem)
+from cell_index import CellIndex
+from currencies import KNOWN_CURRENCIES
+from date_index import DateIndex
+from formula_manager import FORMULA_ROLE
+from provenance import RowIds
+from sheet_view import SheetView
+from span_registry import SpanRegistry
+from undo_stack import ColumnCommand, RenameCommand, RowCommand, SpanCommand
+from utils import format_number, parse_date
 
 logger = logging.getLogger(__name__)
 
+# Cell and structure methods that restore a dehydrated sheet before running (see ExcelTable.dehydrate)
+HYDRATING_METHODS = ("item", "setItem", "takeItem", "insertRow", "insertRows", "removeRow", "insertColumn",
+                     "removeColumn", "setRowCount", "setColumnCount", "clearContents", "clear")
 
 def excel_column_name(n):
     name = ""
@@ -15,8 +31,28 @@ def excel_column_name(n):
     return name
 
 
+class _FormulaDelegate(QStyledItemDelegate):
+    """Edits a formula cell's formula rather than its displayed result; draws the cells of derived sheets"""
+
+    def initStyleOption(self, option, index):
+        super().initStyleOption(option, index)
+        derived = getattr(self.parent(), "derived", None)
+        if derived is not None and not option.text:
+            text = derived.cell(index.row(), index.column())
+            if text:
+                option.text = text
+                option.features |= QStyleOptionViewItem.HasDisplay
+
+    def setEditorData(self, editor, index):
+        formula = index.data(FORMULA_ROLE)
+        if formula and isinstance(editor, QLineEdit):
+            editor.setText(formula)
+        else:
+            super().setEditorData(editor, index)
+
+
 class ExcelTable(QTableWidget):
-    def __init__(self, type, rows=100, cols=20, name="", auto_save_callback=None):
+    def __init__(self, type, rows=100, cols=20, name="", auto_save_callback=None, rows_changed_callback=None):
         super().__init__(rows, cols)
         self.setContextMenuPolicy(Qt.CustomContextMenu)
         self.customContextMenuRequested.connect(self.context_menu)
@@ -24,6 +60,28 @@ class ExcelTable(QTableWidget):
         self.type = type
         self.currency = name.split("-")[1] if "-" in self.name else ""
         self.auto_save_callback = auto_save_callback
+        self.rows_changed_callback = rows_changed_callback  # (table, rows or None for the whole sheet)
+        self.rate_registry = None  # workbook ExchangeRateRegistry, set by the SheetManager
+        self.closed_row_count = 0  # rows above this belong to closed periods and are frozen
+        self.period_provider = None  # returns the workbook (Period From, To) dates, set by the SheetManager
+        self.undo_stack = None  # workbook UndoStack, set by the SheetManager
+        self.formula_manager = None  # workbook FormulaManager, set by the SheetManager
+        self.has_formulas = False  # set once a formula is entered or loaded; saves scanning formula-free sheets
+        self._editing = None  # (row, col, text before) of the cell in the editor
+        self._date_index = DateIndex()
+        self._date_index_valid = False  # rebuilt lazily after row/column structure changes
+        self.sheet_view = None  # SheetView while rows are shown sorted or filtered
+        self.spans = SpanRegistry()  # merged cells; mirrors the view's spans
+        self.cell_index = CellIndex()  # populated cells, kept by the model signals below
+        self.row_ids = RowIds(rows)  # stable row identities for provenance, kept by the model signals below
+        self.revision = 0  # bumped on every change to cells, structure, headers or spans; saves skip clean sheets
+        self.derived = None  # DerivedSheet drawn in place of items (payable detail views), see set_derived
+        self._dehydrated = None  # compressed items while the sheet is dehydrated, see dehydrate
+        self._view_timer = QTimer(self)
+        self._view_timer.setSingleShot(True)
+        self._view_timer.setInterval(0)
+        self._view_timer.timeout.connect(self._rebuild_view)
+        self._exchange_rate = 1.0
         self._custom_headers = None  # Track custom headers
 
         # For aggregate sheets, set up 2-row horizontal header
@@ -41,6 +99,20 @@ class ExcelTable(QTableWidget):
         self.horizontalHeader().setDefaultSectionSize(80)
         self.setSizeAdjustPolicy(QTableWidget.AdjustToContents)
         self.itemChanged.connect(self._on_item_changed)
+        # Model signals also fire while the table's signals are blocked (bulk writes, loading)
+        model = self.model()
+        for signal in (model.dataChanged, model.headerDataChanged, model.rowsInserted, model.rowsRemoved,
+                       model.columnsInserted, model.columnsRemoved, model.modelReset):
+            signal.connect(self._touch)
+        model.dataChanged.connect(self._index_cells)
+        model.rowsInserted.connect(lambda _, first, last: self.cell_index.insert_rows(first, last - first + 1))
+        model.rowsRemoved.connect(lambda _, first, last: self.cell_index.remove_rows(first, last - first + 1))
+        model.rowsInserted.connect(lambda _, first, last: self.row_ids.insert_rows(first, last - first + 1))
+        model.rowsRemoved.connect(lambda _, first, last: self.row_ids.remove_rows(first, last - first + 1))
+        model.columnsInserted.connect(lambda _, first, last: self.cell_index.insert_columns(first, last - first + 1))
+        model.columnsRemoved.connect(lambda _, first, last: self.cell_index.remove_columns(first, last - first + 1))
+        model.modelReset.connect(self.cell_index.clear)  # clear()/clearContents()
+        self.setItemDelegate(_FormulaDelegate(self))
         self.user_added_rows = set()  # Track user-added rows
         self._last_paint_pos = -1
         # Enable smooth scrolling and proper updates
@@ -51,6 +123,29 @@ class ExcelTable(QTableWidget):
         self.verticalScrollBar().valueChanged.connect(self._on_scroll)
         self.horizontalScrollBar().valueChanged.connect(self._on_scroll)
 
+    @property
+    def exchange_rate(self):
+        """本期 rate of the sheet currency to HKD, from the workbook registry when there is one."""
+        if self.rate_registry is not None and self.type == "bank" and self.currency:
+            return self.rate_registry.current_rate(self.currency)
+        return self._exchange_rate
+
+    @exchange_rate.setter
+    def exchange_rate(self, rate):
+        if self.rate_registry is not None and self.type == "bank" and self.currency:
+            self.rate_registry.set_rates(self.currency, current=rate)
+        else:
+            self._exchange_rate = rate
+
+    def _column_rate(self, col):
+        """本期 rate of a 借方(CCY) / 贷方(CCY) column"""
+        header_item = self.horizontalHeaderItem(col)
+        header = header_item.text() if header_item else ""
+        currency = header.split("(")[1].split(")")[0] if "(" in header and ")" in header else ""
+        if self.rate_registry is not None and currency:
+            return self.rate_registry.current_rate(currency)
+        return self.exchange_rate
+
     def paintEvent(self, event):
         # First call the parent paintEvent to draw the table contents
         super().paintEvent(event)
@@ -62,6 +157,14 @@ class ExcelTable(QTableWidget):
             row_height = self.rowHeight(0)
             col_count = self.columnCount()
 
+            # Shade the rows of closed periods (rows are out of order while a view is shown)
+            if self.closed_row_count and self.sheet_view is None:
+                last_closed = self.closed_row_count - 1
+                bottom = self.rowViewportPosition(last_closed) + self.rowHeight(last_closed)
+                if bottom > 0:
+                    painter.fillRect(0, 0, visible_rect.width(), min(bottom, visible_rect.height()),
+                                     QColor(0, 0, 0, 18))
+
             # Paint frozen rows if they exist (for aggregate sheets with 2-row headers)
             if hasattr(self, '_frozen_row_count') and self._frozen_row_count > 0:
                 self._paint_frozen_rows(painter, visible_rect)
@@ -80,159 +183,92 @@ class ExcelTable(QTableWidget):
             # Add antialiasing for better rendering on Windows
             painter.setRenderHint(QPainter.Antialiasing, False)
 
-            # Calculate sums and balances
-            debit_sum, credit_sum = self.sum_columns()
-            balance = debit_sum - credit_sum
-            rate = getattr(self, "exchange_rate", 1.0)
-            hkd_balance = balance * rate
-
-            # Get currency-specific sums for aggregate sheets
-            currency_sums = self.sum_currency_columns()
-
-            # Find column positions - handle both regular and multi-currency sheets
-            debit_col = None
-            credit_col = None
-            balance_col = None
-            currency_cols = []
-
-            # Check if this is a multi-currency aggregate sheet
-            is_aggregate_sheet = (hasattr(self, 'name') and
-                                  self.name in ["銷售收入", "銷售成本", "銀行費用", "利息收入", "董事往來"])
-
-            if is_aggregate_sheet:
-                # For aggregate sheets with 2-row headers, use sub_headers to find currency columns
-                if hasattr(self, '_sub_headers'):
-                    for col, sub_header in enumerate(self._sub_headers):
-                        if sub_header and "原币(" in sub_header:
-                            currency_cols.append(col)
-                        # Find balance column by checking main headers
-                        if col < len(self._main_headers) and "餘" in self._main_headers[col]:
-                            balance_col = col
-                else:
-                    # Fallback for aggregate sheets without new headers
-                    for col in range(col_count):
-                        if col < self.columnCount():
-                            row1_item = self.item(1, col)
-                            if row1_item and "原币(" in row1_item.text():
-                                currency_cols.append(col)
-                            # Find balance column by checking row 0
-                            row0_item = self.item(0, col)
-                            if row0_item and "餘" in row0_item.text():
-                                balance_col = col
-                # For aggregate sheets, treat all currency columns as credit columns
-                credit_col = currency_cols[0] if currency_cols else None
-            else:
-                # Original logic for regular bank sheets
-                for col in range(col_count):
-                    header = self.horizontalHeaderItem(col).text().replace(" ", "")
-                    if "借方" in header:
-                        debit_col = col
-                    if "貸方" in header:
-                        credit_col = col
-                    if "餘額" in header:
-                        balance_col = col
+            # Totals are shared with the .xlsx export
+            pinned_rows = self.pinned_row_values()
+            backgrounds = (QColor(240, 240, 240), QColor(220, 220, 220))
 
-            # Draw first pinned row (sheet currency)
-            painter.fillRect(0, y1, visible_rect.width(), row_height, QColor(240, 240, 240))
             font = painter.font()
             font.setBold(True)
             painter.setFont(font)
 
-            # Set darker pen for frames and text
-            painter.setPen(QColor(80, 80, 80))
+            for (label, values), y, background in zip(pinned_rows, (y1, y2), backgrounds):
+                painter.fillRect(0, y, visible_rect.width(), row_height, background)
 
-            # Draw merged cell background for first 3 columns
-            if col_count >= 3:
-                merge_width = self.columnWidth(0) + self.columnWidth(1) + self.columnWidth(2)
-                painter.fillRect(0, y1, merge_width, row_height, QColor(240, 240, 240))
-                painter.drawRect(0, y1, merge_width, row_height)
+                # Set darker pen for frames and text
+                painter.setPen(QColor(80, 80, 80))
 
-                # Draw the merged cell text
-                if self.type == "bank":
-                    text = f"本币 TOTAL: {self.currency}"
-                else:
-                    text = "本币种"
-                painter.drawText(6, y1 + row_height // 2 + 5, text)
+                # Draw merged cell background for first 3 columns
+                if col_count >= 3:
+                    merge_width = self.columnWidth(0) + self.columnWidth(1) + self.columnWidth(2)
+                    painter.fillRect(0, y, merge_width, row_height, background)
+                    painter.drawRect(0, y, merge_width, row_height)
 
-                # Start drawing individual cells from column 3
-                start_col = 3
-            else:
-                start_col = 0
+                    # Draw the merged cell text
+                    painter.drawText(6, y + row_height // 2 + 5, label)
 
-            # Draw remaining individual cells
-            for col in range(start_col, col_count):
-                x = self.columnViewportPosition(col)
-                w = self.columnWidth(col)
-                painter.drawRect(x, y1, w, row_height)
-
-                text = ""
-                if is_aggregate_sheet:
-                    # For aggregate sheets, only show currency column sums, no balance
-                    if col in currency_sums:
-                        currency, column_sum = currency_sums[col]
-                        text = self.format_number(column_sum)
+                    # Start drawing individual cells from column 3
+                    start_col = 3
                 else:
-                    # For bank sheets, show debit/credit/balance as before
-                    if col == debit_col:
-                        text = self.format_number(debit_sum)
-                    elif col == credit_col:
-                        text = self.format_number(credit_sum)
-                    elif col == balance_col:
-                        text = self.format_number(balance)
-
-                # Use darker text color for better visibility
-                painter.setPen(QColor(40, 40, 40))
-                painter.drawText(x + 6, y1 + row_height // 2 + 5, text)
-
-            # Draw second pinned row (HKD)
-            painter.fillRect(0, y2, visible_rect.width(), row_height, QColor(220, 220, 220))
-
-            # Set darker pen for frames
-            painter.setPen(QColor(80, 80, 80))
-
-            # Draw merged cell background for first 3 columns
-            if col_count >= 3:
-                merge_width = self.columnWidth(0) + self.columnWidth(1) + self.columnWidth(2)
-                painter.fillRect(0, y2, merge_width, row_height, QColor(220, 220, 220))
-                painter.drawRect(0, y2, merge_width, row_height)
-
-                # Draw the merged cell text
-                text = "本期 TOTAL: HKD"
-                painter.drawText(6, y2 + row_height // 2 + 5, text)
-
-                # Start drawing individual cells from column 3
-                start_col = 3
-            else:
-                start_col = 0
+                    start_col = 0
 
-            # Draw remaining individual cells
-            for col in range(start_col, col_count):
-                x = self.columnViewportPosition(col)
-                w = self.columnWidth(col)
-                painter.drawRect(x, y2, w, row_height)
-
-                text = ""
-                if is_aggregate_sheet:
-                    # For aggregate sheets, only show HKD equivalent for currency columns, no balance
-                    if col in currency_sums:
-                        currency, column_sum = currency_sums[col]
-                        text = self.format_number(column_sum * rate)
-                else:
-                    # For bank sheets, show debit/credit/balance as before
-                    if col == debit_col:
-                        text = self.format_number(debit_sum * rate)
-                    elif col == credit_col:
-                        text = self.format_number(credit_sum * rate)
-                    elif col == balance_col:
-                        text = self.format_number(hkd_balance)
-
-                # Use darker text color for better visibility
-                painter.setPen(QColor(40, 40, 40))
-                painter.drawText(x + 6, y2 + row_height // 2 + 5, text)
+                # Draw remaining individual cells
+                for col in range(start_col, col_count):
+                    x = self.columnViewportPosition(col)
+                    w = self.columnWidth(col)
+                    painter.setPen(QColor(80, 80, 80))
+                    painter.drawRect(x, y, w, row_height)
+
+                    text = self.format_number(values[col]) if col in values else ""
+
+                    # Use darker text color for better visibility
+                    painter.setPen(QColor(40, 40, 40))
+                    painter.drawText(x + 6, y + row_height // 2 + 5, text)
 
         finally:
             painter.end()
 
+    def pinned_row_values(self):
+        """Label and {col: amount} of the two pinned total rows: sheet currency, then HKD.
+
+        Shared by paintEvent and the .xlsx export so both show the same totals.
+        """
+        rate = getattr(self, "exchange_rate", 1.0)
+        is_aggregate_sheet = (hasattr(self, 'name') and
+                              self.name in ["銷售收入", "銷售成本", "銀行費用", "利息收入", "董事往來"])
+        totals = {}
+        rates = {}  # col -> HKD rate, where a column has its own currency
+        if is_aggregate_sheet:
+            # For aggregate sheets, only show currency column sums, no balance
+            for col, (currency, column_sum) in self.sum_currency_columns().items():
+                totals[col] = column_sum
+        elif self._currency_amount_columns():
+            # 借方(USD)/贷方(USD)... sheets: one total per currency column, no mixed-currency balance
+            for col in self._currency_amount_columns():
+                rates[col] = self._column_rate(col)
+                column_sum = 0.0
+                for row in self.period_rows():
+                    item = self.item(row, col)
+                    if item and item.text():
+                        column_sum += self.parse_number(item.text())
+                totals[col] = round(column_sum, 2)
+        else:
+            debit_sum, credit_sum = self.sum_columns()
+            balance_col, debit_col, credit_col = self._balance_columns()
+            if debit_col is not None:
+                totals[debit_col] = debit_sum
+            if credit_col is not None:
+                totals[credit_col] = credit_sum
+            if balance_col is not None:
+                totals[balance_col] = debit_sum - credit_sum
+        if self.type == "statement":
+            # Statements carry their own totals lines
+            return []
+        label = f"本币 TOTAL: {self.currency}" if self.type == "bank" else "本币种"
+        return [
+            (label, totals),
+            ("本期 TOTAL: HKD", {col: value * rates.get(col, rate) for col, value in totals.items()}),
+        ]
+
     @staticmethod
     def format_number(value):
         """Deprecated: Use format_number from utils.py instead."""
@@ -259,6 +295,7 @@ class ExcelTable(QTableWidget):
 
     def showEvent(self, event):
         """Handle show events to ensure proper initial painting on Windows"""
+        self.hydrate()
         super().showEvent(event)
         # Force initial viewport update when widget becomes visible
         self.viewport().update()
@@ -347,33 +384,63 @@ class ExcelTable(QTableWidget):
         if current_scroll > max_scroll:
             scrollbar.setValue(max_scroll)
 
-    def _on_item_changed(self, item):
+    def _balance_columns(self):
+        """Return (balance_col, debit_col, credit_col) found in the horizontal headers."""
         balance_col = None
         debit_col = None
         credit_col = None
-        # Skip balance calculation for aggregate sheets (they don't use traditional debit/credit structure)
-        if self.type == "aggregate":
-            self._auto_save()
-            return
         for col in range(self.columnCount()):
             header_item = self.horizontalHeaderItem(col)
             if header_item is None:
                 continue
             header = header_item.text().replace(" ", "")
-            if "余额" in header:
+            if "余额" in header or "餘額" in header:
                 balance_col = col
             if "借方" in header:
                 debit_col = col
             if "貸方" in header or "贷方" in header:
                 credit_col = col
+        return balance_col, debit_col, credit_col
+
+    def _currency_amount_columns(self):
+        """Columns labelled 借方(CCY) / 贷方(CCY) in the horizontal headers."""
+        columns = []
+        for col in range(self.columnCount()):
+            header_item = self.horizontalHeaderItem(col)
+            header = header_item.text().replace(" ", "") if header_item else ""
+            if header.startswith(("借方(", "贷方(", "貸方(")):
+                columns.append(col)
+        return columns
+
+    def _on_item_changed(self, item):
+        if self._editing is not None and self._editing[:2] == (item.row(), item.column()):
+            if self.state() == QTableWidget.EditingState:
+                # Typed edit committed by the editor
+                self._record_cell(item.row(), item.column(), self._editing[2], item.text())
+            self._editing = None
+        if self.formula_manager is not None:
+            self.formula_manager.cells_written(self, [(item.row(), item.column())])
+        self._notify_rows_changed((item.row(),))
+        if self._date_index_valid and item.column() == self._date_column():
+            self._date_index.set_row(item.row(), parse_date(item.text()))
+        if self.sheet_view is not None and not self._view_timer.isActive():
+            self.sheet_view.update_row(item.row(), item.column(), item.text())
+            self._place_view_row(item.row())
+        # Skip balance calculation for aggregate sheets (they don't use traditional debit/credit structure)
+        if self.type == "aggregate":
+            self._auto_save()
+            return
+        balance_col, debit_col, credit_col = self._balance_columns()
         if balance_col is None or debit_col is None or credit_col is None:
             self._auto_save()
             return
         row = item.row()
         col = item.column()
+        if row < self.closed_row_count:
+            return
         # Always set first row balance cell editable, others read-only
         self.blockSignals(True)
-        for r in range(self.rowCount()):
+        for r in self.open_rows():
             bal_item = self.item(r, balance_col)
             if not bal_item:
                 bal_item = QTableWidgetItem()
@@ -391,23 +458,126 @@ class ExcelTable(QTableWidget):
             return
         # Recalculate balances for all rows except the first
         if col in (debit_col, credit_col, balance_col) or (row == 0 and col == balance_col):
-            self.blockSignals(True)
-            for r in range(1, self.rowCount()):
-                prev_balance = self.item(r - 1, balance_col)
+            self.recalculate_balances()
+        self._auto_save()
+
+    def recalculate_balances(self):
+        """Recompute the running 余额 column: row balance = previous balance + debit - credit."""
+        balance_col, debit_col, credit_col = self._balance_columns()
+        if balance_col is None or debit_col is None or credit_col is None:
+            return
+        # Closed rows keep their balances: start from the last frozen (or the first) row
+        first_row = max(self.closed_row_count, 1)
+        self.blockSignals(True)
+        try:
+            prev_item = self.item(first_row - 1, balance_col)
+            prev_val = self.parse_number(prev_item.text()) if prev_item and prev_item.text() else 0.0
+            for r in range(first_row, self.rowCount()):
                 debit = self.item(r, debit_col)
                 credit = self.item(r, credit_col)
-                prev_val = self.parse_number(prev_balance.text()) if prev_balance and prev_balance.text() else 0.0
                 debit_val = self.parse_number(debit.text()) if debit and debit.text() else 0.0
                 credit_val = self.parse_number(credit.text()) if credit and credit.text() else 0.0
                 bal = prev_val + debit_val - credit_val
                 bal_item = self.item(r, balance_col)
                 if not bal_item:
                     bal_item = QTableWidgetItem()
+                    bal_item.setFlags(bal_item.flags() & ~Qt.ItemIsEditable)
                     self.setItem(r, balance_col, bal_item)
-                bal_text = self.format_number(bal)
-                bal_item.setText(bal_text)
+                bal_item.setText(self.format_number(bal))
+                prev_val = bal
+        finally:
             self.blockSignals(False)
-        self._auto_save()
+        view = self.sheet_view
+        if view is not None and (view.sort_column == balance_col or balance_col in view.filters):
+            # Balances were rewritten with signals blocked
+            self._view_timer.start()
+        if self.formula_manager is not None:
+            self.formula_manager.region_changed(self, first_row, balance_col, self.rowCount() - 1, balance_col)
+
+    def _first_free_row(self):
+        """Index of the row after the last row holding any text, from the cell index.
+
+        The running 余额 is written down every row and 序号 may be numbered
+        ahead of the entries, so neither counts as data (except the opening
+        balance on the first row).
+        """
+        if self.derived is not None:
+            return len(self.derived)
+        balance_col = self._balance_columns()[0]
+        ignored = {col for col in (balance_col, self._label_columns().get("序号")) if col is not None}
+        last = self.cell_index.last_row(ignored)
+        if last < 0 and balance_col is not None and (0, balance_col) in self.cell_index:
+            last = 0
+        return last + 1
+
+    def _label_columns(self):
+        """{header label: first column with that label}"""
+        columns = {}
+        for col in range(self.columnCount()):
+            header_item = self.horizontalHeaderItem(col)
+            if header_item is not None:
+                columns.setdefault(header_item.text(), col)
+        return columns
+
+    def append_records(self, records, chunk_size=5000):
+        """Bulk-append rows after the last populated row in one batch.
+
+        ``records`` is an iterable of {header label: text} dicts; labels that are
+        not columns of this sheet are ignored. Signals stay blocked while rows are
+        written and the running 余额 is carried along as rows are appended, so
+        balances are computed once and auto-save fires once.
+        Returns the number of rows appended.
+        """
+        columns = self._label_columns()
+        balance_col, debit_col, credit_col = self._balance_columns()
+        has_balance = None not in (balance_col, debit_col, credit_col)
+        row = self._first_free_row()
+        start_row = row
+        original_row_count = self.rowCount()
+        balance = 0.0
+        if has_balance and row > 0:
+            prev_item = self.item(row - 1, balance_col)
+            balance = self.parse_number(prev_item.text()) if prev_item else 0.0
+        self.setUpdatesEnabled(False)
+        self.blockSignals(True)
+        try:
+            for record in records:
+                if row >= self.rowCount():
+                    self.setRowCount(row + chunk_size)
+                values = {}
+                for label, text in record.items():
+                    col = columns.get(label)
+                    if col is None or text in (None, ""):
+                        continue
+                    values[col] = str(text)
+                if has_balance:
+                    if row == 0:
+                        balance = self.parse_number(values.get(balance_col, ""))
+                    else:
+                        balance += (self.parse_number(values.get(debit_col, ""))
+                                    - self.parse_number(values.get(credit_col, "")))
+                    values[balance_col] = self.format_number(balance)
+                for col, text in values.items():
+                    item = QTableWidgetItem(text)
+                    if col == balance_col and row > 0:
+                        item.setFlags(item.flags() & ~Qt.ItemIsEditable)
+                    self.setItem(row, col, item)
+                row += 1
+            # Trim the spare rows of the last chunk, keeping the usual blank rows below the data
+            self.setRowCount(max(row + 10, original_row_count))
+        finally:
+            self.blockSignals(False)
+            self.setUpdatesEnabled(True)
+        if has_balance and row > start_row:
+            # 余额 carried down below the old entries by an earlier recalculation is now stale
+            others = set(range(self.columnCount())) - {balance_col}
+            if self.cell_index.last_row(others) >= row:
+                self.recalculate_balances()
+        if row > start_row:
+            self.viewport().update()
+            self._notify_rows_changed(range(start_row, row))
+            self._auto_save()
+        return row - start_row
 
     def update_pinned_rows(self):
         self.blockSignals(True)
@@ -557,6 +727,7 @@ class ExcelTable(QTableWidget):
     def setHorizontalHeaderLabels(self, labels):
         super().setHorizontalHeaderLabels(labels)
         self._custom_headers = list(labels)
+        self._date_index_valid = False
         # Set only the first row's balance cell editable, others not
         balance_col = None
         for col, label in enumerate(labels):
@@ -581,10 +752,9 @@ class ExcelTable(QTableWidget):
 
         print(f"DEBUG SETUP: Setting up headers for {len(main_headers)} columns")
 
-        # CRITICAL: Clear all existing spans first to avoid conflicts
-        for row in range(min(10, self.rowCount())):  # Clear spans in first 10 rows
-            for col in range(min(20, self.columnCount())):  # Clear spans in first 20 columns
-                self.setSpan(row, col, 1, 1)
+        # CRITICAL: Clear all existing header spans first to avoid conflicts
+        for row, col, _, _ in self.spans.in_rows(0, 9):
+            self.setSpan(row, col, 1, 1)
 
         self.setColumnCount(len(main_headers))
         print(f"DEBUG SETUP: Column count set to {len(main_headers)}")
@@ -698,26 +868,11 @@ class ExcelTable(QTableWidget):
                 if x + w < 0 or x > visible_rect.width():
                     continue
 
-                row_span = self.rowSpan(row, col)
-                col_span = self.columnSpan(row, col)
-
-                # Simple span detection - if current cell is not top-left of its span, skip
-                # Check if we're the top-left cell of a span by looking at the span values
-                if row_span > 1 or col_span > 1:
-                    # This is a merged cell, check if it's the top-left
-                    is_top_left = True
-                    for check_row in range(max(0, row - row_span + 1), row + 1):
-                        for check_col in range(max(0, col - col_span + 1), col + 1):
-                            if (check_row, check_col) != (row, col):
-                                if self.rowSpan(check_row, check_col) == row_span and self.columnSpan(check_row,
-                                                                                                      check_col) == col_span:
-                                    is_top_left = False
-                                    break
-                        if not is_top_left:
-                            break
-
-                    if not is_top_left:
-                        continue
+                # Cells covered by a span are painted with its top-left cell
+                span = self.spans.span_at(row, col)
+                if span is not None and span[:2] != (row, col):
+                    continue
+                row_span, col_span = span[2:] if span is not None else (1, 1)
 
                 current_item = self.item(row, col)
                 if not current_item:
@@ -761,8 +916,37 @@ class ExcelTable(QTableWidget):
             for col in range(self.columnCount()):
                 self.setHorizontalHeaderItem(col, QTableWidgetItem(excel_column_name(col)))
 
+    def setSpan(self, row, col, rows, cols):
+        # Spans overlapping the new one are dropped first, so the view and the registry agree
+        self._touch()
+        for anchor in self.spans.set(row, col, rows, cols):
+            super().setSpan(*anchor, 1, 1)
+        if rows > 1 or cols > 1 or self.rowSpan(row, col) > 1 or self.columnSpan(row, col) > 1:
+            super().setSpan(row, col, rows, cols)
+
+    def clearSpans(self):
+        super().clearSpans()
+        self.spans.clear()
+        self._touch()
+
+    def load_spans(self, spans):
+        """Restore saved (row, col, rows, cols); older files also list every cell a span covers"""
+        for row, col, rows, cols in spans:
+            if (rows > 1 or cols > 1) and self.spans.span_at(row, col) is None:
+                self.setSpan(row, col, rows, cols)
+
+    def setColumnCount(self, columns):
+        if columns < self.columnCount():
+            self.spans.remove_columns(columns, self.columnCount() - columns)
+        super().setColumnCount(columns)
+
     def insertColumn(self, col):
         super().insertColumn(col)
+        self.spans.insert_columns(col)
+        self._date_index_valid = False
+        self.clear_view()
+        self._formulas_moved("col", col, 1)
+        self._notify_rows_changed()
         if self._custom_headers:
             # Use Excel-style column name for the new column
             self._custom_headers.insert(col, excel_column_name(col))
@@ -773,6 +957,11 @@ class ExcelTable(QTableWidget):
 
     def removeColumn(self, col):
         super().removeColumn(col)
+        self.spans.remove_columns(col)
+        self._date_index_valid = False
+        self.clear_view()
+        self._formulas_moved("col", col, -1)
+        self._notify_rows_changed()
         if self._custom_headers and col < len(self._custom_headers):
             del self._custom_headers[col]
             self.setHorizontalHeaderLabels(self._custom_headers)
@@ -780,19 +969,500 @@ class ExcelTable(QTableWidget):
             self.update_headers()
         self._auto_save()
 
-    def insertRow(self, row):
+    def open_rows(self):
+        """Row indexes of the open period"""
+        return range(self.closed_row_count, self.rowCount())
+
+    def _date_column(self):
+        for col in range(self.columnCount()):
+            header_item = self.horizontalHeaderItem(col)
+            if header_item is not None and header_item.text() == "日期":
+                return col
+        return None
+
+    def date_index(self):
+        """DateIndex over the 日期 column; cell edits keep it current, structure changes rebuild it"""
+        if not self._date_index_valid:
+            date_col = self._date_column()
+            if date_col is None:
+                self._date_index.rebuild((row, None) for row in range(self.rowCount()))
+            else:
+                items = (self.item(row, date_col) for row in range(self.rowCount()))
+                self._date_index.rebuild(
+                    (row, parse_date(item.text()) if item else None) for row, item in enumerate(items)
+                )
+            self._date_index_valid = True
+        return self._date_index
+
+    def period_rows(self):
+        """Open rows of the selected Period From/To, in row order.
+
+        Dated rows come from two binary searches in the date index; rows without
+        a date are always included. Without a period or a 日期 column this is
+        every open row.
+        """
+        period = self.period_provider() if self.period_provider is not None else None
+        if period is None or self._date_column() is None:
+            return self.open_rows()
+        index = self.date_index()
+        rows = index.rows_between(*period)
+        rows.extend(index.undated_rows())
+        rows.sort()
+        return rows[bisect_left(rows, self.closed_row_count):]
+
+    def setRowCount(self, rows):
+        shrinking = rows < self.rowCount()
+        if shrinking:
+            self.spans.remove_rows(rows, self.rowCount() - rows)
+        super().setRowCount(rows)
+        self._date_index_valid = False
+        self._view_structure_changed()
+        if shrinking:
+            # Trimming blank rows off the end: references are left as they are
+            self._formulas_moved()
+
+    def clearContents(self):
+        super().clearContents()
+        self._date_index_valid = False
+        self._view_structure_changed()
+        self._formulas_moved()
+        self._notify_rows_changed()
+
+    def _sort_key(self, col):
+        """Cell text -> sort key: dates and amounts sort by value, other text (and bad dates) as text"""
+        header_item = self.horizontalHeaderItem(col)
+        header = header_item.text() if header_item else ""
+        if header == "日期":
+            def key(text):
+                value = parse_date(text)
+                return (0, value.toordinal()) if value else (1, text)
+        elif any(m in header for m in ("借方", "贷方", "貸方", "余额", "餘額")):
+            def key(text):
+                return (0, self.parse_number(text))
+        else:
+            def key(text):
+                return (1, text)
+        return key
+
+    def _column_values(self, col):
+        for row in range(self.rowCount()):
+            item = self.item(row, col)
+            if item is not None and item.text():
+                yield row, item.text()
+
+    def _ensure_view(self):
+        if self.sheet_view is None:
+            self.sheet_view = SheetView(self.rowCount(), self._column_values)
+        return self.sheet_view
+
+    def sort_view(self, col, descending=False):
+        """Show the rows sorted by ``col`` without moving any cell"""
+        view = self._ensure_view()
+        view.sort_key = self._sort_key(col)
+        view.set_sort(col, descending)
+        self.horizontalHeader().setSortIndicatorShown(True)
+        self.horizontalHeader().setSortIndicator(col, Qt.DescendingOrder if descending else Qt.AscendingOrder)
+        self._apply_view()
+
+    def filter_view(self, col, values):
+        """Show only rows whose ``col`` text is one of ``values`` (None removes the column's filter)"""
+        self._ensure_view().set_filter(col, values)
+        if not self.sheet_view.active:
+            self.clear_view()
+            return
+        self._apply_view()
+
+    def clear_view(self):
+        """Back to the sheet's own row order with every row shown"""
+        self.sheet_view = None
+        self._view_timer.stop()
+        self.horizontalHeader().setSortIndicatorShown(False)
+        self._apply_view()
+
+    def _apply_view(self):
+        """Permute and hide vertical header sections to match the view; cells stay where they are"""
+        header = self.verticalHeader()
+        row_count = self.rowCount()
+        view = self.sheet_view
+        if view is None:
+            order = range(row_count)
+            hidden = ()
+        else:
+            order = view.order()
+            hidden = [row for row in range(row_count) if not view.is_visible(row)]
+            order.extend(hidden)
+        hidden = set(hidden)
+        # Without disabled updates every hide re-lays out the header: quadratic in the row count
+        self.setUpdatesEnabled(False)
+        header.setUpdatesEnabled(False)
+        try:
+            # Unhide first: moving hidden sections is far slower than moving shown ones
+            for row in range(row_count):
+                if row not in hidden and header.isSectionHidden(row):
+                    header.setSectionHidden(row, False)
+            for visual, logical in enumerate(order):
+                current = header.visualIndex(logical)
+                if current != visual:
+                    header.swapSections(visual, current)
+            for row in hidden:
+                if not header.isSectionHidden(row):
+                    header.setSectionHidden(row, True)
+        finally:
+            header.setUpdatesEnabled(True)
+            self.setUpdatesEnabled(True)
+        self.viewport().update()
+
+    def _place_view_row(self, row):
+        """Move one edited row to its place in the view: visible rows first, in view order"""
+        header = self.verticalHeader()
+        if self.sheet_view.is_visible(row):
+            header.setSectionHidden(row, False)
+            header.moveSection(header.visualIndex(row), self.sheet_view.position(row))
+        else:
+            header.moveSection(header.visualIndex(row), self.rowCount() - 1)
+            header.setSectionHidden(row, True)
+
+    def _view_structure_changed(self):
+        if self.sheet_view is not None:
+            self._view_timer.start()
+
+    def _rebuild_view(self):
+        if self.sheet_view is not None:
+            self.sheet_view.rebuild(self.rowCount())
+            self._apply_view()
+
+    def setHorizontalHeaderItem(self, col, item):
+        super().setHorizontalHeaderItem(col, item)
+        self._date_index_valid = False
+
+    def edit(self, index, trigger=None, event=None):
+        # Rows of closed periods are frozen; derived sheets are read-only
+        if index.row() < self.closed_row_count or self.derived is not None:
+            return False
+        if trigger is None:
+            return super().edit(index)
+        started = super().edit(index, trigger, event)
+        if started:
+            self._editing = (index.row(), index.column(), self.cell_source(index.row(), index.column()))
+        return started
+
+    def cell_source(self, row, col):
+        """What was entered in a cell: its formula, or else its text"""
+        item = self.item(row, col)
+        if item is None:
+            return ""
+        return item.data(FORMULA_ROLE) or item.text()
+
+    def formula_cells(self):
+        """{(row, col): formula} of the sheet"""
+        formulas = {}
+        if not self.has_formulas:
+            return formulas
+        for row in range(self.rowCount()):
+            for col in range(self.columnCount()):
+                item = self.item(row, col)
+                if item is not None and item.data(FORMULA_ROLE):
+                    formulas[(row, col)] = item.data(FORMULA_ROLE)
+        return formulas
+
+    def load_formulas(self, formulas):
+        """Put saved {(row, col): formula} back on their cells; the FormulaManager registers them once every
+        sheet is loaded"""
+        self.blockSignals(True)
+        try:
+            for (row, col), formula in formulas.items():
+                item = self.item(row, col)
+                if item is None:
+                    item = QTableWidgetItem()
+                    self.setItem(row, col, item)
+                item.setData(FORMULA_ROLE, formula)
+                self.has_formulas = True
+        finally:
+            self.blockSignals(False)
+
+    def _formulas_moved(self, axis=None, at=0, count=0):
+        """Cells moved: re-register formula cells at their new positions.
+
+        With ``axis`` ("row" or "col"), ``count`` lines were inserted (count > 0)
+        or deleted (count < 0) at ``at``, and references into this sheet move
+        with them, on every sheet.
+        """
+        if self.formula_manager is None:
+            return
+        if axis is not None and count:
+            self.formula_manager.structure_changed(self, axis, at, count)
+        elif self.has_formulas:
+            self.formula_manager.rebuild()
+
+    def _record_cell(self, row, col, old, new):
+        if self.undo_stack is not None:
+            self.undo_stack.record_cell(self, row, col, old, new)
+
+    def _record(self, label, command):
+        if self.undo_stack is not None:
+            self.undo_stack.push(label, command)
+
+    def _undo_batch(self, label):
+        return self.undo_stack.batch(label) if self.undo_stack is not None else nullcontext()
+
+    def _writable(self, row, col):
+        if row < self.closed_row_count or self.derived is not None:
+            return False
+        item = self.item(row, col)
+        return item is None or bool(item.flags() & Qt.ItemIsEditable)
+
+    def write_cells(self, cells, label):
+        """Set [(row, col, text)] on the writable cells as one undo step holding only the changed cells"""
+        changes = []
+        with self._undo_batch(label):
+            for row, col, text in cells:
+                if not self._writable(row, col):
+                    continue
+                old = self.cell_source(row, col)
+                if old != text:
+                    self._record_cell(row, col, old, text)
+                    changes.append((row, col, text))
+        self._editing = None
+        if changes:
+            self.restore_cells(changes)
+
+    def restore_cells(self, cells):
+        """Write [(row, col, text)] in one pass: one balance recalculation, one notification, one save"""
+        self._write_texts(cells)
+        if self.formula_manager is not None:
+            self.formula_manager.cells_written(self, [(row, col) for row, col, _ in cells
+                                                      if row < self.rowCount() and col < self.columnCount()])
+        self._cells_rewritten({row for row, _, _ in cells})
+
+    def show_formula_results(self, results):
+        """Write recalculated formula values {(row, col): text} (FormulaManager)"""
+        self._write_texts([(row, col, text) for (row, col), text in results.items()])
+        self._cells_rewritten({row for row, _ in results})
+
+    def _write_texts(self, cells):
+        balance_col = self._balance_columns()[0] if self.type != "aggregate" else None
+        self.blockSignals(True)
+        try:
+            for row, col, text in cells:
+                if row >= self.rowCount() or col >= self.columnCount():
+                    continue
+                item = self.item(row, col)
+                if item is None:
+                    if not text:
+                        continue
+                    item = QTableWidgetItem(text)
+                    if col == balance_col and row > 0:
+                        # Only the first row's balance is editable
+                        item.setFlags(item.flags() & ~Qt.ItemIsEditable)
+                    self.setItem(row, col, item)
+                else:
+                    item.setText(text)
+        finally:
+            self.blockSignals(False)
+
+    def _cells_rewritten(self, rows):
+        """Bookkeeping after cells were written with signals blocked"""
+        self._date_index_valid = False
+        self._view_structure_changed()
+        self.recalculate_balances()
+        self._notify_rows_changed(sorted(rows))
+        self._auto_save()
+        self.viewport().update()
+
+    def restore_spans(self, anchors, spans):
+        """Reset the spans anchored at ``anchors``, then set ``spans`` (undo/redo of merge/unmerge)"""
+        for row, col in anchors:
+            if self.spans.anchored(row, col):
+                self.setSpan(row, col, 1, 1)
+        for row, col, rs, cs in spans:
+            self.setSpan(row, col, rs, cs)
+        self._auto_save()
+        self.viewport().update()
+
+    def _insert_position(self, row):
         # For aggregate sheets, prevent inserting between title rows (0 and 1)
         if hasattr(self, 'name') and self.name in ["銷售收入", "銷售成本", "銀行費用", "利息收入", "應付費用",
                                                    "董事往來"]:
             if row <= 1:  # Can't insert between or before title rows
                 row = 2  # Insert after title rows instead
-        super().insertRow(row)
+        if row < self.closed_row_count:
+            row = self.closed_row_count  # Never insert into a closed period
+        return row
+
+    def insertRow(self, row):
+        self.insertRows(row, 1)
+
+    def insertRows(self, row, count):
+        """Insert ``count`` blank rows at ``row`` in one model operation; returns the row used"""
+        # The model is changed directly: packed items must be back at their rows first
+        self.hydrate()
+        row = self._insert_position(row)
+        if count <= 0:
+            return row
+        self.model().insertRows(row, count)
+        self.spans.insert_rows(row, count)
+        self._rows_inserted(row, count)
+        return row
+
+    def insert_records(self, row, records):
+        """Insert rows holding ``records`` ({header label: text}) at ``row``.
+
+        One model insert for all rows, one 序号/余额 pass, one change
+        notification and one auto-save, however many records there are.
+        Returns the first inserted row.
+        """
+        records = list(records)
+        self.hydrate()
+        row = self._insert_position(row)
+        if not records:
+            return row
+        columns = self._label_columns()
+        self.setUpdatesEnabled(False)
+        self.blockSignals(True)
+        try:
+            self.model().insertRows(row, len(records))
+            self.spans.insert_rows(row, len(records))
+            for r, record in enumerate(records, row):
+                for label, text in record.items():
+                    col = columns.get(label)
+                    if col is not None and text not in (None, ""):
+                        self.setItem(r, col, QTableWidgetItem(str(text)))
+            self._renumber_rows(columns.get("序号"), row, len(records))
+        finally:
+            self.blockSignals(False)
+            self.setUpdatesEnabled(True)
+        self.recalculate_balances()
+        self._rows_inserted(row, len(records))
+        self.viewport().update()
+        return row
+
+    def _rows_inserted(self, row, count):
+        self._date_index_valid = False
+        self._view_structure_changed()
+        self._formulas_moved("row", row, count)
+        self._notify_rows_changed()
         self._auto_save()
 
+    def _int_text(self, row, col):
+        item = self.item(row, col)
+        text = item.text().strip() if item is not None else ""
+        return int(text) if text.isdigit() else None
+
+    def _renumber_rows(self, col, row, count):
+        """Number rows inserted at ``row`` after the 序号 above them and move later 序号 down by ``count``.
+
+        Only done where the sheet is numbered consecutively, so hand-written
+        序号 are left alone.
+        """
+        if col is None:
+            return
+        previous = self._int_text(row - 1, col) if row > 0 else 0
+        if previous is None:
+            return
+        following = self._int_text(row + count, col)
+        if following is not None and following != previous + 1:
+            return
+        for r in range(row, row + count):
+            if self._int_text(r, col) is None and self._row_texts(r):
+                self.setItem(r, col, QTableWidgetItem(str(previous + 1)))
+            previous = self._int_text(r, col) or previous
+        expected = following
+        for r in range(row + count, self._first_free_row()):
+            if expected is None or self._int_text(r, col) != expected:
+                break
+            self.setItem(r, col, QTableWidgetItem(str(expected + count)))
+            expected += 1
+
     def removeRow(self, row):
+        if row < self.closed_row_count:
+            return
         super().removeRow(row)
+        self.spans.remove_rows(row)
+        self._date_index_valid = False
+        self._view_structure_changed()
+        self._formulas_moved("row", row, -1)
+        self._notify_rows_changed()
         self._auto_save()
 
+    def _row_texts(self, row):
+        texts = {}
+        for col in range(self.columnCount()):
+            item = self.item(row, col)
+            if item is not None and item.text():
+                texts[col] = item.text()
+        return texts
+
+    def add_row(self, row):
+        """Insert a row from the UI, as an undoable step"""
+        row = self._insert_position(row)
+        self.insertRow(row)
+        self._record("Add Row", RowCommand(self, row, inserted=True))
+
+    def _removed_cells(self, positions):
+        """Undo record of cells about to be removed, [(key, (row, col))]:
+        ({key: formula or text}, {key: item flags, where not the default})"""
+        default_flags = QTableWidgetItem().flags()
+        texts, flags = {}, {}
+        for key, (row, col) in positions:
+            item = self.item(row, col)
+            if item is None:
+                continue
+            source = item.data(FORMULA_ROLE) or item.text()
+            if source:
+                texts[key] = source
+            if item.flags() != default_flags:
+                flags[key] = item.flags().value
+        return texts, flags
+
+    def restore_flags(self, cells):
+        """Set the item flags of [(row, col, flags)], e.g. read-only cells brought back by undo"""
+        self.blockSignals(True)
+        try:
+            for row, col, flags in cells:
+                item = self.item(row, col)
+                if item is None:
+                    item = QTableWidgetItem()
+                    self.setItem(row, col, item)
+                item.setFlags(Qt.ItemFlag(flags))
+        finally:
+            self.blockSignals(False)
+
+    def delete_row(self, row):
+        """Remove a row from the UI, keeping its cells (formulas, flags) for undo"""
+        if row < self.closed_row_count or not 0 <= row < self.rowCount():
+            return
+        cells, flags = self._removed_cells((col, (row, col)) for col in range(self.columnCount()))
+        command = RowCommand(self, row, inserted=False, cells=cells, flags=flags)
+        self.removeRow(row)
+        self._record("Delete Row", command)
+
+    def _column_label(self, col):
+        # Letter headers are regenerated from the position, only custom labels need keeping
+        if self._custom_headers and col < len(self._custom_headers):
+            return self._custom_headers[col]
+        return ""
+
+    def set_column_label(self, col, label):
+        if self._custom_headers and col < len(self._custom_headers):
+            self._custom_headers[col] = label
+            self.setHorizontalHeaderLabels(self._custom_headers)
+        else:
+            self.setHorizontalHeaderItem(col, QTableWidgetItem(label))
+
+    def add_column(self, col):
+        """Insert a column from the UI, as an undoable step"""
+        self.insertColumn(col)
+        self._record("Add Column", ColumnCommand(self, col, inserted=True))
+
+    def delete_column(self, col):
+        """Remove a column from the UI, keeping its header label and cells (formulas, flags) for undo"""
+        if not 0 <= col < self.columnCount():
+            return
+        cells, flags = self._removed_cells((row, (row, col)) for row in range(self.rowCount()))
+        command = ColumnCommand(self, col, inserted=False, label=self._column_label(col), cells=cells, flags=flags)
+        self.removeColumn(col)
+        self._record("Delete Column", command)
+
     def context_menu(self, pos):
         menu = QMenu(self)
 
@@ -834,6 +1504,55 @@ class ExcelTable(QTableWidget):
         menu.addAction(split)
         menu.addSeparator()
 
+        # Sort / filter views: rows are only shown in another order, cells and balances stay put
+        sort_asc = QAction("Sort Ascending", self)
+        sort_desc = QAction("Sort Descending", self)
+        current_item = self.currentItem()
+        filter_value = current_item.text() if current_item else ""
+        filter_by = QAction(f"Filter by \"{filter_value[:20]}\"" if filter_value else "Filter by Value", self)
+        clear_view = QAction("Clear Sort/Filter", self)
+        if is_aggregate_sheet or self.type in ("aggregate", "statement"):
+            sort_asc.setEnabled(False)
+            sort_desc.setEnabled(False)
+            filter_by.setEnabled(False)
+        if not filter_value:
+            filter_by.setEnabled(False)
+        clear_view.setEnabled(self.sheet_view is not None)
+        menu.addAction(sort_asc)
+        menu.addAction(sort_desc)
+        menu.addAction(filter_by)
+        menu.addAction(clear_view)
+        sort_asc.triggered.connect(lambda: self.sort_view(self.currentColumn()))
+        sort_desc.triggered.connect(lambda: self.sort_view(self.currentColumn(), descending=True))
+        filter_by.triggered.connect(lambda: self.filter_view(self.currentColumn(), {filter_value}))
+        clear_view.triggered.connect(self.clear_view)
+        menu.addSeparator()
+
+        # Provenance: generated rows <-> the rows they are drawn from
+        search_manager = getattr(self.window(), "search_manager", None)
+        provenance = getattr(self.window(), "provenance", None)
+        if provenance is not None and search_manager is not None:
+            row, col = self.currentRow(), self.currentColumn()
+            if self.derived is not None:
+                go_to_source = QAction("Go to Source", self)
+                source = provenance.source_of(self, row)
+                go_to_source.setEnabled(source is not None)
+                if source is not None:
+                    source_col = self.derived.source_column(row, col)
+                    go_to_source.triggered.connect(
+                        lambda: search_manager.jump_to(*source, source_col if source_col is not None else 0))
+                menu.addAction(go_to_source)
+                menu.addSeparator()
+            elif self.type in ("bank", "non_bank"):
+                derived_menu = menu.addMenu("Derived Rows")
+                derived_rows = provenance.derived_of(self, row)
+                derived_menu.setEnabled(bool(derived_rows))
+                for table, derived_row in derived_rows:
+                    action = derived_menu.addAction(f"{table.name}: row {derived_row + 1}")
+                    action.triggered.connect(
+                        lambda _=False, t=table, r=derived_row: search_manager.jump_to(t, r, 0))
+                menu.addSeparator()
+
         currency_exchange_action = QAction("Add Currency Exchange", self)
         menu.addAction(currency_exchange_action)
         currency_exchange_action.triggered.connect(self.open_currency_exchange_dialog)
@@ -855,10 +1574,10 @@ class ExcelTable(QTableWidget):
         menu.addAction(load_file)
 
         # Connect table actions
-        add_row.triggered.connect(lambda: self.insertRow(self.currentRow() + 1))
-        add_col.triggered.connect(lambda: self.insertColumn(self.currentColumn() + 1))
-        del_row.triggered.connect(lambda: self.removeRow(self.currentRow()))
-        del_col.triggered.connect(lambda: self.removeColumn(self.currentColumn()))
+        add_row.triggered.connect(lambda: self.add_row(self.currentRow() + 1))
+        add_col.triggered.connect(lambda: self.add_column(self.currentColumn() + 1))
+        del_row.triggered.connect(lambda: self.delete_row(self.currentRow()))
+        del_col.triggered.connect(lambda: self.delete_column(self.currentColumn()))
         copy.triggered.connect(self.copy_cells)
         paste.triggered.connect(self.paste_cells)
         clear_content.triggered.connect(self.clear_cell_contents)
@@ -897,13 +1616,13 @@ class ExcelTable(QTableWidget):
         if not selected_indexes:
             return
 
+        cells = []
         for index in selected_indexes:
             if index.isValid():
                 row, col = index.row(), index.column()
-                item = self.item(row, col)
-
-                if item and item.flags() & Qt.ItemIsEditable:
-                    item.setText("")
+                if self.item(row, col):
+                    cells.append((row, col, ""))
+        self.write_cells(cells, "Clear Contents")
 
     def rename_sheet(self):
         """Rename the current sheet"""
@@ -926,10 +1645,9 @@ class ExcelTable(QTableWidget):
             bank_name_edit = QLineEdit(current_bank_name)
             currency_combo = QComboBox()
 
-            # Common currencies list
-            common_currencies = ['USD', 'CAD', 'EUR', 'GBP', 'JPY', 'CNY',
-                                 'AUD', 'CHF', 'HKD', 'SGD', 'INR', 'MXN']
-            currency_combo.addItems(common_currencies)
+            # The workbook's currency list
+            registry = getattr(self.window(), 'currencies', None)
+            currency_combo.addItems(registry.choices() if registry is not None else list(KNOWN_CURRENCIES))
 
             # Select current currency or add if missing
             if self.currency:
@@ -986,35 +1704,55 @@ class ExcelTable(QTableWidget):
         if new_name == self.name:
             return
 
-        # Update name and currency
-        old_name = self.name
-        self.name = new_name
+        before = (self.name, self.currency)
+        # Set currency from combo box; clear it for non-bank
+        self.apply_name(new_name, new_currency if self.type == "bank" else "")
+        self._record("Rename Sheet", RenameCommand(self, before, (self.name, self.currency)))
 
-        if self.type == "bank":
-            self.currency = new_currency  # Set from combo box
-        else:
-            self.currency = ""  # Clear currency for non-bank
+    def apply_name(self, name, currency):
+        """Set the sheet name and currency and update the tab"""
+        old_name = self.name
+        self.name = name
+        self.currency = currency
 
         # Update UI and save
         if hasattr(self.window(), 'update_tab_name'):
-            self.window().update_tab_name(old_name, new_name)
-
+            self.window().update_tab_name(old_name, name)
+        if currency and hasattr(self.window(), 'currencies'):
+            # A new currency gets its columns in the non-bank and payable detail sheets
+            self.window().currencies.add(currency)
+        if self.formula_manager is not None and len(self.formula_manager.engine):
+            # References by sheet name resolve differently now
+            self.formula_manager.rebuild()
+
+        self._notify_rows_changed()
         self._auto_save()
         self.viewport().update()
 
+    def _shown_rows(self, rows):
+        """``rows`` that are shown, in on-screen order (a sort/filter view moves and hides rows)"""
+        header = self.verticalHeader()
+        return sorted((row for row in rows if not header.isSectionHidden(row)), key=header.visualIndex)
+
+    def _shown_rows_from(self, row):
+        """Shown rows from ``row`` down the screen"""
+        header = self.verticalHeader()
+        for visual in range(header.visualIndex(row), self.rowCount()):
+            logical = header.logicalIndex(visual)
+            if not header.isSectionHidden(logical):
+                yield logical
+
     def copy_cells(self):
         sel = self.selectedRanges()
         if not sel:
             return
-        r = sel[0]
+        # Under a sort/filter view one block on screen is several ranges of logical rows
+        selected_rows = {row for r in sel for row in range(r.topRow(), r.bottomRow() + 1)}
+        columns = sorted({col for r in sel for col in range(r.leftColumn(), r.rightColumn() + 1)})
         # Build 2D list of cell contents
         rows = []
-        for i in range(r.rowCount()):
-            row = []
-            for j in range(r.columnCount()):
-                item = self.item(r.topRow() + i, r.leftColumn() + j)
-                row.append(item.text() if item else "")
-            rows.append(row)
+        for source_row in self._shown_rows(selected_rows):
+            rows.append([self.cell_text(source_row, col) for col in columns])
 
         clipboard_text = "\n".join("\t".join(row) for row in rows)
         QApplication.clipboard().setText(clipboard_text)
@@ -1039,80 +1777,168 @@ class ExcelTable(QTableWidget):
         else:
             # Collect all selected cells
             target_cells = []
-            for sel_range in selected_ranges:
-                for r in range(sel_range.topRow(), sel_range.bottomRow() + 1):
+            selected_rows = {r for sel_range in selected_ranges
+                             for r in range(sel_range.topRow(), sel_range.bottomRow() + 1)}
+            for r in self._shown_rows(r for r in selected_rows if r < self.rowCount()):
+                for sel_range in selected_ranges:
+                    if not sel_range.topRow() <= r <= sel_range.bottomRow():
+                        continue
                     for c in range(sel_range.leftColumn(), sel_range.rightColumn() + 1):
-                        if r < self.rowCount() and c < self.columnCount():
+                        if c < self.columnCount():
                             target_cells.append((r, c))
 
+        # One write and one undo step for the whole paste
+        self.write_cells(self._paste_targets(rows, is_single_cell, target_cells), "Paste")
+
+        self.viewport().update()
+
+    def _paste_targets(self, rows, is_single_cell, target_cells):
+        """(row, col, text) written by a paste"""
         # Handle single cell copy to multiple targets
         if is_single_cell and len(target_cells) > 1:
             content = rows[0]
             for r, c in target_cells:
-                item = self.item(r, c)
-                if item is None:
-                    self.setItem(r, c, QTableWidgetItem(content))
-                elif item.flags() & Qt.ItemIsEditable:
-                    item.setText(content)
+                yield r, c, content
         else:
             # Original multi-cell paste logic
             start_row = target_cells[0][0] if target_cells else 0
             start_col = target_cells[0][1] if target_cells else 0
 
-            for i, row_data in enumerate(rows):
-                r = start_row + i
-                if r >= self.rowCount():
-                    break
-
+            # Rows follow the screen, so a paste under a sort/filter view skips hidden rows
+            for row_data, r in zip(rows, self._shown_rows_from(start_row)):
                 columns = row_data.split('\t')
                 for j, content in enumerate(columns):
                     c = start_col + j
                     if c >= self.columnCount():
                         break
-
-                    if r < self.rowCount() and c < self.columnCount():
-                        item = self.item(r, c)
-                        if item is None:
-                            self.setItem(r, c, QTableWidgetItem(content))
-                        elif item.flags() & Qt.ItemIsEditable:
-                            item.setText(content)
-
-        self.viewport().update()
+                    yield r, c, content
 
     def merge_cells(self):
         sel = self.selectedRanges()
         if sel:
             r = sel[0]
+            before = self.spans.overlapping(r.topRow(), r.leftColumn(), r.rowCount(), r.columnCount())
             self.setSpan(r.topRow(), r.leftColumn(), r.rowCount(), r.columnCount())
+            after = self.spans.overlapping(r.topRow(), r.leftColumn(), r.rowCount(), r.columnCount())
+            self._record("Merge Cells", SpanCommand(self, before, after))
 
     def unmerge_cells(self):
         sel = self.selectedRanges()
         if sel:
             r = sel[0]
-            self.setSpan(r.topRow(), r.leftColumn(), 1, 1)
+            span = self.spans.span_at(r.topRow(), r.leftColumn())
+            if span is not None:
+                self.setSpan(span[0], span[1], 1, 1)
+                self._record("Unmerge Cells", SpanCommand(self, [span], []))
 
-    def data(self):
-        cells = {}
-        for row in range(self.rowCount()):
-            for col in range(self.columnCount()):
+    def _touch(self, *_):
+        self.revision += 1
+
+    def _index_cells(self, top_left, bottom_right, roles=()):
+        if roles and Qt.DisplayRole not in roles and Qt.EditRole not in roles:
+            return
+        index = self.cell_index
+        for row in range(top_left.row(), bottom_right.row() + 1):
+            for col in range(top_left.column(), bottom_right.column() + 1):
                 item = self.item(row, col)
-                if item and item.text().strip():  # Only save non-empty cells
-                    # For director sheet, don't save bank-generated data (cells with green background)
-                    if hasattr(self, 'name') and self.name == "董事往來":
-                        # Only save cells that don't have green background (user data)
-                        if not item.data(Qt.BackgroundRole) or item.data(Qt.BackgroundRole) != QColor(200, 255, 200):
-                            cells[(row, col)] = item.text()
-                    else:
-                        # For other sheets, save all data normally
-                        cells[(row, col)] = item.text()
-        spans = []
-        for row in range(self.rowCount()):
-            for col in range(self.columnCount()):
-                rs, cs = self.rowSpan(row, col), self.columnSpan(row, col)
-                if rs > 1 or cs > 1:
-                    spans.append((row, col, rs, cs))
+                index.set(row, col, item is not None and bool(item.text().strip()))
+
+    def set_derived(self, derived):
+        """Show ``derived`` (a DerivedSheet, or None) read-only in place of the sheet's items"""
+        self.clearContents()
+        self.derived = derived
+        if derived is not None:
+            self.setRowCount(max(100, len(derived) + 10))
+        self.viewport().update()
+        self._notify_rows_changed()
+
+    def cell_text(self, row, col):
+        """Text shown in a cell: the item's, or the derived sheet's"""
+        item = self.item(row, col)
+        if item is not None:
+            return item.text()
+        return self.derived.cell(row, col) if self.derived is not None else ""
+
+    @property
+    def dehydrated(self):
+        return self._dehydrated is not None
+
+    def dehydrated_bytes(self):
+        return len(self._dehydrated) if self._dehydrated is not None else 0
+
+    def dehydrate(self):
+        """Pack the items into one compressed blob and free them.
+
+        Structure, spans, the cell index, scroll position and selection stay;
+        model signals are blocked, so nothing sees the cells change. Reading a
+        cell through ``item`` or showing the sheet hydrates it again.
+        Returns False when the sheet cannot be dehydrated now.
+        """
+        if self._dehydrated is not None or self.state() == QTableWidget.EditingState:
+            return False
+        default_flags = QTableWidgetItem().flags()
+        cells = []
+        for item in self.findItems("*", Qt.MatchWildcard):
+            if item is None:  # the wildcard also matches empty cells
+                continue
+            if (item.flags() == default_flags and item.data(FORMULA_ROLE) is None
+                    and item.background().style() == Qt.NoBrush):
+                record = item.text()
+            else:
+                payload = QByteArray()
+                item.write(QDataStream(payload, QIODevice.WriteOnly))
+                record = (item.flags().value, bytes(payload))
+            cells.append((item.row(), item.column(), record))
+        model = self.model()
+        blocked = model.blockSignals(True)
+        try:
+            for row, col, _ in cells:
+                self.takeItem(row, col)
+        finally:
+            model.blockSignals(blocked)
+        self._dehydrated = zlib.compress(pickle.dumps(cells, pickle.HIGHEST_PROTOCOL))
+        for name in HYDRATING_METHODS:
+            # Reads and writes hydrate first; the instance attributes are removed again by hydrate
+            setattr(self, name, self._hydrating(name))
+        return True
+
+    def _hydrating(self, name):
+        def call(*args, **kwargs):
+            self.hydrate()
+            return getattr(self, name)(*args, **kwargs)
+        return call
+
+    def hydrate(self):
+        """Restore the items packed by dehydrate"""
+        if self._dehydrated is None:
+            return
+        cells = pickle.loads(zlib.decompress(self._dehydrated))
+        self._dehydrated = None
+        for name in HYDRATING_METHODS:
+            delattr(self, name)
+        model = self.model()
+        blocked = model.blockSignals(True)
+        try:
+            for row, col, record in cells:
+                if isinstance(record, str):
+                    item = QTableWidgetItem(record)
+                else:
+                    flags, payload = record
+                    item = QTableWidgetItem()
+                    item.read(QDataStream(QByteArray(payload)))
+                    item.setFlags(Qt.ItemFlag(flags))
+                self.setItem(row, col, item)
+        finally:
+            model.blockSignals(blocked)
+        self.viewport().update()
+
+    def data(self):
+        # Only non-empty cells are saved
+        cells = {(row, col): self.item(row, col).text() for row, col in self.cell_index.cells()}
+        spans = self.spans.to_list()
         # Always return data structure even if empty
-        return {"cells": cells, "spans": spans, "rows": self.rowCount(), "cols": self.columnCount(), "name": self.name}
+        return {"cells": cells, "spans": spans, "rows": self.rowCount(), "cols": self.columnCount(), "name": self.name,
+                "formulas": self.formula_cells()}
 
     def load_data(self, data):
         """Load data into the table with error handling"""
@@ -1142,11 +1968,11 @@ class ExcelTable(QTableWidget):
                 for (row, col), text in data["cells"].items():
                     self.setItem(row, col, QTableWidgetItem(text))
 
+            self.load_formulas(data.get("formulas", {}))
+
             # Load cell spans if they exist
             if "spans" in data:
-                for row, col, rs, cs in data["spans"]:
-                    if rs > 1 or cs > 1:
-                        self.setSpan(row, col, rs, cs)
+                self.load_spans(data["spans"])
 
         except Exception as e:
             logger.error(f"ERROR LOAD DATA: Failed to load data: {e}")
@@ -1163,9 +1989,7 @@ class ExcelTable(QTableWidget):
             if is_aggregate_sheet:
                 return  # Ignore delete key for aggregate sheets
 
-            for item in self.selectedItems():
-                if item.flags() & Qt.ItemIsEditable:
-                    item.setText("")
+            self.write_cells([(item.row(), item.column(), "") for item in self.selectedItems()], "Clear Contents")
             if self.auto_save_callback:
                 self.auto_save_callback()
             return
@@ -1185,6 +2009,10 @@ class ExcelTable(QTableWidget):
     def set_exchange_rate(self, rate):
         self.exchange_rate = rate
         self.viewport().update()
+        # No row changed, but values converted to HKD did
+        self._notify_rows_changed(())
+        if self.formula_manager is not None:
+            self.formula_manager.rates_changed()
 
     def sum_columns(self):
         debit_sum = 0.0
@@ -1232,12 +2060,7 @@ class ExcelTable(QTableWidget):
                                     pass
         else:
             # Original logic for regular bank sheets
-            for col in range(self.columnCount()):
-                header = self.horizontalHeaderItem(col).text().replace(" ", "")
-                if "借方" in header:
-                    debit_col = col
-                if "貸方" in header:
-                    credit_col = col
+            _, debit_col, credit_col = self._balance_columns()
 
             # Calculate totals (exclude pinned rows from sum - they are NOT data rows)
             # The pinned rows are artificial summary rows created by update_pinned_rows()
@@ -1254,7 +2077,10 @@ class ExcelTable(QTableWidget):
                 has_pinned_rows = True
                 effective_row_count = self.rowCount() - 2
 
-            for row in range(effective_row_count):
+            # Only the selected period is totalled; closed periods live in their snapshots
+            for row in self.period_rows():
+                if row >= effective_row_count:
+                    break
                 if credit_col is not None:
                     credit_item = self.item(row, credit_col)
                     try:
@@ -1346,6 +2172,10 @@ class ExcelTable(QTableWidget):
 
         return currency_sums
 
+    def _notify_rows_changed(self, rows=None):
+        if self.rows_changed_callback:
+            self.rows_changed_callback(self, rows)
+
     def _auto_save(self, *_):
         if self.auto_save_callback:
             self.auto_save_callback()
@@ -0,0 +1,52 @@
+from PySide6.QtWidgets import (QDialog, QVBoxLayout, QLabel, QTableWidget, QTableWidgetItem, QDoubleSpinBox,
+                               QDialogButtonBox)
+from PySide6.QtCore import Qt
+
+
+class ExchangeRateDialog(QDialog):
+    """Edit the 本期 and 期末 rates of every currency for the current period."""
+
+    def __init__(self, parent=None, registry=None, currencies=None, period=""):
+        super().__init__(parent)
+        self.setWindowTitle("Exchange Rates")
+        self.registry = registry
+        self.period = period
+        layout = QVBoxLayout(self)
+        layout.addWidget(QLabel(f"Period: {period}    (1 unit of currency = ? HKD)"))
+
+        self.currencies = [c for c in sorted(set(currencies or []) | set(registry.currencies())) if c != "HKD"]
+        self.table = QTableWidget(len(self.currencies), 3)
+        self.table.setHorizontalHeaderLabels(["币种", "本期汇率", "期末汇率"])
+        self.table.verticalHeader().setVisible(False)
+        self.spin_boxes = {}
+        for row, currency in enumerate(self.currencies):
+            item = QTableWidgetItem(currency)
+            item.setFlags(item.flags() & ~Qt.ItemIsEditable)
+            self.table.setItem(row, 0, item)
+            current = self._spin_box(registry.current_rate(currency, period))
+            closing = self._spin_box(registry.closing_rate(currency, period))
+            self.table.setCellWidget(row, 1, current)
+            self.table.setCellWidget(row, 2, closing)
+            self.spin_boxes[currency] = (current, closing)
+        self.table.horizontalHeader().setStretchLastSection(True)
+        layout.addWidget(self.table)
+
+        self.button_box = QDialogButtonBox(QDialogButtonBox.Ok | QDialogButtonBox.Cancel)
+        self.button_box.accepted.connect(self.accept)
+        self.button_box.rejected.connect(self.reject)
+        layout.addWidget(self.button_box)
+        self.resize(420, 360)
+
+    @staticmethod
+    def _spin_box(value):
+        spin = QDoubleSpinBox()
+        spin.setDecimals(4)
+        spin.setMinimum(0.0001)
+        spin.setMaximum(100000)
+        spin.setValue(value)
+        return spin
+
+    def accept(self):
+        for currency, (current, closing) in self.spin_boxes.items():
+            self.registry.set_rates(currency, self.period, current=current.value(), closing=closing.value())
+        super().accept()
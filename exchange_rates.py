@@ -0,0 +1,116 @@
+"""Workbook exchange-rate registry: per currency and period, a 本期 and a 期末 rate.
+
+Ordinary HKD conversion uses the 本期 (current) rate; only the period-end
+汇兑损益 revaluation uses the 期末 (closing) rate. A period without its own
+rates falls back to the latest earlier period that has them.
+"""
+from currencies import BASE_CURRENCY
+
+try:
+    import numpy as np
+except ImportError:  # optional: the revaluation sweep falls back to plain Python
+    np = None
+
+
+class ExchangeRateRegistry:
+    def __init__(self, period_provider=None):
+        self._rates = {}  # currency -> {period: [current, closing]}
+        # Returns the workbook's current period key, e.g. "2025/01/01-2025/12/31"
+        self.period_provider = period_provider
+
+    def _period(self, period):
+        if period is None and self.period_provider is not None:
+            return self.period_provider()
+        return period or ""
+
+    def _entry(self, currency, period):
+        periods = self._rates.get(currency)
+        if not periods:
+            return None
+        if period in periods:
+            return periods[period]
+        # Period keys start with the yyyy/MM/dd start date, so they sort chronologically
+        earlier = [p for p in periods if p <= period]
+        return periods[max(earlier)] if earlier else periods[min(periods)]
+
+    def has_rate(self, currency, period=None):
+        return self._entry(currency, self._period(period)) is not None
+
+    def current_rate(self, currency, period=None):
+        """本期 rate of ``currency`` to HKD"""
+        if not currency or currency == BASE_CURRENCY:
+            return 1.0
+        entry = self._entry(currency, self._period(period))
+        return entry[0] if entry else 1.0
+
+    def closing_rate(self, currency, period=None):
+        """期末 rate of ``currency`` to HKD; defaults to the 本期 rate when not set"""
+        if not currency or currency == BASE_CURRENCY:
+            return 1.0
+        entry = self._entry(currency, self._period(period))
+        if not entry:
+            return 1.0
+        return entry[1] if entry[1] is not None else entry[0]
+
+    def set_rates(self, currency, period=None, current=None, closing=None):
+        """Set the 本期 and/or 期末 rate of ``currency`` for ``period`` (default: the current period)"""
+        if not currency or currency == BASE_CURRENCY:
+            return
+        period = self._period(period)
+        periods = self._rates.setdefault(currency, {})
+        entry = periods.get(period)
+        if entry is None:
+            # Start from the rates carried over from an earlier period
+            inherited = self._entry(currency, period)
+            entry = periods[period] = list(inherited) if inherited else [1.0, None]
+        if current is not None:
+            entry[0] = float(current)
+        if closing is not None:
+            entry[1] = float(closing)
+
+    def currencies(self):
+        return sorted(self._rates)
+
+    def current_rates(self, currencies=(), period=None):
+        """{currency: 本期 rate} for the registry's currencies plus ``currencies``"""
+        period = self._period(period)
+        return {c: self.current_rate(c, period) for c in set(self._rates) | set(currencies) | {BASE_CURRENCY}}
+
+    def revalue(self, balances, period=None):
+        """Unrealized gain/loss of foreign-currency balances at the 期末 rate.
+
+        ``balances`` is a list of (key, currency, amount in that currency). Returns
+        [(key, currency, amount, gain in HKD)] for every non-HKD balance, where
+        gain = amount × (期末 rate − 本期 rate). The whole list is computed in one
+        vectorized sweep when NumPy is available.
+        """
+        period = self._period(period)
+        foreign = [b for b in balances if b[1] and b[1] != BASE_CURRENCY]
+        if not foreign:
+            return []
+        currencies = sorted({currency for _, currency, _ in foreign})
+        deltas = {c: self.closing_rate(c, period) - self.current_rate(c, period) for c in currencies}
+        if np is not None:
+            amounts = np.fromiter((amount for _, _, amount in foreign), dtype=float, count=len(foreign))
+            rate_deltas = np.fromiter((deltas[currency] for _, currency, _ in foreign), dtype=float,
+                                      count=len(foreign))
+            gains = (amounts * rate_deltas).tolist()
+        else:
+            gains = [amount * deltas[currency] for _, currency, amount in foreign]
+        return [(key, currency, amount, gain) for (key, currency, amount), gain in zip(foreign, gains)]
+
+    def to_list(self):
+        """Plain data for the .exl file"""
+        return [
+            {"currency": currency, "period": period, "current": current, "closing": closing}
+            for currency, periods in sorted(self._rates.items())
+            for period, (current, closing) in sorted(periods.items())
+        ]
+
+    def load_list(self, entries):
+        self._rates = {}
+        for entry in entries or []:
+            self._rates.setdefault(entry["currency"], {})[entry.get("period", "")] = [
+                float(entry.get("current", 1.0)),
+                None if entry.get("closing") is None else float(entry["closing"]),
+            ]
@@ -1,14 +1,21 @@
-import pickle
 import os
 import logging
 from PySide6.QtWidgets import QFileDialog, QMessageBox, QTableWidgetItem
 from PySide6.QtCore import QDate, Qt
+from currencies import parse_currency_column
+from history_store import HistoryStore
+from utils import NON_BANK_COLUMNS
+from workbook_format import encode_section, read_workbook, write_workbook
 
 logger = logging.getLogger(__name__)
 
 class FileManager:
     def __init__(self, main_window):
         self.main_window = main_window
+        self._sections = {}  # sheet -> (state key, encoded section) from the last save
+        self._last_write = None  # (path, encoded header, sections) of the last file written
+        self.current_path = None  # .exl file last saved or loaded; its history is kept beside it
+        self._history = None
 
     def save_file(self):
         """Save current file"""
@@ -19,7 +26,7 @@ class FileManager:
         )
         if path:
             try:
-                self.save_to_path(path)
+                self.save_to_path(path, label="Save")
                 # Update company name input to saved file name (without extension)
                 base = os.path.basename(path)
                 name = os.path.splitext(base)[0]
@@ -29,18 +36,36 @@ class FileManager:
                 logger.error(f"Failed to save file: {str(e)}")
                 QMessageBox.warning(self.main_window, "Save Error", f"Failed to save file: {str(e)}")
 
-    def save_to_path(self, path):
-        """Save data to specified path"""
-        data = {
-            "version": "1.0",
+    @staticmethod
+    def _sheet_key(tab, tab_name):
+        """Changes whenever anything saved for the sheet may have changed"""
+        return (tab.revision, tab_name, tab.type, getattr(tab, "exchange_rate", 1.0), tab.currency,
+                tab.closed_row_count, tuple(tab._custom_headers or ()))
+
+    def history(self, path=None):
+        """HistoryStore of a workbook file (default: the current one), in <name>.history beside it"""
+        path = path or self.current_path
+        if path is None:
+            return None
+        root = os.path.splitext(os.path.abspath(path))[0] + ".history"
+        if self._history is None or self._history.root != root:
+            self._history = HistoryStore(root)
+        return self._history
+
+    def _header(self):
+        """Everything saved besides the sheets"""
+        return {
             "company": self.main_window.company_input.text(),
             "period_from": self.main_window.period_from_input.date().toString("yyyy/MM/dd"),
             "period_to": self.main_window.period_to_input.date().toString("yyyy/MM/dd"),
-            "sheets": [],
-            "tab_order": [self.main_window.tabs.tabText(i) for i in range(self.main_window.tabs.count())]
+            "tab_order": [self.main_window.tabs.tabText(i) for i in range(self.main_window.tabs.count())],
+            "statement_mappings": getattr(self.main_window, "statement_mappings", {}),
+            "exchange_rates": self.main_window.exchange_rates.to_list(),
+            "period_snapshots": self.main_window.period_snapshots,
         }
 
-        # Save all sheets
+    def _saved_tabs(self):
+        """(sheet, tab name) of the sheets written to the file, in tab order"""
         for i in range(self.main_window.tabs.count()):
             tab = self.main_window.tabs.widget(i)
             tab_name = self.main_window.tabs.tabText(i)
@@ -48,37 +73,118 @@ class FileManager:
                 continue
             if tab.type not in ("bank", "non_bank"):
                 continue
-            # Only call .data() on real sheet tabs
-            sheet_data = tab.data()
+            yield tab, tab_name
+
+    @staticmethod
+    def _sheet_info(tab, tab_name):
+        # Only call .data() on real sheet tabs
+        sheet_data = tab.data()
+        if hasattr(tab, '_custom_headers'):
+            sheet_data["headers"] = tab._custom_headers
+
+        # Get exchange rate if available
+        exchange_rate = getattr(tab, "exchange_rate", 1.0)
+
+        return {
+            "name": tab_name,
+            "type": tab.type,
+            "data": sheet_data,
+            "exchange_rate": exchange_rate,
+            "currency": tab.currency,
+            "closed_rows": tab.closed_row_count,
+        }
+
+    @staticmethod
+    def _workbook_currencies(data):
+        """Currencies of the bank sheets, and of non-bank amount columns holding any cell"""
+        currencies = set()
+        for sheet_info in data.get("sheets", []):
+            if sheet_info.get("type") == "bank":
+                currencies.add(sheet_info.get("currency", ""))
+            elif sheet_info.get("type") == "non_bank":
+                headers = sheet_info["data"].get("headers") or NON_BANK_COLUMNS
+                for col in {col for _, col in sheet_info["data"].get("cells", {})}:
+                    parsed = parse_currency_column(headers[col]) if col < len(headers) else None
+                    if parsed:
+                        currencies.add(parsed[1])
+        return currencies
+
+    def workbook_data(self):
+        """The workbook as it would be saved, in the layout load_data_from_dict takes"""
+        data = self._header()
+        data["sheets"] = [self._sheet_info(tab, tab_name) for tab, tab_name in self._saved_tabs()]
+        return data
+
+    def save_to_path(self, path, label=""):
+        """Save data to specified path; returns False when the file is already up to date"""
+        header = self._header()
+
+        # Save all sheets; unchanged sheets reuse their section from the last save
+        sections = []
+        names = []
+        cache = {}
+        for tab, tab_name in self._saved_tabs():
+            key = self._sheet_key(tab, tab_name)
+            cached = self._sections.get(tab)
+            if cached is not None and cached[0] == key:
+                cache[tab] = cached
+                sections.append(cached[1])
+                names.append(tab_name)
+                continue
             try:
-                if hasattr(tab, '_custom_headers'):
-                    sheet_data["headers"] = tab._custom_headers
-
-                # Get exchange rate if available
-                exchange_rate = getattr(tab, "exchange_rate", 1.0)
-
-                sheet_info = {
-                    "name": tab_name,
-                    "type": tab.type,
-                    "data": sheet_data,
-                    "exchange_rate": exchange_rate,
-                    "currency": tab.currency,
-                }
-                #print(f"saving sheet: {sheet_data}")
-                data["sheets"].append(sheet_info)
+                sheet_info = self._sheet_info(tab, tab_name)
+                cache[tab] = (key, encode_section(sheet_info))
+                sections.append(cache[tab][1])
+                names.append(tab_name)
             except Exception as e:
-                logger.error(f"Error saving sheet {self.main_window.tabs.tabText(i)}: {e}")
+                logger.error(f"Error saving sheet {tab_name}: {e}")
                 import traceback
                 traceback.print_exc()
                 continue
 
+        self._sections = cache
+        write = (path, encode_section(header), sections)
+        last = self._last_write
+        if (last is not None and last[:2] == write[:2] and len(last[2]) == len(sections)
+                and all(a is b for a, b in zip(last[2], sections)) and os.path.exists(path)):
+            return False  # clean workbook: the file already holds exactly this
         try:
-            with open(path, "wb") as f:
-                pickle.dump(data, f)
+            write_workbook(path, header, sections)
             #logger.info(f"Successfully saved to {path}")
         except Exception as e:
+            self._last_write = None
             logger.error(f"Failed to write file: {str(e)}")
             raise Exception(f"Failed to write file: {str(e)}")
+        self._last_write = write
+        self.current_path = path
+        try:
+            self.history(path).record(write[1], list(zip(names, sections)), label)
+        except Exception as e:
+            # The workbook itself is saved; a history failure must not fail the save
+            logger.error(f"Failed to record save history: {e}")
+        return True
+
+    def restore_version(self, version_id):
+        """Replace the workbook with an earlier version; the restored state is saved as a new version"""
+        self.save_to_path(self.current_path)  # keep the current state in the history
+        data = self.history().load_version(version_id)
+        self.load_data_from_dict(data)
+        self.save_to_path(self.current_path, label=f"Restored version {version_id}")
+
+    def restore_sheet(self, version_id, name):
+        """Replace (or re-add) one sheet with its content in an earlier version"""
+        store = self.history()
+        sheet_info = store.load_sheet(version_id, name)
+        # After this save the latest version holds the current workbook
+        self.save_to_path(self.current_path)
+        data = store.load_version(store.versions()[-1]["id"])
+        sheets = [s for s in data["sheets"] if s["name"] != name]
+        if len(sheets) == len(data["sheets"]):
+            order = data["tab_order"]
+            order.insert(order.index("+") if "+" in order else len(order), name)
+        data["sheets"] = sheets + [sheet_info]
+        self.load_data_from_dict(data)
+        self.save_to_path(self.current_path, label=f"Restored {name} from version {version_id}")
 
     def load_file(self):
         """Load file from disk"""
@@ -93,8 +199,9 @@ class FileManager:
         logger.info(f"Attempting to load file {path}")
         try:
             with open(path, "rb") as f:
-                data = pickle.load(f)
+                data = read_workbook(f)
             self.load_data_from_dict(data)
+            self.current_path = path
         except Exception as e:
             logger.error(f"Failed to load file: {str(e)}")
             QMessageBox.warning(self.main_window, "Load Error", f"Failed to load file: {str(e)}")
@@ -102,9 +209,17 @@ class FileManager:
     def load_data_from_dict(self, data):
         """Common method to load data from a dictionary (used by both auto-load and manual load)"""
         logger.info(f"Starting data load, found {len(data.get('sheets', []))} sheets")
-        self.main_window.tabs.clear()
+        self.main_window._suppress_plus_tab = True  # the '+' tab becomes current while tabs are removed
+        try:
+            self.main_window.tabs.clear()
+        finally:
+            self.main_window._suppress_plus_tab = False
         self.main_window.user_added_rows = None
         self.main_window.sheets = []
+        self.main_window.provenance.clear()
+
+        # Only the currencies the workbook uses get columns in new sheets
+        self.main_window.currencies.reset(self._workbook_currencies(data))
 
         # Store sheets temporarily to reorder them
         temp_sheets = {}
@@ -121,6 +236,13 @@ class FileManager:
         self.main_window.company_input.setText(company_name)
         logger.info(f"Set company name to: '{company_name}'")
 
+        self.main_window.statement_mappings = dict(data.get("statement_mappings", {}))
+        self.main_window.exchange_rates.load_list(data.get("exchange_rates", []))
+        self.main_window.period_snapshots = list(data.get("period_snapshots", []))
+        self.main_window.undo_stack.clear()
+        snapshots = self.main_window.period_snapshots
+        self.main_window.statement_manager.set_opening_balances(snapshots[-1]["balances"] if snapshots else {})
+
         # Load period dates with backward compatibility
         if "period_from" in data and "period_to" in data:
             from_date = QDate.fromString(data.get("period_from", ""), "yyyy/MM/dd")
@@ -146,14 +268,20 @@ class FileManager:
                         if row < table.rowCount() and col < table.columnCount():
                             item = QTableWidgetItem(cell_value)
                             table.setItem(row, col, item)
+                    table.load_formulas(sheet_info["data"].get("formulas", {}))
+                    table.load_spans(sheet_info["data"].get("spans", []))
                 elif sheet_type == "non_bank":
-                    table = self.main_window.sheet_manager.create_non_bank_sheet(sheet_name)
+                    # Cells are stored by position: the sheet gets the columns it was saved with
+                    table = self.main_window.sheet_manager.create_non_bank_sheet(
+                        sheet_name, columns=sheet_info["data"].get("headers") or NON_BANK_COLUMNS)
                     for cell_key, cell_value in sheet_info["data"]["cells"].items():
                         row = cell_key[0]
                         col = cell_key[1]
                         if row < table.rowCount() and col < table.columnCount():
                             item = QTableWidgetItem(cell_value)
                             table.setItem(row, col, item)
+                    table.load_formulas(sheet_info["data"].get("formulas", {}))
+                    table.load_spans(sheet_info["data"].get("spans", []))
                 table.name = sheet_name
                 temp_sheets[sheet_name] = table
 
@@ -172,10 +300,16 @@ class FileManager:
                 if sheet_info:
                     table = temp_sheets[sheet_name]
                     try:
-                        table.set_exchange_rate(sheet_info["exchange_rate"])
-                        if hasattr(table, "exchange_rate_input"):
-                            table.exchange_rate_input.setValue(sheet_info["exchange_rate"])
                         table.currency = sheet_info["currency"]
+                        table.closed_row_count = min(sheet_info.get("closed_rows", 0), table.rowCount())
+                        # Files from before the rate registry only carry one rate per sheet
+                        legacy_rate = sheet_info.get("exchange_rate", 1.0)
+                        if legacy_rate != 1.0 and not self.main_window.exchange_rates.has_rate(table.currency):
+                            table.set_exchange_rate(legacy_rate)
+                        if hasattr(table, "exchange_rate_input"):
+                            table.exchange_rate_input.blockSignals(True)
+                            table.exchange_rate_input.setValue(table.exchange_rate)
+                            table.exchange_rate_input.blockSignals(False)
                         self.main_window.tabs.addTab(table, sheet_name)
                         logger.info(f"loading {sheet_info}")
                     except Exception as e:
@@ -184,6 +318,7 @@ class FileManager:
                         traceback.print_exc()
                         raise e
 
+        self.main_window.formula_manager.rebuild()
         logger.info("Data loading completed successfully")
         self.last_loaded_company_name = data.get("company", "")
         logger.info(f"last_loaded_company_name set to '{self.last_loaded_company_name}'")
@@ -195,7 +330,7 @@ class FileManager:
         path = f"{fname}.exl"
         try:
             if self.main_window.tabs.count() > 0:
-                self.save_to_path(path)
+                self.save_to_path(path, label="Auto-save")
             else:
                 logger.info("No tabs to save")
         except Exception as e:
@@ -216,8 +351,9 @@ class FileManager:
                 if os.path.exists(file_path):
                     logger.info(f"File exists, loading...")
                     with open(file_path, "rb") as f:
-                        data = pickle.load(f)
+                        data = read_workbook(f)
                     self.load_data_from_dict(data)
+                    self.current_path = file_path
                     logger.info(f"Auto-loaded company file: {file_path}")
                 else:
                     self.main_window.new_file()
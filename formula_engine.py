@@ -0,0 +1,670 @@
+"""Excel-style formulas: parser, dependency graph and incremental recalculation.
+
+A formula such as ``=SUM(E2:E40)`` or ``=HSBC-USD!G10*rate`` is parsed once
+into a small AST. Every formula cell is registered in a dependency graph under
+the cells and ranges it reads, so a change only recalculates the formulas that
+depend on it, transitively, in topological order. Formulas caught in a cycle
+(and anything depending on them) evaluate to ``#CYCLE!``.
+
+Cells are (sheet, row, col) with 0-based row and col; ``sheet`` is any
+hashable key the caller uses for a sheet. References are A1 style (row 1 is
+the first row, column A the first column); sheet names containing spaces or
+operators other than '-' must be quoted: ``='My Sheet'!A1``. When rows or
+columns are inserted or deleted, shift_references moves the references of a
+formula the way Excel does; a reference to a deleted cell becomes ``#REF!``.
+"""
+import math
+import operator
+import re
+from collections import deque
+
+FUNCTIONS = ("SUM", "AVERAGE", "MIN", "MAX", "COUNT", "ABS", "ROUND", "IF")
+
+
+class FormulaError(Exception):
+    """An Excel error value (#REF!, #DIV/0!, ...) raised during evaluation"""
+
+    def __init__(self, code):
+        super().__init__(code)
+        self.code = code
+
+
+CYCLE = "#CYCLE!"
+ERRORS = frozenset(("#REF!", "#DIV/0!", "#VALUE!", "#NAME?", "#NUM!", "#ERROR!", CYCLE))
+
+_NAME_CHARS = r"[^\s!'\"()+\-*/^,:=<>&]+"
+_CELL = r"\$?[A-Za-z]{1,3}\$?\d+"
+_TOKEN = re.compile(
+    r"\s*(?:"
+    r"(?P<number>(?:\d+\.?\d*|\.\d+)(?:[eE][+-]?\d+)?)"
+    r"|(?P<string>\"(?:[^\"]|\"\")*\")"
+    rf"|(?:'(?P<quoted>(?:[^']|'')+)'|(?P<sheet>{_NAME_CHARS}(?:-{_NAME_CHARS})*))!(?P<sref>{_CELL}(?::{_CELL})?)"
+    rf"|(?P<ref>{_CELL}(?::{_CELL})?)(?![\w(])"
+    r"|(?P<error>#REF!)"
+    r"|(?P<name>[A-Za-z_\u4e00-\u9fff][\w.]*)"
+    r"|(?P<op><=|>=|<>|[-+*/^(),=<>&])"
+    r")"
+)
+
+
+def column_index(letters):
+    index = 0
+    for char in letters.upper():
+        index = index * 26 + ord(char) - ord("A") + 1
+    return index - 1
+
+
+def column_letters(index):
+    """0 -> 'A', 27 -> 'AB'"""
+    letters = ""
+    index += 1
+    while index:
+        index, remainder = divmod(index - 1, 26)
+        letters = chr(ord("A") + remainder) + letters
+    return letters
+
+
+def parse_cell(text):
+    """'$B$12' -> (row 11, col 1)"""
+    match = re.fullmatch(r"\$?([A-Za-z]{1,3})\$?(\d+)", text)
+    return int(match.group(2)) - 1, column_index(match.group(1))
+
+
+_CELL_PARTS = re.compile(r"(\$?)([A-Za-z]{1,3})(\$?)(\d+)")
+
+
+def _shift_span(first, last, at, count):
+    """Span [first, last] after ``count`` lines inserted (count > 0) or deleted (count < 0) at ``at``; None when
+    every line of it is deleted"""
+    if count > 0:
+        return first + count if first >= at else first, last + count if last >= at else last
+    end = at - count  # first line after the deleted ones
+    first = first if first < at else (first + count if first >= end else at)
+    last = last if last < at else (last + count if last >= end else at - 1)
+    return (first, last) if first <= last else None
+
+
+def _shift_ref(ref, axis, at, count):
+    """A1 reference or range moved along ``axis`` ("row" or "col"); '#REF!' when it is deleted"""
+    parts = [_CELL_PARTS.fullmatch(part).groups() for part in ref.split(":")]
+    if axis == "row":
+        lines = [int(p[3]) - 1 for p in parts]
+    else:
+        lines = [column_index(p[1]) for p in parts]
+    span = _shift_span(min(lines), max(lines), at, count)
+    if span is None:
+        return "#REF!"
+    if len(parts) == 1:
+        span = span[:1]
+    elif lines[0] > lines[1]:
+        span = span[::-1]
+    cells = []
+    for (col_abs, letters, row_abs, digits), line in zip(parts, span):
+        if axis == "row":
+            digits = str(line + 1)
+        else:
+            letters = column_letters(line)
+        cells.append(f"{col_abs}{letters}{row_abs}{digits}")
+    return ":".join(cells)
+
+
+def shift_references(text, local, sheet_name, axis, at, count, is_sheet=None):
+    """Formula ``text`` with its references into the sheet ``sheet_name`` moved after ``count`` rows or
+    columns (``axis`` "row" or "col") were inserted (count > 0) or deleted (count < 0) at ``at``.
+
+    ``local`` tells whether the formula is on that sheet, so its unqualified
+    references point into it. Text that does not parse is returned unchanged.
+    """
+    body = text[1:] if text.startswith("=") else text
+    try:
+        shifted = _shift_text(body, local, sheet_name, axis, at, count, is_sheet)
+    except SyntaxError:
+        return text
+    return text[:len(text) - len(body)] + shifted
+
+
+def _shift_text(text, local, sheet_name, axis, at, count, is_sheet):
+    out = []
+    pos = 0
+    while pos < len(text):
+        match = _TOKEN.match(text, pos)
+        if match is None or match.end() == pos:
+            if text[pos:].strip():
+                raise SyntaxError(f"Unexpected {text[pos:pos + 10]!r}")
+            out.append(text[pos:])
+            break
+        kind = match.lastgroup
+        if kind in ("quoted", "sheet", "sref"):
+            sheet = match.group("quoted").replace("''", "'") if match.group("quoted") else match.group("sheet")
+            prefix_end = match.start("sref")
+            if match.group("sheet") and is_sheet is not None and not is_sheet(sheet):
+                split = next((i for i, char in enumerate(sheet) if char == "-" and is_sheet(sheet[i + 1:])), None)
+                if split is not None:
+                    # 'A1-HSBC-USD!G10': shift the leading reference too
+                    start = match.start("sheet")
+                    out.append(text[pos:start])
+                    out.append(_shift_text(sheet[:split], local, sheet_name, axis, at, count, is_sheet) + "-")
+                    pos = start + split + 1
+                    sheet = sheet[split + 1:]
+            ref = match.group("sref")
+            if sheet == sheet_name:
+                ref = _shift_ref(ref, axis, at, count)
+            # A deleted reference loses its sheet name, as in Excel
+            out.append(text[pos:match.start()] if ref == "#REF!" else text[pos:prefix_end])
+            out.append(ref)
+        elif kind == "ref":
+            ref = match.group("ref")
+            out.append(text[pos:match.start("ref")])
+            out.append(_shift_ref(ref, axis, at, count) if local else ref)
+        else:
+            out.append(text[pos:match.end()])
+        pos = match.end()
+    return "".join(out)
+
+
+def _tokens(text, is_sheet=None, end=True):
+    pos = 0
+    text = text.rstrip()
+    while pos < len(text):
+        match = _TOKEN.match(text, pos)
+        if match is None or match.end() == pos:
+            raise SyntaxError(f"Unexpected {text[pos:pos + 10]!r}")
+        pos = match.end()
+        kind = match.lastgroup
+        if kind in ("quoted", "sheet", "sref"):
+            sheet = match.group("quoted").replace("''", "'") if match.group("quoted") else match.group("sheet")
+            if match.group("sheet") and is_sheet is not None and not is_sheet(sheet):
+                # 'A1-HSBC-USD!G10': the sheet name is the part after a '-' that names a sheet
+                split = next((i for i, char in enumerate(sheet) if char == "-" and is_sheet(sheet[i + 1:])), None)
+                if split is not None:
+                    yield from _tokens(sheet[:split], is_sheet, end=False)
+                    yield "op", "-"
+                    sheet = sheet[split + 1:]
+            yield "ref", (sheet, match.group("sref"))
+        elif kind == "ref":
+            yield "ref", (None, match.group("ref"))
+        elif kind == "string":
+            yield "string", match.group("string")[1:-1].replace('""', '"')
+        else:
+            yield kind, match.group(kind)
+    if end:
+        yield "end", None
+
+
+class _Parser:
+    """Recursive descent over the tokens; produces nested tuples:
+
+    ("num", v) ("str", s) ("cell", sheet, row, col) ("range", sheet, r1, c1, r2, c2)
+    ("name", n) ("neg", x) ("bin", op, a, b) ("call", fn, [args]) ("error", "#REF!")
+    """
+
+    def __init__(self, text, is_sheet=None):
+        self._tokens = list(_tokens(text, is_sheet))
+        self._pos = 0
+
+    def _peek(self):
+        return self._tokens[self._pos]
+
+    def _next(self):
+        token = self._tokens[self._pos]
+        self._pos += 1
+        return token
+
+    def _expect(self, op):
+        kind, value = self._next()
+        if kind != "op" or value != op:
+            raise SyntaxError(f"Expected {op!r}")
+
+    def parse(self):
+        node = self._comparison()
+        if self._peek()[0] != "end":
+            raise SyntaxError(f"Unexpected {self._peek()[1]!r}")
+        return node
+
+    def _binary(self, operand, ops):
+        node = operand()
+        while self._peek()[0] == "op" and self._peek()[1] in ops:
+            op = self._next()[1]
+            node = ("bin", op, node, operand())
+        return node
+
+    def _comparison(self):
+        return self._binary(self._concat, ("=", "<>", "<", ">", "<=", ">="))
+
+    def _concat(self):
+        return self._binary(self._additive, ("&",))
+
+    def _additive(self):
+        return self._binary(self._term, ("+", "-"))
+
+    def _term(self):
+        return self._binary(self._power, ("*", "/"))
+
+    def _power(self):
+        return self._binary(self._unary, ("^",))
+
+    def _unary(self):
+        # As in Excel, negation binds tighter than ^: -2^2 = 4
+        kind, value = self._peek()
+        if kind == "op" and value in ("-", "+"):
+            self._next()
+            operand = self._unary()
+            return ("neg", operand) if value == "-" else operand
+        return self._primary()
+
+    def _primary(self):
+        kind, value = self._next()
+        if kind == "number":
+            return ("num", float(value))
+        if kind == "string":
+            return ("str", value)
+        if kind == "error":
+            return ("error", value)
+        if kind == "ref":
+            sheet, ref = value
+            if ":" in ref:
+                (r1, c1), (r2, c2) = (parse_cell(part) for part in ref.split(":"))
+                return ("range", sheet, min(r1, r2), min(c1, c2), max(r1, r2), max(c1, c2))
+            return ("cell", sheet) + parse_cell(ref)
+        if kind == "name":
+            if self._peek() == ("op", "("):
+                self._next()
+                function = value.upper()
+                if function not in FUNCTIONS:
+                    raise SyntaxError(f"Unknown function {value}")
+                args = []
+                if self._peek() != ("op", ")"):
+                    args.append(self._comparison())
+                    while self._peek() == ("op", ","):
+                        self._next()
+                        args.append(self._comparison())
+                self._expect(")")
+                return ("call", function, args)
+            if value.upper() in ("TRUE", "FALSE"):
+                return ("num", 1.0 if value.upper() == "TRUE" else 0.0)
+            return ("name", value)
+        if kind == "op" and value == "(":
+            node = self._comparison()
+            self._expect(")")
+            return node
+        raise SyntaxError("Incomplete formula" if kind == "end" else f"Unexpected {value!r}")
+
+
+def parse(text, is_sheet=None):
+    """Parse a formula (with or without the leading '=') into its AST; raises SyntaxError.
+
+    ``is_sheet(name)`` tells whether a sheet exists, to split an unquoted name
+    like ``A1-HSBC-USD`` into ``A1 -`` and the sheet ``HSBC-USD``.
+    """
+    return _Parser(text[1:] if text.startswith("=") else text, is_sheet).parse()
+
+
+def _bind(node, sheet, resolve_sheet, formula):
+    """Copy of an AST with sheet names replaced by sheet keys; collects the references into ``formula``"""
+    kind = node[0]
+    if kind in ("cell", "range"):
+        target = sheet if node[1] is None else resolve_sheet(node[1])
+        if target is None:
+            formula.error = "#REF!"
+        elif kind == "cell":
+            formula.cells.append((target,) + node[2:])
+        else:
+            formula.ranges.append((target,) + node[2:])
+        return (kind, target) + node[2:]
+    if kind == "neg":
+        return ("neg", _bind(node[1], sheet, resolve_sheet, formula))
+    if kind == "bin":
+        return ("bin", node[1], _bind(node[2], sheet, resolve_sheet, formula),
+                _bind(node[3], sheet, resolve_sheet, formula))
+    if kind == "call":
+        return ("call", node[1], [_bind(arg, sheet, resolve_sheet, formula) for arg in node[2]])
+    if kind == "name":
+        formula.names = True
+    return node
+
+
+def to_number(value):
+    """Cell text -> float, or the text itself when it is not a number ("" stays "")"""
+    if not isinstance(value, str):
+        return value
+    text = value.replace(",", "").strip()
+    if text.startswith("(") and text.endswith(")"):
+        text = "-" + text[1:-1]
+    try:
+        return float(text)
+    except ValueError:
+        return value
+
+
+def _numeric(value):
+    if isinstance(value, float):
+        return value
+    if value == "":
+        return 0.0
+    raise FormulaError("#VALUE!")
+
+
+def _divide(a, b):
+    a, b = _numeric(a), _numeric(b)
+    if b == 0:
+        raise FormulaError("#DIV/0!")
+    return a / b
+
+
+def _comparison(compare):
+    def apply(a, b):
+        if type(a) is not type(b):
+            # Excel orders numbers before text
+            a, b = isinstance(a, str), isinstance(b, str)
+        return 1.0 if compare(a, b) else 0.0
+    return apply
+
+
+_OPERATORS = {
+    "+": lambda a, b: _numeric(a) + _numeric(b),
+    "-": lambda a, b: _numeric(a) - _numeric(b),
+    "*": lambda a, b: _numeric(a) * _numeric(b),
+    "/": _divide,
+    "^": lambda a, b: math.pow(_numeric(a), _numeric(b)),
+    "&": lambda a, b: f"{a}{b}",
+    "=": lambda a, b: 1.0 if a == b else 0.0,
+    "<>": lambda a, b: 1.0 if a != b else 0.0,
+    "<": _comparison(operator.lt),
+    ">": _comparison(operator.gt),
+    "<=": _comparison(operator.le),
+    ">=": _comparison(operator.ge),
+}
+
+
+class _Formula:
+    __slots__ = ("text", "ast", "cells", "ranges", "names", "error", "function")
+
+    def __init__(self, text, sheet, resolve_sheet):
+        self.text = text
+        self.error = None
+        self.cells = []  # resolved (sheet, row, col) read by the formula
+        self.ranges = []  # resolved (sheet, r1, c1, r2, c2)
+        self.names = False  # True when the formula reads a name such as ``rate``
+        try:
+            ast = parse(text, lambda name: resolve_sheet(name) is not None)
+            self.ast = _bind(ast, sheet, resolve_sheet, self)
+        except SyntaxError:
+            self.ast = None
+            self.error = "#ERROR!"
+
+
+class FormulaEngine:
+    """Formula cells of a workbook, their dependency graph and their cached values.
+
+    ``read_cell(sheet, row, col)`` returns the text of a plain (non-formula)
+    cell, ``resolve_sheet(name)`` the sheet key for a sheet name (None when
+    there is no such sheet) and ``resolve_name(sheet, name)`` the value of a
+    name such as ``rate`` used in a formula on ``sheet`` (None when unknown).
+    """
+
+    def __init__(self, read_cell, resolve_sheet, resolve_name=None):
+        self.read_cell = read_cell
+        self.resolve_sheet = resolve_sheet
+        self.resolve_name = resolve_name or (lambda sheet, name: None)
+        self._formulas = {}  # cell -> _Formula
+        self._values = {}  # cell -> float, str or error code
+        self._points = {}  # sheet -> {(row, col): set of formula cells reading it}
+        self._ranges = {}  # sheet -> {col: {formula cell: [(r1, r2)]}} for ranges covering col
+
+    def __len__(self):
+        return len(self._formulas)
+
+    def __contains__(self, cell):
+        return cell in self._formulas
+
+    def formula(self, cell):
+        formula = self._formulas.get(cell)
+        return formula.text if formula else None
+
+    def value(self, cell):
+        return self._values.get(cell)
+
+    def has_dependents(self, sheet):
+        return bool(self._points.get(sheet)) or bool(self._ranges.get(sheet))
+
+    # Graph maintenance
+
+    def _register(self, cell, formula):
+        if formula.error is None:
+            formula.function = self._compile(formula.ast, cell[0])
+        self._formulas[cell] = formula
+        for sheet, row, col in formula.cells:
+            self._points.setdefault(sheet, {}).setdefault((row, col), set()).add(cell)
+        for sheet, r1, c1, r2, c2 in formula.ranges:
+            columns = self._ranges.setdefault(sheet, {})
+            for col in range(c1, c2 + 1):
+                columns.setdefault(col, {}).setdefault(cell, []).append((r1, r2))
+
+    def _unregister(self, cell):
+        formula = self._formulas.pop(cell, None)
+        if formula is None:
+            return
+        self._values.pop(cell, None)
+        for sheet, row, col in formula.cells:
+            readers = self._points.get(sheet, {}).get((row, col))
+            if readers is not None:
+                readers.discard(cell)
+                if not readers:
+                    del self._points[sheet][(row, col)]
+        for sheet, _, c1, _, c2 in formula.ranges:
+            columns = self._ranges.get(sheet, {})
+            for col in range(c1, c2 + 1):
+                columns.get(col, {}).pop(cell, None)
+                if col in columns and not columns[col]:
+                    del columns[col]
+
+    def _dependents(self, sheet, row, col):
+        """Formula cells reading (sheet, row, col) directly"""
+        points = self._points.get(sheet, {}).get((row, col), ())
+        ranges = self._ranges.get(sheet, {}).get(col)
+        if not ranges:
+            return points
+        result = set(points)
+        for cell, spans in ranges.items():
+            if any(r1 <= row <= r2 for r1, r2 in spans):
+                result.add(cell)
+        return result
+
+    def _region_dependents(self, sheet, r1, c1, r2, c2):
+        """Formula cells reading any cell of a region"""
+        result = set()
+        for (row, col), readers in self._points.get(sheet, {}).items():
+            if r1 <= row <= r2 and c1 <= col <= c2:
+                result |= readers
+        for col, readers in self._ranges.get(sheet, {}).items():
+            if c1 <= col <= c2:
+                for cell, spans in readers.items():
+                    if any(a <= r2 and r1 <= b for a, b in spans):
+                        result.add(cell)
+        return result
+
+    # Edits; each returns {formula cell: new value} for the formulas recalculated
+
+    def set_formula(self, cell, text):
+        self._unregister(cell)
+        self._register(cell, _Formula(text, cell[0], self.resolve_sheet))
+        return self._recalculate({cell, *self._dependents(*cell)})
+
+    def remove_formula(self, cell):
+        """``cell`` is a plain cell again"""
+        if cell not in self._formulas:
+            return {}
+        self._unregister(cell)
+        return self._recalculate(set(self._dependents(*cell)))
+
+    def cells_changed(self, sheet, cells):
+        """Plain cells [(row, col)] of ``sheet`` got new text"""
+        seeds = set()
+        for row, col in cells:
+            seeds.update(self._dependents(sheet, row, col))
+        return self._recalculate(seeds)
+
+    def region_changed(self, sheet, r1, c1, r2, c2):
+        """Every plain cell in a region may have changed (e.g. a recalculated 余额 column)"""
+        return self._recalculate(self._region_dependents(sheet, r1, c1, r2, c2))
+
+    def names_changed(self):
+        """Values of names (exchange rates) changed: recalculate the formulas reading them"""
+        return self._recalculate({cell for cell, formula in self._formulas.items() if formula.names})
+
+    def clear(self):
+        self._formulas = {}
+        self._values = {}
+        self._points = {}
+        self._ranges = {}
+
+    def rebuild(self, formulas):
+        """Replace every formula from {cell: text} and evaluate them all"""
+        self.clear()
+        for cell, text in formulas.items():
+            self._register(cell, _Formula(text, cell[0], self.resolve_sheet))
+        return self._recalculate(set(self._formulas))
+
+    # Recalculation
+
+    def _recalculate(self, seeds):
+        """Evaluate ``seeds`` and their transitive dependents in topological order"""
+        if not seeds:
+            return {}
+        # Edges of the affected subgraph: precedent -> dependents
+        edges = {}
+        indegree = dict.fromkeys(seeds, 0)
+        queue = deque(seeds)
+        while queue:
+            cell = queue.popleft()
+            dependents = self._dependents(*cell)
+            edges[cell] = dependents
+            for dependent in dependents:
+                if dependent in indegree:
+                    indegree[dependent] += 1
+                else:
+                    indegree[dependent] = 1
+                    queue.append(dependent)
+        # Seeds reached from other seeds wait for them; the rest start the order
+        ready = deque(cell for cell, count in indegree.items() if count == 0)
+        changed = {}
+        while ready:
+            cell = ready.popleft()
+            value = self._evaluate(cell)
+            if self._values.get(cell) != value or cell not in self._values:
+                changed[cell] = value
+            self._values[cell] = value
+            for dependent in edges[cell]:
+                indegree[dependent] -= 1
+                if indegree[dependent] == 0:
+                    ready.append(dependent)
+        # Whatever never became ready sits on (or behind) a cycle
+        for cell, count in indegree.items():
+            if count > 0:
+                if self._values.get(cell) != CYCLE:
+                    changed[cell] = CYCLE
+                self._values[cell] = CYCLE
+        return changed
+
+    def _evaluate(self, cell):
+        formula = self._formulas[cell]
+        if formula.error:
+            return formula.error
+        try:
+            value = formula.function()
+        except FormulaError as e:
+            return e.code
+        except (ArithmeticError, ValueError):
+            return "#NUM!"
+        if isinstance(value, list):
+            # A bare range is only a value when it is a single cell
+            value = value[0] if len(value) == 1 else "#VALUE!"
+        return 0.0 if value == "" else value
+
+    def _cell_value(self, sheet, row, col):
+        cell = (sheet, row, col)
+        if cell in self._formulas:
+            value = self._values.get(cell, "")
+            if value in ERRORS:
+                raise FormulaError(value)
+            return value
+        return to_number(self.read_cell(sheet, row, col) or "")
+
+    def _compile(self, node, sheet):
+        """AST -> function of no arguments computing its value; done once per formula"""
+        kind = node[0]
+        if kind == "num" or kind == "str":
+            value = node[1]
+            return lambda: value
+        if kind == "error":
+            code = node[1]
+
+            def error():
+                raise FormulaError(code)
+            return error
+        if kind == "cell":
+            _, target, row, col = node
+            cell_value = self._cell_value
+            return lambda: cell_value(target, row, col)
+        if kind == "range":
+            _, target, r1, c1, r2, c2 = node
+            cell_value = self._cell_value
+            return lambda: [cell_value(target, row, col) for row in range(r1, r2 + 1) for col in range(c1, c2 + 1)]
+        if kind == "name":
+            name = node[1]
+
+            def lookup():
+                value = self.resolve_name(sheet, name)
+                if value is None:
+                    raise FormulaError("#NAME?")
+                return value
+            return lookup
+        if kind == "neg":
+            operand = self._compile(node[1], sheet)
+            return lambda: -_numeric(operand())
+        if kind == "bin":
+            op = _OPERATORS[node[1]]
+            left, right = self._compile(node[2], sheet), self._compile(node[3], sheet)
+            return lambda: op(left(), right())
+        function = node[1]
+        args = [self._compile(arg, sheet) for arg in node[2]]
+        call = self._call
+        return lambda: call(function, [arg() for arg in args])
+
+    @staticmethod
+    def _call(function, args):
+        if function == "IF":
+            if len(args) not in (2, 3):
+                raise FormulaError("#VALUE!")
+            condition = args[0]
+            if isinstance(condition, str):
+                raise FormulaError("#VALUE!")
+            return args[1] if condition else (args[2] if len(args) == 3 else 0.0)
+        if function in ("ABS", "ROUND"):
+            if not 1 <= len(args) <= (2 if function == "ROUND" else 1):
+                raise FormulaError("#VALUE!")
+            x = _numeric(args[0])
+            if function == "ABS":
+                return abs(x)
+            digits = int(_numeric(args[1])) if len(args) == 2 else 0
+            # Excel rounds halves away from zero
+            scale = 10.0 ** digits
+            return math.copysign(math.floor(abs(x) * scale + 0.5) / scale, x)
+        # Aggregates: ranges skip text and empty cells, as in Excel
+        numbers = []
+        for arg in args:
+            if isinstance(arg, list):
+                numbers.extend(v for v in arg if isinstance(v, float))
+            else:
+                numbers.append(_numeric(arg))
+        if function == "SUM":
+            return math.fsum(numbers)
+        if function == "COUNT":
+            return float(len(numbers))
+        if not numbers:
+            if function == "AVERAGE":
+                raise FormulaError("#DIV/0!")
+            return 0.0
+        if function == "AVERAGE":
+            return math.fsum(numbers) / len(numbers)
+        return min(numbers) if function == "MIN" else max(numbers)
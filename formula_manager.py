@@ -0,0 +1,144 @@
+import logging
+from PySide6.QtCore import Qt
+from formula_engine import FormulaEngine, shift_references
+from utils import format_number
+
+logger = logging.getLogger(__name__)
+
+# Item data role holding a cell's formula text; the item text shows the result
+FORMULA_ROLE = Qt.UserRole + 1
+
+# Nested result writes (a formula result changing a 余额 column read by other formulas) stop here
+MAX_DEPTH = 8
+
+
+def is_formula(text):
+    return len(text) > 1 and text.startswith("=")
+
+
+class FormulaManager:
+    """Workbook formulas: keeps the FormulaEngine in step with the sheets.
+
+    Sheets report written cells through ``cells_written`` and recalculated
+    余额 columns through ``region_changed``; only the formulas depending on
+    them are recalculated, and their results are written back as ordinary
+    cell text, so totals, balances and statements read them like typed values.
+    In a formula, ``rate`` is the sheet's exchange rate and a currency code
+    (e.g. ``USD``) its 本期 rate to HKD.
+    """
+
+    def __init__(self, main_window):
+        self.main_window = main_window
+        self.engine = FormulaEngine(self._read_cell, self._sheet_named, self._name_value)
+        self._depth = 0
+
+    def _sheet_named(self, name):
+        for sheet in self.main_window.sheets:
+            if sheet.name == name and getattr(sheet, "formula_manager", None) is self:
+                return sheet
+        return None
+
+    @staticmethod
+    def _read_cell(sheet, row, col):
+        return sheet.cell_text(row, col)
+
+    def _name_value(self, sheet, name):
+        if name.lower() == "rate":
+            return float(sheet.exchange_rate)
+        code = name.upper()
+        registry = self.main_window.exchange_rates
+        if code == "HKD" or registry.has_rate(code):
+            return float(registry.current_rate(code))
+        return None
+
+    @staticmethod
+    def display(value):
+        if isinstance(value, float):
+            return format_number(value)
+        return value
+
+    def cells_written(self, table, cells):
+        """New text in [(row, col)] of ``table``: (un)register formulas, recalculate dependents"""
+        engine = self.engine
+        changed = {}
+        formula_cells = []
+        plain = []
+        table.blockSignals(True)
+        try:
+            for row, col in cells:
+                item = table.item(row, col)
+                text = item.text() if item else ""
+                cell = (table, row, col)
+                if is_formula(text):
+                    item.setData(FORMULA_ROLE, text)
+                    table.has_formulas = True
+                    changed.update(engine.set_formula(cell, text))
+                    formula_cells.append(cell)
+                elif cell in engine:
+                    item.setData(FORMULA_ROLE, None)
+                    changed.update(engine.remove_formula(cell))
+                else:
+                    plain.append((row, col))
+        finally:
+            table.blockSignals(False)
+        if plain and engine.has_dependents(table):
+            changed.update(engine.cells_changed(table, plain))
+        # A formula written with an unchanged result still needs its text replaced by the result
+        for cell in formula_cells:
+            changed.setdefault(cell, engine.value(cell))
+        self._apply(changed)
+
+    def region_changed(self, table, top, left, bottom, right):
+        """Cells of a region were rewritten without signals (e.g. a recalculated 余额 column)"""
+        if self.engine.has_dependents(table):
+            self._apply(self.engine.region_changed(table, top, left, bottom, right))
+
+    def rates_changed(self):
+        self._apply(self.engine.names_changed())
+
+    def structure_changed(self, table, axis, at, count):
+        """``count`` rows or columns (``axis`` "row" or "col") were inserted (count > 0) or deleted (count < 0)
+        at ``at`` of ``table``: move the references into it, then re-register the formulas at their new cells"""
+        sheets = [sheet for sheet in self.main_window.sheets
+                  if getattr(sheet, "formula_manager", None) is self and sheet.has_formulas]
+        if not sheets:
+            return
+        is_sheet = lambda name: self._sheet_named(name) is not None
+        for sheet in sheets:
+            sheet.blockSignals(True)
+            try:
+                for (row, col), text in sheet.formula_cells().items():
+                    shifted = shift_references(text, sheet is table, table.name, axis, at, count, is_sheet)
+                    if shifted != text:
+                        sheet.item(row, col).setData(FORMULA_ROLE, shifted)
+            finally:
+                sheet.blockSignals(False)
+        self.rebuild()
+
+    def rebuild(self):
+        """Re-register every formula of the workbook (after load, sheet rename or delete)"""
+        formulas = {}
+        for sheet in self.main_window.sheets:
+            if getattr(sheet, "formula_manager", None) is self and sheet.has_formulas:
+                for (row, col), text in sheet.formula_cells().items():
+                    formulas[(sheet, row, col)] = text
+        self._apply(self.engine.rebuild(formulas))
+        if formulas:
+            logger.info(f"Registered {len(formulas)} formulas")
+
+    def _apply(self, changed):
+        """Write recalculated values into their cells, one batch per sheet"""
+        if not changed:
+            return
+        if self._depth >= MAX_DEPTH:
+            logger.warning(f"Formula results still changing after {MAX_DEPTH} passes; stopped")
+            return
+        results = {}
+        for (table, row, col), value in changed.items():
+            results.setdefault(table, {})[(row, col)] = self.display(value)
+        self._depth += 1
+        try:
+            for table, cells in results.items():
+                table.show_formula_results(cells)
+        finally:
+            self._depth -= 1
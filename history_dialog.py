@@ -0,0 +1,88 @@
+from PySide6.QtWidgets import (QDialog, QVBoxLayout, QHBoxLayout, QLabel, QPushButton, QTableWidget,
+                               QTableWidgetItem, QAbstractItemView, QInputDialog, QMessageBox)
+from PySide6.QtCore import Qt
+
+
+class HistoryDialog(QDialog):
+    """File -> History: saved versions of the workbook; restore a whole version or one sheet of it."""
+
+    def __init__(self, parent=None, file_manager=None):
+        super().__init__(parent)
+        self.setWindowTitle("Workbook History")
+        self.file_manager = file_manager
+        self._versions = []
+        layout = QVBoxLayout(self)
+
+        self.status_label = QLabel("")
+        layout.addWidget(self.status_label)
+
+        self.versions_table = QTableWidget(0, 4)
+        self.versions_table.setHorizontalHeaderLabels(["版本", "时间", "说明", "更改的工作表"])
+        self.versions_table.verticalHeader().setVisible(False)
+        self.versions_table.setEditTriggers(QAbstractItemView.NoEditTriggers)
+        self.versions_table.setSelectionBehavior(QAbstractItemView.SelectRows)
+        self.versions_table.setSelectionMode(QAbstractItemView.SingleSelection)
+        self.versions_table.horizontalHeader().setStretchLastSection(True)
+        layout.addWidget(self.versions_table)
+
+        buttons = QHBoxLayout()
+        restore_version = QPushButton("Restore Version")
+        restore_version.clicked.connect(self.restore_version)
+        buttons.addWidget(restore_version)
+        restore_sheet = QPushButton("Restore Sheet...")
+        restore_sheet.clicked.connect(self.restore_sheet)
+        buttons.addWidget(restore_sheet)
+        buttons.addStretch()
+        close = QPushButton("Close")
+        close.clicked.connect(self.close)
+        buttons.addWidget(close)
+        layout.addLayout(buttons)
+        self.resize(620, 420)
+
+    def refresh(self):
+        store = self.file_manager.history()
+        # Newest first
+        self._versions = list(reversed(store.versions())) if store else []
+        self.versions_table.setRowCount(len(self._versions))
+        for i, version in enumerate(self._versions):
+            changed = ", ".join(store.changed_sheets(version["id"]))
+            values = (str(version["id"]), version["time"], version["label"], changed or "-")
+            for j, value in enumerate(values):
+                item = QTableWidgetItem(value)
+                if j == 0:
+                    item.setTextAlignment(Qt.AlignRight | Qt.AlignVCenter)
+                self.versions_table.setItem(i, j, item)
+        if store and self._versions:
+            self.status_label.setText(f"{len(self._versions)} versions, {store.size_bytes() / 1024:.0f} KB")
+            self.versions_table.selectRow(0)
+        else:
+            self.status_label.setText("No saved versions yet; versions are recorded when the workbook is saved.")
+
+    def _selected(self):
+        row = self.versions_table.currentRow()
+        return self._versions[row] if 0 <= row < len(self._versions) else None
+
+    def restore_version(self):
+        version = self._selected()
+        if version is None:
+            return
+        reply = QMessageBox.question(
+            self, "Restore Version",
+            f"Replace the workbook with version {version['id']} ({version['time']})?\n\n"
+            f"The current state stays in the history.",
+            QMessageBox.Yes | QMessageBox.No, QMessageBox.No
+        )
+        if reply == QMessageBox.Yes:
+            self.file_manager.restore_version(version["id"])
+            self.refresh()
+
+    def restore_sheet(self):
+        version = self._selected()
+        if version is None:
+            return
+        names = [name for name, _ in version["sheets"]]
+        name, ok = QInputDialog.getItem(self, "Restore Sheet",
+                                        f"Sheet to restore from version {version['id']}:", names, 0, False)
+        if ok and name:
+            self.file_manager.restore_sheet(version["id"], name)
+            self.refresh()
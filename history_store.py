@@ -0,0 +1,121 @@
+"""Versioned save history of a workbook, stored as deduplicated chunks.
+
+Every recorded save is a version: a small manifest naming the chunk of the
+workbook header and the chunk of each sheet section. Chunks are addressed by
+the SHA-256 of their content and stored zlib-compressed once, so sheets that
+did not change between saves are shared and the store grows by what changed.
+A version is restored straight from its own manifest, without replaying the
+versions before it.
+
+Layout of the store directory::
+
+    versions.jsonl          one manifest per line, oldest first
+    objects/ab/cdef...      compressed chunk with digest abcdef...
+"""
+import hashlib
+import json
+import os
+import pickle
+import time
+import zlib
+
+
+class HistoryStore:
+    def __init__(self, root):
+        self.root = root
+        self._versions = None  # loaded lazily from versions.jsonl
+        self._last_sections = {}  # id(section bytes) -> (section, digest) of the latest record
+
+    def _object_path(self, digest):
+        return os.path.join(self.root, "objects", digest[:2], digest[2:])
+
+    def _put(self, data):
+        """Store a chunk unless present; returns its digest"""
+        digest = hashlib.sha256(data).hexdigest()
+        path = self._object_path(digest)
+        if not os.path.exists(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp_path = f"{path}.tmp"
+            with open(tmp_path, "wb") as f:
+                f.write(zlib.compress(data, 6))
+            os.replace(tmp_path, path)
+        return digest
+
+    def _get(self, digest):
+        with open(self._object_path(digest), "rb") as f:
+            return zlib.decompress(f.read())
+
+    def versions(self):
+        """Manifests, oldest first: {"id", "time", "label", "header", "sheets": [[name, digest]]}"""
+        if self._versions is None:
+            self._versions = []
+            path = os.path.join(self.root, "versions.jsonl")
+            if os.path.exists(path):
+                with open(path, encoding="utf-8") as f:
+                    self._versions = [json.loads(line) for line in f if line.strip()]
+        return self._versions
+
+    def version(self, version_id):
+        for version in self.versions():
+            if version["id"] == version_id:
+                return version
+        raise KeyError(f"No version {version_id} in {self.root}")
+
+    def record(self, header, sections, label=""):
+        """Record a save: encoded ``header`` and [(sheet name, encoded section)].
+
+        Returns the new manifest, or None when it matches the latest version.
+        """
+        known = self._last_sections
+        digests = []
+        for name, section in sections:
+            # Sections reused from the previous save are the same bytes objects; skip rehashing them
+            entry = known.get(id(section))
+            digest = entry[1] if entry is not None and entry[0] is section else self._put(section)
+            digests.append((name, digest, section))
+        self._last_sections = {id(section): (section, digest) for _, digest, section in digests}
+        header_digest = self._put(header)
+        sheets = [[name, digest] for name, digest, _ in digests]
+        versions = self.versions()
+        if versions and versions[-1]["header"] == header_digest and versions[-1]["sheets"] == sheets:
+            return None
+        manifest = {
+            "id": versions[-1]["id"] + 1 if versions else 1,
+            "time": time.strftime("%Y/%m/%d %H:%M:%S"),
+            "label": label,
+            "header": header_digest,
+            "sheets": sheets,
+        }
+        os.makedirs(self.root, exist_ok=True)
+        with open(os.path.join(self.root, "versions.jsonl"), "a", encoding="utf-8") as f:
+            f.write(json.dumps(manifest, ensure_ascii=False) + "\n")
+        versions.append(manifest)
+        return manifest
+
+    def changed_sheets(self, version_id):
+        """Names of the sheets whose content differs from the previous version"""
+        versions = self.versions()
+        index = versions.index(self.version(version_id))
+        before = dict(map(tuple, versions[index - 1]["sheets"])) if index else {}
+        return [name for name, digest in versions[index]["sheets"] if before.get(name) != digest]
+
+    def load_sheet(self, version_id, name):
+        """Sheet dict (as saved in the workbook) of one sheet of a version"""
+        for sheet_name, digest in self.version(version_id)["sheets"]:
+            if sheet_name == name:
+                return pickle.loads(self._get(digest))
+        raise KeyError(f"No sheet {name!r} in version {version_id}")
+
+    def load_version(self, version_id):
+        """Workbook dict of a version, in the layout FileManager.load_data_from_dict takes"""
+        version = self.version(version_id)
+        data = pickle.loads(self._get(version["header"]))
+        data["sheets"] = [pickle.loads(self._get(digest)) for _, digest in version["sheets"]]
+        return data
+
+    def size_bytes(self):
+        """Bytes used by the store on disk"""
+        total = 0
+        for folder, _, files in os.walk(self.root):
+            total += sum(os.path.getsize(os.path.join(folder, name)) for name in files)
+        return total
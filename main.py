@@ -1,5 +1,7 @@
 import sys
+import argparse
 import logging
+import tracemalloc
 from PySide6.QtWidgets import QApplication
 from excel_like import ExcelLike
 import faulthandler
@@ -16,9 +18,46 @@ logging.basicConfig(
     filemode='w'
 )
 
+
+def parse_args(argv):
+    """Our options; anything else is left for Qt"""
+    parser = argparse.ArgumentParser(add_help=False)
+    parser.add_argument("--trace-memory", action="store_true",
+                        help="trace Python allocations for File -> Memory Report")
+    parser.add_argument("--memory-report", nargs="?", const="", metavar="FILE.exl",
+                        help="print per-sheet memory of FILE.exl (or the start-up workbook) and exit")
+    parser.add_argument("--memory-threshold", type=float, default=None, metavar="MB",
+                        help="warn about sheets estimated above this size")
+    parser.add_argument("--sheet-memory", type=float, default=None, metavar="MB",
+                        help="budget for the items of bank and non-bank sheets; sheets not viewed "
+                             "recently are dehydrated above it (0: never)")
+    return parser.parse_known_args(argv[1:])
+
+
+def print_memory_report(win, path, threshold_mb):
+    import memory_report
+    from workbook_format import read_workbook
+    if path:
+        with open(path, "rb") as f:
+            win.file_manager.load_data_from_dict(read_workbook(f))
+    entries = memory_report.measure(win.sheets)
+    threshold_mb = memory_report.DEFAULT_THRESHOLD_MB if threshold_mb is None else threshold_mb
+    for line in memory_report.report_lines(entries, threshold_mb, memory_report.traced_memory()):
+        print(line)
+    return 1 if memory_report.warnings(entries, threshold_mb) else 0
+
+
 if __name__ == "__main__":
-    app = QApplication(sys.argv)
+    options, qt_args = parse_args(sys.argv)
+    if options.trace_memory or options.memory_report is not None:
+        tracemalloc.start()
+    app = QApplication(sys.argv[:1] + qt_args)
     win = ExcelLike()
+    win.memory_threshold_mb = options.memory_threshold
+    if options.sheet_memory is not None:
+        win.sheet_cache.budget_mb = options.sheet_memory
+    if options.memory_report is not None:
+        sys.exit(print_memory_report(win, options.memory_report, options.memory_threshold))
     # Set window size to 80% of the screen size
     screen = app.primaryScreen()
     size = screen.availableGeometry()
@@ -0,0 +1,49 @@
+from PySide6.QtWidgets import QDialog, QVBoxLayout, QLabel, QTableWidget, QTableWidgetItem, QAbstractItemView
+from PySide6.QtCore import Qt
+import memory_report
+
+
+class MemoryReportDialog(QDialog):
+    """File -> Memory Report: estimated memory per sheet, largest first."""
+
+    HEADERS = ["工作表", "类型", "行×列", "项目数", "有内容", "项目 KB", "界面 KB", "Python KB", "合计 KB"]
+
+    def __init__(self, parent=None, threshold_mb=memory_report.DEFAULT_THRESHOLD_MB):
+        super().__init__(parent)
+        self.setWindowTitle("Memory Report")
+        self.threshold_mb = threshold_mb
+        layout = QVBoxLayout(self)
+
+        self.summary_label = QLabel("")
+        self.summary_label.setWordWrap(True)
+        layout.addWidget(self.summary_label)
+
+        self.sheets_table = QTableWidget(0, len(self.HEADERS))
+        self.sheets_table.setHorizontalHeaderLabels(self.HEADERS)
+        self.sheets_table.verticalHeader().setVisible(False)
+        self.sheets_table.setEditTriggers(QAbstractItemView.NoEditTriggers)
+        self.sheets_table.setSelectionBehavior(QAbstractItemView.SelectRows)
+        layout.addWidget(self.sheets_table)
+        self.resize(820, 460)
+
+    def show_report(self, sheets):
+        entries = memory_report.measure(sheets)
+        self.sheets_table.setRowCount(len(entries))
+        for i, m in enumerate(entries):
+            values = (m.name, m.type, f"{m.rows}×{m.cols}", m.items, m.populated,
+                      round(m.item_bytes / 1024), round(m.widget_bytes / 1024), round(m.python_bytes / 1024),
+                      round(m.total_bytes / 1024))
+            for j, value in enumerate(values):
+                item = QTableWidgetItem(f"{value:,}" if isinstance(value, int) else value)
+                if isinstance(value, int):
+                    item.setTextAlignment(Qt.AlignRight | Qt.AlignVCenter)
+                self.sheets_table.setItem(i, j, item)
+
+        lines = [f"{len(entries)} sheets, about {sum(m.total_bytes for m in entries) / 1e6:.1f} MB estimated."]
+        traced = memory_report.traced_memory()
+        if traced is None:
+            lines.append("Python heap: start with --trace-memory to include tracemalloc figures.")
+        else:
+            lines.append(f"Python heap (tracemalloc): {traced[0] / 1e6:.1f} MB, peak {traced[1] / 1e6:.1f} MB.")
+        lines.extend(f"⚠ {warning}" for warning in memory_report.warnings(entries, self.threshold_mb))
+        self.summary_label.setText("\n".join(lines))
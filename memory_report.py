@@ -0,0 +1,112 @@
+"""Per-sheet memory accounting: where a workbook's memory goes.
+
+Qt objects are invisible to tracemalloc, so each sheet is estimated from
+what it holds: its QTableWidgetItems (and their text), the model's
+row x column table of item pointers, which exists even for empty rows, and
+a fixed overhead per widget. Python-side indexes (cell index, spans, date
+index, sheet view, row ids, derived sheet references, the packed items of a
+dehydrated sheet) are measured with sys.getsizeof. When tracemalloc is tracing (``main.py --trace-memory``), the
+report adds the Python heap and its largest allocating files.
+"""
+import sys
+import tracemalloc
+
+# Estimates of Qt allocations, in bytes
+ITEM_BYTES = 160  # QTableWidgetItem with its data vector and one display value
+TEXT_BYTES_PER_CHAR = 2  # QString is UTF-16
+TEXT_OVERHEAD = 24
+GRID_SLOT_BYTES = 8  # one item pointer per cell of the model, populated or not
+HEADER_SECTION_BYTES = 16  # per row and column of the two QHeaderViews
+WIDGET_BYTES = 48 * 1024  # table, viewport, headers, scroll bars, delegate
+
+DEFAULT_THRESHOLD_MB = 20
+
+
+def _is_qt(obj):
+    return any(cls.__module__.startswith(("PySide6", "shiboken6")) for cls in type(obj).__mro__)
+
+
+def _deep_size(obj, seen=None):
+    """sys.getsizeof of ``obj`` and the containers and scalars it holds"""
+    if seen is None:
+        seen = set()
+    if id(obj) in seen or _is_qt(obj) or callable(obj):
+        return 0
+    seen.add(id(obj))
+    size = sys.getsizeof(obj)
+    if isinstance(obj, dict):
+        size += sum(_deep_size(k, seen) + _deep_size(v, seen) for k, v in obj.items())
+    elif isinstance(obj, (list, tuple, set, frozenset)):
+        size += sum(_deep_size(v, seen) for v in obj)
+    elif hasattr(obj, "__dict__"):
+        # Plain Python helpers (CellIndex, SpanRegistry, ...); Qt objects they refer to are skipped
+        size += _deep_size(vars(obj), seen)
+    return size
+
+
+class SheetMemory:
+    def __init__(self, sheet):
+        self.name = sheet.name
+        self.type = sheet.type
+        self.rows = sheet.rowCount()
+        self.cols = sheet.columnCount()
+        self.items = 0
+        text_chars = 0
+        item_at = type(sheet).item  # not the instance's: measuring must not hydrate a dehydrated sheet
+        for row in range(self.rows):
+            for col in range(self.cols):
+                item = item_at(sheet, row, col)
+                if item is not None:
+                    self.items += 1
+                    text_chars += len(item.text())
+        index = getattr(sheet, "cell_index", None)
+        self.populated = len(index) if index is not None else self.items
+        self.item_bytes = self.items * (ITEM_BYTES + TEXT_OVERHEAD) + text_chars * TEXT_BYTES_PER_CHAR
+        self.widget_bytes = (WIDGET_BYTES + self.rows * self.cols * GRID_SLOT_BYTES
+                             + (self.rows + self.cols) * HEADER_SECTION_BYTES)
+        seen = set()
+        self.python_bytes = sum(_deep_size(getattr(sheet, name), seen)
+                                for name in ("cell_index", "spans", "_date_index", "sheet_view", "row_ids", "derived", "_dehydrated")
+                                if getattr(sheet, name, None) is not None)
+
+    @property
+    def total_bytes(self):
+        return self.item_bytes + self.widget_bytes + self.python_bytes
+
+
+def measure(sheets):
+    """SheetMemory of each sheet, largest first"""
+    return sorted((SheetMemory(sheet) for sheet in sheets), key=lambda m: m.total_bytes, reverse=True)
+
+
+def traced_memory(limit=5):
+    """(current bytes, peak bytes, [(file, bytes)] of the largest allocators), or None when not tracing"""
+    if not tracemalloc.is_tracing():
+        return None
+    current, peak = tracemalloc.get_traced_memory()
+    stats = tracemalloc.take_snapshot().statistics("filename")[:limit]
+    return current, peak, [(stat.traceback[0].filename, stat.size) for stat in stats]
+
+
+def warnings(entries, threshold_mb=DEFAULT_THRESHOLD_MB):
+    limit = threshold_mb * 1e6
+    return [f"{m.name}: about {m.total_bytes / 1e6:.1f} MB (over {threshold_mb} MB)"
+            for m in entries if m.total_bytes > limit]
+
+
+def report_lines(entries, threshold_mb=DEFAULT_THRESHOLD_MB, traced=None):
+    yield (f"{'sheet':<24} {'type':<15} {'rows x cols':>12} {'items':>9} {'cells':>9} "
+           f"{'items KB':>9} {'widget KB':>10} {'python KB':>10} {'total KB':>9}")
+    for m in entries:
+        yield (f"{m.name:<24} {m.type:<15} {f'{m.rows}x{m.cols}':>12} {m.items:>9} {m.populated:>9} "
+               f"{m.item_bytes / 1024:>9.0f} {m.widget_bytes / 1024:>10.0f} {m.python_bytes / 1024:>10.0f} "
+               f"{m.total_bytes / 1024:>9.0f}")
+    total = sum(m.total_bytes for m in entries)
+    yield f"{len(entries)} sheets, about {total / 1e6:.1f} MB estimated"
+    if traced is not None:
+        current, peak, top = traced
+        yield f"Python heap (tracemalloc): {current / 1e6:.1f} MB, peak {peak / 1e6:.1f} MB"
+        for filename, size in top:
+            yield f"  {size / 1e6:8.2f} MB  {filename}"
+    for warning in warnings(entries, threshold_mb):
+        yield f"WARNING {warning}"
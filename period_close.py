@@ -0,0 +1,177 @@
+import logging
+from datetime import datetime
+from PySide6.QtWidgets import QMessageBox
+from utils import parse_date
+
+logger = logging.getLogger(__name__)
+
+
+def next_period(period_from, period_to):
+    """The period following [period_from, period_to] (QDates) with the same length.
+
+    Whole-month periods advance by the same number of months, anything else by
+    the same number of days.
+    """
+    start = period_to.addDays(1)
+    if period_from.day() == 1 and period_to.day() == period_to.daysInMonth():
+        months = (period_to.year() - period_from.year()) * 12 + period_to.month() - period_from.month() + 1
+        return start, start.addMonths(months).addDays(-1)
+    return start, start.addDays(period_from.daysTo(period_to))
+
+
+class PeriodCloseManager:
+    """File -> Close Period: freeze the current period and carry its balances forward.
+
+    Each sheet's rows up to the last one dated within the period become read-only
+    (``closed_row_count``); a sheet with a later-dated row above that one must
+    be sorted by 日期 first. A compact snapshot of the closing balances per
+    account and currency, plus per-sheet totals, is stored in
+    ``main_window.period_snapshots``; its balances are the opening balances of
+    the next period, so balances, totals and Update only touch open rows.
+    """
+
+    def __init__(self, main_window):
+        self.main_window = main_window
+
+    def close_period(self):
+        mw = self.main_window
+        period_from = mw.period_from_input.date()
+        period_to = mw.period_to_input.date()
+        label = f"{period_from.toString('yyyy/MM/dd')} - {period_to.toString('yyyy/MM/dd')}"
+        reply = QMessageBox.question(
+            mw, "Close Period",
+            f"Close the period {label}?\n\nRows dated up to {period_to.toString('yyyy/MM/dd')} become "
+            f"read-only and their balances are carried forward as opening balances.",
+            QMessageBox.Yes | QMessageBox.No, QMessageBox.No
+        )
+        if reply != QMessageBox.Yes:
+            return
+        try:
+            snapshot = self.close(period_to.toPython())
+        except ValueError as e:
+            QMessageBox.warning(mw, "Close Period", f"Cannot close {label}:\n{e}")
+            return
+        new_from, new_to = next_period(period_from, period_to)
+        mw.period_from_input.setDate(new_from)
+        mw.period_to_input.setDate(new_to)
+        mw.auto_save()
+        closed = sum(s["closed_rows"] for s in snapshot["sheets"])
+        QMessageBox.information(
+            mw, "Close Period",
+            f"Closed {label}: {closed} rows frozen, {len(snapshot['balances'])} account balances carried forward."
+        )
+
+    def close(self, period_end):
+        """Close every row dated up to ``period_end`` (a datetime.date); returns the snapshot.
+
+        Raises ValueError, closing nothing, if a sheet has rows dated after the
+        period before rows dated within it.
+        """
+        mw = self.main_window
+        manager = mw.statement_manager
+        closed_rows = {}
+        exchange_sheet = None
+        for sheet in mw.sheets:
+            if not manager.is_source(sheet):
+                continue
+            if sheet.type == "payable_detail":
+                # 汇兑损益 is rebuilt from the open 中转 rows by the next Update
+                exchange_sheet = sheet
+                closed_rows[sheet] = sheet.rowCount()
+            else:
+                closed_rows[sheet] = self._closing_row_count(sheet, period_end)
+
+        balances = manager.closing_balances(closed_rows)
+        snapshot = {
+            "period_from": mw.period_from_input.date().toString("yyyy/MM/dd"),
+            "period_to": mw.period_to_input.date().toString("yyyy/MM/dd"),
+            "closed_at": datetime.now().strftime("%Y/%m/%d %H:%M:%S"),
+            "sheets": [
+                self._sheet_summary(sheet, count) for sheet, count in closed_rows.items() if sheet is not exchange_sheet
+            ],
+            "balances": balances,
+        }
+
+        for sheet, count in closed_rows.items():
+            if sheet is exchange_sheet:
+                sheet.clearContents()
+            else:
+                sheet.closed_row_count = count
+            sheet.viewport().update()
+            manager.on_rows_changed(sheet)
+        mw.period_snapshots.append(snapshot)
+        manager.set_opening_balances(balances)
+        # Closed rows are frozen: earlier edits can no longer be undone
+        mw.undo_stack.clear()
+        logger.info(f"Closed period {snapshot['period_from']}-{snapshot['period_to']}: "
+                    f"{len(balances)} accounts carried forward")
+        return snapshot
+
+    @staticmethod
+    def _column(sheet, label):
+        for col in range(sheet.columnCount()):
+            header_item = sheet.horizontalHeaderItem(col)
+            if header_item is not None and header_item.text() == label:
+                return col
+        return -1
+
+    def _closing_row_count(self, sheet, period_end):
+        """1 + the last row dated on or before ``period_end``; never less than the rows already closed.
+
+        Raises ValueError when a row dated after the period comes before one
+        dated within it: closing would freeze the later row too.
+        """
+        date_col = self._column(sheet, "日期")
+        count = sheet.closed_row_count
+        if date_col < 0:
+            return count
+        later = None
+        for row in sheet.open_rows():
+            item = sheet.item(row, date_col)
+            value = parse_date(item.text()) if item else None
+            if value is None:
+                continue
+            if value > period_end:
+                if later is None:
+                    later = row
+            elif later is not None:
+                raise ValueError(f"{sheet.name}: row {later + 1} is dated after the period but comes before "
+                                 f"row {row + 1}; sort the sheet by 日期 before closing")
+            else:
+                count = row + 1
+        return count
+
+    def _sheet_summary(self, sheet, count):
+        """Debit/credit totals of the rows closed now, per currency, and the bank closing balance"""
+        debit, credit = {}, {}
+        if sheet.type == "bank":
+            columns = [(self._column(sheet, "借方"), debit, sheet.currency),
+                       (self._column(sheet, "贷方"), credit, sheet.currency)]
+        else:
+            columns = []
+            for col in range(sheet.columnCount()):
+                text = sheet.horizontalHeaderItem(col).text() if sheet.horizontalHeaderItem(col) else ""
+                for prefix, totals in (("借方(", debit), ("贷方(", credit)):
+                    if text.startswith(prefix) and text.endswith(")"):
+                        columns.append((col, totals, text[len(prefix):-1]))
+        for col, totals, currency in columns:
+            if col < 0:
+                continue
+            for row in range(sheet.closed_row_count, count):
+                item = sheet.item(row, col)
+                if item and item.text().strip():
+                    totals[currency] = totals.get(currency, 0.0) + sheet.parse_number(item.text())
+
+        summary = {
+            "name": sheet.name,
+            "type": sheet.type,
+            "currency": getattr(sheet, "currency", ""),
+            "closed_rows": count,
+            "debit": {c: round(v, 2) for c, v in debit.items() if v},
+            "credit": {c: round(v, 2) for c, v in credit.items() if v},
+        }
+        balance_col = self._column(sheet, "余额")
+        if sheet.type == "bank" and balance_col >= 0 and count > 0:
+            item = sheet.item(count - 1, balance_col)
+            summary["closing_balance"] = sheet.parse_number(item.text()) if item and item.text() else 0.0
+        return summary
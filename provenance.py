@@ -0,0 +1,90 @@
+"""Provenance of generated rows: source rows <-> the derived rows drawn from them.
+
+Every sheet numbers its rows with RowIds, stable identities that move with
+their rows through inserts and deletes (and are unaffected by renames), so a
+derived row keeps pointing at the same transaction when rows are inserted
+above it. ProvenanceIndex maps each source row id to the derived sheet rows
+showing it; the reverse direction is the DerivedSheet's own reference.
+"""
+import itertools
+from array import array
+
+_ids = itertools.count(1)  # shared by every sheet, so a row id identifies its sheet too
+
+
+class RowIds:
+    def __init__(self, rows=0):
+        self._ids = array("q", (next(_ids) for _ in range(rows)))
+        self._rows = None  # row id -> row, rebuilt lazily after structural changes
+
+    def __len__(self):
+        return len(self._ids)
+
+    def id_at(self, row):
+        return self._ids[row] if 0 <= row < len(self._ids) else None
+
+    def row_of(self, row_id):
+        """Current row of ``row_id``, or None once the row is deleted"""
+        if self._rows is None:
+            self._rows = {row_id: row for row, row_id in enumerate(self._ids)}
+        return self._rows.get(row_id)
+
+    def insert_rows(self, row, count=1):
+        self._ids[row:row] = array("q", (next(_ids) for _ in range(count)))
+        self._rows = None
+
+    def remove_rows(self, row, count=1):
+        del self._ids[row:row + count]
+        self._rows = None
+
+
+class ProvenanceIndex:
+    def __init__(self):
+        self._derived = {}  # source row id -> [(derived table, derived row)]
+        self._tables = {}  # derived table -> (DerivedSheet, source row ids)
+
+    def register(self, table, derived):
+        """Index the rows ``table`` shows through ``derived``, replacing what it showed before"""
+        self.unregister(table)
+        row_ids = []
+        for row, row_id in derived.source_ids():
+            self._derived.setdefault(row_id, []).append((table, row))
+            row_ids.append(row_id)
+        self._tables[table] = (derived, row_ids)
+
+    def clear(self):
+        self._derived = {}
+        self._tables = {}
+
+    def unregister(self, table):
+        entry = self._tables.pop(table, None)
+        if entry is None:
+            return
+        for row_id in set(entry[1]):
+            refs = [ref for ref in self._derived.get(row_id, ()) if ref[0] is not table]
+            if refs:
+                self._derived[row_id] = refs
+            else:
+                self._derived.pop(row_id, None)
+
+    def source_of(self, table, row):
+        """(source sheet, current source row) of a derived row, or None"""
+        derived = getattr(table, "derived", None)
+        return derived.source_of(row) if derived is not None else None
+
+    def derived_of(self, sheet, row):
+        """[(derived table, row)] showing ``row`` of ``sheet``"""
+        return list(self._derived.get(sheet.row_ids.id_at(row), ()))
+
+    def affected(self, sheet, rows=None):
+        """{derived table: set of rows} showing ``rows`` of ``sheet`` (None: any of its rows)"""
+        affected = {}
+        if rows is None:
+            for table, (derived, _) in self._tables.items():
+                if any(source is sheet for source in derived.sources()):
+                    affected[table] = set(range(len(derived)))
+            return affected
+        for row in rows:
+            for table, derived_row in self._derived.get(sheet.row_ids.id_at(row), ()):
+                affected.setdefault(table, set()).add(derived_row)
+        return affected
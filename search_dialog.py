@@ -0,0 +1,63 @@
+import time
+from PySide6.QtWidgets import (QDialog, QVBoxLayout, QLineEdit, QLabel, QTableWidget, QTableWidgetItem,
+                               QAbstractItemView)
+from PySide6.QtCore import Qt
+
+
+class SearchDialog(QDialog):
+    """Navigate -> Find in Workbook: list matching cells of every sheet; click a result to jump to it."""
+
+    def __init__(self, parent=None, search_manager=None):
+        super().__init__(parent)
+        self.setWindowTitle("Find in Workbook")
+        self.search_manager = search_manager
+        self._results = []
+        layout = QVBoxLayout(self)
+
+        self.query_input = QLineEdit()
+        self.query_input.setPlaceholderText("摘要, 对方科目, 子科目, 发票号码...")
+        self.query_input.textChanged.connect(self.run_search)
+        self.query_input.returnPressed.connect(self._jump_to_first)
+        layout.addWidget(self.query_input)
+
+        self.status_label = QLabel("")
+        layout.addWidget(self.status_label)
+
+        self.results_table = QTableWidget(0, 4)
+        self.results_table.setHorizontalHeaderLabels(["工作表", "行", "列", "内容"])
+        self.results_table.verticalHeader().setVisible(False)
+        self.results_table.setEditTriggers(QAbstractItemView.NoEditTriggers)
+        self.results_table.setSelectionBehavior(QAbstractItemView.SelectRows)
+        self.results_table.horizontalHeader().setStretchLastSection(True)
+        self.results_table.cellClicked.connect(self._jump_to)
+        self.results_table.cellActivated.connect(self._jump_to)
+        layout.addWidget(self.results_table)
+        self.resize(560, 420)
+
+    def focus_query(self):
+        self.query_input.setFocus()
+        self.query_input.selectAll()
+
+    def run_search(self, text=None):
+        query = self.query_input.text().strip() if text is None else text.strip()
+        start = time.time()
+        self._results = self.search_manager.search(query) if query else []
+        elapsed = (time.time() - start) * 1000
+        self.results_table.setRowCount(len(self._results))
+        for i, (table, row, col, cell_text) in enumerate(self._results):
+            header_item = table.horizontalHeaderItem(col)
+            values = (table.name, str(row + 1), header_item.text() if header_item else str(col + 1), cell_text)
+            for j, value in enumerate(values):
+                item = QTableWidgetItem(value)
+                if j == 1:
+                    item.setTextAlignment(Qt.AlignRight | Qt.AlignVCenter)
+                self.results_table.setItem(i, j, item)
+        self.status_label.setText(f"{len(self._results)} results ({elapsed:.0f} ms)" if query else "")
+
+    def _jump_to(self, result_row, _col=0):
+        if 0 <= result_row < len(self._results):
+            table, row, col, _ = self._results[result_row]
+            self.search_manager.jump_to(table, row, col)
+
+    def _jump_to_first(self):
+        self._jump_to(0)
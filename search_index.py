@@ -0,0 +1,202 @@
+"""Inverted full-text index over sheet cells.
+
+Latin text is indexed by word; a query word matches indexed words by prefix
+(through a sorted vocabulary). Digit runs and CJK text, which has no word
+breaks, are indexed as overlapping n-grams (3 digits, 2 CJK characters, plus
+the shorter grams at the end of a run), so they are found at any position,
+e.g. part of an invoice number. Candidates from the posting sets are
+intersected and finally checked against the cell text, so the index is only
+ever a filter; a query too unselective for the index scans the cells in
+order and stops at the result limit.
+
+Cells are keyed by one integer packing (sheet id, row, column); sheet ids are
+assigned by the caller and stay the same when a sheet is renamed.
+"""
+import re
+from bisect import bisect_left
+from functools import lru_cache
+
+_RUN = re.compile(r"[a-z]+|[0-9]+|[\u3400-\u4dbf\u4e00-\u9fff\uf900-\ufaff]+")
+
+_COLUMN_BITS = 10
+_ROW_BITS = 24
+_COLUMN_MASK = (1 << _COLUMN_BITS) - 1
+_ROW_MASK = (1 << _ROW_BITS) - 1
+
+
+def cell_key(sheet_id, row, col):
+    return (((sheet_id << _ROW_BITS) | row) << _COLUMN_BITS) | col
+
+
+def split_key(key):
+    """cell_key() -> (sheet_id, row, col)"""
+    return key >> (_ROW_BITS + _COLUMN_BITS), (key >> _COLUMN_BITS) & _ROW_MASK, key & _COLUMN_MASK
+
+
+def _gram_size(run):
+    """0 for latin words, else the n-gram size of a digit or CJK run"""
+    if run[0] <= "9":
+        return 3
+    return 0 if run[0] < "\u3400" else 2
+
+
+@lru_cache(maxsize=65536)
+def terms(text):
+    """Index terms of ``text``; ledgers repeat the same account names, hence the cache"""
+    result = set()
+    for run in _RUN.findall(text.lower()):
+        n = _gram_size(run)
+        if n:
+            # Slices near the end of the run are the shorter tail grams
+            result.update(run[i:i + n] for i in range(len(run)))
+        else:
+            result.add(run)
+    return frozenset(result)
+
+
+def query_terms(text):
+    """Terms to look up for ``text``; each matches indexed terms by prefix"""
+    result = set()
+    for run in _RUN.findall(text.lower()):
+        n = _gram_size(run)
+        if n and len(run) > n:
+            result.update(run[i:i + n] for i in range(len(run) - n + 1))
+        else:
+            result.add(run)
+    return result
+
+
+# Prefix terms matching more indexed terms than this are left to the final text check
+_MAX_PREFIX_TERMS = 64
+
+
+class SearchIndex:
+    def __init__(self):
+        self._postings = {}  # term -> set of cell keys
+        self._cells = {}  # sheet id -> {row: {col: text}}
+        self._vocabulary = []  # sorted terms, for prefix lookups
+        self._vocabulary_stale = False
+
+    def __len__(self):
+        return sum(len(cols) for rows in self._cells.values() for cols in rows.values())
+
+    def set_row(self, sheet_id, row, values):
+        """Replace the indexed cells of a row; ``values`` is {col: text}"""
+        rows = self._cells.setdefault(sheet_id, {})
+        old = rows.get(row, {})
+        for col in set(old) | set(values):
+            old_text = old.get(col, "")
+            text = values.get(col, "")
+            if old_text == text:
+                continue
+            key = cell_key(sheet_id, row, col)
+            if old_text:
+                for term in terms(old_text):
+                    postings = self._postings.get(term)
+                    if postings is not None:
+                        postings.discard(key)
+                        if not postings:
+                            del self._postings[term]
+                            self._vocabulary_stale = True
+            if text:
+                postings_of = self._postings
+                for term in terms(text):
+                    postings = postings_of.get(term)
+                    if postings is None:
+                        postings = postings_of[term] = set()
+                        self._vocabulary_stale = True
+                    postings.add(key)
+        values = {col: text for col, text in values.items() if text}
+        if values:
+            rows[row] = values
+        else:
+            rows.pop(row, None)
+
+    def set_sheet(self, sheet_id, rows):
+        """Replace every row of a sheet; ``rows`` is {row: {col: text}}"""
+        for row in list(self._cells.get(sheet_id, {})):
+            if row not in rows:
+                self.set_row(sheet_id, row, {})
+        for row, values in rows.items():
+            self.set_row(sheet_id, row, values)
+
+    def remove_sheet(self, sheet_id):
+        self.set_sheet(sheet_id, {})
+        self._cells.pop(sheet_id, None)
+
+    def indexed_rows(self, sheet_id):
+        return set(self._cells.get(sheet_id, ()))
+
+    def text(self, sheet_id, row, col):
+        return self._cells.get(sheet_id, {}).get(row, {}).get(col, "")
+
+    def _matching(self, term):
+        """Posting sets of the indexed terms starting with ``term``, or None when there are too many"""
+        if self._vocabulary_stale:
+            self._vocabulary = sorted(self._postings)
+            self._vocabulary_stale = False
+        sets = []
+        i = bisect_left(self._vocabulary, term)
+        while i < len(self._vocabulary) and self._vocabulary[i].startswith(term):
+            if len(sets) == _MAX_PREFIX_TERMS:
+                return None
+            sets.append(self._postings[self._vocabulary[i]])
+            i += 1
+        return sets
+
+    def _scan(self, words, limit, candidates=None):
+        """Walk the cells in order until ``limit`` matches; cheaper than sorting a huge candidate set"""
+        results = []
+        for sheet_id in sorted(self._cells):
+            rows = self._cells[sheet_id]
+            for row in sorted(rows):
+                for col, text in sorted(rows[row].items()):
+                    if candidates is not None and cell_key(sheet_id, row, col) not in candidates:
+                        continue
+                    lowered = text.lower()
+                    if all(word in lowered for word in words):
+                        results.append((sheet_id, row, col, text))
+                        if len(results) >= limit:
+                            return results
+        return results
+
+    def search(self, query, limit=1000):
+        """Cells whose text contains every whitespace-separated word of ``query`` (case-insensitive).
+
+        Returns up to ``limit`` (sheet_id, row, col, text), ordered by sheet id, row and column.
+        """
+        words = query.lower().split()
+        term_sets = []
+        for word in words:
+            for term in query_terms(word):
+                sets = self._matching(term)
+                if sets is None:
+                    continue
+                if not sets:
+                    return []
+                term_sets.append(sets)
+        if not term_sets:
+            return self._scan(words, limit) if words else []
+        # Most selective term first: every later step only walks the shrinking candidate set
+        term_sets.sort(key=lambda sets: sum(len(s) for s in sets))
+        first = term_sets[0]
+        candidates = first[0] if len(first) == 1 else set().union(*first)
+        for sets in term_sets[1:]:
+            if len(sets) == 1:
+                candidates = candidates & sets[0]
+            else:
+                candidates = {key for key in candidates if any(key in s for s in sets)}
+            if not candidates:
+                return []
+        if len(candidates) > 50 * limit:
+            return self._scan(words, limit, candidates)
+        results = []
+        for key in sorted(candidates):
+            sheet_id, row, col = split_key(key)
+            text = self.text(sheet_id, row, col)
+            lowered = text.lower()
+            if all(word in lowered for word in words):
+                results.append((sheet_id, row, col, text))
+                if len(results) >= limit:
+                    break
+        return results
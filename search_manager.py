@@ -0,0 +1,134 @@
+import logging
+import time
+from PySide6.QtCore import QTimer
+from search_index import SearchIndex
+
+logger = logging.getLogger(__name__)
+
+# Text columns that are searched; amounts and dates are left out
+SEARCH_COLUMNS = ("摘要", "对方科目", "子科目", "发票号码", "借方科目", "贷方科目", "备注")
+
+
+class SearchManager:
+    """Keeps the workbook SearchIndex current and answers Ctrl+F queries.
+
+    Edited rows are collected through ``on_rows_changed`` and indexed in
+    chunks on the following event-loop passes; a search first indexes whatever
+    is still pending. Sheets get a stable id when first seen, so renaming
+    a sheet costs nothing and deleted sheets are dropped on the next sync.
+    """
+
+    # Rows indexed per event-loop pass, so a large import does not freeze the window
+    SYNC_CHUNK = 2000
+
+    def __init__(self, main_window):
+        self.main_window = main_window
+        self.index = SearchIndex()
+        self._ids = {}  # table -> sheet id
+        self._tables = {}  # sheet id -> table
+        self._next_id = 1
+        self._pending = {}  # table -> set of rows, or None to re-index the whole sheet
+        self._timer = QTimer()
+        self._timer.setSingleShot(True)
+        self._timer.setInterval(0)
+        self._timer.timeout.connect(lambda: self.sync(self.SYNC_CHUNK))
+
+    @staticmethod
+    def is_indexed(table):
+        return getattr(table, "type", None) not in (None, "statement")
+
+    def on_rows_changed(self, table, rows=None):
+        """Sheet callback: ``rows`` is an iterable of row indexes, or None for the whole sheet"""
+        if not self.is_indexed(table):
+            return
+        if rows is None:
+            self._pending[table] = None
+        else:
+            pending = self._pending.setdefault(table, set())
+            if pending is not None:
+                pending.update(rows)
+        self._timer.start()
+
+    @staticmethod
+    def _columns(table):
+        columns = []
+        for col in range(table.columnCount()):
+            header_item = table.horizontalHeaderItem(col)
+            if header_item is not None and header_item.text() in SEARCH_COLUMNS:
+                columns.append(col)
+        return columns
+
+    @staticmethod
+    def _row_values(table, row, columns):
+        values = {}
+        for col in columns:
+            text = table.cell_text(row, col)
+            if text:
+                values[col] = text
+        return values
+
+    def sync(self, chunk=None):
+        """Drop deleted sheets, register new ones and index up to ``chunk`` pending rows (default: all)"""
+        self._timer.stop()
+        sheets = [s for s in self.main_window.sheets if self.is_indexed(s)]
+        current = set(sheets)
+        for table in [t for t in self._ids if t not in current]:
+            sheet_id = self._ids.pop(table)
+            del self._tables[sheet_id]
+            self.index.remove_sheet(sheet_id)
+            self._pending.pop(table, None)
+        for table in sheets:
+            if table not in self._ids:
+                self._ids[table] = self._next_id
+                self._tables[self._next_id] = table
+                self._next_id += 1
+                self._pending[table] = None
+        for table in list(self._pending):
+            sheet_id = self._ids.get(table)
+            rows = self._pending.pop(table)
+            if sheet_id is None:
+                continue
+            if rows is None:
+                # Whole sheet: every current row, plus indexed rows that no longer exist
+                rows = set(range(table.rowCount())) | self.index.indexed_rows(sheet_id)
+            rows = sorted(rows)
+            if chunk is not None and len(rows) > chunk:
+                rows, rest = rows[:chunk], rows[chunk:]
+                self._pending[table] = set(rest)
+            columns = self._columns(table)
+            row_count = table.rowCount()
+            for row in rows:
+                values = self._row_values(table, row, columns) if row < row_count else {}
+                self.index.set_row(sheet_id, row, values)
+            if chunk is not None:
+                chunk -= len(rows)
+                if chunk <= 0:
+                    break
+        if self._pending:
+            self._timer.start()
+
+    def search(self, query, limit=1000):
+        """[(table, row, col, text)] of the cells matching ``query``, in tab order"""
+        self.sync()
+        start = time.time()
+        results = []
+        for sheet_id, row, col, text in self.index.search(query, limit):
+            table = self._tables[sheet_id]
+            if table.cell_text(row, col) != text:
+                # Changed without a notification (e.g. a bulk rewrite): re-index on the next pass
+                self.on_rows_changed(table, (row,))
+                continue
+            results.append((table, row, col, text))
+        order = {table: i for i, table in enumerate(self.main_window.sheets)}
+        results.sort(key=lambda r: (order.get(r[0], len(order)), r[1], r[2]))
+        logger.debug(f"Search {query!r}: {len(results)} results in {(time.time() - start) * 1000:.1f}ms")
+        return results
+
+    def jump_to(self, table, row, col):
+        """Show ``table`` and select the cell"""
+        self.main_window.open_sheet(table)
+        table.setCurrentCell(row, col)
+        item = table.item(row, col)
+        if item is not None:
+            table.scrollToItem(item)
+        table.setFocus()
@@ -0,0 +1,83 @@
+"""Keep the items of sheets not viewed recently within a memory budget.
+
+The items of each bank and non-bank sheet are estimated from its cell index.
+When the hydrated sheets together go over the budget, the least recently
+viewed ones are dehydrated (ExcelTable.dehydrate: their items packed into one
+compressed blob) until they fit; the current sheet never is. A dehydrated
+sheet comes back, with its scroll position and selection, when it is shown or
+a computation reads its cells.
+"""
+import logging
+from PySide6.QtCore import QTimer
+from memory_report import ITEM_BYTES, TEXT_BYTES_PER_CHAR, TEXT_OVERHEAD
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BUDGET_MB = 200
+AVERAGE_TEXT_CHARS = 8
+CHECK_INTERVAL_MS = 10_000  # sheets hydrated by computations are trimmed on this timer
+DEHYDRATED_TYPES = ("bank", "non_bank")
+
+
+def item_bytes(sheet):
+    """Estimated bytes of a sheet's items, from its populated cell count"""
+    return len(sheet.cell_index) * (ITEM_BYTES + TEXT_OVERHEAD + AVERAGE_TEXT_CHARS * TEXT_BYTES_PER_CHAR)
+
+
+class SheetCache:
+    def __init__(self, main_window, budget_mb=DEFAULT_BUDGET_MB):
+        self.main_window = main_window
+        self.budget_mb = budget_mb  # 0 or None: never dehydrate (main.py --sheet-memory)
+        self._clock = 0
+        self._used = {}  # sheet -> clock of its last view
+        self._sizes = {}  # sheet -> (revision, estimated item bytes)
+        self._timer = QTimer()
+        self._timer.setSingleShot(True)
+        self._timer.setInterval(0)
+        self._timer.timeout.connect(self.enforce)
+        self._check_timer = QTimer()
+        self._check_timer.setInterval(CHECK_INTERVAL_MS)
+        self._check_timer.timeout.connect(self.enforce)
+        self._check_timer.start()
+
+    def touch(self, sheet):
+        """``sheet`` was viewed; check the budget once control returns to the event loop"""
+        self._clock += 1
+        self._used[sheet] = self._clock
+        self._timer.start()
+
+    def _size(self, sheet):
+        cached = self._sizes.get(sheet)
+        if cached is None or cached[0] != sheet.revision:
+            cached = self._sizes[sheet] = (sheet.revision, item_bytes(sheet))
+        return cached[1]
+
+    def enforce(self):
+        """Dehydrate the least recently viewed sheets until the hydrated ones fit the budget.
+
+        Returns the sheets dehydrated.
+        """
+        self._timer.stop()
+        sheets = self.main_window.sheets
+        live = set(sheets)
+        for table in [t for t in self._used if t not in live]:
+            del self._used[table]
+        for table in [t for t in self._sizes if t not in live]:
+            del self._sizes[table]
+        if not self.budget_mb:
+            return []
+        hydrated = [s for s in sheets if s.type in DEHYDRATED_TYPES and not s.dehydrated]
+        total = sum(self._size(s) for s in hydrated)
+        budget = self.budget_mb * 1e6
+        current = self.main_window.tabs.currentWidget()
+        dehydrated = []
+        for sheet in sorted(hydrated, key=lambda s: self._used.get(s, 0)):
+            if total <= budget:
+                break
+            if sheet is not current and sheet.dehydrate():
+                total -= self._size(sheet)
+                dehydrated.append(sheet)
+        if dehydrated:
+            logger.info(f"Dehydrated {len(dehydrated)} sheets ({', '.join(s.name for s in dehydrated)}); "
+                        f"about {total / 1e6:.1f} MB of items left in {self.budget_mb} MB")
+        return dehydrated
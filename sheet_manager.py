@@ -2,6 +2,8 @@ from PySide6.QtWidgets import QDoubleSpinBox, QTableWidgetItem, QMenu
 from PySide6.QtCore import Qt, QDate
 from PySide6.QtGui import QColor
 from excel_table import ExcelTable
+from currencies import SIDES, column_currencies, insert_position
+from utils import BANK_COLUMNS, non_bank_columns, payable_detail_columns
 from datetime import datetime
 import logging
 
@@ -11,59 +13,100 @@ class SheetManager:
     def __init__(self, main_window):
         self.main_window = main_window
 
-    def create_bank_sheet(self, name, currency=None):
-        """Create a bank sheet with exchange rate control"""
-        columns = ["序号", "日期", "对方科目", "子科目", "借方", "贷方", "余额", "发票号码", "摘要"]
-        table = ExcelTable(auto_save_callback=self.main_window.auto_save, name=name, type="bank")
+    def _new_table(self, sheet_type, name, columns):
+        """An ExcelTable with ``columns`` wired to the workbook: auto-save, row changes, rates, period, undo, formulas"""
+        mw = self.main_window
+        table = ExcelTable(sheet_type, auto_save_callback=mw.auto_save, name=name,
+                           rows_changed_callback=mw.on_rows_changed)
+        # Rates live in the workbook registry, shared by all sheets of a currency
+        table.rate_registry = mw.exchange_rates
+        table.period_provider = mw.period_range
+        table.undo_stack = mw.undo_stack
+        table.formula_manager = mw.formula_manager
         table.setColumnCount(len(columns))
         table.setHorizontalHeaderLabels(columns)
+        return table
+
+    def _add_sheet(self, table, open_tab=True):
+        """List ``table`` among the workbook's sheets, and open its tab unless ``open_tab`` is False"""
+        if open_tab:
+            self.main_window.tabs.addTab(table, table.name)
+        self.main_window.sheets.append(table)
+
+    def create_bank_sheet(self, name, currency=None):
+        """Create a bank sheet with exchange rate control"""
+        table = self._new_table("bank", name, BANK_COLUMNS)
 
         # Add exchange rate control
         rate_input = QDoubleSpinBox()
         # Use currency argument if provided, else try to parse from name
         currency_str = currency if currency else (name.split("-")[1] if "-" in name else "")
         rate_input.setPrefix(f"{currency_str}:HKD = 1:")
-        rate_input.setValue(1.0)
-        rate_input.setDecimals(2)
+        rate_input.setDecimals(4)
+        rate_input.setMaximum(100000)
+        rate_input.setValue(table.exchange_rate)
         rate_input.valueChanged.connect(lambda v, t=table: t.set_exchange_rate(v))
         rate_input.setVisible(False)  # Start hidden
         self.main_window.layout.addWidget(rate_input)
         table.exchange_rate_input = rate_input
-        table.set_exchange_rate(1.0)
 
-        self.main_window.tabs.addTab(table, name)
-        self.main_window.sheets.append(table)
+        self._add_sheet(table)
+        self.main_window.currencies.add(currency_str)
         return table
 
-    def create_non_bank_sheet(self, name="非银行交易"):
-        """Create a regular sheet"""
-        columns = ["序号", "日期", "借方科目", "子科目", "贷方科目", "子科目", "借方(USD)", "借方(EUR)", "借方(JPY)", "借方(GBP)", "借方(CHF)", "借方(CAD)", "借方(AUD)", "借方(CNY)", "借方(HKD)", "借方(NZD)", "贷方(USD)", "贷方(EUR)", "贷方(JPY)", "贷方(GBP)", "贷方(CHF)", "贷方(CAD)", "贷方(AUD)", "贷方(CNY)", "贷方(HKD)", "贷方(NZD)", "备注", "来源"]
-        table = ExcelTable(auto_save_callback=self.main_window.auto_save, name=name, type="non_bank")
-        table.setColumnCount(len(columns))
-        table.setHorizontalHeaderLabels(columns)
-
-        self.main_window.tabs.addTab(table, name)
-        self.main_window.sheets.append(table)
+    def create_non_bank_sheet(self, name="非银行交易", columns=None):
+        """Create a regular sheet with currency columns for the workbook's currencies (or ``columns``)"""
+        columns = list(columns or non_bank_columns(self.main_window.currencies.used()))
+        table = self._new_table("non_bank", name, columns)
+        self._add_sheet(table)
         return table
     
-    def create_payable_detail_sheet(self, sheet_name):
-        """Create a payable sheet with exactly the same header structure as the sales sheet"""
-        # Use the same main and sub headers, merged ranges, and formatting as sales sheet
-        columns = [
-            "序号", "日期", "对方科目", "子科目", "发票号码",
-            "借方(USD)", "借方(EUR)", "借方(JPY)", "借方(GBP)", "借方(CHF)", "借方(CAD)", "借方(AUD)", "借方(CNY)", "借方(HKD)", "借方(NZD)",
-            "贷方(USD)", "贷方(EUR)", "贷方(JPY)", "贷方(GBP)", "贷方(CHF)", "贷方(CAD)", "贷方(AUD)", "贷方(CNY)", "贷方(HKD)", "贷方(NZD)",
-            "余额", "摘要", "来源"
-        ]
-        table = ExcelTable("payable_detail", auto_save_callback=self.main_window.auto_save, name=sheet_name)
+    def create_payable_detail_sheet(self, sheet_name, open_tab=True):
+        """Create a payable sheet with exactly the same header structure as the sales sheet
+
+        With ``open_tab=False`` the sheet is only listed in the sheet navigator until it is opened.
+        """
+        # Currency columns only for the currencies the workbook uses; add_currency_columns adds the others
+        columns = list(payable_detail_columns(self.main_window.currencies.used()))
+        table = self._new_table("payable_detail", sheet_name, columns)
+        table.setRowCount(300)
+        self._add_sheet(table, open_tab)
+        return table
+
+    def add_currency_columns(self, table, currency):
+        """Insert the 借方/贷方 columns of ``currency`` into a non-bank or payable detail sheet.
+
+        Returns the inserted columns, in insertion order (empty when the sheet has them already).
+        """
+        labels = [table.horizontalHeaderItem(c).text() if table.horizontalHeaderItem(c) else ""
+                  for c in range(table.columnCount())]
+        if currency in column_currencies(labels):
+            return []
+        inserted = []
+        for side in SIDES:
+            label = f"{side}({currency})"
+            col = insert_position(labels, side, currency)
+            table.insertColumn(col)
+            table.set_column_label(col, label)
+            labels.insert(col, label)
+            inserted.append(col)
+        return inserted
+
+    def create_statement_sheet(self, sheet_name):
+        """Create a read-only 利润表 / 资产负债表 sheet filled by the StatementManager"""
+        columns = ["项目", "金额(HKD)"]
+        table = ExcelTable("statement", auto_save_callback=self.main_window.auto_save, name=sheet_name)
         table.setColumnCount(len(columns))
         table.setHorizontalHeaderLabels(columns)
-        table.setRowCount(300)
-        self.main_window.tabs.addTab(table, sheet_name)
-        self.main_window.sheets.append(table)
+        table.setRowCount(0)
+        table.setColumnWidth(0, 220)
+        self._add_sheet(table)
         return table
 
     def reorder_sheets(self, from_index, to_index):
-        """Handle tab reordering to keep sheets list in sync"""
-        self.main_window.sheets.insert(to_index, self.main_window.sheets.pop(from_index))
+        """Handle tab reordering to keep sheets list in sync: open sheets in tab order, then the others"""
+        tabs = self.main_window.tabs
+        sheets = self.main_window.sheets
+        open_sheets = [tabs.widget(i) for i in range(tabs.count()) if tabs.widget(i) in sheets]
+        sheets[:] = open_sheets + [sheet for sheet in sheets if sheet not in open_sheets]
         self.main_window.auto_save()
\ No newline at end of file
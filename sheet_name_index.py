@@ -0,0 +1,98 @@
+"""Incremental fuzzy search over sheet names, for the sheet navigator.
+
+Every name is indexed under each of its 1-, 2- and 3-character substrings
+(lowercased), so a query finds the names containing it from one posting list
+(up to 3 characters) or the intersection of its trigrams' lists, without
+scanning every name. While the query grows, later keystrokes only filter the
+previous matches. When no name contains the query, names holding its
+characters in order (e.g. "hsusd" for "HSBC-USD") are returned instead.
+"""
+
+MAX_GRAM = 3
+
+
+def _grams(text):
+    for size in range(1, MAX_GRAM + 1):
+        for start in range(len(text) - size + 1):
+            yield text[start:start + size]
+
+
+def _subsequence_span(query, text):
+    """Length of the leftmost span of ``text`` holding ``query``'s characters in order, or None"""
+    pos = -1
+    first = None
+    for char in query:
+        pos = text.find(char, pos + 1)
+        if pos < 0:
+            return None
+        if first is None:
+            first = pos
+    return pos - first + 1
+
+
+class SheetNameIndex:
+    def __init__(self, names=()):
+        self.names = []
+        self._lowered = []
+        self._postings = {}  # gram -> set of name indexes
+        self._last = None  # (query, substring matches, fuzzy) of the previous search
+        for name in names:
+            self.add(name)
+
+    def __len__(self):
+        return len(self.names)
+
+    def add(self, name):
+        index = len(self.names)
+        lowered = name.lower()
+        self.names.append(name)
+        self._lowered.append(lowered)
+        for gram in set(_grams(lowered)):
+            self._postings.setdefault(gram, set()).add(index)
+        self._last = None
+        return index
+
+    def _containing(self, query):
+        if len(query) <= MAX_GRAM:
+            return set(self._postings.get(query, ()))
+        candidates = None
+        for start in range(len(query) - MAX_GRAM + 1):
+            posting = self._postings.get(query[start:start + MAX_GRAM])
+            if not posting:
+                return set()
+            candidates = set(posting) if candidates is None else candidates & posting
+        lowered = self._lowered
+        return {i for i in candidates if query in lowered[i]}
+
+    def search(self, query, limit=None):
+        """Indexes of the names matching ``query``, best first.
+
+        Names starting with the query come first, then names containing it
+        (earlier matches first); without any, names holding the query's
+        characters in order, tightest first.
+        """
+        query = query.strip().lower()
+        if not query:
+            return list(range(len(self.names)))[:limit]
+        lowered = self._lowered
+        last = self._last
+        extends = last is not None and query.startswith(last[0])
+        if extends and last[2]:
+            matches = set()  # nothing contained the shorter query either
+        elif extends:
+            # Typing on: only the previous matches can still contain the query
+            matches = {i for i in last[1] if query in lowered[i]}
+        else:
+            matches = self._containing(query)
+        if matches:
+            self._last = (query, matches, False)
+            ranked = sorted(matches, key=lambda i: (lowered[i].find(query), len(lowered[i]), lowered[i]))
+            return ranked[:limit]
+        candidates = last[1] if extends and last[2] else range(len(self.names))
+        spans = {}
+        for i in candidates:
+            span = _subsequence_span(query, lowered[i])
+            if span is not None:
+                spans[i] = span
+        self._last = (query, set(spans), True)
+        return sorted(spans, key=lambda i: (spans[i], len(lowered[i]), lowered[i]))[:limit]
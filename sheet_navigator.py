@@ -0,0 +1,127 @@
+from PySide6.QtWidgets import QDockWidget, QWidget, QVBoxLayout, QLineEdit, QTreeWidget, QTreeWidgetItem
+from PySide6.QtCore import Qt, QTimer
+from sheet_name_index import SheetNameIndex
+
+TYPE_LABELS = (
+    ("bank", "银行"),
+    ("non_bank", "非银行"),
+    ("payable_detail", "明细"),
+    ("aggregate", "汇总"),
+    ("statement", "报表"),
+)
+MAX_RESULTS = 200
+
+
+class SheetNavigator(QDockWidget):
+    """Navigate -> Sheet Navigator: every sheet in a tree by type and account, with fuzzy search by name.
+
+    Generated sheets need not be open as tabs; activating one opens it.
+    """
+
+    def __init__(self, main_window):
+        super().__init__("Sheets", main_window)
+        self.main_window = main_window
+        self.setObjectName("SheetNavigator")
+        self._sheets = []
+        self._signature = None
+        self.index = SheetNameIndex()
+        self._timer = QTimer(self)
+        self._timer.setSingleShot(True)
+        self._timer.setInterval(0)
+        self._timer.timeout.connect(self.refresh)
+
+        panel = QWidget()
+        layout = QVBoxLayout(panel)
+        layout.setContentsMargins(4, 4, 4, 4)
+        self.query_input = QLineEdit()
+        self.query_input.setPlaceholderText("Sheet name...")
+        self.query_input.setClearButtonEnabled(True)
+        self.query_input.textChanged.connect(self._show_matches)
+        self.query_input.returnPressed.connect(self._open_first)
+        layout.addWidget(self.query_input)
+        self.tree = QTreeWidget()
+        self.tree.setHeaderHidden(True)
+        self.tree.itemActivated.connect(self._open_item)
+        self.tree.itemClicked.connect(self._open_item)
+        layout.addWidget(self.tree)
+        self.setWidget(panel)
+
+    def schedule_refresh(self):
+        """Refresh once control returns to the event loop, if the panel is shown"""
+        if self.isVisible():
+            self._timer.start()
+
+    def showEvent(self, event):
+        super().showEvent(event)
+        self.refresh()
+
+    def focus_query(self):
+        self.query_input.setFocus()
+        self.query_input.selectAll()
+
+    def refresh(self):
+        """Re-read the workbook's sheets; nothing is rebuilt when they have not changed"""
+        self._timer.stop()
+        sheets = list(self.main_window.sheets)
+        signature = [(id(sheet), sheet.name, sheet.type) for sheet in sheets]
+        if signature == self._signature:
+            return
+        self._signature = signature
+        self._sheets = sheets
+        self.index = SheetNameIndex(sheet.name for sheet in sheets)
+        self._show_matches(self.query_input.text())
+
+    def _item(self, parent, sheet_index):
+        sheet = self._sheets[sheet_index]
+        item = QTreeWidgetItem(parent, [sheet.name])
+        item.setData(0, Qt.UserRole, sheet_index)
+        item.setToolTip(0, sheet.name)
+        return item
+
+    def _show_matches(self, text=""):
+        self.tree.setUpdatesEnabled(False)
+        self.tree.clear()
+        if text.strip():
+            for sheet_index in self.index.search(text, MAX_RESULTS):
+                self._item(self.tree, sheet_index)
+            if self.tree.topLevelItemCount():
+                self.tree.setCurrentItem(self.tree.topLevelItem(0))
+        else:
+            self._build_tree()
+        self.tree.setUpdatesEnabled(True)
+
+    def _build_tree(self):
+        groups = {}
+        for sheet_type, label in TYPE_LABELS:
+            groups[sheet_type] = QTreeWidgetItem(self.tree, [label])
+        accounts = {}
+        counts = {}
+        for sheet_index, sheet in enumerate(self._sheets):
+            group = groups.get(sheet.type)
+            if group is None:
+                group = groups[sheet.type] = QTreeWidgetItem(self.tree, [sheet.type])
+            counts[sheet.type] = counts.get(sheet.type, 0) + 1
+            if sheet.type == "payable_detail" and "-" in sheet.name:
+                # 对方科目-子科目 sheets grouped under their account
+                account = sheet.name.split("-", 1)[0]
+                parent = accounts.get(account)
+                if parent is None:
+                    parent = accounts[account] = QTreeWidgetItem(group, [account])
+                group = parent
+            self._item(group, sheet_index)
+        for sheet_type, group in groups.items():
+            if sheet_type not in counts:
+                self.tree.takeTopLevelItem(self.tree.indexOfTopLevelItem(group))
+            else:
+                group.setText(0, f"{group.text(0)} ({counts[sheet_type]})")
+                group.setExpanded(sheet_type != "payable_detail")
+
+    def _open_item(self, item, _column=0):
+        sheet_index = item.data(0, Qt.UserRole)
+        if sheet_index is not None and sheet_index < len(self._sheets):
+            self.main_window.open_sheet(self._sheets[sheet_index])
+
+    def _open_first(self):
+        item = self.tree.currentItem() or self.tree.topLevelItem(0)
+        if item is not None:
+            self._open_item(item)
@@ -0,0 +1,174 @@
+"""Non-destructive sort and filter views over a sheet's rows.
+
+A view never touches the cells: it computes a permutation of row indexes
+(the display order of the rows that pass the filters) that the table applies
+to its vertical header. The running 余额 and every other cell keep their
+logical row, so balances are unaffected by how the rows are shown.
+
+Filters are served from per-column value indexes ({value: rows}); the sort
+order is a sorted list of (key, row), so an edited row is moved with two
+binary searches instead of re-sorting the sheet.
+"""
+from bisect import bisect_left, insort
+
+
+class ColumnValueIndex:
+    """{cell text: set of rows} for one column, plus the reverse row -> text map"""
+
+    def __init__(self, values=()):
+        self._rows = {}
+        self._values = {}
+        for row, value in values:
+            self.set_row(row, value)
+
+    def set_row(self, row, value):
+        old = self._values.pop(row, None)
+        if old is not None:
+            rows = self._rows[old]
+            rows.discard(row)
+            if not rows:
+                del self._rows[old]
+        if value:
+            self._values[row] = value
+            self._rows.setdefault(value, set()).add(row)
+
+    def value_of(self, row):
+        return self._values.get(row, "")
+
+    def rows_with(self, values):
+        """Rows whose text is one of ``values``"""
+        rows = set()
+        for value in values:
+            rows |= self._rows.get(value, set())
+        return rows
+
+    def values(self):
+        return sorted(self._rows)
+
+
+class SheetView:
+    """Display order of a sheet: rows passing every filter, optionally sorted by one column.
+
+    ``sort_key(text)`` turns cell text into a comparable key; cells whose text
+    is empty always go last, in row order, whatever the direction.
+    """
+
+    def __init__(self, row_count, column_values, sort_key=None):
+        # column_values(col) -> iterable of (row, text), used to build value indexes on demand
+        self._column_values = column_values
+        self.sort_key = sort_key or (lambda text: text)
+        self.row_count = row_count
+        self.sort_column = None
+        self.descending = False
+        self.filters = {}  # col -> set of allowed texts
+        self._indexes = {}  # col -> ColumnValueIndex
+        self._entries = []  # sorted [(key, row)] of visible rows with a sort key
+        self._tail = []  # sorted rows shown after the entries: unsorted or empty sort cell
+        self._visible = set()
+        self.rebuild()
+
+    @property
+    def active(self):
+        return self.sort_column is not None or bool(self.filters)
+
+    def index(self, col):
+        if col not in self._indexes:
+            self._indexes[col] = ColumnValueIndex(self._column_values(col))
+        return self._indexes[col]
+
+    def set_sort(self, col, descending=False):
+        self.sort_column = col
+        self.descending = descending
+        self.rebuild()
+
+    def set_filter(self, col, values):
+        """Show only rows whose ``col`` text is in ``values``; None removes the filter"""
+        if values is None:
+            self.filters.pop(col, None)
+        else:
+            self.filters[col] = set(values)
+        self.rebuild()
+
+    def _passes(self, row):
+        return all(self.index(col).value_of(row) in allowed for col, allowed in self.filters.items())
+
+    def _key(self, row):
+        """Sort key of a row, or None when it goes to the tail"""
+        if self.sort_column is None:
+            return None
+        text = self.index(self.sort_column).value_of(row)
+        return self.sort_key(text) if text else None
+
+    def rebuild(self, row_count=None):
+        if row_count is not None:
+            self.row_count = row_count
+            self._indexes = {}
+        if self.filters:
+            visible = None
+            for col, allowed in self.filters.items():
+                rows = self.index(col).rows_with(allowed)
+                visible = rows if visible is None else visible & rows
+            self._visible = {row for row in visible if row < self.row_count}
+        else:
+            self._visible = set(range(self.row_count))
+        self._entries = []
+        self._tail = []
+        for row in sorted(self._visible):
+            key = self._key(row)
+            if key is None:
+                self._tail.append(row)
+            else:
+                self._entries.append((key, row))
+        self._entries.sort()
+
+    def update_row(self, row, col, text):
+        """A cell changed: keep indexes, visibility and sort position current"""
+        if col not in self._indexes:
+            return  # built from the current cells when first needed
+        if col == self.sort_column or col in self.filters:
+            self._remove(row)
+            self._indexes[col].set_row(row, text)
+            if self._passes(row):
+                self._add(row)
+        else:
+            self._indexes[col].set_row(row, text)
+
+    def _remove(self, row):
+        if row not in self._visible:
+            return
+        self._visible.discard(row)
+        key = self._key(row)
+        if key is None:
+            i = bisect_left(self._tail, row)
+            if i < len(self._tail) and self._tail[i] == row:
+                del self._tail[i]
+        else:
+            i = bisect_left(self._entries, (key, row))
+            if i < len(self._entries) and self._entries[i] == (key, row):
+                del self._entries[i]
+
+    def _add(self, row):
+        self._visible.add(row)
+        key = self._key(row)
+        if key is None:
+            insort(self._tail, row)
+        else:
+            insort(self._entries, (key, row))
+
+    def is_visible(self, row):
+        return row in self._visible
+
+    def order(self):
+        """Visible rows in display order"""
+        rows = [row for _, row in self._entries]
+        if self.descending:
+            rows.reverse()
+        return rows + self._tail
+
+    def position(self, row):
+        """Display position of a visible row"""
+        key = self._key(row)
+        if key is None:
+            return len(self._entries) + bisect_left(self._tail, row)
+        i = bisect_left(self._entries, (key, row))
+        return len(self._entries) - 1 - i if self.descending else i
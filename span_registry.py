@@ -0,0 +1,124 @@
+"""Merged-cell spans of a sheet, kept sparse and keyed by their top-left cell.
+
+Spans never overlap. Anchors are kept sorted, so the spans anchored in a
+band of rows are found by binary search; the span covering a cell is found
+by searching the anchors at most ``max height`` rows above it. Row and
+column insertion/removal shift and resize spans the way QTableView does, so
+the registry stays a mirror of the view's spans.
+"""
+from bisect import bisect_left, bisect_right, insort
+
+
+class SpanRegistry:
+    def __init__(self, spans=()):
+        self._spans = {}  # (row, col) -> (rows, cols)
+        self._anchors = []  # sorted (row, col)
+        self._max_rows = 1
+        for row, col, rows, cols in spans:
+            self.set(row, col, rows, cols)
+
+    def __len__(self):
+        return len(self._spans)
+
+    def __iter__(self):
+        """(row, col, rows, cols) in row-major order"""
+        for row, col in self._anchors:
+            yield (row, col) + self._spans[(row, col)]
+
+    def to_list(self):
+        return list(self)
+
+    def anchored(self, row, col):
+        """(rows, cols) of the span anchored at (row, col), or None"""
+        return self._spans.get((row, col))
+
+    def span_at(self, row, col):
+        """(top, left, rows, cols) of the span covering (row, col), or None"""
+        lo = bisect_left(self._anchors, (row - self._max_rows + 1, -1))
+        hi = bisect_right(self._anchors, (row, col))
+        for i in range(hi - 1, lo - 1, -1):
+            top, left = self._anchors[i]
+            rows, cols = self._spans[(top, left)]
+            if top + rows > row and left <= col < left + cols:
+                return top, left, rows, cols
+        return None
+
+    def in_rows(self, top, bottom):
+        """Spans anchored in rows top..bottom, as (row, col, rows, cols)"""
+        lo = bisect_left(self._anchors, (top, -1))
+        hi = bisect_left(self._anchors, (bottom + 1, -1))
+        return [anchor + self._spans[anchor] for anchor in self._anchors[lo:hi]]
+
+    def in_region(self, top, left, bottom, right):
+        """Spans anchored in a region"""
+        return [span for span in self.in_rows(top, bottom) if left <= span[1] <= right]
+
+    def overlapping(self, top, left, rows, cols):
+        """Spans sharing at least one cell with a rectangle"""
+        bottom, right = top + rows - 1, left + cols - 1
+        return [span for span in self.in_rows(top - self._max_rows + 1, bottom)
+                if span[0] + span[2] > top and span[1] <= right and span[1] + span[3] > left]
+
+    def set(self, row, col, rows, cols):
+        """Merge a rectangle (1x1 unmerges); returns the other spans it replaced, as anchors"""
+        replaced = [(r, c) for r, c, _, _ in self.overlapping(row, col, rows, cols) if (r, c) != (row, col)]
+        for anchor in replaced:
+            self._remove(anchor)
+        self._remove((row, col))
+        if rows > 1 or cols > 1:
+            self._spans[(row, col)] = (rows, cols)
+            insort(self._anchors, (row, col))
+            self._max_rows = max(self._max_rows, rows)
+        return replaced
+
+    def _remove(self, anchor):
+        if self._spans.pop(anchor, None) is not None:
+            del self._anchors[bisect_left(self._anchors, anchor)]
+
+    def clear(self):
+        self._spans = {}
+        self._anchors = []
+        self._max_rows = 1
+
+    def _replace(self, spans):
+        spans = list(spans)  # may be a generator over the current spans
+        self.clear()
+        for row, col, rows, cols in spans:
+            if rows > 1 or cols > 1:
+                self._spans[(row, col)] = (rows, cols)
+                self._max_rows = max(self._max_rows, rows)
+        self._anchors = sorted(self._spans)
+
+    def insert_rows(self, row, count=1):
+        """Rows inserted before ``row``: later spans move down, spans across it grow"""
+        self._replace(
+            (r + count, c, rows, cols) if r >= row else (r, c, rows + count if r + rows > row else rows, cols)
+            for r, c, rows, cols in self
+        )
+
+    def remove_rows(self, row, count=1):
+        """Rows row..row+count-1 removed: later spans move up, spans across them shrink"""
+        end = row + count
+        spans = []
+        for r, c, rows, cols in self:
+            top, bottom = r, r + rows  # rows [top, bottom)
+            kept = max(0, min(bottom, row) - top) + max(0, bottom - max(top, end))
+            if kept:
+                spans.append((min(top, row) if top < end else top - count, c, kept, cols))
+        self._replace(spans)
+
+    def insert_columns(self, col, count=1):
+        self._replace(
+            (r, c + count, rows, cols) if c >= col else (r, c, rows, cols + count if c + cols > col else cols)
+            for r, c, rows, cols in self
+        )
+
+    def remove_columns(self, col, count=1):
+        end = col + count
+        spans = []
+        for r, c, rows, cols in self:
+            left, right = c, c + cols
+            kept = max(0, min(right, col) - left) + max(0, right - max(left, end))
+            if kept:
+                spans.append((r, min(left, col) if left < end else left - count, rows, kept))
+        self._replace(spans)
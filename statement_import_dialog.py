@@ -0,0 +1,99 @@
+from PySide6.QtWidgets import QDialog, QVBoxLayout, QFormLayout, QComboBox, QLabel, QDialogButtonBox, QMessageBox
+from PySide6.QtCore import Qt
+from statement_importer import STATEMENT_FIELDS, SIGNED_AMOUNT_FIELD, DATE_FORMAT_CHOICES
+
+NOT_MAPPED = "(not mapped)"
+
+
+class StatementImportDialog(QDialog):
+    """Map CSV statement columns onto the 日期/摘要/借方/贷方/发票号码 columns of a bank sheet."""
+
+    def __init__(self, parent=None, header=None, sheet_names=None, saved_mappings=None, current_sheet=None):
+        super().__init__(parent)
+        self.setWindowTitle("Import Statement")
+        self.header = header or []
+        self.saved_mappings = saved_mappings or {}
+        layout = QVBoxLayout(self)
+
+        form = QFormLayout()
+        form.setLabelAlignment(Qt.AlignRight)
+        self.sheet_combo = QComboBox()
+        self.sheet_combo.addItems(sheet_names or [])
+        if current_sheet in (sheet_names or []):
+            self.sheet_combo.setCurrentText(current_sheet)
+        form.addRow("Bank Sheet:", self.sheet_combo)
+
+        self.field_combos = {}
+        for field in STATEMENT_FIELDS + [SIGNED_AMOUNT_FIELD]:
+            combo = QComboBox()
+            combo.addItem(NOT_MAPPED)
+            combo.addItems(self.header)
+            self.field_combos[field] = combo
+            form.addRow(f"{field}:", combo)
+
+        self.date_format_combo = QComboBox()
+        self.date_format_combo.addItems(list(DATE_FORMAT_CHOICES))
+        form.addRow("Date Format:", self.date_format_combo)
+        layout.addLayout(form)
+
+        hint = QLabel("借方 = money in, 贷方 = money out. Use 金额(+/-) for statements with one signed amount column.")
+        hint.setWordWrap(True)
+        layout.addWidget(hint)
+
+        self.button_box = QDialogButtonBox(QDialogButtonBox.Ok | QDialogButtonBox.Cancel)
+        self.button_box.accepted.connect(self.accept)
+        self.button_box.rejected.connect(self.reject)
+        layout.addWidget(self.button_box)
+
+        self.sheet_combo.currentTextChanged.connect(self._apply_saved_mapping)
+        self._apply_saved_mapping(self.sheet_combo.currentText())
+
+    def _apply_saved_mapping(self, sheet_name):
+        """Pre-fill the combos with the mapping last used for this sheet, or guess from the header."""
+        mapping = self.saved_mappings.get(sheet_name)
+        for field, combo in self.field_combos.items():
+            column = mapping.get(field) if mapping else self._guess_column(field)
+            index = combo.findText(column) if column else -1
+            combo.setCurrentIndex(index if index >= 0 else 0)
+        date_format = (mapping or {}).get("date_format", "auto")
+        index = self.date_format_combo.findText(date_format)
+        self.date_format_combo.setCurrentIndex(max(index, 0))
+
+    def _guess_column(self, field):
+        hints = {
+            "日期": ("日期", "date"),
+            "摘要": ("摘要", "description", "details", "particulars", "narrative"),
+            "借方": ("借方", "deposit", "credit amount", "money in"),
+            "贷方": ("贷方", "withdrawal", "debit amount", "money out"),
+            "发票号码": ("发票", "invoice", "reference"),
+        }
+        for column in self.header:
+            lowered = column.lower()
+            if field == SIGNED_AMOUNT_FIELD:
+                # Only an exact match, so "Credit Amount" style columns are not counted twice
+                if lowered in ("amount", "金额", "交易金额"):
+                    return column
+            elif any(h in lowered for h in hints[field]):
+                return column
+        return None
+
+    def accept(self):
+        sheet_name, mapping = self.get_result()
+        if not sheet_name:
+            QMessageBox.warning(self, "Input Error", "Please select a bank sheet.")
+            return
+        if not mapping.get("日期"):
+            QMessageBox.warning(self, "Input Error", "Please map the 日期 column.")
+            return
+        if not (mapping.get("借方") or mapping.get("贷方") or mapping.get(SIGNED_AMOUNT_FIELD)):
+            QMessageBox.warning(self, "Input Error", "Please map at least one amount column.")
+            return
+        super().accept()
+
+    def get_result(self):
+        mapping = {}
+        for field, combo in self.field_combos.items():
+            text = combo.currentText()
+            mapping[field] = "" if text == NOT_MAPPED else text
+        mapping["date_format"] = self.date_format_combo.currentText()
+        return self.sheet_combo.currentText(), mapping
@@ -0,0 +1,199 @@
+import csv
+import logging
+import re
+import time
+from datetime import datetime
+from PySide6.QtWidgets import QDialog, QFileDialog, QMessageBox
+from utils import format_date, parse_date
+
+logger = logging.getLogger(__name__)
+
+# Bank sheet columns a statement can be mapped onto
+STATEMENT_FIELDS = ["日期", "摘要", "借方", "贷方", "发票号码"]
+# Single signed amount column: positive -> 借方 (进账), negative -> 贷方 (出账)
+SIGNED_AMOUNT_FIELD = "金额(+/-)"
+
+DATE_FORMAT_CHOICES = {
+    "auto": None,
+    "yyyy/MM/dd": "%Y/%m/%d",
+    "yyyy-MM-dd": "%Y-%m-%d",
+    "dd/MM/yyyy": "%d/%m/%Y",
+    "MM/dd/yyyy": "%m/%d/%Y",
+    "dd-MM-yyyy": "%d-%m-%Y",
+    "dd MMM yyyy": "%d %b %Y",
+}
+
+_AMOUNT_STRIP = re.compile(r"[^0-9.\-]")
+
+
+def parse_amount(text):
+    """Parse a statement amount such as '1,234.50', '(12.00)', 'HK$ 9.10 CR' or '-5'.
+
+    Returns a float, or None for empty / non-numeric cells.
+    """
+    if text is None:
+        return None
+    text = str(text).strip()
+    if not text:
+        return None
+    negative = False
+    upper = text.upper()
+    if upper.endswith("CR"):
+        text = text[:-2]
+    elif upper.endswith("DR"):
+        negative = True
+        text = text[:-2]
+    text = text.strip()
+    if text.startswith("(") and text.endswith(")"):
+        negative = True
+        text = text[1:-1]
+    cleaned = _AMOUNT_STRIP.sub("", text)
+    if cleaned.startswith("-"):
+        negative = not negative
+        cleaned = cleaned[1:]
+    if not cleaned or cleaned == ".":
+        return None
+    try:
+        value = float(cleaned)
+    except ValueError:
+        return None
+    return -value if negative else value
+
+
+def _detect_encoding(path):
+    with open(path, "rb") as f:
+        head = f.read(65536)
+    for encoding in ("utf-8-sig", "gb18030", "big5"):
+        try:
+            head.decode(encoding)
+            return encoding
+        except UnicodeDecodeError:
+            continue
+    return "latin-1"
+
+
+def read_csv_header(path):
+    """Return (encoding, header row) of a CSV statement."""
+    encoding = _detect_encoding(path)
+    with open(path, newline="", encoding=encoding, errors="replace") as f:
+        for row in csv.reader(f):
+            if any(cell.strip() for cell in row):
+                return encoding, [cell.strip() for cell in row]
+    return encoding, []
+
+
+def iter_statement_records(path, mapping, encoding=None):
+    """Stream a CSV statement as bank-sheet records ({column label: text}).
+
+    ``mapping`` maps STATEMENT_FIELDS (and optionally SIGNED_AMOUNT_FIELD) to CSV
+    header names, plus an optional "date_format" key from DATE_FORMAT_CHOICES.
+    Dates become yyyy/MM/dd and amounts plain two-decimal numbers while streaming;
+    rows without a date or without any amount (totals, notes) are skipped.
+    """
+    encoding = encoding or _detect_encoding(path)
+    date_format = DATE_FORMAT_CHOICES.get(mapping.get("date_format") or "auto")
+    with open(path, newline="", encoding=encoding, errors="replace") as f:
+        reader = csv.reader(f)
+        header = None
+        for row in reader:
+            if any(cell.strip() for cell in row):
+                header = [cell.strip() for cell in row]
+                break
+        if header is None:
+            return
+        index = {name: i for i, name in enumerate(header)}
+        cols = {field: index.get(mapping.get(field) or "") for field in STATEMENT_FIELDS + [SIGNED_AMOUNT_FIELD]}
+
+        def cell(row, field):
+            col = cols[field]
+            return row[col].strip() if col is not None and col < len(row) else ""
+
+        for row in reader:
+            raw_date = cell(row, "日期")
+            if date_format:
+                try:
+                    parsed = datetime.strptime(raw_date, date_format).date()
+                except ValueError:
+                    parsed = None
+            else:
+                parsed = parse_date(raw_date)
+            if parsed is None:
+                continue
+            debit = parse_amount(cell(row, "借方"))
+            credit = parse_amount(cell(row, "贷方"))
+            signed = parse_amount(cell(row, SIGNED_AMOUNT_FIELD))
+            if signed is not None:
+                if signed >= 0:
+                    debit = (debit or 0.0) + signed
+                else:
+                    credit = (credit or 0.0) - signed
+            # Withdrawals exported as negative numbers in the 贷方 column
+            if credit is not None and credit < 0:
+                credit = -credit
+            if debit is not None and debit < 0:
+                credit = (credit or 0.0) - debit
+                debit = None
+            if not debit and not credit:
+                continue
+            yield {
+                "日期": format_date(parsed),
+                "摘要": cell(row, "摘要"),
+                "借方": f"{debit:.2f}" if debit else "",
+                "贷方": f"{credit:.2f}" if credit else "",
+                "发票号码": cell(row, "发票号码"),
+            }
+
+
+class StatementImporter:
+    """File -> Import Statement: bulk-load a CSV bank statement into a bank sheet."""
+
+    def __init__(self, main_window):
+        self.main_window = main_window
+
+    def import_statement(self):
+        """Ask for a CSV file and a column mapping, then import it"""
+        from statement_import_dialog import StatementImportDialog
+        bank_sheets = [s for s in self.main_window.sheets if getattr(s, "type", None) == "bank"]
+        if not bank_sheets:
+            QMessageBox.warning(self.main_window, "Import Statement", "Please add a bank sheet first.")
+            return
+        path, _ = QFileDialog.getOpenFileName(
+            self.main_window, "Import Statement", "", "CSV files (*.csv);;All files (*)"
+        )
+        if not path:
+            return
+        try:
+            encoding, header = read_csv_header(path)
+        except Exception as e:
+            QMessageBox.warning(self.main_window, "Import Error", f"Failed to read file: {str(e)}")
+            return
+        if not header:
+            QMessageBox.warning(self.main_window, "Import Error", "The file has no header row.")
+            return
+        current = self.main_window.tabs.currentWidget()
+        dialog = StatementImportDialog(
+            self.main_window,
+            header=header,
+            sheet_names=[s.name for s in bank_sheets],
+            saved_mappings=self.main_window.statement_mappings,
+            current_sheet=getattr(current, "name", None),
+        )
+        if dialog.exec() != QDialog.Accepted:
+            return
+        sheet_name, mapping = dialog.get_result()
+        self.main_window.statement_mappings[sheet_name] = mapping
+        sheet = next(s for s in bank_sheets if s.name == sheet_name)
+        try:
+            count = self.import_path(path, sheet, mapping, encoding)
+        except Exception as e:
+            logger.error(f"Failed to import statement {path}: {e}")
+            QMessageBox.warning(self.main_window, "Import Error", f"Failed to import statement: {str(e)}")
+            return
+        QMessageBox.information(self.main_window, "Import Statement", f"Imported {count} rows into {sheet_name}.")
+
+    def import_path(self, path, sheet, mapping, encoding=None):
+        """Stream the CSV into ``sheet`` in a single batched append; returns the row count"""
+        start = time.time()
+        count = sheet.append_records(iter_statement_records(path, mapping, encoding))
+        logger.info(f"Imported {count} statement rows into {sheet.name} in {time.time() - start:.2f}s")
+        return count
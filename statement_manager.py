@@ -0,0 +1,250 @@
+import logging
+import time
+from PySide6.QtCore import Qt, QTimer
+from PySide6.QtGui import QColor, QFont
+from PySide6.QtWidgets import QTableWidgetItem
+from statements import (
+    EXCHANGE_SHEET, OPENING_ACCOUNT, StatementEngine, bank_row_contributions, exchange_row_contributions,
+    is_profit_account, non_bank_row_contributions, period_contributions,
+)
+from trial_balance import trial_balance
+from utils import format_number
+
+logger = logging.getLogger(__name__)
+
+# Engine key of the opening balances carried forward from the last closed period
+OPENING_BALANCES_KEY = "opening_balances"
+
+
+class StatementManager:
+    """Keeps the 利润表 / 资产负债表 sheets up to date as source rows change.
+
+    Sheets report changed rows through ``rows_changed_callback``; the rows are
+    collected and read once on the next event-loop pass, so a burst of edits
+    (paste, import) costs one refresh. Only the statement lines whose accounts
+    moved are rewritten.
+    """
+
+    def __init__(self, main_window):
+        self.main_window = main_window
+        self.engine = StatementEngine()
+        self._pending = {}  # table -> set of rows, or None to re-read the whole sheet
+        self._columns = {}  # table -> {header label: [cols]}
+        self._period = None  # (Period From, To) dates the engine rows were read for
+        self._timer = QTimer()
+        self._timer.setSingleShot(True)
+        self._timer.setInterval(0)
+        self._timer.timeout.connect(self.refresh)
+
+    @staticmethod
+    def is_source(table):
+        sheet_type = getattr(table, "type", None)
+        return sheet_type in ("bank", "non_bank") or (
+            sheet_type == "payable_detail" and getattr(table, "name", "") == EXCHANGE_SHEET
+        )
+
+    def on_rows_changed(self, table, rows=None):
+        """Sheet callback: ``rows`` is an iterable of row indexes, or None for the whole sheet"""
+        if not self.is_source(table):
+            return
+        if rows is None:
+            self._pending[table] = None
+            self._columns.pop(table, None)
+        else:
+            pending = self._pending.setdefault(table, set())
+            if pending is not None:
+                pending.update(rows)
+        self._timer.start()
+
+    def _column_map(self, table):
+        columns = self._columns.get(table)
+        if columns is None:
+            columns = {}
+            for col in range(table.columnCount()):
+                header_item = table.horizontalHeaderItem(col)
+                if header_item is not None:
+                    columns.setdefault(header_item.text(), []).append(col)
+            self._columns[table] = columns
+        return columns
+
+    def _row_contributions(self, table, row, columns):
+        def get(label, occurrence=0):
+            cols = columns.get(label)
+            if not cols or occurrence >= len(cols):
+                return ""
+            item = table.item(row, cols[occurrence])
+            return item.text() if item else ""
+
+        if table.type == "bank":
+            contributions = bank_row_contributions(table.name, table.currency, row, get)
+        elif table.type == "non_bank":
+            contributions = non_bank_row_contributions(columns, get)
+        else:
+            contributions = exchange_row_contributions(columns, get)
+        start, end = self._period
+        return period_contributions(contributions, table.date_index().date_of(row), start, end)
+
+    def set_period(self, start, end):
+        """Period From/To moved: re-read only the rows dated between the old and new bounds"""
+        old, self._period = self._period, (start, end)
+        if old is None or old == self._period:
+            return
+        for table in self.main_window.sheets:
+            if not self.is_source(table):
+                continue
+            index = table.date_index()
+            rows = set()
+            for before, after in zip(old, self._period):
+                if before != after:
+                    rows.update(index.rows_between(min(before, after), max(before, after)))
+            if rows:
+                self.on_rows_changed(table, rows)
+        self.schedule_refresh()
+
+    def _read_pending(self):
+        if self._period is None:
+            self._period = self.main_window.period_range()
+        sources = [s for s in self.main_window.sheets if self.is_source(s)]
+        # Sheets that were deleted, replaced by a load, or renamed away from 汇兑损益
+        for key in self.engine.sheet_keys() - set(sources) - {OPENING_BALANCES_KEY}:
+            self.engine.remove_sheet(key)
+            self._columns.pop(key, None)
+        pending, self._pending = self._pending, {}
+        for table, rows in pending.items():
+            if table not in sources:
+                continue
+            columns = self._column_map(table)
+            if rows is None:
+                self.engine.set_sheet(table, {
+                    row: self._row_contributions(table, row, columns) for row in table.open_rows()
+                })
+            else:
+                for row in rows:
+                    if table.closed_row_count <= row < table.rowCount():
+                        self.engine.set_row(table, row, self._row_contributions(table, row, columns))
+
+    def set_opening_balances(self, balances):
+        """Carry forward a closed period: ``balances`` is {account: {currency: debit - credit}}"""
+        self.engine.set_sheet(OPENING_BALANCES_KEY, {
+            i: ((account, currency, max(amount, 0.0), max(-amount, 0.0)),)
+            for i, (account, currency, amount) in enumerate(
+                (account, currency, amount)
+                for account, totals in sorted(balances.items())
+                for currency, amount in sorted(totals.items())
+            )
+        })
+        self.schedule_refresh()
+
+    def closing_balances(self, closed_rows):
+        """Balances carried out of a closed period: the current opening balances plus
+        every row below ``closed_rows[table]``. Profit accounts close into 期初结余.
+        """
+        for table in closed_rows:
+            self.on_rows_changed(table)
+        self._read_pending()
+        parts = [self.engine.sheet_balances(OPENING_BALANCES_KEY)]
+        parts += [self.engine.sheet_balances(table, range(count)) for table, count in closed_rows.items()]
+        balances = {}
+        for part in parts:
+            for account, totals in part.items():
+                target = balances.setdefault(OPENING_ACCOUNT if is_profit_account(account) else account, {})
+                for currency, amount in totals.items():
+                    target[currency] = target.get(currency, 0.0) + amount
+        return {
+            account: {c: round(a, 2) for c, a in totals.items() if abs(a) >= 0.005}
+            for account, totals in balances.items()
+            if any(abs(a) >= 0.005 for a in totals.values())
+        }
+
+    def exchange_rates(self):
+        """currency -> 本期 HKD rate for the current period"""
+        return self.main_window.exchange_rates.current_rates(self.engine.currencies())
+
+    def schedule_refresh(self):
+        """Rates or period changed: revalue on the next event-loop pass"""
+        self._timer.start()
+
+    def revaluation_rows(self):
+        """Period-end revaluation of every foreign-currency balance at the 期末 rate.
+
+        Returns [(account, currency, amount, gain in HKD)] for non-zero gains.
+        """
+        for sheet in self.main_window.sheets:
+            if self.is_source(sheet):
+                self.on_rows_changed(sheet)
+        self._read_pending()
+        balances = [
+            (account, currency, amount) for account, currency, amount in self.engine.balances()
+            if account != OPENING_ACCOUNT and not is_profit_account(account)
+        ]
+        return [row for row in self.main_window.exchange_rates.revalue(balances) if abs(row[3]) >= 0.005]
+
+    def trial_balance(self):
+        """Trial balance lines of every source sheet at the 本期 rates (see trial_balance.py).
+
+        Only sheets the engine has not read yet are read in full; the others
+        are current already, apart from rows still pending.
+        """
+        read = self.engine.sheet_keys()
+        for sheet in self.main_window.sheets:
+            if self.is_source(sheet) and sheet not in read:
+                self.on_rows_changed(sheet)
+        self._read_pending()
+        return trial_balance(self.engine.totals(), self.exchange_rates())
+
+    def refresh(self):
+        """Apply pending row changes and rewrite the statement lines that moved"""
+        self._timer.stop()
+        self._read_pending()
+        for view in self.engine.refresh(self.exchange_rates()):
+            table = self._find_sheet(view.name)
+            if table is not None:
+                self._write_view(table, view)
+
+    def generate(self):
+        """Re-read every source sheet and (re)create the statement sheets"""
+        start = time.time()
+        for sheet in self.main_window.sheets:
+            if self.is_source(sheet):
+                self.on_rows_changed(sheet)
+        self.refresh()
+        for view in self.engine.views:
+            table = self._find_sheet(view.name)
+            if table is None:
+                table = self.main_window.sheet_manager.create_statement_sheet(view.name)
+            self._write_view(table, view)
+        logger.info(f"Generated statements in {time.time() - start:.2f}s")
+
+    def _find_sheet(self, name):
+        for sheet in self.main_window.sheets:
+            if getattr(sheet, "type", None) == "statement" and sheet.name == name:
+                return sheet
+        return None
+
+    @staticmethod
+    def _write_view(table, view):
+        rows = view.rows()
+        table.blockSignals(True)
+        try:
+            if table.rowCount() != len(rows):
+                table.setRowCount(len(rows))
+            bold = QFont()
+            bold.setBold(True)
+            for row, (label, amount) in enumerate(rows):
+                texts = (label, "" if amount is None else format_number(round(amount, 2)))
+                for col, text in enumerate(texts):
+                    item = table.item(row, col)
+                    if item is not None and item.text() == text:
+                        continue
+                    item = QTableWidgetItem(text)
+                    item.setFlags(item.flags() & ~Qt.ItemIsEditable)
+                    if col == 1:
+                        item.setTextAlignment(Qt.AlignRight | Qt.AlignVCenter)
+                    if amount is None or "合计" in label or label.startswith(("二、", "一、")):
+                        item.setFont(bold)
+                    if amount is None:
+                        item.setBackground(QColor(240, 240, 240))
+                    table.setItem(row, col, item)
+        finally:
+            table.blockSignals(False)
+        table.viewport().update()
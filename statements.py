@@ -0,0 +1,390 @@
+"""利润表 / 资产负债表 as materialized views over per-account aggregates.
+
+Every source row (bank, non-bank and 汇兑损益 rows) is turned into a few
+contributions (account, currency, debit, credit). The engine keeps the
+contributions of each row, so an edited row only moves the difference into
+the per-(account, currency) aggregates, and only the accounts that moved
+are pushed to the statement views. Nothing here depends on Qt.
+"""
+import re
+
+EXCHANGE_SHEET = "汇兑损益"
+EXCHANGE_ACCOUNT = "汇兑损益"
+BANK_ACCOUNT = "银行存款"
+OPENING_ACCOUNT = "期初结余"
+UNASSIGNED_ACCOUNT = "未指定科目"
+TRANSFER_SUB_ACCOUNT = "中转"
+REVALUATION_SOURCE = "期末汇率"  # 来源 of the period-end revaluation rows in the 汇兑损益 sheet
+
+INCOME_ACCOUNTS = {"销售收入": "一、营业收入", "銷售收入": "一、营业收入"}
+COST_ACCOUNTS = {"销售成本": "减：营业成本", "銷售成本": "减：营业成本",
+                 "银行费用": "减：银行费用", "銀行費用": "减：银行费用"}
+OTHER_INCOME_ACCOUNTS = {"利息收入": "加：利息收入"}
+
+_CURRENCY_COLUMN = re.compile(r"^(借方|贷方)\((\w+)\)$")
+
+
+def parse_amount(text):
+    """Sheet amount text ('1,234.50', '(12.00)') to float; blanks and junk are 0."""
+    if not text:
+        return 0.0
+    text = text.replace(",", "").strip()
+    if text.startswith("(") and text.endswith(")"):
+        text = "-" + text[1:-1]
+    try:
+        return float(text)
+    except ValueError:
+        return 0.0
+
+
+def top_account(account):
+    """应付账款-A公司 -> 应付账款"""
+    return account.split("-", 1)[0]
+
+
+def is_profit_account(account):
+    """Accounts that close into 本期利润 (and are therefore never revalued)"""
+    top = top_account(account)
+    return (top == EXCHANGE_ACCOUNT or top in INCOME_ACCOUNTS or top in COST_ACCOUNTS
+            or top in OTHER_INCOME_ACCOUNTS)
+
+
+def _account(name, sub):
+    name = name.strip()
+    sub = sub.strip()
+    return f"{name}-{sub}" if name and sub else name
+
+
+def period_contributions(contributions, value, start, end):
+    """Restrict a row's contributions to the period [start, end] by its date ``value``.
+
+    Rows after the period are left out; rows before it count towards the
+    balance sheet only, so their profit accounts close into 期初结余. Undated
+    rows are kept as they are.
+    """
+    if value is None or not contributions:
+        return contributions
+    if end is not None and value > end:
+        return ()
+    if start is not None and value < start:
+        return tuple(
+            (OPENING_ACCOUNT if is_profit_account(account) else account, currency, debit, credit)
+            for account, currency, debit, credit in contributions
+        )
+    return contributions
+
+
+def bank_row_contributions(sheet_name, currency, row, get):
+    """Contributions of a bank sheet row; ``get(label, occurrence=0)`` returns cell text.
+
+    The bank side is booked to 银行存款-<sheet>, the other side to 对方科目-子科目.
+    Row 0 also carries the opening 余额, booked against 期初结余. 中转 rows move
+    money between two banks; their difference is taken from the 汇兑损益 sheet,
+    so they have no counterpart here.
+    """
+    debit = parse_amount(get("借方"))
+    credit = parse_amount(get("贷方"))
+    bank = f"{BANK_ACCOUNT}-{sheet_name}"
+    contributions = []
+    if row == 0:
+        # The first-row 余额 is the balance after this row
+        opening = parse_amount(get("余额")) - debit + credit
+        if opening:
+            contributions.append((bank, currency, opening, 0.0))
+            contributions.append((OPENING_ACCOUNT, currency, 0.0, opening))
+    if not debit and not credit:
+        return tuple(contributions)
+    contributions.append((bank, currency, debit, credit))
+    sub = get("子科目")
+    if sub.strip() != TRANSFER_SUB_ACCOUNT:
+        counterpart = _account(get("对方科目"), sub) or UNASSIGNED_ACCOUNT
+        contributions.append((counterpart, currency, credit, debit))
+    return tuple(contributions)
+
+
+def non_bank_row_contributions(columns, get):
+    """Contributions of a 非银行交易 row: 借方(CCY) amounts go to 借方科目, 贷方(CCY) to 贷方科目.
+
+    When only one account is filled in, both sides are booked to it.
+    """
+    debit_account = _account(get("借方科目"), get("子科目", 0))
+    credit_account = _account(get("贷方科目"), get("子科目", 1))
+    contributions = []
+    for label in columns:
+        match = _CURRENCY_COLUMN.match(label)
+        if not match:
+            continue
+        amount = parse_amount(get(label))
+        if not amount:
+            continue
+        side, currency = match.groups()
+        if side == "借方":
+            account = debit_account or credit_account or UNASSIGNED_ACCOUNT
+            contributions.append((account, currency, amount, 0.0))
+        else:
+            account = credit_account or debit_account or UNASSIGNED_ACCOUNT
+            contributions.append((account, currency, 0.0, amount))
+    return tuple(contributions)
+
+
+def exchange_row_contributions(columns, get):
+    """Contributions of a 汇兑损益 sheet row (amounts already in the column currency).
+
+    The sheet's 借方 is a gain and its 贷方 a loss, so 汇兑损益 itself is
+    credited with a gain like any other income. Period-end revaluation rows
+    (来源 期末汇率) name the revalued account in 对方科目 and, when it has one,
+    子科目; that account is debited with the gain, so its HKD balance moves
+    with it.
+    """
+    revalued = ""
+    if get("来源").strip() == REVALUATION_SOURCE:
+        revalued = _account(get("对方科目"), get("子科目"))
+    contributions = []
+    for label in columns:
+        match = _CURRENCY_COLUMN.match(label)
+        if not match:
+            continue
+        amount = parse_amount(get(label))
+        if amount:
+            side, currency = match.groups()
+            debit, credit = (amount, 0.0) if side == "借方" else (0.0, amount)
+            contributions.append((EXCHANGE_ACCOUNT, currency, credit, debit))
+            if revalued:
+                contributions.append((revalued, currency, debit, credit))
+    return tuple(contributions)
+
+
+class StatementView:
+    """A statement whose lines are sums of per-account values.
+
+    Subclasses map an account to a line (or None) and give the account's value
+    on that line; the view keeps each account's last value so a changed
+    account only adjusts the totals of its own line.
+    """
+
+    name = ""
+
+    def __init__(self):
+        self.lines = {}  # line -> total (HKD)
+        self._values = {}  # account -> (line, value)
+
+    def line_of(self, account):
+        raise NotImplementedError
+
+    def value_of(self, account, debit, credit):
+        raise NotImplementedError
+
+    def update_account(self, account, debit, credit):
+        """Push an account's new HKD debit/credit totals; returns True if a line moved."""
+        line = self.line_of(account)
+        value = self.value_of(account, debit, credit) if line else 0.0
+        old_line, old_value = self._values.get(account, (None, 0.0))
+        if (line, value) == (old_line, old_value):
+            return False
+        if old_line is not None:
+            self.lines[old_line] = self.lines.get(old_line, 0.0) - old_value
+        if line is not None:
+            self.lines[line] = self.lines.get(line, 0.0) + value
+            self._values[account] = (line, value)
+        else:
+            self._values.pop(account, None)
+        return True
+
+    def clear(self):
+        self.lines.clear()
+        self._values.clear()
+
+    def rows(self):
+        """[(label, amount or None)] in display order"""
+        raise NotImplementedError
+
+
+class ProfitAndLossView(StatementView):
+    name = "利润表"
+
+    LINE_ORDER = ["一、营业收入", "减：营业成本", "减：银行费用", "加：利息收入"]
+
+    def line_of(self, account):
+        top = top_account(account)
+        if top == EXCHANGE_ACCOUNT:
+            return EXCHANGE_ACCOUNT
+        return INCOME_ACCOUNTS.get(top) or COST_ACCOUNTS.get(top) or OTHER_INCOME_ACCOUNTS.get(top)
+
+    def value_of(self, account, debit, credit):
+        # Profit effect: credits add to profit, debits reduce it (an exchange gain is a credit)
+        return credit - debit
+
+    def net_profit(self):
+        return sum(self.lines.values())
+
+    def rows(self):
+        rows = []
+        for line in self.LINE_ORDER:
+            value = self.lines.get(line, 0.0)
+            # Cost lines are shown as positive amounts being subtracted
+            rows.append((line, -value if line.startswith("减") else value))
+        exchange = self.lines.get(EXCHANGE_ACCOUNT, 0.0)
+        # Period-end exchange total: a gain is added, a loss subtracted
+        if exchange >= 0:
+            rows.append(("加：汇兑收益", exchange))
+        else:
+            rows.append(("减：汇兑损益", -exchange))
+        rows.append(("二、净利润", self.net_profit()))
+        return rows
+
+
+class BalanceSheetView(StatementView):
+    name = "资产负债表"
+
+    PROFIT_LINE = "本期利润"
+
+    def __init__(self):
+        super().__init__()
+        self._profit_view = ProfitAndLossView()
+
+    def line_of(self, account):
+        top = top_account(account)
+        if self._profit_view.line_of(account):
+            return self.PROFIT_LINE
+        return top
+
+    def value_of(self, account, debit, credit):
+        if self._profit_view.line_of(account):
+            return self._profit_view.value_of(account, debit, credit)
+        # Net debit balance; negative balances are shown on the liability side
+        return debit - credit
+
+    def rows(self):
+        assets, liabilities = [], []
+        for line in sorted(self.lines):
+            if line in (self.PROFIT_LINE, OPENING_ACCOUNT):
+                continue
+            value = self.lines[line]
+            if abs(value) < 0.005:
+                continue
+            if line == BANK_ACCOUNT:
+                assets.insert(0, ("货币资金", value))
+            elif value > 0:
+                assets.append((line, value))
+            else:
+                liabilities.append((line, -value))
+        opening = -self.lines.get(OPENING_ACCOUNT, 0.0)
+        profit = self.lines.get(self.PROFIT_LINE, 0.0)
+        total_assets = sum(v for _, v in assets)
+        total_liabilities = sum(v for _, v in liabilities)
+        rows = [("资产", None)] + assets + [("资产合计", total_assets)]
+        rows += [("负债", None)] + liabilities + [("负债合计", total_liabilities)]
+        rows += [("所有者权益", None), ("期初结余", opening), ("本期利润", profit)]
+        equity = opening + profit
+        difference = total_assets - total_liabilities - equity
+        if abs(difference) >= 0.005:
+            # Unbalanced non-bank entries (借方 ≠ 贷方) end up here
+            rows.append(("未平衡差额", difference))
+            equity += difference
+        rows.append(("所有者权益合计", equity))
+        rows.append(("负债和所有者权益合计", total_liabilities + equity))
+        return rows
+
+
+class StatementEngine:
+    """Per-row contributions -> per-(account, currency) aggregates -> statement views."""
+
+    def __init__(self, views=None):
+        self.views = views if views is not None else [ProfitAndLossView(), BalanceSheetView()]
+        self._rows = {}  # sheet key -> {row: contributions}
+        self._balances = {}  # account -> {currency: [debit, credit]}
+        self._dirty = set()  # accounts whose aggregates moved since the last refresh
+        self._rates = None
+
+    def sheet_keys(self):
+        return set(self._rows)
+
+    def currencies(self):
+        return {currency for totals in self._balances.values() for currency in totals}
+
+    def balances(self):
+        """[(account, currency, debit - credit)] in the original currencies"""
+        return [
+            (account, currency, debit - credit)
+            for account, totals in self._balances.items()
+            for currency, (debit, credit) in totals.items()
+            if abs(debit - credit) >= 0.005
+        ]
+
+    def totals(self):
+        """[(account, currency, debit, credit)] of every account with a movement, in the original currencies"""
+        return [
+            (account, currency, debit, credit)
+            for account, totals in self._balances.items()
+            for currency, (debit, credit) in totals.items()
+            if abs(debit) >= 0.005 or abs(credit) >= 0.005
+        ]
+
+    def _apply(self, contributions, sign):
+        for account, currency, debit, credit in contributions:
+            totals = self._balances.setdefault(account, {}).setdefault(currency, [0.0, 0.0])
+            totals[0] += sign * debit
+            totals[1] += sign * credit
+            self._dirty.add(account)
+
+    def set_row(self, sheet_key, row, contributions):
+        rows = self._rows.setdefault(sheet_key, {})
+        old = rows.get(row, ())
+        if old == contributions:
+            return
+        self._apply(old, -1)
+        self._apply(contributions, 1)
+        if contributions:
+            rows[row] = contributions
+        else:
+            rows.pop(row, None)
+
+    def set_sheet(self, sheet_key, rows):
+        """Replace every row of a sheet; ``rows`` is {row: contributions}."""
+        self.remove_sheet(sheet_key)
+        self._rows[sheet_key] = {}
+        for row, contributions in rows.items():
+            self.set_row(sheet_key, row, contributions)
+
+    def remove_sheet(self, sheet_key):
+        for contributions in self._rows.pop(sheet_key, {}).values():
+            self._apply(contributions, -1)
+
+    def sheet_balances(self, sheet_key, rows=None):
+        """{account: {currency: debit - credit}} over ``rows`` of a sheet (default: every row)"""
+        balances = {}
+        sheet_rows = self._rows.get(sheet_key, {})
+        for row in (sheet_rows if rows is None else rows):
+            for account, currency, debit, credit in sheet_rows.get(row, ()):
+                totals = balances.setdefault(account, {})
+                totals[currency] = totals.get(currency, 0.0) + debit - credit
+        return balances
+
+    def account_totals(self, account, rates):
+        """HKD debit/credit totals of an account"""
+        debit = credit = 0.0
+        for currency, (d, c) in self._balances.get(account, {}).items():
+            rate = rates.get(currency, 1.0)
+            debit += d * rate
+            credit += c * rate
+        return debit, credit
+
+    def refresh(self, rates):
+        """Push moved accounts to the views; returns the views whose lines changed.
+
+        A change of exchange rates revalues every account, which is still only
+        a pass over the aggregates, not over the sheets.
+        """
+        if rates != self._rates:
+            self._rates = dict(rates)
+            self._dirty.update(self._balances)
+        changed = set()
+        for account in self._dirty:
+            debit, credit = self.account_totals(account, self._rates)
+            for view in self.views:
+                if view.update_account(account, debit, credit):
+                    changed.add(view)
+            if not any(abs(d) > 1e-9 or abs(c) > 1e-9 for d, c in self._balances.get(account, {}).values()):
+                self._balances.pop(account, None)
+        self._dirty.clear()
+        return [view for view in self.views if view in changed]
@@ -0,0 +1,28 @@
+"""Checks of the core (Qt-free) logic; the few that need widgets run on the offscreen platform."""
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+
+@pytest.fixture(scope="session")
+def qapp():
+    from PySide6.QtWidgets import QApplication
+    return QApplication.instance() or QApplication([])
+
+
+@pytest.fixture
+def window(qapp, tmp_path, monkeypatch):
+    """A main window working in a scratch directory, with message boxes answered silently"""
+    from PySide6.QtWidgets import QMessageBox
+    from excel_like import ExcelLike
+    monkeypatch.chdir(tmp_path)
+    for name in ("critical", "warning", "information"):
+        monkeypatch.setattr(QMessageBox, name, staticmethod(lambda *args, **kwargs: QMessageBox.Ok))
+    win = ExcelLike()
+    yield win
+    win.close()
+    win.deleteLater()
@@ -0,0 +1,50 @@
+from cell_index import CellIndex
+
+
+def populated(*cells):
+    index = CellIndex()
+    for row, col in cells:
+        index.set(row, col, True)
+    return index
+
+
+def test_cells_in_row_major_order_and_last_row():
+    index = populated((5, 2), (0, 3), (5, 0), (2, 6))
+    assert list(index.cells()) == [(0, 3), (2, 6), (5, 0), (5, 2)]
+    assert len(index) == 4 and (5, 2) in index and (5, 1) not in index
+    assert index.columns() == {0, 2, 3, 6}
+    assert index.last_row() == 5
+    assert index.last_row(ignore={0, 2}) == 2
+    index.set(5, 0, False)
+    index.set(5, 2, False)
+    assert index.last_row() == 2
+    index.set(9, 6, True)
+    assert index.last_row(ignore={0, 2}) == 9
+
+
+def test_rows_shift_like_the_view():
+    index = populated((0, 0), (3, 1), (4, 2))
+    index.insert_rows(3, 2)
+    assert list(index.cells()) == [(0, 0), (5, 1), (6, 2)]
+    index.remove_rows(4, 2)
+    assert list(index.cells()) == [(0, 0), (4, 2)]
+    assert index.last_row() == 4
+
+
+def test_columns_shift_like_the_view():
+    index = populated((0, 0), (0, 3), (1, 1))
+    index.insert_columns(1)
+    assert list(index.cells()) == [(0, 0), (0, 4), (1, 2)]
+    index.remove_columns(2)
+    assert list(index.cells()) == [(0, 0), (0, 3)]
+    assert index.last_row() == 0
+
+
+def test_saved_cells_follow_the_index(window):
+    sheet = window.sheet_manager.create_bank_sheet("T-HKD")
+    sheet.append_records([{"日期": "2025/01/01", "摘要": "a"}])
+    sheet.removeRow(0)
+    sheet.append_records([{"日期": "2025/01/02"}])
+    date_col = sheet._label_columns()["日期"]
+    assert sheet.data()["cells"][(0, date_col)] == "2025/01/02"
+    assert (0, sheet._label_columns()["摘要"]) not in sheet.data()["cells"]
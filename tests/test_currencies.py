@@ -0,0 +1,49 @@
+from currencies import CurrencyRegistry, currency_columns, insert_position, parse_currency_column, sort_currencies
+
+LABELS = ["日期", "摘要", "借方(USD)", "借方(HKD)", "贷方(USD)", "贷方(HKD)", "备注"]
+
+
+def test_parse_currency_column():
+    assert parse_currency_column("借方(USD)") == ("借方", "USD")
+    assert parse_currency_column("貸方 (HKD)") == ("贷方", "HKD")
+    assert parse_currency_column("借方()") is None
+    assert parse_currency_column("摘要") is None
+
+
+def test_known_currencies_keep_their_order():
+    assert sort_currencies({"XYZ", "HKD", "ABC", "USD"}) == ["USD", "HKD", "ABC", "XYZ"]
+    assert currency_columns(["HKD", "USD"]) == ("借方(USD)", "借方(HKD)", "贷方(USD)", "贷方(HKD)")
+
+
+def test_insert_position_keeps_currency_order_within_each_side():
+    assert insert_position(LABELS, "借方", "EUR") == 3  # between USD and HKD
+    assert insert_position(LABELS, "贷方", "EUR") == 5
+    assert insert_position(LABELS, "借方", "ABC") == 4  # unknown currencies go last
+    assert insert_position(LABELS, "借方", "USD") == 2
+    # First column of a side: 贷方 after the 借方 group, 借方 before the 贷方 group
+    assert insert_position(["日期", "借方(USD)", "备注"], "贷方", "EUR") == 2
+    assert insert_position(["日期", "贷方(USD)"], "借方", "EUR") == 1
+    assert insert_position(["日期", "摘要"], "借方", "EUR") == 2
+
+
+def test_registry_reports_new_currencies_only():
+    added = []
+    registry = CurrencyRegistry(added.append)
+    assert "HKD" in registry
+    assert registry.add(" eur ") and not registry.add("EUR") and not registry.add("")
+    assert added == ["EUR"]
+    registry.reset(["jpy"])
+    assert registry.used() == ["JPY", "HKD"] and added == ["EUR"]
+    assert registry.choices()[-1] == "MXN"
+    registry.add("ZZZ")
+    assert registry.choices()[-1] == "ZZZ"
+
+
+def test_new_currency_adds_columns_to_non_bank_sheets(window):
+    sheet = window.sheet_manager.create_non_bank_sheet()
+    window.currencies.add("CAD")
+    labels = [sheet.horizontalHeaderItem(c).text() for c in range(sheet.columnCount())]
+    currency_labels = [label for label in labels if parse_currency_column(label)]
+    assert currency_labels == [f"{side}({currency})" for side in ("借方", "贷方")
+                               for currency in ("USD", "EUR", "JPY", "GBP", "CAD", "HKD", "RMB")]
+    assert labels[-2:] == ["备注", "来源"]
@@ -0,0 +1,48 @@
+from datetime import date
+
+from PySide6.QtCore import QDate
+from PySide6.QtWidgets import QTableWidgetItem
+
+from date_index import DateIndex
+
+
+def test_rows_between_is_inclusive_and_in_date_order():
+    index = DateIndex()
+    index.rebuild([(0, date(2025, 1, 31)), (1, None), (2, date(2025, 1, 1)), (3, date(2025, 2, 1)),
+                   (4, date(2025, 1, 31))])
+    assert index.rows_between(date(2025, 1, 1), date(2025, 1, 31)) == [2, 0, 4]
+    assert index.rows_between(start=date(2025, 1, 2)) == [0, 4, 3]
+    assert index.rows_between(end=date(2024, 12, 31)) == []
+    assert index.rows_between() == [2, 0, 4, 3]
+    assert index.undated_rows() == {1}
+    assert len(index) == 4
+
+
+def test_set_row_moves_a_row_between_dates():
+    index = DateIndex()
+    index.rebuild([(0, date(2025, 1, 5)), (1, date(2025, 1, 5))])
+    index.set_row(0, date(2025, 3, 1))
+    assert index.rows_between(date(2025, 1, 1), date(2025, 1, 31)) == [1]
+    assert index.date_of(0) == date(2025, 3, 1)
+    index.set_row(1, None)
+    assert index.rows_between() == [0]
+    assert index.undated_rows() == {1}
+    index.set_row(1, date(2025, 1, 1))
+    assert index.rows_between() == [1, 0] and index.undated_rows() == set()
+
+
+def test_period_rows_follow_the_period_and_edits(window):
+    window.period_from_input.setDate(QDate(2025, 1, 1))
+    window.period_to_input.setDate(QDate(2025, 1, 31))
+    sheet = window.sheet_manager.create_bank_sheet("T-HKD")
+    sheet.append_records([{"日期": "2025/02/03", "摘要": "later"}, {"日期": "2025/01/10", "摘要": "in"},
+                          {"日期": "2024/12/31", "摘要": "earlier"}, {"摘要": "undated"}])
+    rows = sheet.period_rows()
+    assert 1 in rows and 3 in rows
+    assert 0 not in rows and 2 not in rows
+    # Editing a date moves the row in or out of the period
+    sheet.setItem(0, sheet._label_columns()["日期"], QTableWidgetItem("2025/01/15"))
+    assert 0 in sheet.period_rows()
+    sheet.insertRows(0, 1)
+    rows = sheet.period_rows()
+    assert 1 in rows and 2 in rows and 3 not in rows
@@ -0,0 +1,70 @@
+from PySide6.QtWidgets import QTableWidgetItem
+
+from derived_sheet import DerivedSheet
+from utils import non_bank_columns, payable_detail_columns
+
+HEADERS = list(payable_detail_columns(["HKD", "USD"]))
+
+
+def bank_sheet(window):
+    sheet = window.sheet_manager.create_bank_sheet("T-USD")
+    sheet.append_records([
+        {"日期": "2025/01/02", "对方科目": "應付賬款", "子科目": "A公司", "借方": "100", "摘要": "refund"},
+        {"日期": "2025/01/03", "对方科目": "應付賬款", "子科目": "A公司", "贷方": "40", "发票号码": "INV-1"},
+    ])
+    return sheet
+
+
+def test_bank_amounts_go_to_the_column_of_their_side(window):
+    sheet = bank_sheet(window)
+    derived = DerivedSheet("應付賬款-A公司", HEADERS)
+    derived.add(sheet, 0)
+    derived.add(sheet, 1)
+    assert len(derived) == 2
+    assert derived.cell(0, HEADERS.index("借方(USD)")) == "100.0"
+    assert derived.cell(0, HEADERS.index("贷方(USD)")) == ""
+    assert derived.cell(1, HEADERS.index("贷方(USD)")) == "40.0"
+    assert derived.cell(1, HEADERS.index("发票号码")) == "INV-1"
+    assert derived.cell(1, HEADERS.index("来源")) == "T-USD:2"
+    assert derived.source_column(1, HEADERS.index("贷方(USD)")) == sheet._label_columns()["贷方"]
+
+
+def test_debit_and_creditor_sheets_take_both_sides_in_one_column(window):
+    sheet = bank_sheet(window)
+    debit = DerivedSheet("銀行費用", HEADERS)
+    debit.add(sheet, 1)
+    assert debit.cell(0, HEADERS.index("借方(USD)")) == "40.0"
+    creditor = DerivedSheet("銷售收入", HEADERS)
+    creditor.add(sheet, 0)
+    assert creditor.cell(0, HEADERS.index("贷方(USD)")) == "100.0"
+
+
+def test_rows_follow_their_source(window):
+    sheet = bank_sheet(window)
+    derived = DerivedSheet("應付賬款-A公司", HEADERS)
+    derived.add(sheet, 1)
+    sheet.insertRows(0, 2)
+    assert derived.source_of(0) == (sheet, 3)
+    assert derived.cell(0, HEADERS.index("来源")) == "T-USD:4"
+    sheet.setItem(3, sheet._label_columns()["摘要"], QTableWidgetItem("edited"))
+    assert derived.cell(0, HEADERS.index("摘要")) == "edited"
+    sheet.removeRow(3)
+    assert derived.source_of(0) is None
+    assert derived.row_cells(0) == {}
+
+
+def test_non_bank_rows_and_inserted_currency_columns(window):
+    sheet = window.sheet_manager.create_non_bank_sheet(columns=non_bank_columns(["HKD"]))
+    columns = sheet._label_columns()
+    sheet.append_records([{"日期": "2025/01/05", "借方科目": "應付賬款", "子科目": "A公司", "借方(HKD)": "8",
+                           "备注": "accrual"}])
+    derived = DerivedSheet("應付賬款-A公司", HEADERS)
+    derived.add(sheet, 0, columns["借方(HKD)"])
+    assert derived.cell(0, HEADERS.index("日期")) == "2025/01/05"
+
+    inserted = window.sheet_manager.add_currency_columns(sheet, "USD")
+    assert inserted and min(inserted) <= columns["借方(HKD)"]
+    for col in inserted:
+        derived.columns_inserted(sheet, col)
+    assert derived.cell(0, HEADERS.index("日期")) == "2025/01/05"
+    assert derived._cols[0] == sheet._label_columns()["借方(HKD)"]
@@ -0,0 +1,90 @@
+from PySide6.QtWidgets import QTableWidgetItem
+
+
+def texts(sheet, row, labels):
+    columns = sheet._label_columns()
+    return [sheet.item(row, columns[label]).text() if sheet.item(row, columns[label]) else "" for label in labels]
+
+
+def test_first_free_row_ignores_running_balance_and_numbering(window):
+    sheet = window.sheet_manager.create_bank_sheet("T-HKD")
+    columns = sheet._label_columns()
+    sheet.append_records([{"日期": "2025/01/01", "对方科目": "股本", "借方": "100", "余额": "100", "序号": "1"},
+                          {"日期": "2025/01/02", "对方科目": "銀行費用", "贷方": "5", "序号": "2"}])
+    # 余额 recalculated and 序号 numbered ahead, well below the entries
+    for row in range(2, 40):
+        sheet.setItem(row, columns["序号"], QTableWidgetItem(str(row + 1)))
+        sheet.setItem(row, columns["余额"], QTableWidgetItem("95.00"))
+    assert sheet._first_free_row() == 2
+
+
+def test_opening_balance_counts_as_data(window):
+    sheet = window.sheet_manager.create_bank_sheet("T-USD")
+    sheet.setItem(0, sheet._label_columns()["余额"], QTableWidgetItem("1,000.00"))
+    assert sheet._first_free_row() == 1
+
+
+def test_append_records_continues_after_the_entries(window):
+    sheet = window.sheet_manager.create_bank_sheet("T-EUR")
+    columns = sheet._label_columns()
+    sheet.append_records([{"日期": "2025/01/01", "对方科目": "股本", "借方": "100", "余额": "100", "序号": "1"}])
+    for row in range(1, 20):
+        sheet.setItem(row, columns["序号"], QTableWidgetItem(str(row + 1)))
+    sheet.append_records([{"日期": "2025/02/01", "对方科目": "銀行費用", "贷方": "10"}])
+    assert texts(sheet, 1, ["日期", "贷方", "余额"]) == ["2025/02/01", "10", "90.00"]
+
+
+def sorted_sheet(window):
+    """Rows c, a, b sorted by 摘要: a, b, c on screen, with the 'b' row filtered out"""
+    sheet = window.sheet_manager.create_bank_sheet("T-VIEW")
+    sheet.append_records([{"日期": "2025/01/03", "摘要": "c"}, {"日期": "2025/01/01", "摘要": "a"},
+                          {"日期": "2025/01/02", "摘要": "b"}, {"日期": "2025/01/04", "摘要": "d"}])
+    col = sheet._label_columns()["摘要"]
+    sheet.sort_view(col)
+    sheet.filter_view(col, {"a", "c", "d"})
+    return sheet, col
+
+
+def test_copy_follows_the_rows_on_screen(window):
+    from PySide6.QtWidgets import QApplication, QTableWidgetSelectionRange
+    sheet, col = sorted_sheet(window)
+    # The block a..c on screen is logical rows 1 and 0
+    sheet.setRangeSelected(QTableWidgetSelectionRange(1, col, 1, col), True)
+    sheet.setRangeSelected(QTableWidgetSelectionRange(0, col, 0, col), True)
+    sheet.copy_cells()
+    assert QApplication.clipboard().text() == "a\nc"
+
+
+def test_paste_skips_hidden_rows(window):
+    from PySide6.QtWidgets import QApplication
+    sheet, col = sorted_sheet(window)
+    date_col = sheet._label_columns()["日期"]
+    sheet.setCurrentCell(1, date_col)  # 'a', first on screen
+    QApplication.clipboard().setText("x\ny\nz")
+    sheet.paste_cells()
+    # a, c, d on screen; 'b' (row 2) is hidden and keeps its date
+    assert texts(sheet, 1, ["日期"]) == ["x"]
+    assert texts(sheet, 0, ["日期"]) == ["y"]
+    assert texts(sheet, 3, ["日期"]) == ["z"]
+    assert texts(sheet, 2, ["日期"]) == ["2025/01/02"]
+
+
+def test_insert_records_renumbers_and_notifies_once(window):
+    sheet = window.sheet_manager.create_bank_sheet("T-BULK")
+    sheet.append_records([{"序号": str(n), "日期": f"2025/01/0{n}", "借方": "10"} for n in (1, 2, 3)])
+    sheet.item(0, sheet._label_columns()["余额"]).setText("10")  # opening balance
+    calls = {"saves": 0, "changes": 0}
+    sheet.auto_save_callback = lambda: calls.__setitem__("saves", calls["saves"] + 1)
+    sheet.rows_changed_callback = lambda table, rows: calls.__setitem__("changes", calls["changes"] + 1)
+
+    sheet.insert_records(1, [{"日期": "2025/01/01", "借方": "1"}, {"日期": "2025/01/01", "借方": "2"}])
+    assert calls == {"saves": 1, "changes": 1}
+    assert [texts(sheet, row, ["序号", "借方", "余额"]) for row in range(5)] == [
+        ["1", "10", "10"], ["2", "1", "11.00"], ["3", "2", "13.00"], ["4", "10", "23.00"], ["5", "10", "33.00"]]
+
+
+def test_insert_rows_leaves_hand_written_numbers_alone(window):
+    sheet = window.sheet_manager.create_bank_sheet("T-NUM")
+    sheet.append_records([{"序号": "A-1", "日期": "2025/01/01"}, {"序号": "7", "日期": "2025/01/02"}])
+    sheet.insert_records(1, [{"日期": "2025/01/01"}])
+    assert [texts(sheet, row, ["序号"])[0] for row in range(3)] == ["A-1", "", "7"]
@@ -0,0 +1,113 @@
+import pytest
+
+from formula_engine import CYCLE, FormulaEngine, column_letters, parse, parse_cell, shift_references
+
+
+class Book:
+    """Plain cells {(sheet, row, col): text} behind a FormulaEngine"""
+
+    def __init__(self, sheets=("S1", "HSBC-USD")):
+        self.cells = {}
+        self.sheets = set(sheets)
+        self.engine = FormulaEngine(lambda sheet, row, col: self.cells.get((sheet, row, col), ""),
+                                    lambda name: name if name in self.sheets else None,
+                                    lambda sheet, name: 7.8 if name == "rate" else None)
+
+    def set(self, cell, text):
+        if text.startswith("="):
+            return self.engine.set_formula(cell, text)
+        self.cells[cell] = text
+        return self.engine.cells_changed(cell[0], [cell[1:]])
+
+
+def test_parse_references_and_precedence():
+    assert parse_cell("$B$12") == (11, 1)
+    assert column_letters(0) == "A" and column_letters(27) == "AB"
+    assert parse("=-2^2") == ("bin", "^", ("neg", ("num", 2.0)), ("num", 2.0))
+    assert parse("=SUM(E2:E40)") == ("call", "SUM", [("range", None, 1, 4, 39, 4)])
+    assert parse("=A1-HSBC-USD!G10", lambda name: name == "HSBC-USD") == (
+        "bin", "-", ("cell", None, 0, 0), ("cell", "HSBC-USD", 9, 6))
+    with pytest.raises(SyntaxError):
+        parse("=SUM(")
+
+
+def test_functions_and_errors():
+    book = Book()
+    book.set(("S1", 0, 0), "1,000.00")
+    book.set(("S1", 1, 0), "(200)")
+    book.set(("S1", 2, 0), "text")
+    assert book.set(("S1", 0, 1), "=SUM(A1:A3)") == {("S1", 0, 1): 800.0}
+    assert book.set(("S1", 1, 1), "=A1/0") == {("S1", 1, 1): "#DIV/0!"}
+    assert book.set(("S1", 2, 1), "=A3+1") == {("S1", 2, 1): "#VALUE!"}
+    assert book.set(("S1", 3, 1), "=ROUND(2.5)+IF(A1>A2,1,0)*rate") == {("S1", 3, 1): 3.0 + 7.8}
+    assert book.set(("S1", 4, 1), "=Missing!A1") == {("S1", 4, 1): "#REF!"}
+    assert book.set(("S1", 5, 1), "=foo") == {("S1", 5, 1): "#NAME?"}
+
+
+def test_edits_recalculate_dependents_across_sheets():
+    book = Book()
+    book.set(("HSBC-USD", 9, 6), "100")
+    book.set(("S1", 0, 0), "=HSBC-USD!G10*rate")
+    book.set(("S1", 1, 0), "=A1+1")
+    changed = book.set(("HSBC-USD", 9, 6), "200")
+    assert changed == {("S1", 0, 0): 1560.0, ("S1", 1, 0): 1561.0}
+    assert book.set(("S1", 5, 5), "1") == {}
+
+
+def test_cycle_gives_cycle_error_and_recovers():
+    book = Book()
+    book.set(("S1", 0, 0), "=B1+1")
+    changed = book.set(("S1", 0, 1), "=A1+1")
+    assert changed[("S1", 0, 0)] == CYCLE and changed[("S1", 0, 1)] == CYCLE
+    book.set(("S1", 0, 2), "=A1*2")
+    assert book.engine.value(("S1", 0, 2)) == CYCLE
+    book.set(("S1", 0, 1), "=5")
+    assert book.engine.value(("S1", 0, 0)) == 6.0
+    assert book.engine.value(("S1", 0, 2)) == 12.0
+
+
+def test_shift_references_on_row_insert_and_delete():
+    # A row inserted inside the range grows it; a row inserted below it leaves it alone
+    assert shift_references("=SUM(E2:E40)", True, "S1", "row", 10, 1) == "=SUM(E2:E41)"
+    assert shift_references("=SUM(E2:E40)", True, "S1", "row", 40, 1) == "=SUM(E2:E40)"
+    assert shift_references("=SUM(E2:E40)+A41", True, "S1", "row", 39, 1) == "=SUM(E2:E41)+A42"
+    assert shift_references("=SUM($E$2:E40)+A5", True, "S1", "row", 4, -1) == "=SUM($E$2:E39)+#REF!"
+    assert shift_references("=SUM(E2:E3)", True, "S1", "row", 1, -2) == "=SUM(#REF!)"
+    # Unqualified references belong to the formula's own sheet
+    assert shift_references("=A5+S1!A5", False, "S1", "row", 0, 1) == "=A5+S1!A6"
+    assert shift_references("=HSBC-USD!G10*2", False, "HSBC-USD", "row", 9, -1) == "=#REF!*2"
+    assert shift_references("=A1-HSBC-USD!G10", True, "HSBC-USD", "col", 0, 1,
+                            lambda name: name == "HSBC-USD") == "=B1-HSBC-USD!H10"
+    assert shift_references("='My Sheet'!B2:C3", False, "My Sheet", "col", 1, -1) == "='My Sheet'!B2:B3"
+
+
+def test_deleted_reference_evaluates_to_ref_error():
+    book = Book()
+    book.set(("S1", 0, 0), shift_references("=A5*2", True, "S1", "row", 4, -1))
+    assert book.engine.value(("S1", 0, 0)) == "#REF!"
+
+
+def test_formulas_follow_row_insert_and_delete(window):
+    from PySide6.QtWidgets import QTableWidgetItem
+    from formula_manager import FORMULA_ROLE
+    sheet = window.sheet_manager.create_bank_sheet("T-HKD")
+    other = window.sheet_manager.create_bank_sheet("T-USD")
+    debit = sheet._label_columns()["借方"]
+    sheet.append_records([{"日期": "2025/01/01", "借方": "100"}, {"日期": "2025/01/02", "借方": "20"},
+                          {"日期": "2025/01/03", "借方": "3"}])
+    c = column_letters(debit)
+    sheet.setItem(5, debit, QTableWidgetItem(f"=SUM({c}1:{c}3)"))
+    other.setItem(0, 0, QTableWidgetItem(f"=T-HKD!{c}3*2"))
+    assert sheet.item(5, debit).text() == "123.00"
+
+    sheet.insertRows(1, 1)
+    sheet.setItem(1, debit, QTableWidgetItem("1000"))
+    assert sheet.item(6, debit).data(FORMULA_ROLE) == f"=SUM({c}1:{c}4)"
+    assert sheet.item(6, debit).text() == "1,123.00"
+    assert other.item(0, 0).data(FORMULA_ROLE) == f"=T-HKD!{c}4*2"
+
+    sheet.removeRow(3)
+    assert sheet.item(5, debit).data(FORMULA_ROLE) == f"=SUM({c}1:{c}3)"
+    assert sheet.item(5, debit).text() == "1,120.00"
+    assert other.item(0, 0).data(FORMULA_ROLE) == "=#REF!*2"
+    assert other.item(0, 0).text() == "#REF!"
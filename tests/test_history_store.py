@@ -0,0 +1,60 @@
+import os
+
+from history_store import HistoryStore
+from workbook_format import encode_section
+
+
+def sheet(name, text):
+    return {"name": name, "data": {"cells": {(0, 0): text}}}
+
+
+def record(store, header, sheets, label=""):
+    return store.record(encode_section(header), [(s["name"], encode_section(s)) for s in sheets], label)
+
+
+def test_versions_round_trip_and_share_unchanged_sheets(tmp_path):
+    store = HistoryStore(str(tmp_path / "book.history"))
+    header = {"company_name": "Co", "tab_order": ["A", "B"]}
+    first = record(store, header, [sheet("A", "a1"), sheet("B", "b1")], "first")
+    objects = sum(len(files) for _, _, files in os.walk(tmp_path / "book.history" / "objects"))
+    second = record(store, header, [sheet("A", "a2"), sheet("B", "b1")])
+
+    assert (first["id"], second["id"]) == (1, 2)
+    assert second["sheets"][1] == first["sheets"][1]
+    # Only the changed sheet was stored again
+    assert sum(len(files) for _, _, files in os.walk(tmp_path / "book.history" / "objects")) == objects + 1
+    assert store.changed_sheets(1) == ["A", "B"]
+    assert store.changed_sheets(2) == ["A"]
+    assert store.load_version(1) == dict(header, sheets=[sheet("A", "a1"), sheet("B", "b1")])
+    assert store.load_sheet(2, "A") == sheet("A", "a2")
+
+    # A fresh store reads the same history back from disk
+    reopened = HistoryStore(store.root)
+    assert [v["label"] for v in reopened.versions()] == ["first", ""]
+    assert reopened.load_version(2)["sheets"] == [sheet("A", "a2"), sheet("B", "b1")]
+
+
+def test_an_unchanged_save_is_not_a_new_version(tmp_path):
+    store = HistoryStore(str(tmp_path / "h"))
+    sections = [("A", encode_section(sheet("A", "x")))]
+    assert store.record(encode_section({}), sections) is not None
+    assert store.record(encode_section({}), sections) is None
+    assert len(store.versions()) == 1
+
+
+def test_saves_are_recorded_and_restored(window, tmp_path):
+    from PySide6.QtWidgets import QTableWidgetItem
+    manager = window.file_manager
+    table = window.sheet_manager.create_bank_sheet("T-HKD")
+    memo = table._label_columns()["摘要"]
+    table.append_records([{"日期": "2025/01/01", "摘要": "v1"}])
+    path = str(tmp_path / "book.exl")
+    manager.save_to_path(path)
+    table.setItem(0, memo, QTableWidgetItem("v2"))
+    manager.save_to_path(path)
+    assert len(manager.history().versions()) == 2
+
+    manager.restore_version(1)
+    restored = next(s for s in window.sheets if s.name == "T-HKD")
+    assert restored.item(0, memo).text() == "v1"
+    assert manager.history().versions()[-1]["label"] == "Restored version 1"
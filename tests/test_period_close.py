@@ -0,0 +1,72 @@
+from datetime import date
+
+import pytest
+from PySide6.QtCore import QDate
+
+from period_close import next_period
+
+
+def test_next_period_of_whole_months():
+    assert next_period(QDate(2025, 1, 1), QDate(2025, 1, 31)) == (QDate(2025, 2, 1), QDate(2025, 2, 28))
+    assert next_period(QDate(2025, 1, 1), QDate(2025, 3, 31)) == (QDate(2025, 4, 1), QDate(2025, 6, 30))
+    assert next_period(QDate(2024, 1, 1), QDate(2024, 12, 31)) == (QDate(2025, 1, 1), QDate(2025, 12, 31))
+
+
+def test_next_period_of_other_lengths():
+    assert next_period(QDate(2025, 1, 6), QDate(2025, 1, 12)) == (QDate(2025, 1, 13), QDate(2025, 1, 19))
+
+
+def test_close_freezes_rows_and_carries_balances_forward(window):
+    window.period_from_input.setDate(QDate(2025, 1, 1))
+    window.period_to_input.setDate(QDate(2025, 1, 31))
+    sheet = window.sheet_manager.create_bank_sheet("T-HKD")
+    sheet.append_records([
+        {"日期": "2025/01/01", "摘要": "Opening", "余额": "1000"},
+        {"日期": "2025/01/10", "对方科目": "銷售收入", "借方": "500"},
+        {"日期": "2025/01/20", "对方科目": "應付賬款", "子科目": "A公司", "贷方": "200"},
+        {"日期": "2025/02/03", "对方科目": "銀行費用", "贷方": "5"},
+    ])
+
+    snapshot = window.period_close.close(date(2025, 1, 31))
+
+    assert sheet.closed_row_count == 3
+    assert snapshot["period_to"] == "2025/01/31"
+    # 銷售收入 closes into 期初结余 with the opening balance
+    assert snapshot["balances"] == {
+        "银行存款-T-HKD": {"HKD": 1300.0},
+        "期初结余": {"HKD": -1500.0},
+        "應付賬款-A公司": {"HKD": 200.0},
+    }
+    summary = next(s for s in snapshot["sheets"] if s["name"] == "T-HKD")
+    assert summary["debit"] == {"HKD": 500.0}
+    assert summary["credit"] == {"HKD": 200.0}
+    assert summary["closing_balance"] == 1300.0
+    assert window.period_snapshots == [snapshot]
+
+    # The next period starts from the carried balances plus its own rows
+    window.period_from_input.setDate(QDate(2025, 2, 1))
+    window.period_to_input.setDate(QDate(2025, 2, 28))
+    lines = {(line.account, line.currency): line.balance for line in window.statement_manager.trial_balance()}
+    assert lines[("银行存款-T-HKD", "HKD")] == 1295.0
+    assert lines[("銀行費用", "HKD")] == 5.0
+    assert ("銷售收入", "HKD") not in lines
+    assert sum(lines.values()) == 0.0
+
+
+def test_close_refuses_rows_dated_after_the_period_above_rows_within_it(window):
+    sheet = window.sheet_manager.create_bank_sheet("T-HKD")
+    sheet.append_records([
+        {"日期": "2025/01/01", "摘要": "Opening", "余额": "1000"},
+        {"日期": "2025/02/03", "对方科目": "銀行費用", "贷方": "5"},
+        {"日期": "2025/01/20", "对方科目": "銷售收入", "借方": "500"},
+    ])
+
+    with pytest.raises(ValueError, match="row 2"):
+        window.period_close.close(date(2025, 1, 31))
+    assert sheet.closed_row_count == 0
+    assert window.period_snapshots == []
+
+    # Rows after the period at the end are simply left open
+    sheet.removeRow(1)
+    window.period_close.close(date(2025, 1, 31))
+    assert sheet.closed_row_count == 2
@@ -0,0 +1,48 @@
+from derived_sheet import DerivedSheet
+from provenance import ProvenanceIndex, RowIds
+from utils import payable_detail_columns
+
+HEADERS = list(payable_detail_columns(["HKD", "USD"]))
+
+
+def test_row_ids_move_with_their_rows():
+    ids = RowIds(3)
+    first, second, third = (ids.id_at(row) for row in range(3))
+    ids.insert_rows(1, 2)
+    assert [ids.row_of(i) for i in (first, second, third)] == [0, 3, 4]
+    ids.remove_rows(3)
+    assert ids.row_of(second) is None
+    assert ids.row_of(third) == 3 and len(ids) == 4
+    assert ids.id_at(10) is None
+    assert len({ids.id_at(row) for row in range(4)} | {RowIds(1).id_at(0)}) == 5  # unique across sheets
+
+
+def test_index_maps_source_rows_to_derived_rows(window):
+    sheet = window.sheet_manager.create_bank_sheet("T-USD")
+    sheet.append_records([{"日期": "2025/01/02", "对方科目": "應付賬款", "子科目": "A公司", "借方": "100"},
+                          {"日期": "2025/01/03", "对方科目": "銀行費用", "贷方": "5"},
+                          {"日期": "2025/01/04", "对方科目": "應付賬款", "子科目": "A公司", "贷方": "40"}])
+    table, other = object(), object()
+    derived = DerivedSheet("應付賬款-A公司", HEADERS)
+    derived.add(sheet, 0)
+    derived.add(sheet, 2)
+    index = ProvenanceIndex()
+    index.register(table, derived)
+    assert index.derived_of(sheet, 2) == [(table, 1)]
+    assert index.derived_of(sheet, 1) == []
+    assert index.affected(sheet, [1, 2]) == {table: {1}}
+    assert index.affected(sheet) == {table: {0, 1}}
+
+    # Rows inserted above the source keep the mapping
+    sheet.insertRows(0, 1)
+    assert index.derived_of(sheet, 3) == [(table, 1)]
+    assert derived.source_of(1) == (sheet, 3)
+
+    fees = DerivedSheet("銀行費用", HEADERS)
+    fees.add(sheet, 2)
+    index.register(other, fees)
+    index.unregister(table)
+    assert index.derived_of(sheet, 3) == []
+    assert index.affected(sheet, [2, 3]) == {other: {0}}
+    index.clear()
+    assert index.affected(sheet) == {}
@@ -0,0 +1,47 @@
+from search_index import SearchIndex, cell_key, split_key, terms
+
+
+def indexed():
+    index = SearchIndex()
+    index.set_sheet(1, {0: {0: "HSBC Payment", 1: "INV-2025-00417"}, 2: {0: "應付賬款 A公司"}})
+    index.set_sheet(2, {5: {3: "hsbc fee"}})
+    return index
+
+
+def found(index, query, limit=1000):
+    return [(sheet_id, row, col) for sheet_id, row, col, _ in index.search(query, limit)]
+
+
+def test_keys_and_terms():
+    assert split_key(cell_key(3, 70000, 12)) == (3, 70000, 12)
+    assert terms("INV 417") == {"inv", "417", "17", "7"}
+    assert "付賬" in terms("應付賬款")
+
+
+def test_words_match_by_prefix_case_insensitively():
+    index = indexed()
+    assert found(index, "hsbc") == [(1, 0, 0), (2, 5, 3)]
+    assert found(index, "pay HSB") == [(1, 0, 0)]
+    assert found(index, "hsbc", limit=1) == [(1, 0, 0)]
+    assert found(index, "nothing") == []
+
+
+def test_digits_and_cjk_match_anywhere():
+    index = indexed()
+    assert found(index, "0041") == [(1, 0, 1)]
+    assert found(index, "付賬") == [(1, 2, 0)]
+    assert found(index, "賬款 a公司") == [(1, 2, 0)]
+    # One character is too short for the index: the cells are scanned instead
+    assert found(index, "款") == [(1, 2, 0)]
+
+
+def test_edits_and_removed_sheets_leave_the_index():
+    index = indexed()
+    index.set_row(1, 0, {0: "Transfer"})
+    assert found(index, "hsbc") == [(2, 5, 3)]
+    assert found(index, "00417") == []
+    assert found(index, "trans") == [(1, 0, 0)]
+    index.remove_sheet(2)
+    assert found(index, "hsbc") == []
+    assert index.indexed_rows(1) == {0, 2}
+    assert len(index) == 2
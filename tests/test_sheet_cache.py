@@ -0,0 +1,65 @@
+from PySide6.QtCore import Qt
+from PySide6.QtWidgets import QTableWidgetItem
+
+from sheet_cache import SheetCache
+
+RECORDS = [
+    {"日期": "2025/01/01", "摘要": "a", "余额": "100"},
+    {"日期": "2025/01/02", "摘要": "b", "对方科目": "股本", "借方": "10"},
+    {"日期": "2025/01/03", "摘要": "c", "对方科目": "銀行費用", "贷方": "1"},
+]
+
+
+def column_texts(sheet, label, rows):
+    col = sheet._label_columns()[label]
+    return [sheet.item(row, col).text() if sheet.item(row, col) else "" for row in rows]
+
+
+def filled_sheet(window, name="T-HKD"):
+    sheet = window.sheet_manager.create_bank_sheet(name)
+    sheet.append_records(RECORDS)
+    return sheet
+
+
+def test_dehydrate_round_trip_keeps_text_and_flags(window):
+    sheet = filled_sheet(window)
+    col = sheet._label_columns()["摘要"]
+    item = QTableWidgetItem("locked")
+    item.setFlags(item.flags() & ~Qt.ItemIsEditable)
+    sheet.setItem(1, col, item)
+    assert sheet.dehydrate()
+    assert sheet.dehydrated and sheet.dehydrated_bytes() > 0
+    assert column_texts(sheet, "摘要", range(3)) == ["a", "locked", "c"]
+    assert not sheet.dehydrated
+    assert not sheet.item(1, col).flags() & Qt.ItemIsEditable
+    assert column_texts(sheet, "余额", range(3)) == ["100.00", "110.00", "109.00"]
+
+
+def test_insert_records_into_a_dehydrated_sheet_keeps_every_row(window):
+    sheet = filled_sheet(window)
+    assert sheet.dehydrate()
+    sheet.insert_records(1, [{"日期": "2025/01/01", "摘要": "NEW", "借方": "5"}])
+    assert column_texts(sheet, "摘要", range(4)) == ["a", "NEW", "b", "c"]
+    assert column_texts(sheet, "余额", range(4)) == ["100.00", "105.00", "115.00", "114.00"]
+
+
+def test_insert_rows_into_a_dehydrated_sheet_keeps_every_row(window):
+    sheet = filled_sheet(window)
+    assert sheet.dehydrate()
+    sheet.insertRows(1, 2)
+    sheet.setItem(1, sheet._label_columns()["摘要"], QTableWidgetItem("NEW"))
+    assert column_texts(sheet, "摘要", range(5)) == ["a", "NEW", "", "b", "c"]
+
+
+def test_enforce_dehydrates_least_recently_viewed_sheets(window):
+    sheets = [filled_sheet(window, f"T{i}-HKD") for i in range(3)]
+    cache = SheetCache(window, budget_mb=1e-9)
+    for sheet in sheets:
+        cache.touch(sheet)
+    window.tabs.setCurrentWidget(sheets[2])
+    dehydrated = cache.enforce()
+    assert sheets[0] in dehydrated and sheets[1] in dehydrated
+    assert sheets[2] not in dehydrated and not sheets[2].dehydrated
+    cache.budget_mb = 0
+    sheets[0].hydrate()
+    assert cache.enforce() == []
@@ -0,0 +1,28 @@
+from sheet_name_index import SheetNameIndex
+
+NAMES = ["HSBC-USD", "HSBC-HKD", "Hang Seng-USD", "應付賬款-A公司", "USD Savings"]
+
+
+def test_prefix_matches_first_then_earlier_matches():
+    index = SheetNameIndex(NAMES)
+    assert index.search("usd") == [4, 0, 2]
+    assert index.search("hsbc") == [1, 0]
+    assert index.search("hsbc-u") == [0]  # typing on filters the previous matches
+    assert index.search("賬款") == [3]
+    assert index.search("usd", limit=1) == [4]
+    assert index.search("  ") == [0, 1, 2, 3, 4]
+
+
+def test_characters_in_order_when_nothing_contains_the_query():
+    index = SheetNameIndex(NAMES)
+    assert index.search("hsusd") == [0, 2]
+    assert index.search("hsusdx") == []
+    assert index.search("hs") == [1, 0]  # a shorter query searches afresh
+
+
+def test_added_names_are_found():
+    index = SheetNameIndex(NAMES)
+    index.search("hsbc")
+    assert index.add("HSBC-EUR") == 5
+    assert index.search("hsbc") == [5, 1, 0]
+    assert len(index) == 6
@@ -0,0 +1,56 @@
+from sheet_view import ColumnValueIndex, SheetView
+
+
+def make_view(cells, **kwargs):
+    """A view over {col: {row: text}}"""
+    return SheetView(len(cells[0]), lambda col: cells.get(col, {}).items(), **kwargs), cells
+
+
+def test_column_value_index():
+    index = ColumnValueIndex([(0, "a"), (1, "b"), (2, "a")])
+    assert index.rows_with({"a"}) == {0, 2}
+    index.set_row(0, "")
+    assert index.rows_with({"a", "b"}) == {1, 2}
+    assert index.values() == ["a", "b"] and index.value_of(0) == ""
+
+
+def test_sort_keeps_empty_cells_last_in_either_direction():
+    view, _ = make_view({0: {0: "3", 1: "", 2: "10", 3: "1"}}, sort_key=float)
+    view.set_sort(0)
+    assert view.order() == [3, 0, 2, 1]
+    assert view.position(2) == 2 and view.position(1) == 3
+    view.set_sort(0, descending=True)
+    assert view.order() == [2, 0, 3, 1]
+    assert view.position(2) == 0
+
+
+def test_filters_combine_and_follow_edits():
+    view, cells = make_view({0: {0: "a", 1: "b", 2: "a", 3: "c"}, 1: {0: "x", 1: "x", 2: "y", 3: "x"}})
+    view.set_filter(0, {"a", "c"})
+    view.set_filter(1, {"x"})
+    assert view.order() == [0, 3]
+    assert not view.is_visible(2)
+    view.update_row(2, 1, "x")
+    assert view.order() == [0, 2, 3]
+    view.set_sort(0, descending=True)
+    view.update_row(0, 0, "c")
+    assert view.order() == [3, 0, 2]
+    view.update_row(0, 0, "d")  # filtered out now
+    assert view.order() == [3, 2]
+    view.set_filter(0, None)
+    view.set_filter(1, None)
+    view.set_sort(None)
+    assert view.order() == [0, 1, 2, 3] and not view.active
+
+
+def test_sort_view_on_a_sheet_leaves_the_cells_in_place(window):
+    sheet = window.sheet_manager.create_bank_sheet("T-HKD")
+    sheet.append_records([{"日期": "2025/01/02", "借方": "10", "余额": "100"},
+                          {"日期": "2025/01/01", "借方": "5"}])
+    columns = sheet._label_columns()
+    sheet.sort_view(columns["日期"])
+    header = sheet.verticalHeader()
+    assert header.visualIndex(1) == 0 and header.visualIndex(0) == 1
+    # The running 余额 stays with the logical rows
+    assert sheet.item(0, columns["余额"]).text() == "100.00"
+    assert sheet.item(1, columns["余额"]).text() == "105.00"
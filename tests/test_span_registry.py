@@ -0,0 +1,46 @@
+from span_registry import SpanRegistry
+
+
+def test_lookup_by_anchor_and_covered_cell():
+    spans = SpanRegistry([(5, 1, 3, 2), (0, 0, 2, 2)])
+    assert list(spans) == [(0, 0, 2, 2), (5, 1, 3, 2)]
+    assert spans.anchored(5, 1) == (3, 2)
+    assert spans.span_at(7, 2) == (5, 1, 3, 2)
+    assert spans.span_at(8, 2) is None
+    assert spans.in_rows(1, 5) == [(5, 1, 3, 2)]
+    assert spans.in_region(0, 1, 10, 5) == [(5, 1, 3, 2)]
+
+
+def test_overlapping_merge_replaces_spans_and_1x1_unmerges():
+    spans = SpanRegistry([(0, 0, 2, 2), (3, 0, 1, 3)])
+    assert spans.set(1, 1, 3, 1) == [(0, 0), (3, 0)]
+    assert list(spans) == [(1, 1, 3, 1)]
+    spans.set(1, 1, 1, 1)
+    assert len(spans) == 0
+
+
+def test_rows_and_columns_shift_and_resize_spans():
+    spans = SpanRegistry([(2, 0, 3, 1), (6, 0, 1, 2)])
+    spans.insert_rows(3, 2)
+    assert list(spans) == [(2, 0, 5, 1), (8, 0, 1, 2)]
+    spans.remove_rows(1, 2)
+    assert list(spans) == [(1, 0, 4, 1), (6, 0, 1, 2)]
+    spans.remove_rows(6)
+    assert list(spans) == [(1, 0, 4, 1)]
+    spans.insert_columns(0)
+    assert list(spans) == [(1, 1, 4, 1)]
+    spans = SpanRegistry([(0, 0, 1, 3)])
+    spans.remove_columns(1)
+    assert list(spans) == [(0, 0, 1, 2)]
+
+
+def test_registry_mirrors_the_view(window):
+    sheet = window.sheet_manager.create_bank_sheet("T-HKD")
+    sheet.setSpan(2, 1, 3, 2)
+    sheet.setSpan(10, 0, 2, 1)
+    sheet.insertRow(3)
+    sheet.removeRow(0)
+    sheet.insertColumn(2)
+    for row, col, rows, cols in sheet.spans:
+        assert (sheet.rowSpan(row, col), sheet.columnSpan(row, col)) == (rows, cols)
+    assert sheet.spans.to_list() == [(1, 1, 4, 3), (10, 0, 2, 1)]
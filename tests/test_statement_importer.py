@@ -0,0 +1,48 @@
+from PySide6.QtWidgets import QTableWidgetItem
+
+from statement_importer import StatementImporter, iter_statement_records, parse_amount
+
+MAPPING = {"日期": "Date", "摘要": "Description", "借方": "Deposit", "贷方": "Withdrawal", "date_format": "auto"}
+
+
+def write_statement(path, rows):
+    path.write_text("Date,Description,Deposit,Withdrawal\n" + "\n".join(rows) + "\n", encoding="utf-8")
+    return str(path)
+
+
+def column_texts(sheet, label, rows):
+    col = sheet._label_columns()[label]
+    return [sheet.item(row, col).text() if sheet.item(row, col) else "" for row in rows]
+
+
+def test_parse_amount():
+    assert parse_amount("1,234.50") == 1234.5
+    assert parse_amount("(12.00)") == -12.0
+    assert parse_amount("HK$ 9.10 CR") == 9.1
+    assert parse_amount("") is None
+
+
+def test_records_skip_totals_and_normalise(tmp_path):
+    path = write_statement(tmp_path / "s.csv", ["2025-03-01,Salary,\"1,000.00\",", "02/03/2025,Fee,,-5",
+                                                "Total,,1000,5"])
+    records = list(iter_statement_records(path, MAPPING))
+    assert [(r["日期"], r["借方"], r["贷方"]) for r in records] == [("2025/03/01", "1000.00", ""),
+                                                                  ("2025/03/02", "", "5.00")]
+
+
+def test_import_into_an_edited_sheet_continues_after_the_entries(window, tmp_path):
+    sheet = window.sheet_manager.create_bank_sheet("T-HKD")
+    columns = sheet._label_columns()
+    sheet.append_records([{"日期": "2025/02/01", "摘要": "Opening", "余额": "100", "序号": "1"},
+                          {"日期": "2025/02/02", "对方科目": "股本", "借方": "50", "序号": "2"}])
+    # An edit has recalculated 余额 down the sheet; 序号 was numbered ahead
+    sheet.setItem(1, columns["借方"], QTableWidgetItem("60"))
+    for row in range(2, 30):
+        sheet.setItem(row, columns["序号"], QTableWidgetItem(str(row + 1)))
+    assert column_texts(sheet, "余额", [1, 20]) == ["160.00", "160.00"]
+
+    path = write_statement(tmp_path / "s.csv", ["2025-03-01,Fee,,10", "2025-03-02,Interest,2.5,"])
+    assert StatementImporter(window).import_path(path, sheet, MAPPING) == 2
+    assert column_texts(sheet, "摘要", [2, 3]) == ["Fee", "Interest"]
+    assert column_texts(sheet, "余额", [2, 3, 20]) == ["150.00", "152.50", "152.50"]
+    assert sheet._first_free_row() == 4
@@ -0,0 +1,151 @@
+import pytest
+
+from statements import (BalanceSheetView, ProfitAndLossView, StatementEngine, bank_row_contributions,
+                        exchange_row_contributions, non_bank_row_contributions, period_contributions)
+
+
+def getter(values):
+    def get(label, occurrence=0):
+        value = values.get(label, "")
+        if isinstance(value, tuple):
+            return value[occurrence] if occurrence < len(value) else ""
+        return value
+    return get
+
+
+def balance_sheet(engine, rates):
+    engine.refresh(rates)
+    view = next(v for v in engine.views if isinstance(v, BalanceSheetView))
+    return dict(view.rows())
+
+
+def test_bank_row_books_both_sides():
+    get = getter({"借方": "1,000.00", "对方科目": "銷售收入", "子科目": "A公司"})
+    assert bank_row_contributions("滙豐USD", "USD", 3, get) == (
+        ("银行存款-滙豐USD", "USD", 1000.0, 0.0),
+        ("銷售收入-A公司", "USD", 0.0, 1000.0),
+    )
+
+
+def test_first_bank_row_books_opening_balance():
+    get = getter({"贷方": "100.00", "余额": "900.00", "对方科目": "銀行費用"})
+    contributions = bank_row_contributions("滙豐HKD", "HKD", 0, get)
+    assert contributions[:2] == (("银行存款-滙豐HKD", "HKD", 1000.0, 0.0), ("期初结余", "HKD", 0.0, 1000.0))
+
+
+def test_transfer_row_has_no_counterpart():
+    get = getter({"贷方": "500", "对方科目": "银行存款", "子科目": "中转"})
+    assert bank_row_contributions("滙豐USD", "USD", 5, get) == (("银行存款-滙豐USD", "USD", 0.0, 500.0),)
+
+
+def test_non_bank_row_books_each_side_to_its_account():
+    columns = ["日期", "借方科目", "子科目", "借方(USD)", "贷方科目", "子科目", "贷方(USD)"]
+    get = getter({"借方科目": "應收賬款", "子科目": ("A公司", ""), "贷方科目": "銷售收入",
+                  "借方(USD)": "200", "贷方(USD)": "200"})
+    assert non_bank_row_contributions(columns, get) == (
+        ("應收賬款-A公司", "USD", 200.0, 0.0),
+        ("銷售收入", "USD", 0.0, 200.0),
+    )
+
+
+def test_rows_before_the_period_close_profit_accounts_into_opening():
+    contributions = (("銷售收入", "USD", 0.0, 10.0), ("應收賬款", "USD", 10.0, 0.0))
+    assert period_contributions(contributions, "2024/12/31", "2025/01/01", "2025/12/31") == (
+        ("期初结余", "USD", 0.0, 10.0), ("應收賬款", "USD", 10.0, 0.0))
+    assert period_contributions(contributions, "2026/01/01", "2025/01/01", "2025/12/31") == ()
+    assert period_contributions(contributions, "2025/06/30", "2025/01/01", "2025/12/31") == contributions
+
+
+def test_transfer_difference_is_not_booked_to_an_account():
+    get = getter({"对方科目": "银行存款", "借方(HKD)": "12.00", "摘要": "USD和HKD互转"})
+    # A gain (借方 of the sheet) is credited to 汇兑损益
+    assert exchange_row_contributions(["借方(HKD)", "贷方(HKD)"], get) == (("汇兑损益", "HKD", 0.0, 12.0),)
+
+
+def test_earlier_exchange_gain_adds_to_opening_equity():
+    engine = StatementEngine()
+    engine.set_row("滙豐USD", 0, bank_row_contributions("滙豐USD", "USD", 0, getter(
+        {"借方": "100", "余额": "100", "对方科目": "應收賬款"})))
+    gain = exchange_row_contributions(["借方(HKD)"], getter(
+        {"对方科目": "银行存款", "子科目": "滙豐USD", "借方(HKD)": "10", "来源": "期末汇率"}))
+    engine.set_row("汇兑损益", 0, period_contributions(gain, "2024/12/31", "2025/01/01", "2025/12/31"))
+    rows = balance_sheet(engine, {"USD": 7.8, "HKD": 1.0})
+    assert rows["期初结余"] == 10.0
+    assert "未平衡差额" not in rows
+
+
+def _revalued_engine(account, sub):
+    """USD 500 against ``account`` at 本期 7.8, revalued at 期末 7.9"""
+    engine = StatementEngine()
+    columns = ["日期", "借方科目", "子科目", "借方(USD)", "贷方科目", "子科目", "贷方(USD)"]
+    engine.set_row("非银行交易", 0, non_bank_row_contributions(columns, getter(
+        {"借方科目": account, "子科目": (sub, ""), "贷方科目": "銷售收入",
+         "借方(USD)": "500", "贷方(USD)": "500"})))
+    revaluation = getter({"对方科目": account, "子科目": sub, "借方(HKD)": "50.00", "来源": "期末汇率"})
+    contributions = exchange_row_contributions(["借方(HKD)", "贷方(HKD)"], revaluation)
+    engine.set_row("汇兑损益", 0, contributions)
+    return engine, contributions
+
+
+def test_revaluation_is_booked_to_an_account_without_sub_account():
+    engine, contributions = _revalued_engine("應收賬款", "")
+    assert ("應收賬款", "HKD", 50.0, 0.0) in contributions
+    rows = balance_sheet(engine, {"USD": 7.8, "HKD": 1.0})
+    assert "未平衡差额" not in rows
+    assert rows["應收賬款"] == 500 * 7.8 + 50
+    assert rows["本期利润"] == 500 * 7.8 + 50
+
+
+def test_revaluation_is_booked_to_a_sub_account():
+    engine, contributions = _revalued_engine("應收賬款", "A公司")
+    assert ("應收賬款-A公司", "HKD", 50.0, 0.0) in contributions
+    assert "未平衡差额" not in balance_sheet(engine, {"USD": 7.8, "HKD": 1.0})
+
+
+def test_edited_row_only_moves_the_difference():
+    engine = StatementEngine()
+    get = getter({"借方": "100", "对方科目": "銷售收入"})
+    engine.set_row("滙豐HKD", 2, bank_row_contributions("滙豐HKD", "HKD", 2, get))
+    engine.refresh({"HKD": 1.0})
+    get = getter({"借方": "150", "对方科目": "銷售收入"})
+    engine.set_row("滙豐HKD", 2, bank_row_contributions("滙豐HKD", "HKD", 2, get))
+    changed = engine.refresh({"HKD": 1.0})
+    profit = next(v for v in engine.views if isinstance(v, ProfitAndLossView))
+    assert profit in changed
+    assert dict(profit.rows())["一、营业收入"] == 150.0
+    engine.remove_sheet("滙豐HKD")
+    assert engine.totals() == []
+
+
+def test_profit_and_loss_lines():
+    engine = StatementEngine()
+    engine.set_row("滙豐USD", 1, bank_row_contributions("滙豐USD", "USD", 1, getter(
+        {"借方": "1000", "对方科目": "銷售收入"})))
+    engine.set_row("滙豐USD", 2, bank_row_contributions("滙豐USD", "USD", 2, getter(
+        {"贷方": "10", "对方科目": "銀行費用"})))
+    engine.set_row("汇兑损益", 0, exchange_row_contributions(["借方(HKD)", "贷方(HKD)"], getter(
+        {"贷方(HKD)": "3.00"})))
+    engine.refresh({"USD": 7.8, "HKD": 1.0})
+    profit = next(v for v in engine.views if isinstance(v, ProfitAndLossView))
+    rows = profit.rows()
+    assert [line for line, _ in rows] == ["一、营业收入", "减：营业成本", "减：银行费用", "加：利息收入",
+                                          "减：汇兑损益", "二、净利润"]
+    values = dict(rows)
+    assert values["一、营业收入"] == 7800.0
+    assert values["减：银行费用"] == 78.0
+    assert values["减：汇兑损益"] == 3.0
+    assert values["二、净利润"] == 7800.0 - 78.0 - 3.0
+
+
+def test_balance_sheet_sides_and_rate_changes():
+    engine = StatementEngine()
+    engine.set_row("滙豐USD", 0, bank_row_contributions("滙豐USD", "USD", 0, getter(
+        {"借方": "100", "余额": "600", "对方科目": "應付賬款"})))
+    rows = balance_sheet(engine, {"USD": 7.8, "HKD": 1.0})
+    assert rows["货币资金"] == 600 * 7.8
+    assert rows["應付賬款"] == 100 * 7.8
+    assert rows["期初结余"] == 500 * 7.8
+    assert "未平衡差额" not in rows
+    changed = engine.refresh({"USD": 7.85, "HKD": 1.0})
+    assert len(changed) == 1 and isinstance(changed[0], BalanceSheetView)
+    assert dict(changed[0].rows())["货币资金"] == pytest.approx(600 * 7.85)
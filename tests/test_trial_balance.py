@@ -0,0 +1,46 @@
+import pytest
+
+from statements import StatementEngine, bank_row_contributions, exchange_row_contributions
+from trial_balance import account_positions, hkd_totals, trial_balance
+
+RATES = {"USD": 7.8, "EUR": 8.5, "HKD": 1.0}
+
+
+def get(values):
+    return lambda label, occurrence=0: values.get(label, "")
+
+
+def test_lines_are_sorted_with_sub_accounts_after_their_account():
+    totals = [("應收賬款-B", "USD", 10.0, 0.0), ("銀行費用", "HKD", 5.0, 0.0), ("應收賬款", "EUR", 3.0, 1.0),
+              ("應收賬款-A", "USD", 0.0, 2.0)]
+    lines = trial_balance(totals, RATES)
+    assert [(line.account, line.currency) for line in lines] == [
+        ("應收賬款", "EUR"), ("應收賬款-A", "USD"), ("應收賬款-B", "USD"), ("銀行費用", "HKD")]
+    assert lines[0].balance == 2.0
+    assert lines[0].hkd_balance == 17.0
+    assert lines[1].hkd_credit == pytest.approx(15.6)
+
+
+def test_unknown_currencies_count_at_par():
+    (line,) = trial_balance([("現金", "XYZ", 4.0, 0.0)], RATES)
+    assert line.rate == 1.0 and line.hkd_debit == 4.0
+
+
+def test_account_positions_add_up_currencies():
+    lines = trial_balance([("董事往來", "USD", 100.0, 0.0), ("董事往來", "HKD", 0.0, 80.0)], RATES)
+    assert account_positions(lines) == {"董事往來": pytest.approx(700.0)}
+
+
+def test_engine_totals_balance_at_one_rate_per_currency():
+    engine = StatementEngine()
+    engine.set_row("滙豐USD", 0, bank_row_contributions("滙豐USD", "USD", 0, get(
+        {"借方": "100", "余额": "1100", "对方科目": "銷售收入"})))
+    engine.set_row("滙豐EUR", 1, bank_row_contributions("滙豐EUR", "EUR", 1, get(
+        {"贷方": "20", "对方科目": "應付賬款", "子科目": "A公司"})))
+    engine.set_row("汇兑损益", 0, exchange_row_contributions(["借方(HKD)"], get(
+        {"借方(HKD)": "50", "对方科目": "應收賬款", "来源": "期末汇率"})))
+    lines = trial_balance(engine.totals(), RATES)
+    debit, credit = hkd_totals(lines)
+    assert debit > 0
+    assert debit == pytest.approx(credit)
+    assert ("應收賬款", "HKD") in {(line.account, line.currency) for line in lines}
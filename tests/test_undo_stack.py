@@ -0,0 +1,98 @@
+from PySide6.QtCore import Qt
+from PySide6.QtWidgets import QApplication, QTableWidgetItem
+
+from formula_engine import column_letters
+from formula_manager import FORMULA_ROLE
+from undo_stack import CellEditCommand, UndoStack
+
+
+class Cells:
+    """Just enough of a sheet for CellEditCommand"""
+
+    def __init__(self):
+        self.cells = {}
+
+    def restore_cells(self, cells):
+        for row, col, text in cells:
+            self.cells[(row, col)] = text
+
+
+def test_batches_coalesce_cell_edits_into_one_step():
+    table = Cells()
+    stack = UndoStack()
+    with stack.batch("Paste"):
+        stack.record_cell(table, 0, 0, "", "a")
+        stack.record_cell(table, 0, 0, "a", "b")
+        stack.record_cell(table, 1, 0, "x", "y")
+    assert stack.undo_label() == "Paste"
+    stack.undo()
+    assert table.cells == {(0, 0): "", (1, 0): "x"}
+    assert stack.redo_label() == "Paste"
+    stack.redo()
+    assert table.cells == {(0, 0): "b", (1, 0): "y"}
+    # A new step drops what could be redone
+    stack.undo()
+    stack.record_cell(table, 2, 0, "", "z")
+    assert not stack.can_redo()
+
+
+def test_oldest_steps_are_dropped_over_the_memory_cap():
+    table = Cells()
+    stack = UndoStack(max_bytes=1000)
+    for n in range(20):
+        stack.record_cell(table, n, 0, "", "x" * 100)
+    assert stack.memory_bytes() <= 1000
+    assert 1 <= len(stack._undo) < 20
+    stack.record_cell(table, 0, 1, "", "y" * 5000)
+    assert len(stack._undo) == 1  # the newest step is kept however large
+    command = CellEditCommand(table)
+    command.record(0, 0, "a", "b")
+    assert command.size() > 0
+
+
+def test_undo_and_redo_of_paste(window):
+    sheet = window.sheet_manager.create_bank_sheet("T-HKD")
+    columns = sheet._label_columns()
+    account = columns["对方科目"]
+    sheet.append_records([{"日期": "2025/01/01", "对方科目": "股本", "借方": "100"}])
+
+    def block():
+        return [sheet.item(r, account + c).text() if sheet.item(r, account + c) else ""
+                for r in (0, 1) for c in (0, 1)]
+
+    sheet.setCurrentCell(0, account)
+    QApplication.clipboard().setText("x\ty\nz\tw")
+    sheet.paste_cells()
+    assert block() == ["x", "y", "z", "w"]
+    assert window.undo_stack.undo_label() == "Paste"
+
+    window.undo_stack.undo()
+    assert block() == ["股本", "", "", ""]
+    window.undo_stack.redo()
+    assert block() == ["x", "y", "z", "w"]
+
+
+def test_undo_of_row_delete_restores_formulas_and_flags(window):
+    sheet = window.sheet_manager.create_bank_sheet("T-HKD")
+    columns = sheet._label_columns()
+    debit, memo = columns["借方"], columns["摘要"]
+    sheet.append_records([{"日期": "2025/01/01", "借方": "100"}, {"日期": "2025/01/02", "摘要": "fixed"}])
+    c = column_letters(debit)
+    sheet.setItem(1, debit, QTableWidgetItem(f"={c}1*2"))
+    item = sheet.item(1, memo)
+    item.setFlags(item.flags() & ~Qt.ItemIsEditable)
+
+    sheet.delete_row(1)
+    assert sheet.item(1, debit) is None or sheet.item(1, debit).text() == ""
+
+    window.undo_stack.undo()
+    assert sheet.item(1, debit).data(FORMULA_ROLE) == f"={c}1*2"
+    assert sheet.item(1, debit).text() == "200.00"
+    assert sheet.item(1, memo).text() == "fixed"
+    assert not sheet.item(1, memo).flags() & Qt.ItemIsEditable
+    # The restored formula is live again
+    sheet.item(0, debit).setText("50")
+    assert sheet.item(1, debit).text() == "100.00"
+
+    window.undo_stack.redo()
+    assert sheet.item(1, memo) is None or sheet.item(1, memo).text() == ""
@@ -0,0 +1,58 @@
+from workbook_diff import diff_sheets, diff_workbooks, main, report_lines
+from workbook_format import encode_section, write_workbook
+
+# Bank columns: 序号 日期 对方科目 子科目 借方 贷方 余额 发票号码 摘要
+DATE, DEBIT, CREDIT, BALANCE, MEMO = 1, 4, 5, 6, 8
+
+
+def bank(name, rows, **extra):
+    cells = {}
+    for row, values in enumerate(rows):
+        for col, text in values.items():
+            cells[(row, col)] = text
+    return dict({"name": name, "type": "bank", "data": {"cells": cells}}, **extra)
+
+
+ROWS = [{DATE: "2025/01/01", DEBIT: "100", BALANCE: "100", MEMO: "opening"},
+        {DATE: "2025/01/05", CREDIT: "20", BALANCE: "80", MEMO: "fee"},
+        {DATE: "2025/01/09", DEBIT: "5", BALANCE: "85", MEMO: "interest"}]
+
+
+def test_inserted_row_does_not_shift_later_rows():
+    new_rows = ROWS[:1] + [{DATE: "2025/01/02", DEBIT: "1", BALANCE: "101", MEMO: "new"}] + ROWS[1:]
+    diff = diff_sheets(bank("T", ROWS), bank("T", new_rows))
+    assert [row for row, _ in diff.added_rows] == [1]
+    assert diff.added_rows[0][1]["摘要"] == "new"
+    # 余额 is recalculated on every later row and is ignored
+    assert diff.removed_rows == [] and diff.modified_cells == []
+
+
+def test_edited_amount_is_a_modified_cell():
+    new_rows = [dict(row) for row in ROWS]
+    new_rows[1][CREDIT] = "25"
+    diff = diff_sheets(bank("T", ROWS), bank("T", new_rows))
+    assert diff.modified_cells == [(1, 1, "贷方", "20", "25")]
+    assert diff.added_rows == [] and diff.removed_rows == []
+
+
+def test_workbook_fields_and_added_and_removed_sheets():
+    old = {"company": "Co", "tab_order": ["A"], "sheets": [bank("A", ROWS), bank("Gone", ROWS[:1])]}
+    new = {"company": "Co Ltd", "tab_order": ["A"], "sheets": [bank("A", ROWS, exchange_rate=7.8), bank("B", ROWS[:2])]}
+    diff = diff_workbooks(old, new)
+    assert diff.fields == {"company": ("Co", "Co Ltd")}
+    assert [(s.name, s.status) for s in diff.sheets] == [("A", "changed"), ("B", "added"), ("Gone", "removed")]
+    assert diff.sheets[0].exchange_rate == (1.0, 7.8)
+    assert len(diff.sheets[1].added_rows) == 2
+    assert diff_workbooks(old, new, ["Gone"]).sheets[0].removed_rows[0][0] == 0
+    lines = list(report_lines(diff))
+    assert "company: 'Co' -> 'Co Ltd'" in lines
+    assert diff_workbooks(old, old).is_empty()
+    assert list(report_lines(diff_workbooks(old, old))) == ["No differences."]
+
+
+def test_cli_exit_code(tmp_path, capsys):
+    for name, rows in (("old", ROWS), ("new", ROWS[:2])):
+        write_workbook(tmp_path / f"{name}.exl", {"company": "Co"}, [encode_section(bank("T", rows))])
+    assert main([str(tmp_path / "old.exl"), str(tmp_path / "old.exl")]) == 0
+    assert main([str(tmp_path / "old.exl"), str(tmp_path / "new.exl")]) == 1
+    assert "- row 3: 日期=2025/01/09" in capsys.readouterr().out
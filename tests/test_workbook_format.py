@@ -0,0 +1,47 @@
+import pickle
+
+from workbook_format import FORMAT_VERSION, encode_section, read_workbook, write_workbook
+
+
+def test_sections_round_trip(tmp_path):
+    path = tmp_path / "book.exl"
+    sheets = [{"name": "A", "data": {"cells": {(0, 0): "x"}}}, {"name": "B", "data": {}}]
+    write_workbook(path, {"company_name": "Co"}, [encode_section(sheet) for sheet in sheets])
+    with open(path, "rb") as f:
+        data = read_workbook(f)
+    assert data == {"company_name": "Co", "version": FORMAT_VERSION, "sheets": sheets}
+    assert not (tmp_path / "book.exl.tmp").exists()
+
+
+def test_files_without_sections_still_load(tmp_path):
+    path = tmp_path / "old.exl"
+    old = {"version": "1.0", "sheets": [{"name": "A"}]}
+    path.write_bytes(pickle.dumps(old))
+    with open(path, "rb") as f:
+        assert read_workbook(f) == old
+
+
+def test_reopen_a_sectioned_save(window, tmp_path):
+    from PySide6.QtWidgets import QTableWidgetItem
+    manager = window.file_manager
+    sheet = window.sheet_manager.create_bank_sheet("T-HKD")
+    other = window.sheet_manager.create_bank_sheet("T-USD")
+    sheet.append_records([{"日期": "2025/01/01", "摘要": "first", "借方": "100", "余额": "100"}])
+    other.append_records([{"日期": "2025/01/02", "摘要": "usd"}])
+    path = str(tmp_path / "book.exl")
+    assert manager.save_to_path(path)
+    assert not manager.save_to_path(path)  # nothing changed since
+    before = dict(manager._sections)
+
+    sheet.setItem(1, sheet._label_columns()["摘要"], QTableWidgetItem("second"))
+    assert manager.save_to_path(path)
+    # Only the edited sheet was encoded again
+    assert manager._sections[other][1] is before[other][1]
+    assert manager._sections[sheet][1] is not before[sheet][1]
+
+    with open(path, "rb") as f:
+        manager.load_data_from_dict(read_workbook(f))
+    loaded = {s.name: s for s in window.sheets}
+    memo = loaded["T-HKD"]._label_columns()["摘要"]
+    assert [loaded["T-HKD"].item(row, memo).text() for row in (0, 1)] == ["first", "second"]
+    assert loaded["T-USD"].item(0, memo).text() == "usd"
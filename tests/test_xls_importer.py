@@ -0,0 +1,55 @@
+import os
+
+import pytest
+from PySide6.QtCore import QDate
+
+from statements import parse_amount
+from xls_importer import XlsImporter
+
+SAMPLE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "瑞能-賬目-2025.xls")
+
+
+def column_texts(sheet, label):
+    col = sheet._label_columns()[label]
+    return [sheet.item(row, col).text() if sheet.item(row, col) else "" for row in range(sheet._first_free_row())]
+
+
+@pytest.fixture
+def imported(window):
+    summary = XlsImporter(window).import_path(SAMPLE)
+    sheets = {sheet.name: sheet for sheet in window.sheets}
+    return window, dict(summary), sheets
+
+
+def test_bank_worksheets_become_bank_sheets(imported):
+    window, summary, sheets = imported
+    assert sheets["滙豐往來-HKD"].type == "bank"
+    assert summary["滙豐USD儲蓄 -> 滙豐儲蓄-USD"] > 0
+    assert "125.00" in column_texts(sheets["滙豐往來-HKD"], "贷方")
+
+
+def test_ledger_rows_mirroring_bank_rows_are_not_imported_twice(imported):
+    window, summary, sheets = imported
+    non_bank = next(sheet for sheet in window.sheets if sheet.type == "non_bank")
+    notes = column_texts(non_bank, "备注")
+    assert "滙豐HKD往來 / 手續費" not in notes
+    bank_worksheets = ("滙豐HKD往來", "滙豐HKD儲蓄", "滙豐USD儲蓄", "滙豐CAD儲蓄", "滙豐EUR儲蓄", "滙豐CNY儲蓄",
+                       "USD定期", "信用卡")
+    assert not [note for note in notes if note.split(" / ")[0] in bank_worksheets]
+    # 銀行費用 rows against a receivable have no bank row behind them
+    sources = column_texts(non_bank, "来源")
+    assert sum(source.startswith("銀行費用:") for source in sources) == 2
+
+
+def test_bank_fees_are_booked_once(imported):
+    window, summary, sheets = imported
+    window.period_from_input.setDate(QDate(2025, 1, 1))
+    window.period_to_input.setDate(QDate(2025, 12, 31))
+    bank = sheets["滙豐儲蓄-EUR"]
+    rows = zip(column_texts(bank, "日期"), column_texts(bank, "对方科目"), column_texts(bank, "贷方"))
+    fees = sum(parse_amount(credit) for date, account, credit in rows
+               if account == "銀行費用" and date.startswith("2025"))
+    booked = [(line.debit, line.credit) for line in window.statement_manager.trial_balance()
+              if line.account == "銀行費用" and line.currency == "EUR"]
+    assert fees > 0
+    assert booked == [(pytest.approx(fees), 0.0)]
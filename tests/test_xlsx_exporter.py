@@ -0,0 +1,26 @@
+import re
+import zipfile
+
+from xlsx_exporter import XlsxExporter
+
+
+def exported_sheet_names(path):
+    with zipfile.ZipFile(path) as archive:
+        workbook = archive.read("xl/workbook.xml").decode("utf-8")
+    return re.findall(r'<sheet name="([^"]*)"', workbook)
+
+
+def test_export_includes_sheets_without_a_tab(window, tmp_path):
+    bank = window.sheet_manager.create_bank_sheet("T-USD")
+    bank.append_records([{"日期": "2025/01/02", "对方科目": "應付賬款", "子科目": "A公司", "借方": "100"}])
+    detail = window.sheet_manager.create_payable_detail_sheet("應付賬款-A公司", open_tab=False)
+    assert window.tabs.indexOf(detail) < 0
+
+    path = tmp_path / "out.xlsx"
+    count = XlsxExporter(window).export_path(str(path))
+    names = exported_sheet_names(path)
+    assert count == len(window.sheets) == len(names)
+    assert names[-1] == "應付賬款-A公司"
+    tab_names = [window.tabs.widget(i).name for i in range(window.tabs.count())
+                 if window.tabs.widget(i) in window.sheets]
+    assert names[:len(tab_names)] == tab_names
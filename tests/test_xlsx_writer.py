@@ -0,0 +1,63 @@
+import zipfile
+from xml.etree import ElementTree
+
+from xlsx_writer import STYLE_AMOUNT, STYLE_HEADER, XlsxWriter, column_letter
+
+NS = {"m": "http://schemas.openxmlformats.org/spreadsheetml/2006/main"}
+
+
+def read_sheet(archive, index):
+    root = ElementTree.fromstring(archive.read(f"xl/worksheets/sheet{index}.xml"))
+    cells = {}
+    for cell in root.iter(f"{{{NS['m']}}}c"):
+        value = cell.find("m:v", NS)
+        text = cell.find("m:is/m:t", NS)
+        cells[cell.get("r")] = (value.text if value is not None else text.text if text is not None else None,
+                                cell.get("s"))
+    merges = [merge.get("ref") for merge in root.iter(f"{{{NS['m']}}}mergeCell")]
+    return cells, merges
+
+
+def test_column_letters():
+    assert [column_letter(n) for n in (0, 25, 26, 701, 702)] == ["A", "Z", "AA", "ZZ", "AAA"]
+
+
+def test_cells_styles_and_merges(tmp_path):
+    path = tmp_path / "out.xlsx"
+    merges = []
+
+    def rows():
+        yield [("日期", STYLE_HEADER), ("金额", STYLE_HEADER)]
+        yield ["a < b & c", (1234.5, STYLE_AMOUNT), None, ""]
+        merges.append((0, 0, 1, 2))  # filled while the rows are written
+        yield [" padded\x01", 7]
+
+    with XlsxWriter(path) as writer:
+        assert writer.write_sheet("Sheet:1", rows(), merges, column_widths=[12, 8], freeze_rows=1) == "Sheet_1"
+
+    with zipfile.ZipFile(path) as archive:
+        assert archive.testzip() is None
+        cells, merge_refs = read_sheet(archive, 1)
+        xml = archive.read("xl/worksheets/sheet1.xml").decode("utf-8")
+    assert cells == {"A1": ("日期", "1"), "B1": ("金额", "1"), "A2": ("a < b & c", None),
+                     "B2": ("1234.5", "2"), "A3": (" padded", None), "B3": ("7", None)}
+    assert merge_refs == ["A1:B1"]
+    assert 'state="frozen"' in xml and 'customWidth="1"' in xml
+
+
+def test_sheet_names_are_unique_and_short(tmp_path):
+    path = tmp_path / "names.xlsx"
+    with XlsxWriter(path) as writer:
+        names = [writer.write_sheet(name, [[1]]) for name in ("Bank", "bank", "x" * 40, "[a]/b")]
+    assert names == ["Bank", "bank (2)", "x" * 31, "_a__b"]
+    with zipfile.ZipFile(path) as archive:
+        workbook = ElementTree.fromstring(archive.read("xl/workbook.xml"))
+        assert [s.get("name") for s in workbook.iter(f"{{{NS['m']}}}sheet")] == names
+        assert "xl/styles.xml" in archive.namelist()
+
+
+def test_an_empty_workbook_still_has_a_sheet(tmp_path):
+    path = tmp_path / "empty.xlsx"
+    XlsxWriter(path).close()
+    with zipfile.ZipFile(path) as archive:
+        assert "xl/worksheets/sheet1.xml" in archive.namelist()
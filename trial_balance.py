@@ -0,0 +1,61 @@
+"""Consolidated trial balance: every account's totals per currency, with HKD equivalents.
+
+The lines are read from the statement engine's per-(account, currency)
+aggregates, which are kept up to date row by row as bank, non-bank and
+汇兑损益 rows change (see statements.py), so a report is one pass over the
+accounts rather than over every row. Amounts are restricted to the period as
+for the statements. Nothing here depends on Qt.
+"""
+from statements import top_account
+
+
+class TrialBalanceLine:
+    __slots__ = ("account", "currency", "debit", "credit", "rate")
+
+    def __init__(self, account, currency, debit, credit, rate):
+        self.account = account
+        self.currency = currency
+        self.debit = debit
+        self.credit = credit
+        self.rate = rate
+
+    @property
+    def balance(self):
+        return self.debit - self.credit
+
+    @property
+    def hkd_debit(self):
+        return self.debit * self.rate
+
+    @property
+    def hkd_credit(self):
+        return self.credit * self.rate
+
+    @property
+    def hkd_balance(self):
+        return self.balance * self.rate
+
+
+def trial_balance(totals, rates):
+    """Lines of ``totals`` [(account, currency, debit, credit)] at ``rates`` {currency: HKD rate}.
+
+    Sorted by account then currency, so sub-accounts follow their account.
+    """
+    return sorted(
+        (TrialBalanceLine(account, currency, debit, credit, rates.get(currency, 1.0))
+         for account, currency, debit, credit in totals),
+        key=lambda line: (top_account(line.account), line.account, line.currency),
+    )
+
+
+def hkd_totals(lines):
+    """(HKD debit, HKD credit) over ``lines``; equal when the books balance at one rate per currency"""
+    return sum(line.hkd_debit for line in lines), sum(line.hkd_credit for line in lines)
+
+
+def account_positions(lines):
+    """{account: HKD balance} over every currency of each account"""
+    positions = {}
+    for line in lines:
+        positions[line.account] = positions.get(line.account, 0.0) + line.hkd_balance
+    return positions
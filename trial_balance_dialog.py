@@ -0,0 +1,93 @@
+import time
+from PySide6.QtWidgets import (QDialog, QVBoxLayout, QHBoxLayout, QLabel, QPushButton, QTableWidget,
+                               QTableWidgetItem, QAbstractItemView)
+from PySide6.QtCore import Qt
+from PySide6.QtGui import QColor, QFont
+from trial_balance import account_positions, hkd_totals
+from utils import format_number
+
+
+class TrialBalanceDialog(QDialog):
+    """File -> Trial Balance: every account's totals per currency across all bank and non-bank sheets.
+
+    Accounts held in more than one currency get a 合计 line with their HKD position.
+    """
+
+    HEADERS = ["科目", "币种", "借方", "贷方", "余额", "汇率", "借方(HKD)", "贷方(HKD)", "余额(HKD)"]
+
+    def __init__(self, parent=None, statement_manager=None):
+        super().__init__(parent)
+        self.setWindowTitle("Trial Balance")
+        self.statement_manager = statement_manager
+        layout = QVBoxLayout(self)
+
+        self.summary_label = QLabel("")
+        self.summary_label.setWordWrap(True)
+        layout.addWidget(self.summary_label)
+
+        self.lines_table = QTableWidget(0, len(self.HEADERS))
+        self.lines_table.setHorizontalHeaderLabels(self.HEADERS)
+        self.lines_table.verticalHeader().setVisible(False)
+        self.lines_table.setEditTriggers(QAbstractItemView.NoEditTriggers)
+        self.lines_table.setSelectionBehavior(QAbstractItemView.SelectRows)
+        layout.addWidget(self.lines_table)
+
+        buttons = QHBoxLayout()
+        buttons.addStretch()
+        refresh_button = QPushButton("Refresh")
+        refresh_button.clicked.connect(self.refresh)
+        buttons.addWidget(refresh_button)
+        layout.addLayout(buttons)
+        self.resize(960, 560)
+
+    def refresh(self):
+        start = time.perf_counter()
+        lines = self.statement_manager.trial_balance()
+        elapsed = time.perf_counter() - start
+        self.show_lines(lines)
+        self.summary_label.setText(f"{self.summary_label.text()}\nComputed in {elapsed * 1000:.0f} ms.")
+
+    def show_lines(self, lines):
+        positions = account_positions(lines)
+        counts = {}
+        for line in lines:
+            counts[line.account] = counts.get(line.account, 0) + 1
+        rows = []
+        for i, line in enumerate(lines):
+            rows.append((line.account, line.currency, line.debit, line.credit, line.balance, line.rate,
+                         line.hkd_debit, line.hkd_credit, line.hkd_balance))
+            last = i + 1 == len(lines) or lines[i + 1].account != line.account
+            if last and counts[line.account] > 1:
+                rows.append((f"{line.account} 合计", "HKD", None, None, None, None, None, None,
+                             positions[line.account]))
+
+        self.lines_table.setRowCount(len(rows))
+        bold = QFont()
+        bold.setBold(True)
+        for i, values in enumerate(rows):
+            subtotal = values[2] is None
+            for j, value in enumerate(values):
+                if value is None:
+                    text = ""
+                elif j == 5:
+                    text = f"{value:.4f}"
+                elif isinstance(value, float):
+                    text = format_number(round(value, 2))
+                else:
+                    text = value
+                item = QTableWidgetItem(text)
+                if j >= 2:
+                    item.setTextAlignment(Qt.AlignRight | Qt.AlignVCenter)
+                if subtotal:
+                    item.setFont(bold)
+                    item.setBackground(QColor(240, 240, 240))
+                self.lines_table.setItem(i, j, item)
+        self.lines_table.resizeColumnToContents(0)
+
+        debit, credit = hkd_totals(lines)
+        text = (f"{len(positions)} accounts, {len(lines)} account/currency lines. "
+                f"借方合计 HKD {format_number(round(debit, 2))}, "
+                f"贷方合计 HKD {format_number(round(credit, 2))}.")
+        if abs(debit - credit) >= 0.005:
+            text += f"\n⚠ Out of balance by HKD {format_number(round(debit - credit, 2))}."
+        self.summary_label.setText(text)
@@ -0,0 +1,320 @@
+"""Workbook undo/redo as a stack of compact diff commands.
+
+Commands keep only what changed (cell texts before/after, one row or column,
+spans, names) and call back into the sheet to apply it, so a 10k-cell paste
+is one command holding 10k (old, new) pairs rather than a copy of the sheet.
+Everything recorded inside ``batch()`` becomes one undo step. The history is
+capped by an estimate of its memory; the oldest steps are dropped first.
+"""
+from contextlib import contextmanager
+
+# Rough per-entry overhead (tuple, dict slot, small ints) added to the string sizes
+_ENTRY_BYTES = 120
+
+
+def _text_bytes(*texts):
+    return sum(len(t) * 2 + 50 for t in texts if t)
+
+
+class CellEditCommand:
+    """Changed cell texts of one sheet: {(row, col): [old, new]}"""
+
+    def __init__(self, table):
+        self.table = table
+        self.changes = {}
+
+    def record(self, row, col, old, new):
+        change = self.changes.get((row, col))
+        if change is None:
+            self.changes[(row, col)] = [old, new]
+        else:
+            change[1] = new  # keep the first old text, the last new one
+
+    def undo(self):
+        self.table.restore_cells([(row, col, old) for (row, col), (old, _) in self.changes.items()])
+
+    def redo(self):
+        self.table.restore_cells([(row, col, new) for (row, col), (_, new) in self.changes.items()])
+
+    def size(self):
+        return sum(_ENTRY_BYTES + _text_bytes(old, new) for old, new in self.changes.values())
+
+    def tables(self):
+        return {self.table}
+
+
+class RowCommand:
+    """A row inserted (``inserted``) or removed, with the removed row's cells: formula or text, and flags"""
+
+    def __init__(self, table, row, inserted, cells=None, flags=None):
+        self.table = table
+        self.row = row
+        self.inserted = inserted
+        self.cells = cells or {}  # col -> formula or text
+        self.flags = flags or {}  # col -> item flags, where not the default
+
+    def _insert(self):
+        self.table.insertRow(self.row)
+        if self.flags:
+            self.table.restore_flags([(self.row, col, flags) for col, flags in self.flags.items()])
+        if self.cells:
+            self.table.restore_cells([(self.row, col, text) for col, text in self.cells.items()])
+
+    def undo(self):
+        if self.inserted:
+            self.table.removeRow(self.row)
+        else:
+            self._insert()
+
+    def redo(self):
+        if self.inserted:
+            self._insert()
+        else:
+            self.table.removeRow(self.row)
+
+    def size(self):
+        return _ENTRY_BYTES * (1 + len(self.flags)) + sum(
+            _ENTRY_BYTES + _text_bytes(t) for t in self.cells.values())
+
+    def tables(self):
+        return {self.table}
+
+
+class ColumnCommand:
+    """A column inserted or removed, with the removed column's header label and cells: formula or text, and flags"""
+
+    def __init__(self, table, col, inserted, label="", cells=None, flags=None):
+        self.table = table
+        self.col = col
+        self.inserted = inserted
+        self.label = label
+        self.cells = cells or {}  # row -> formula or text
+        self.flags = flags or {}  # row -> item flags, where not the default
+
+    def _insert(self):
+        self.table.insertColumn(self.col)
+        if self.label:
+            self.table.set_column_label(self.col, self.label)
+        if self.flags:
+            self.table.restore_flags([(row, self.col, flags) for row, flags in self.flags.items()])
+        if self.cells:
+            self.table.restore_cells([(row, self.col, text) for row, text in self.cells.items()])
+
+    def undo(self):
+        if self.inserted:
+            self.table.removeColumn(self.col)
+        else:
+            self._insert()
+
+    def redo(self):
+        if self.inserted:
+            self._insert()
+        else:
+            self.table.removeColumn(self.col)
+
+    def size(self):
+        return _ENTRY_BYTES * (1 + len(self.flags)) + _text_bytes(self.label) + sum(
+            _ENTRY_BYTES + _text_bytes(t) for t in self.cells.values())
+
+    def tables(self):
+        return {self.table}
+
+
+class SpanCommand:
+    """Merge/unmerge: the spans anchored in a region before and after, as (row, col, rows, cols)"""
+
+    def __init__(self, table, before, after):
+        self.table = table
+        self.before = list(before)
+        self.after = list(after)
+
+    def _apply(self, spans):
+        self.table.restore_spans({(r, c) for r, c, _, _ in self.before + self.after}, spans)
+
+    def undo(self):
+        self._apply(self.before)
+
+    def redo(self):
+        self._apply(self.after)
+
+    def size(self):
+        return _ENTRY_BYTES * (1 + len(self.before) + len(self.after))
+
+    def tables(self):
+        return {self.table}
+
+
+class RenameCommand:
+    """Sheet rename: (name, currency) before and after"""
+
+    def __init__(self, table, before, after):
+        self.table = table
+        self.before = before
+        self.after = after
+
+    def undo(self):
+        self.table.apply_name(*self.before)
+
+    def redo(self):
+        self.table.apply_name(*self.after)
+
+    def size(self):
+        return _ENTRY_BYTES + _text_bytes(*self.before, *self.after)
+
+    def tables(self):
+        return {self.table}
+
+
+class BatchCommand:
+    """Several commands undone and redone as one step (cell edits coalesce per sheet)"""
+
+    def __init__(self, label):
+        self.label = label
+        self.commands = []
+        self._cells = {}  # table -> CellEditCommand in self.commands
+
+    def record_cell(self, table, row, col, old, new):
+        command = self._cells.get(table)
+        if command is None:
+            command = self._cells[table] = CellEditCommand(table)
+            self.commands.append(command)
+        command.record(row, col, old, new)
+
+    def add(self, command):
+        self.commands.append(command)
+        # Cell edits after a structural change must not be merged into edits made before it
+        self._cells = {}
+
+    def undo(self):
+        for command in reversed(self.commands):
+            command.undo()
+
+    def redo(self):
+        for command in self.commands:
+            command.redo()
+
+    def size(self):
+        return _ENTRY_BYTES + sum(command.size() for command in self.commands)
+
+    def tables(self):
+        tables = set()
+        for command in self.commands:
+            tables |= command.tables()
+        return tables
+
+
+class UndoStack:
+    def __init__(self, max_bytes=32 * 1024 * 1024, changed_callback=None):
+        self.max_bytes = max_bytes
+        self.changed_callback = changed_callback  # called after every push/undo/redo
+        self._undo = []  # [(label, command, size)]
+        self._redo = []
+        self._bytes = 0
+        self._batch = None
+        self._batch_depth = 0
+        self.applying = False  # True while undoing/redoing: changes are not recorded
+
+    def can_undo(self):
+        return bool(self._undo)
+
+    def can_redo(self):
+        return bool(self._redo)
+
+    def undo_label(self):
+        return self._undo[-1][0] if self._undo else ""
+
+    def redo_label(self):
+        return self._redo[-1][0] if self._redo else ""
+
+    def memory_bytes(self):
+        return self._bytes
+
+    @contextmanager
+    def batch(self, label):
+        """Everything recorded inside becomes one undo step; batches may nest"""
+        if self._batch_depth == 0:
+            self._batch = BatchCommand(label)
+        self._batch_depth += 1
+        try:
+            yield self._batch
+        finally:
+            self._batch_depth -= 1
+            if self._batch_depth == 0:
+                batch, self._batch = self._batch, None
+                if batch.commands:
+                    self._push(batch.label, batch)
+
+    def record_cell(self, table, row, col, old, new, label="Edit Cell"):
+        if self.applying or old == new:
+            return
+        if self._batch is not None:
+            self._batch.record_cell(table, row, col, old, new)
+        else:
+            command = CellEditCommand(table)
+            command.record(row, col, old, new)
+            self._push(label, command)
+
+    def push(self, label, command):
+        if self.applying:
+            return
+        if self._batch is not None:
+            self._batch.add(command)
+        else:
+            self._push(label, command)
+
+    def _push(self, label, command):
+        size = command.size()
+        self._undo.append((label, command, size))
+        self._bytes += size - sum(entry[2] for entry in self._redo)
+        self._redo = []
+        self._evict()
+        self._changed()
+
+    def _evict(self):
+        # Oldest first; the newest step is always kept, however large
+        drop = 0
+        while drop < len(self._undo) - 1 and self._bytes > self.max_bytes:
+            self._bytes -= self._undo[drop][2]
+            drop += 1
+        if drop:
+            del self._undo[:drop]
+
+    def undo(self):
+        if not self._undo:
+            return
+        entry = self._undo.pop()
+        self._run(entry[1].undo)
+        self._redo.append(entry)
+        self._changed()
+
+    def redo(self):
+        if not self._redo:
+            return
+        entry = self._redo.pop()
+        self._run(entry[1].redo)
+        self._undo.append(entry)
+        self._changed()
+
+    def _run(self, action):
+        self.applying = True
+        try:
+            action()
+        finally:
+            self.applying = False
+
+    def discard(self, table):
+        """Drop every step touching ``table`` (deleted or replaced sheets)"""
+        self._undo = [e for e in self._undo if table not in e[1].tables()]
+        self._redo = [e for e in self._redo if table not in e[1].tables()]
+        self._bytes = sum(e[2] for e in self._undo + self._redo)
+        self._changed()
+
+    def clear(self):
+        self._undo = []
+        self._redo = []
+        self._bytes = 0
+        self._changed()
+
+    def _changed(self):
+        if self.changed_callback:
+            self.changed_callback()
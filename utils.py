@@ -1,3 +1,26 @@
+from datetime import date, datetime
+from currencies import LEGACY_CURRENCIES, currency_columns
+
+# Columns of new bank sheets
+BANK_COLUMNS = ("序号", "日期", "对方科目", "子科目", "借方", "贷方", "余额", "发票号码", "摘要")
+_NON_BANK_LEADING = ("序号", "日期", "借方科目", "子科目", "贷方科目", "子科目")
+_NON_BANK_TRAILING = ("备注", "来源")
+_PAYABLE_DETAIL_LEADING = ("序号", "日期", "对方科目", "子科目", "发票号码")
+_PAYABLE_DETAIL_TRAILING = ("余额", "摘要", "来源")
+# 非银行交易 sheets saved without their headers had a column pair for every legacy currency
+NON_BANK_COLUMNS = _NON_BANK_LEADING + currency_columns(LEGACY_CURRENCIES) + _NON_BANK_TRAILING
+
+
+def non_bank_columns(currencies):
+    """Columns of a new 非银行交易 sheet with 借方/贷方 columns for ``currencies``"""
+    return _NON_BANK_LEADING + currency_columns(currencies) + _NON_BANK_TRAILING
+
+
+def payable_detail_columns(currencies):
+    """Columns of a new payable detail sheet with 借方/贷方 columns for ``currencies``"""
+    return _PAYABLE_DETAIL_LEADING + currency_columns(currencies) + _PAYABLE_DETAIL_TRAILING
+
+
 def format_number(value):
     """Format a number with commas, 2 decimals, and parentheses for negatives."""
     try:
@@ -7,3 +30,37 @@ def format_number(value):
     except Exception:
         return str(value)
 
+
+
+DATE_FORMATS = ("%Y/%m/%d", "%m/%d/%y", "%Y-%m-%d", "%m-%d-%y", "%Y.%m.%d", "%d/%m/%Y", "%Y%m%d")
+
+
+def parse_date(value):
+    """Parse a cell date (text, datetime or date) into a datetime.date, or None."""
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    text = str(value).strip() if value is not None else ""
+    if not text:
+        return None
+    for fmt in DATE_FORMATS:
+        try:
+            return datetime.strptime(text, fmt).date()
+        except ValueError:
+            continue
+    return None
+
+
+def format_date(value):
+    """Format a date as the yyyy/MM/dd text used in sheets."""
+    # Formatted by hand: strftime is comparatively slow when called per imported row
+    return f"{value.year:04d}/{value.month:02d}/{value.day:02d}"
+
+
+def normalize_date(value):
+    """Return a date as yyyy/MM/dd text; unparseable text is kept as-is."""
+    parsed = parse_date(value)
+    if parsed is None:
+        return str(value).strip() if value is not None else ""
+    return format_date(parsed)
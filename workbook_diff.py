@@ -0,0 +1,248 @@
+"""Compare two workbooks sheet by sheet: added, removed and modified rows and cells.
+
+Rows are aligned by a key (日期, the amount columns and 摘要/备注) through a
+hash table rather than by position, so inserting a row early in a sheet does
+not make every later row look changed. Rows left over are paired a second
+time on 日期 + 摘要 alone, so an edited amount shows as a modified cell rather
+than a removed and an added row. Both passes are linear in the number of rows.
+
+    python workbook_diff.py last_month.exl this_month.exl [--sheet NAME]
+"""
+import sys
+from collections import defaultdict
+
+from statements import parse_amount
+from utils import BANK_COLUMNS, NON_BANK_COLUMNS, normalize_date
+
+# Derived columns: renumbered or recalculated whenever a row is inserted above them
+IGNORED_LABELS = ("序号", "余额")
+
+_DEFAULT_COLUMNS = {"bank": BANK_COLUMNS, "non_bank": NON_BANK_COLUMNS}
+
+
+def _is_amount(label):
+    return label.startswith("借方") or label.startswith("贷方")
+
+
+class SheetDiff:
+    """Differences of one sheet; rows are 0-based, cells are {label: text}"""
+
+    def __init__(self, name, status="changed"):
+        self.name = name
+        self.status = status  # "added", "removed" or "changed"
+        self.added_rows = []  # [(new row, cells)]
+        self.removed_rows = []  # [(old row, cells)]
+        self.modified_cells = []  # [(old row, new row, label, old text, new text)]
+        self.exchange_rate = None  # (old, new) when it changed
+
+    def is_empty(self):
+        return (self.status == "changed" and not self.added_rows and not self.removed_rows
+                and not self.modified_cells and self.exchange_rate is None)
+
+
+class WorkbookDiff:
+    def __init__(self):
+        self.fields = {}  # workbook field -> (old, new): company, period_from, period_to, exchange_rates
+        self.tab_order = None  # (old, new) when it changed
+        self.sheets = []  # non-empty SheetDiffs
+
+    def is_empty(self):
+        return not self.fields and self.tab_order is None and not self.sheets
+
+
+def _labels(sheet):
+    data = sheet["data"]
+    labels = list(data.get("headers") or _DEFAULT_COLUMNS.get(sheet.get("type"), ()))
+    cols = data.get("cols", len(labels))
+    labels += [f"列{col + 1}" for col in range(len(labels), cols)]
+    return labels
+
+
+def _rows(sheet, columns=None):
+    """{row: {col: text}} of a saved sheet, columns renumbered through ``columns``"""
+    rows = defaultdict(dict)
+    for (row, col), text in sheet["data"]["cells"].items():
+        rows[row][columns.get(col, col) if columns else col] = text
+    return rows
+
+
+def _match_columns(old_labels, new_labels):
+    """Old column -> new column by label (the n-th 子科目 to the n-th 子科目), and the combined labels.
+
+    Old columns without a match are numbered after the new ones, so their cells show as cleared.
+    """
+    seen = defaultdict(int)
+    positions = {}
+    for col, label in enumerate(new_labels):
+        positions[(label, seen[label])] = col
+        seen[label] += 1
+    seen.clear()
+    labels = list(new_labels)
+    columns = {}
+    for col, label in enumerate(old_labels):
+        target = positions.get((label, seen[label]))
+        seen[label] += 1
+        if target is None:
+            target = len(labels)
+            labels.append(label)
+        columns[col] = target
+    return columns, labels
+
+
+class _Layout:
+    """Column roles of a sheet, by header label"""
+
+    def __init__(self, labels):
+        self.labels = labels
+        self.date = [c for c, label in enumerate(labels) if label == "日期"]
+        self.amounts = [c for c, label in enumerate(labels) if _is_amount(label)]
+        self.text = [c for c, label in enumerate(labels) if label in ("摘要", "备注")]
+        self.ignored = {c for c, label in enumerate(labels) if label in IGNORED_LABELS}
+        self._dates = {}  # text -> normalized date; a sheet has few distinct dates
+
+    def _date(self, text):
+        date = self._dates.get(text)
+        if date is None:
+            date = self._dates[text] = normalize_date(text)
+        return date
+
+    def label(self, col):
+        return self.labels[col] if col < len(self.labels) else f"列{col + 1}"
+
+    def key(self, cells):
+        """Full key: date, amounts and description"""
+        return (tuple(self._date(cells.get(c, "")) for c in self.date)
+                + tuple(parse_amount(cells.get(c, "")) for c in self.amounts)
+                + tuple(cells.get(c, "").strip() for c in self.text))
+
+    def loose_key(self, cells):
+        """Date and description only, for pairing rows whose amounts changed"""
+        return (tuple(self._date(cells.get(c, "")) for c in self.date)
+                + tuple(cells.get(c, "").strip() for c in self.text))
+
+
+def _align(old_rows, new_rows, old_ids, new_ids, key):
+    """Pair rows with equal keys, in row order; returns (pairs, unpaired old ids, unpaired new ids)"""
+    by_key = defaultdict(list)
+    for row in reversed(old_ids):
+        by_key[key(old_rows[row])].append(row)  # reversed, so pop() yields the first row
+    pairs = []
+    unpaired_new = []
+    for row in new_ids:
+        candidates = by_key.get(key(new_rows[row]))
+        if candidates:
+            pairs.append((candidates.pop(), row))
+        else:
+            unpaired_new.append(row)
+    paired_old = {old for old, _ in pairs}
+    return pairs, [row for row in old_ids if row not in paired_old], unpaired_new
+
+
+def diff_sheets(old, new):
+    """SheetDiff of two saved sheet dicts of the same name"""
+    result = SheetDiff(new["name"])
+    if old.get("exchange_rate", 1.0) != new.get("exchange_rate", 1.0):
+        result.exchange_rate = (old.get("exchange_rate", 1.0), new.get("exchange_rate", 1.0))
+    # Columns are matched by label, so an inserted or deleted column does not shift the others
+    columns, labels = _match_columns(_labels(old), _labels(new))
+    layout = _Layout(labels)
+    old_rows, new_rows = _rows(old, columns), _rows(new)
+    pairs, removed, added = _align(old_rows, new_rows, sorted(old_rows), sorted(new_rows), layout.key)
+    if layout.date or layout.text:
+        loose_pairs, removed, added = _align(old_rows, new_rows, removed, added, layout.loose_key)
+        pairs += loose_pairs
+    pairs.sort(key=lambda pair: pair[1])
+    for old_row, new_row in pairs:
+        old_cells, new_cells = old_rows[old_row], new_rows[new_row]
+        if old_cells == new_cells:
+            continue
+        for col in sorted(old_cells.keys() | new_cells.keys()):
+            if col in layout.ignored:
+                continue
+            before, after = old_cells.get(col, ""), new_cells.get(col, "")
+            if before.strip() != after.strip():
+                result.modified_cells.append((old_row, new_row, layout.label(col), before, after))
+    result.removed_rows = [(row, {layout.label(c): t for c, t in sorted(old_rows[row].items())}) for row in removed]
+    result.added_rows = [(row, {layout.label(c): t for c, t in sorted(new_rows[row].items())}) for row in added]
+    return result
+
+
+def diff_workbooks(old, new, sheet_names=None):
+    """WorkbookDiff of two workbook dicts (as read by workbook_format.read_workbook)"""
+    result = WorkbookDiff()
+    for field in ("company", "period_from", "period_to", "exchange_rates"):
+        if old.get(field) != new.get(field):
+            result.fields[field] = (old.get(field), new.get(field))
+    if old.get("tab_order") != new.get("tab_order"):
+        result.tab_order = (old.get("tab_order"), new.get("tab_order"))
+    old_sheets = {sheet["name"]: sheet for sheet in old.get("sheets", [])}
+    new_sheets = {sheet["name"]: sheet for sheet in new.get("sheets", [])}
+    names = list(new_sheets) + [name for name in old_sheets if name not in new_sheets]
+    for name in names:
+        if sheet_names and name not in sheet_names:
+            continue
+        if name not in old_sheets:
+            sheet = SheetDiff(name, "added")
+            sheet.added_rows = diff_sheets({"name": name, "data": {"cells": {}}}, new_sheets[name]).added_rows
+        elif name not in new_sheets:
+            sheet = SheetDiff(name, "removed")
+            sheet.removed_rows = diff_sheets(old_sheets[name], {"name": name, "data": {"cells": {}}}).removed_rows
+        else:
+            sheet = diff_sheets(old_sheets[name], new_sheets[name])
+        if not sheet.is_empty():
+            result.sheets.append(sheet)
+    return result
+
+
+def _row_text(cells):
+    return "  ".join(f"{label}={text}" for label, text in cells.items())
+
+
+def report_lines(diff):
+    """Plain-text report; rows are shown 1-based as in the sheets"""
+    if diff.is_empty():
+        yield "No differences."
+        return
+    for field, (before, after) in diff.fields.items():
+        if field == "exchange_rates":
+            yield "exchange_rates: registry changed"
+        else:
+            yield f"{field}: {before!r} -> {after!r}"
+    if diff.tab_order is not None:
+        before, after = diff.tab_order
+        yield f"tab_order: {before} -> {after}"
+    for sheet in diff.sheets:
+        yield ""
+        yield f"[{sheet.name}] {sheet.status}: +{len(sheet.added_rows)} rows, -{len(sheet.removed_rows)} rows, " \
+              f"{len(sheet.modified_cells)} cells modified"
+        if sheet.exchange_rate is not None:
+            yield f"  exchange_rate: {sheet.exchange_rate[0]} -> {sheet.exchange_rate[1]}"
+        for row, cells in sheet.removed_rows:
+            yield f"  - row {row + 1}: {_row_text(cells)}"
+        for row, cells in sheet.added_rows:
+            yield f"  + row {row + 1}: {_row_text(cells)}"
+        for old_row, new_row, label, before, after in sheet.modified_cells:
+            yield f"  ~ row {old_row + 1}->{new_row + 1} {label}: {before!r} -> {after!r}"
+
+
+def main(argv=None):
+    import argparse
+    from workbook_format import read_workbook
+
+    parser = argparse.ArgumentParser(description="Compare two .exl workbooks sheet by sheet")
+    parser.add_argument("old")
+    parser.add_argument("new")
+    parser.add_argument("--sheet", action="append", help="only compare this sheet (repeatable)")
+    args = parser.parse_args(argv)
+    with open(args.old, "rb") as f:
+        old = read_workbook(f)
+    with open(args.new, "rb") as f:
+        new = read_workbook(f)
+    diff = diff_workbooks(old, new, args.sheet)
+    for line in report_lines(diff):
+        print(line)
+    return 1 if not diff.is_empty() else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,33 @@
+""".exl workbook files: a pickled dict whose sheets are stored as separately pickled sections.
+
+Each sheet is encoded on its own, so a save can reuse the bytes of sheets
+that did not change and only encode the dirty ones. Files written before
+sections (``"sheets"`` holding the sheet dicts directly) still load.
+"""
+import os
+import pickle
+
+FORMAT_VERSION = "2.0"
+
+
+def encode_section(obj):
+    return pickle.dumps(obj, pickle.HIGHEST_PROTOCOL)
+
+
+def write_workbook(path, header, sections):
+    """Write ``header`` (everything but the sheets) and the encoded sheet ``sections``"""
+    data = dict(header, version=FORMAT_VERSION, sheet_sections=list(sections))
+    # Write beside the file and swap it in, so a failed save leaves the previous file intact
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as f:
+        pickle.dump(data, f, pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp_path, path)
+
+
+def read_workbook(f):
+    """Workbook dict with ``"sheets"`` decoded, from either file layout"""
+    data = pickle.load(f)
+    sections = data.pop("sheet_sections", None)
+    if sections is not None:
+        data["sheets"] = [pickle.loads(section) for section in sections]
+    return data
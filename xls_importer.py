@@ -0,0 +1,336 @@
+import logging
+import os
+import time
+from PySide6.QtWidgets import QFileDialog, QMessageBox
+from currencies import BASE_CURRENCY, KNOWN_CURRENCIES
+from utils import normalize_date
+from xls_reader import XlsReader, XlsError
+
+logger = logging.getLogger(__name__)
+
+# Traditional -> simplified characters that appear in legacy book headers
+_HEADER_CHARS = str.maketrans({
+    "號": "号", "對": "对", "貸": "贷", "餘": "余", "額": "额", "發": "发",
+    "碼": "码", "幣": "币", "備": "备", "註": "注", "來": "来",
+})
+
+# Legacy header text (normalized) -> column label used by our sheets
+_HEADER_ALIASES = {
+    "序号": "序号",
+    "日期": "日期",
+    "对方科目": "对方科目",
+    "摘要": "摘要",
+    "借方": "借方",
+    "贷方": "贷方",
+    "余额": "余额",
+    "发票号码": "发票号码",
+    "发票号": "发票号码",
+    "备注": "备注",
+}
+
+# First-column markers of the summary rows at the bottom of legacy sheets
+_FOOTER_PREFIXES = ("本期TOTAL", "期末TOTAL", "本币TOTAL", "注")
+# Rows above a header that describe the company rather than the account
+_TITLE_SKIP_PREFIXES = ("公司名称", "公司名稱", "会计期间", "會計期間")
+# Date-column markers of an opening balance row
+_OPENING_MARKERS = ("上年余额", "期初结余", "期初余额")
+
+
+def _normalize_header(value):
+    text = str(value) if value is not None else ""
+    return "".join(text.split()).replace("　", "").translate(_HEADER_CHARS)
+
+
+def _currency_of(value):
+    """Extract 'USD' from sub-headers such as '原幣(USD)' or '原幣/USD'."""
+    text = _normalize_header(value)
+    if not text.startswith("原币"):
+        return ""
+    text = text[2:].strip("()（）/")
+    return text.upper()
+
+
+def _title_text(value):
+    """Titles are often letter-spaced ('董 事 往 來'); keep real spaces in Latin names."""
+    words = str(value).split()
+    if all(len(w) == 1 for w in words):
+        return "".join(words)
+    return " ".join(words)
+
+
+def _cell_text(value):
+    if value is None or value == "":
+        return ""
+    if isinstance(value, float):
+        if value.is_integer() and abs(value) < 1e15:
+            return str(int(value))
+        return f"{value:.2f}"
+    return normalize_date(value) if hasattr(value, "strftime") else str(value).strip()
+
+
+def _amount_text(value):
+    if value in (None, ""):
+        return ""
+    if isinstance(value, (int, float)):
+        return f"{value:.2f}" if value else ""
+    return str(value).strip()
+
+
+class _SheetLayout:
+    """Column positions of a legacy worksheet, detected from its header rows."""
+
+    def __init__(self, header_row, header_values, sub_values, title=""):
+        self.header_row = header_row
+        self.title = title  # block title such as 應收賬款-客户名
+        self.pending = None  # first data row, when it was read while looking for a sub-header
+        self.columns = {}  # our label -> legacy column
+        self.debit = {}  # currency -> legacy column
+        self.credit = {}
+        group = None
+        for col, value in enumerate(header_values):
+            label = _HEADER_ALIASES.get(_normalize_header(value))
+            if label in ("借方", "贷方"):
+                group = label
+            elif _normalize_header(value):
+                group = None
+            if label and label not in self.columns:
+                self.columns[label] = col
+            if group:
+                currency = _currency_of(sub_values[col]) if col < len(sub_values) else ""
+                if currency:
+                    (self.debit if group == "借方" else self.credit)[currency] = col
+        self.has_sub_header = bool(self.debit or self.credit)
+        if not self.has_sub_header:
+            # No 原币(...) row: single-currency columns
+            if "借方" in self.columns:
+                self.debit[""] = self.columns["借方"]
+            if "贷方" in self.columns:
+                self.credit[""] = self.columns["贷方"]
+
+    @property
+    def is_bank(self):
+        currencies = set(self.debit) | set(self.credit)
+        return (len(self.debit) == 1 and len(self.credit) == 1 and len(currencies) == 1
+                and "余额" in self.columns)
+
+    @property
+    def currency(self):
+        return next(iter(set(self.debit) | set(self.credit)), "")
+
+
+class XlsImporter:
+    """Import legacy Excel 97 account books into bank and 非银行交易 sheets."""
+
+    def __init__(self, main_window):
+        self.main_window = main_window
+
+    def import_file(self):
+        """Ask for an .xls file and import it"""
+        path, _ = QFileDialog.getOpenFileName(
+            self.main_window, "Import Excel 97 Book", "", "Excel 97-2003 (*.xls)"
+        )
+        if not path:
+            return
+        try:
+            summary = self.import_path(path)
+        except XlsError as e:
+            QMessageBox.warning(self.main_window, "Import Error", str(e))
+            return
+        except Exception as e:
+            logger.error(f"Failed to import {path}: {e}")
+            QMessageBox.warning(self.main_window, "Import Error", f"Failed to import file: {str(e)}")
+            return
+        lines = [f"{name}: {count} rows" for name, count in summary]
+        QMessageBox.information(self.main_window, "Import Complete", "\n".join(lines) or "No rows found.")
+
+    def import_path(self, path):
+        """Import every recognisable worksheet; returns [(sheet name, rows imported)]"""
+        start = time.time()
+        summary = {}
+        with XlsReader(path) as reader:
+            bank_accounts = self._bank_accounts(reader)
+            for worksheet in reader.sheet_names():
+                rows = reader.iter_rows(worksheet)
+                # A worksheet may hold several ledger blocks, each with its own title and header
+                layout = self._detect_layout(rows)
+                if layout is None:
+                    logger.info(f"Skipping worksheet '{worksheet}': no 日期/借方/贷方 header")
+                while layout is not None:
+                    if layout.is_bank:
+                        table, records = self._bank_target(worksheet, layout, rows)
+                    else:
+                        table, records = self._non_bank_target(worksheet, layout, rows, bank_accounts)
+                    count = table.append_records(records)
+                    key = f"{worksheet} -> {table.name}"
+                    summary[key] = summary.get(key, 0) + count
+                    layout = self._detect_layout(rows)
+        logger.info(f"Imported {os.path.basename(path)} in {time.time() - start:.2f}s: {summary}")
+        self.main_window._add_plus_tab()
+        return list(summary.items())
+
+    def _bank_accounts(self, reader):
+        """Names a ledger's 对方科目 may give a bank account by: bank worksheets and bank sheets.
+
+        Only the first header of each worksheet is read.
+        """
+        names = {sheet.name for sheet in self.main_window.sheets if getattr(sheet, "type", None) == "bank"}
+        for worksheet in reader.sheet_names():
+            rows = reader.iter_rows(worksheet)
+            layout = self._detect_layout(rows)
+            rows.close()
+            if layout is not None and layout.is_bank:
+                names.add(worksheet)
+                names.add(self._bank_sheet_name(worksheet, layout))
+        return names
+
+    @staticmethod
+    def _detect_layout(rows):
+        """Consume rows up to and including the next header (and 原币 sub-header) rows."""
+        previous = None
+        title = ""
+        scanned = 0
+        for row_index, values in rows:
+            if previous is not None:
+                header_index, header_values = previous
+                sub_values = values if row_index == header_index + 1 else []
+                layout = _SheetLayout(header_index, header_values, sub_values, title)
+                if layout.has_sub_header or not sub_values:
+                    return layout
+                # The row after the header is already data: it must not be lost
+                layout.pending = (row_index, values)
+                return layout
+            labels = {_HEADER_ALIASES.get(_normalize_header(v)) for v in values}
+            if "日期" in labels and ("借方" in labels or "贷方" in labels):
+                previous = (row_index, values)
+                continue
+            first = _normalize_header(values[0]) if values else ""
+            if not title and first and not first.startswith(_FOOTER_PREFIXES + _TITLE_SKIP_PREFIXES):
+                title = _title_text(values[0])
+            scanned += 1
+            if scanned > 30:
+                return None
+        if previous is not None:
+            return _SheetLayout(previous[0], previous[1], [], title)
+        return None
+
+    @staticmethod
+    def _data_rows(layout, rows):
+        if layout.pending:
+            yield layout.pending
+        for row_index, values in rows:
+            first = _normalize_header(values[0]) if values else ""
+            if first.startswith(_FOOTER_PREFIXES):
+                break
+            yield row_index, values
+
+    def _bank_sheet_name(self, worksheet, layout):
+        currency = layout.currency or self._currency_from_name(worksheet)
+        bank_name = worksheet.replace(currency, "").strip(" -_") if currency else worksheet
+        return f"{bank_name or worksheet}-{currency or 'HKD'}"
+
+    def _bank_target(self, worksheet, layout, rows):
+        name = self._bank_sheet_name(worksheet, layout)
+        table = self._find_sheet(name, "bank")
+        if table is None:
+            table = self.main_window.sheet_manager.create_bank_sheet(name, name.rsplit("-", 1)[1])
+        return table, self._bank_records(layout, rows, table)
+
+    def _bank_records(self, layout, rows, table):
+        cols = layout.columns
+        debit_col = next(iter(layout.debit.values()))
+        credit_col = next(iter(layout.credit.values()))
+        first_row = table._first_free_row() == 0
+
+        def get(values, col):
+            return values[col] if col is not None and col < len(values) else ""
+
+        for _, values in self._data_rows(layout, rows):
+            date_value = get(values, cols.get("日期"))
+            counterpart = _cell_text(get(values, cols.get("对方科目")))
+            debit = _amount_text(get(values, debit_col))
+            credit = _amount_text(get(values, credit_col))
+            summary = _cell_text(get(values, cols.get("摘要")))
+            if _normalize_header(date_value) in _OPENING_MARKERS:
+                # Opening balance becomes the editable first-row 余额
+                balance = _amount_text(get(values, cols.get("余额")))
+                if first_row and balance:
+                    first_row = False
+                    yield {"余额": balance, "摘要": summary or _cell_text(date_value)}
+                continue
+            if not (counterpart or debit or credit or summary):
+                continue
+            first_row = False
+            account, _, sub_account = counterpart.partition("-")
+            yield {
+                "序号": _cell_text(get(values, cols.get("序号"))),
+                "日期": normalize_date(date_value),
+                "对方科目": account,
+                "子科目": sub_account,
+                "借方": debit,
+                "贷方": credit,
+                "发票号码": _cell_text(get(values, cols.get("发票号码"))),
+                "摘要": summary,
+            }
+
+    def _non_bank_target(self, worksheet, layout, rows, bank_accounts=()):
+        # Columns for the ledger's currencies, before any record is written
+        for currency in set(layout.debit) | set(layout.credit):
+            self.main_window.currencies.add(currency or BASE_CURRENCY)
+        table = self._find_sheet(None, "non_bank")
+        if table is None:
+            table = self.main_window.sheet_manager.create_non_bank_sheet()
+        return table, self._non_bank_records(worksheet, layout, rows, bank_accounts)
+
+    def _non_bank_records(self, worksheet, layout, rows, bank_accounts=()):
+        """Each legacy ledger row becomes one 非银行交易 row on the side its amounts are on.
+
+        Rows against a bank account (对方科目 in ``bank_accounts``) mirror a bank
+        row, which already books both sides, so they are skipped.
+        """
+        cols = layout.columns
+        # The block title (e.g. 應收賬款-客户名) names the account better than the tab does
+        account, _, sub_account = (layout.title or worksheet).partition("-")
+
+        def get(values, col):
+            return values[col] if col is not None and col < len(values) else ""
+
+        mirrored = 0
+        for row_index, values in self._data_rows(layout, rows):
+            date_value = get(values, cols.get("日期"))
+            counterpart = _cell_text(get(values, cols.get("对方科目")))
+            if counterpart in bank_accounts:
+                mirrored += 1
+                continue
+            summary = _cell_text(get(values, cols.get("摘要")))
+            record = {}
+            for side, columns in (("借方", layout.debit), ("贷方", layout.credit)):
+                for currency, col in columns.items():
+                    amount = _amount_text(get(values, col))
+                    if amount:
+                        record[f"{side}({currency or 'HKD'})"] = amount
+            if not record:
+                continue
+            if any(key.startswith("借方") for key in record):
+                record["借方科目"] = account
+            else:
+                record["贷方科目"] = account
+            record["子科目"] = sub_account
+            record["日期"] = normalize_date(date_value)
+            record["备注"] = " / ".join(t for t in (counterpart, summary) if t)
+            record["来源"] = f"{worksheet}:{row_index + 1}"
+            yield record
+        if mirrored:
+            logger.info(f"Skipped {mirrored} rows of '{layout.title or worksheet}' mirroring bank sheets")
+
+    def _find_sheet(self, name, sheet_type):
+        for sheet in self.main_window.sheets:
+            if getattr(sheet, "type", None) == sheet_type and (name is None or sheet.name == name):
+                return sheet
+        return None
+
+    @staticmethod
+    def _currency_from_name(worksheet):
+        for currency in KNOWN_CURRENCIES + ("RMB",):
+            if currency in worksheet.upper():
+                return currency
+        return ""
@@ -0,0 +1,513 @@
+"""Streaming reader for Excel 97-2003 (.xls, BIFF8 inside an OLE2 container).
+
+Pure Python, no Excel or third-party package needed. The OLE2 sector chain is
+followed lazily (FAT sectors are read on demand), so only the shared string
+table and the row currently being decoded are held in memory.
+"""
+import io
+import struct
+from datetime import date, timedelta
+
+# OLE2 / compound file constants
+_OLE_SIGNATURE = b"\xd0\xcf\x11\xe0\xa1\xb1\x1a\xe1"
+_END_OF_CHAIN = 0xFFFFFFFE
+_FREE_SECT = 0xFFFFFFFF
+
+# BIFF8 record types
+_BOF = 0x0809
+_EOF = 0x000A
+_CONTINUE = 0x003C
+_FILEPASS = 0x002F
+_DATEMODE = 0x0022
+_FORMAT = 0x041E
+_XF = 0x00E0
+_BOUNDSHEET = 0x0085
+_SST = 0x00FC
+_NUMBER = 0x0203
+_RK = 0x027E
+_MULRK = 0x00BD
+_LABELSST = 0x00FD
+_LABEL = 0x0204
+_FORMULA = 0x0006
+_STRING = 0x0207
+_BOOLERR = 0x0205
+
+# Built-in number formats that display dates (including the CJK ones)
+_BUILTIN_DATE_FORMATS = set(range(14, 23)) | set(range(27, 37)) | {45, 46, 47} | set(range(50, 59))
+
+
+class XlsError(Exception):
+    """Raised when a file is not a readable BIFF8 workbook."""
+
+
+class _OleStream:
+    """Sequential reader over one stream of an OLE2 compound file."""
+
+    def __init__(self, container, start_sector, size):
+        self._container = container
+        self._start = start_sector
+        self._size = size
+        self._sector = start_sector
+        self._sector_pos = 0  # index of self._sector within the chain
+        self._pos = 0
+        self._buffer = b""
+        self._buffer_start = 0
+
+    def tell(self):
+        return self._pos
+
+    def seek(self, offset):
+        """Seek to an absolute offset, walking the sector chain forward only when possible."""
+        sector_size = self._container.sector_size
+        target_index = offset // sector_size
+        if target_index < self._sector_pos:
+            self._sector = self._start
+            self._sector_pos = 0
+        while self._sector_pos < target_index:
+            self._sector = self._container.next_sector(self._sector)
+            self._sector_pos += 1
+        self._pos = offset
+        self._buffer = b""
+        self._buffer_start = offset
+
+    def read(self, n):
+        out = []
+        remaining = min(n, self._size - self._pos)
+        while remaining > 0:
+            buf_off = self._pos - self._buffer_start
+            if buf_off >= len(self._buffer):
+                self._fill()
+                buf_off = self._pos - self._buffer_start
+            chunk = self._buffer[buf_off:buf_off + remaining]
+            if not chunk:
+                break
+            out.append(chunk)
+            self._pos += len(chunk)
+            remaining -= len(chunk)
+        return b"".join(out)
+
+    def _fill(self):
+        sector_size = self._container.sector_size
+        target_index = self._pos // sector_size
+        while self._sector_pos < target_index:
+            self._sector = self._container.next_sector(self._sector)
+            self._sector_pos += 1
+        if self._sector in (_END_OF_CHAIN, _FREE_SECT):
+            raise XlsError("Unexpected end of OLE2 sector chain")
+        self._buffer = self._container.read_sector(self._sector)
+        self._buffer_start = self._sector_pos * sector_size
+
+
+class _OleContainer:
+    """Minimal OLE2 compound document reader with a lazily loaded FAT."""
+
+    def __init__(self, fh):
+        self._fh = fh
+        header = fh.read(512)
+        if len(header) < 512 or header[:8] != _OLE_SIGNATURE:
+            raise XlsError("Not an OLE2 (Excel 97-2003) file")
+        self.sector_size = 1 << struct.unpack_from("<H", header, 0x1E)[0]
+        self.mini_sector_size = 1 << struct.unpack_from("<H", header, 0x20)[0]
+        (num_fat, first_dir, _, self.mini_cutoff, first_minifat, _num_minifat,
+         first_difat, num_difat) = struct.unpack_from("<IIIIIIII", header, 0x2C)
+        self._ids_per_sector = self.sector_size // 4
+
+        # DIFAT: locations of FAT sectors (small: one entry per 128 sectors of file)
+        difat = list(struct.unpack_from("<109I", header, 0x4C))
+        sector = first_difat
+        for _ in range(num_difat):
+            if sector in (_END_OF_CHAIN, _FREE_SECT):
+                break
+            data = self.read_sector(sector)
+            entries = struct.unpack("<%dI" % self._ids_per_sector, data)
+            difat.extend(entries[:-1])
+            sector = entries[-1]
+        self._fat_sectors = [s for s in difat[:num_fat] if s not in (_END_OF_CHAIN, _FREE_SECT)]
+        self._fat_cache = {}
+
+        self._entries = self._read_directory(first_dir)
+        self._first_minifat = first_minifat
+
+    def read_sector(self, sector):
+        self._fh.seek(512 + sector * self.sector_size)
+        return self._fh.read(self.sector_size)
+
+    def next_sector(self, sector):
+        fat_index, slot = divmod(sector, self._ids_per_sector)
+        table = self._fat_cache.get(fat_index)
+        if table is None:
+            if fat_index >= len(self._fat_sectors):
+                raise XlsError("Corrupt OLE2 FAT")
+            if len(self._fat_cache) > 64:  # keep the cache bounded
+                self._fat_cache.clear()
+            raw = self.read_sector(self._fat_sectors[fat_index])
+            table = struct.unpack("<%dI" % self._ids_per_sector, raw)
+            self._fat_cache[fat_index] = table
+        return table[slot]
+
+    def _read_directory(self, first_dir):
+        entries = []
+        stream = _OleStream(self, first_dir, 1 << 62)
+        while True:
+            try:
+                raw = stream.read(128)
+            except XlsError:
+                break
+            if len(raw) < 128:
+                break
+            name_len = struct.unpack_from("<H", raw, 64)[0]
+            name = raw[:max(0, name_len - 2)].decode("utf-16-le", "ignore")
+            entry_type = raw[66]
+            start, size = struct.unpack_from("<II", raw, 116)
+            entries.append((name, entry_type, start, size))
+        return entries
+
+    def open_stream(self, *names):
+        for wanted in names:
+            for name, entry_type, start, size in self._entries:
+                if entry_type == 2 and name == wanted:
+                    if size < self.mini_cutoff:
+                        return self._open_mini_stream(start, size)
+                    return _OleStream(self, start, size)
+        raise XlsError("No Workbook stream found (is this an Excel 97-2003 file?)")
+
+    def _open_mini_stream(self, start, size):
+        """Small streams live in the mini stream; they are < 4 KiB so read them whole."""
+        root = self._entries[0]
+        root_stream = _OleStream(self, root[2], root[3])
+        minifat_stream = _OleStream(self, self._first_minifat, 1 << 62)
+        data = []
+        sector = start
+        remaining = size
+        while remaining > 0 and sector not in (_END_OF_CHAIN, _FREE_SECT):
+            root_stream.seek(sector * self.mini_sector_size)
+            data.append(root_stream.read(min(self.mini_sector_size, remaining)))
+            remaining -= self.mini_sector_size
+            minifat_stream.seek(sector * 4)
+            sector = struct.unpack("<I", minifat_stream.read(4))[0]
+        return _BytesStream(io.BytesIO(b"".join(data)[:size]))
+
+
+class _BytesStream:
+    """Adapter giving BytesIO the same tell/seek/read surface as _OleStream."""
+
+    def __init__(self, bio):
+        self._bio = bio
+
+    def tell(self):
+        return self._bio.tell()
+
+    def seek(self, offset):
+        self._bio.seek(offset)
+
+    def read(self, n):
+        return self._bio.read(n)
+
+
+def _decode_rk(rk):
+    if rk & 0x02:
+        value = rk >> 2
+    else:
+        value = struct.unpack("<d", struct.pack("<Q", (rk & 0xFFFFFFFC) << 32))[0]
+    if rk & 0x01:
+        value /= 100.0
+    return value
+
+
+def _unpack_unicode(data, pos, length_size=2):
+    """Decode an XLUnicodeString (or ShortXLUnicodeString when length_size is 1)."""
+    if length_size == 1:
+        nchars = data[pos]
+    else:
+        nchars = struct.unpack_from("<H", data, pos)[0]
+    pos += length_size
+    flags = data[pos]
+    pos += 1
+    if flags & 0x08:
+        pos += 2
+    if flags & 0x04:
+        pos += 4
+    if flags & 0x01:
+        return data[pos:pos + 2 * nchars].decode("utf-16-le", "replace")
+    return data[pos:pos + nchars].decode("latin-1")
+
+
+def _is_date_format(fmt_index, fmt_string):
+    if fmt_index in _BUILTIN_DATE_FORMATS:
+        return True
+    if not fmt_string:
+        return False
+    cleaned = []
+    in_quote = False
+    in_bracket = False
+    skip_next = False
+    for ch in fmt_string:
+        if skip_next:
+            skip_next = False
+            continue
+        if in_quote:
+            in_quote = ch != '"'
+            continue
+        if in_bracket:
+            in_bracket = ch != ']'
+            continue
+        if ch == '"':
+            in_quote = True
+        elif ch == '[':
+            in_bracket = True
+        elif ch in '\\_*':
+            skip_next = True
+        else:
+            cleaned.append(ch.lower())
+    text = "".join(cleaned)
+    if text == "general":
+        return False
+    return any(c in text for c in "ymd")
+
+
+class XlsReader:
+    """Read worksheets of a BIFF8 workbook row by row.
+
+    Usage:
+        with XlsReader(path) as reader:
+            for name in reader.sheet_names():
+                for row_index, values in reader.iter_rows(name):
+                    ...
+
+    ``values`` is a list of cell values (str, float, bool or datetime.date),
+    with ``""`` for empty cells.
+    """
+
+    def __init__(self, path):
+        self._fh = open(path, "rb")
+        try:
+            self._ole = _OleContainer(self._fh)
+            self._stream = self._ole.open_stream("Workbook", "Book")
+            self._datemode = 0
+            self._formats = {}
+            self._xf_formats = []
+            self._date_xf = []
+            self._sheets = []  # (name, offset)
+            self._sst = []
+            self._read_globals()
+        except Exception:
+            self._fh.close()
+            raise
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        if self._fh:
+            self._fh.close()
+            self._fh = None
+
+    def sheet_names(self):
+        return [name for name, _ in self._sheets]
+
+    def _records(self, block_size=65536):
+        """Yield (type, data) records from the current stream position, reading in blocks."""
+        read = self._stream.read
+        unpack = struct.unpack_from
+        buf = b""
+        pos = 0
+        while True:
+            if len(buf) - pos < 4:
+                buf = buf[pos:] + read(block_size)
+                pos = 0
+                if len(buf) < 4:
+                    return
+            rtype, length = unpack("<HH", buf, pos)
+            end = pos + 4 + length
+            if end > len(buf):
+                buf = buf[pos:] + read(max(block_size, end - pos))
+                pos = 0
+                end = 4 + length
+                if end > len(buf):
+                    return
+            yield rtype, buf[pos + 4:end]
+            pos = end
+
+    def _read_globals(self):
+        self._stream.seek(0)
+        records = self._records()
+        rtype, data = next(records, (None, b""))
+        if rtype != _BOF or struct.unpack_from("<H", data, 0)[0] != 0x0600:
+            raise XlsError("Only BIFF8 (Excel 97-2003) workbooks are supported")
+        sst_segments = None
+        for rtype, data in records:
+            if sst_segments is not None:
+                if rtype == _CONTINUE:
+                    sst_segments.append(data)
+                    continue
+                self._sst = self._parse_sst(sst_segments)
+                sst_segments = None
+            if rtype == _EOF:
+                break
+            if rtype == _FILEPASS:
+                raise XlsError("Password-protected workbooks are not supported")
+            if rtype == _DATEMODE:
+                self._datemode = struct.unpack_from("<H", data, 0)[0]
+            elif rtype == _FORMAT:
+                index = struct.unpack_from("<H", data, 0)[0]
+                self._formats[index] = _unpack_unicode(data, 2)
+            elif rtype == _XF:
+                self._xf_formats.append(struct.unpack_from("<H", data, 2)[0])
+            elif rtype == _BOUNDSHEET:
+                offset = struct.unpack_from("<I", data, 0)[0]
+                sheet_type = data[5]
+                if sheet_type == 0:  # ordinary worksheet (skip charts / macros)
+                    self._sheets.append((_unpack_unicode(data, 6, length_size=1), offset))
+            elif rtype == _SST:
+                sst_segments = [data]
+        if sst_segments is not None:
+            self._sst = self._parse_sst(sst_segments)
+        self._date_xf = [_is_date_format(f, self._formats.get(f)) for f in self._xf_formats]
+
+    @staticmethod
+    def _parse_sst(segments):
+        strings = []
+        seg_index = 0
+        data = segments[0]
+        unique = struct.unpack_from("<I", data, 4)[0]
+        pos = 8
+        for _ in range(unique):
+            if pos >= len(data):
+                seg_index += 1
+                if seg_index >= len(segments):
+                    break
+                data = segments[seg_index]
+                pos = 0
+            nchars = struct.unpack_from("<H", data, pos)[0]
+            flags = data[pos + 2]
+            pos += 3
+            rich_runs = 0
+            ext_size = 0
+            if flags & 0x08:
+                rich_runs = struct.unpack_from("<H", data, pos)[0]
+                pos += 2
+            if flags & 0x04:
+                ext_size = struct.unpack_from("<i", data, pos)[0]
+                pos += 4
+            high_byte = flags & 0x01
+            parts = []
+            remaining = nchars
+            while True:
+                width = 2 if high_byte else 1
+                available = (len(data) - pos) // width
+                take = min(remaining, available)
+                raw = data[pos:pos + take * width]
+                parts.append(raw.decode("utf-16-le" if high_byte else "latin-1", "replace"))
+                pos += take * width
+                remaining -= take
+                if remaining <= 0:
+                    break
+                # String continues in the next CONTINUE record, which restarts with a flags byte
+                seg_index += 1
+                if seg_index >= len(segments):
+                    break
+                data = segments[seg_index]
+                high_byte = data[0] & 0x01
+                pos = 1
+            strings.append("".join(parts))
+            skip = rich_runs * 4 + ext_size
+            while skip > 0:
+                available = len(data) - pos
+                if skip <= available:
+                    pos += skip
+                    break
+                skip -= available
+                seg_index += 1
+                if seg_index >= len(segments):
+                    break
+                data = segments[seg_index]
+                pos = 0
+        return strings
+
+    def _convert(self, value, xf_index):
+        if xf_index < len(self._date_xf) and self._date_xf[xf_index] and value >= 1:
+            base = date(1904, 1, 1) if self._datemode else date(1899, 12, 30)
+            if not self._datemode and value < 61:
+                base = date(1899, 12, 31)  # Excel's fictitious 1900-02-29
+            try:
+                return base + timedelta(days=int(value))
+            except OverflowError:
+                return value
+        return value
+
+    def iter_rows(self, sheet):
+        """Yield (row_index, values) for every non-empty row of a worksheet, in order."""
+        if isinstance(sheet, int):
+            _, offset = self._sheets[sheet]
+        else:
+            offset = dict(self._sheets)[sheet]
+        self._stream.seek(offset)
+        current_row = None
+        cells = {}
+        pending_formula = None  # (row, col) waiting for a STRING record
+        for rtype, data in self._records():
+            cell = None
+            if rtype == _NUMBER:
+                row, col, xf = struct.unpack_from("<HHH", data, 0)
+                cell = (row, col, self._convert(struct.unpack_from("<d", data, 6)[0], xf))
+            elif rtype == _RK:
+                row, col, xf, rk = struct.unpack_from("<HHHi", data, 0)
+                cell = (row, col, self._convert(_decode_rk(rk), xf))
+            elif rtype == _MULRK:
+                row, first_col = struct.unpack_from("<HH", data, 0)
+                last_col = struct.unpack_from("<H", data, len(data) - 2)[0]
+                if row != current_row:
+                    if current_row is not None and cells:
+                        yield current_row, self._row_values(cells)
+                    current_row, cells = row, {}
+                for i in range(last_col - first_col + 1):
+                    xf, rk = struct.unpack_from("<Hi", data, 4 + i * 6)
+                    cells[first_col + i] = self._convert(_decode_rk(rk), xf)
+                continue
+            elif rtype == _LABELSST:
+                row, col, _xf, index = struct.unpack_from("<HHHI", data, 0)
+                cell = (row, col, self._sst[index] if index < len(self._sst) else "")
+            elif rtype == _LABEL:
+                row, col = struct.unpack_from("<HH", data, 0)
+                cell = (row, col, _unpack_unicode(data, 6))
+            elif rtype == _BOOLERR:
+                row, col, _xf, value, is_error = struct.unpack_from("<HHHBB", data, 0)
+                cell = (row, col, "" if is_error else bool(value))
+            elif rtype == _FORMULA:
+                row, col, xf = struct.unpack_from("<HHH", data, 0)
+                result = data[6:14]
+                if result[6:8] == b"\xff\xff":
+                    kind = result[0]
+                    if kind == 0:
+                        pending_formula = (row, col)
+                        continue
+                    value = bool(result[2]) if kind == 1 else ""
+                else:
+                    value = self._convert(struct.unpack("<d", result)[0], xf)
+                cell = (row, col, value)
+            elif rtype == _STRING and pending_formula:
+                row, col = pending_formula
+                pending_formula = None
+                cell = (row, col, _unpack_unicode(data, 0))
+            elif rtype == _EOF:
+                break
+            if cell is None:
+                continue
+            row, col, value = cell
+            if row != current_row:
+                if current_row is not None and cells:
+                    yield current_row, self._row_values(cells)
+                current_row, cells = row, {}
+            cells[col] = value
+        if current_row is not None and cells:
+            yield current_row, self._row_values(cells)
+
+    @staticmethod
+    def _row_values(cells):
+        values = [""] * (max(cells) + 1)
+        for col, value in cells.items():
+            values[col] = value
+        return values
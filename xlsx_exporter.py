@@ -0,0 +1,147 @@
+import logging
+import re
+import time
+from PySide6.QtWidgets import QFileDialog, QMessageBox
+from xlsx_writer import XlsxWriter, STYLE_AMOUNT, STYLE_HEADER, STYLE_TOTAL, STYLE_TOTAL_AMOUNT
+
+logger = logging.getLogger(__name__)
+
+# 借方(USD) -> ("借方", "USD"): currency columns share a merged group header
+_CURRENCY_HEADER = re.compile(r"^(借方|贷方|貸方)\((\w+)\)$")
+_AMOUNT_MARKERS = ("借方", "贷方", "貸方", "余额", "餘額")
+_NUMBER = re.compile(r"^\(?-?[\d,]*\.?\d+\)?$")
+
+
+def _header_rows(labels):
+    """Split sheet labels into (main, sub, merges) for a one- or two-row export header."""
+    groups = [_CURRENCY_HEADER.match(label.replace(" ", "")) for label in labels]
+    if not any(groups):
+        return [labels], []
+    main, sub, merges = [], [], []
+    col = 0
+    while col < len(labels):
+        match = groups[col]
+        if match is None:
+            main.append(labels[col])
+            sub.append("")
+            merges.append((0, col, 2, 1))
+            col += 1
+            continue
+        start = col
+        while col < len(labels) and groups[col] and groups[col].group(1) == match.group(1):
+            main.append(match.group(1) if col == start else "")
+            sub.append(f"原币({groups[col].group(2)})")
+            col += 1
+        if col - start > 1:
+            merges.append((0, start, 1, col - start))
+    return [main, sub], merges
+
+
+class XlsxExporter:
+    """File -> Export .xlsx: write every sheet of the workbook to an Excel file."""
+
+    def __init__(self, main_window):
+        self.main_window = main_window
+
+    def export_file(self):
+        """Ask for a target file and export the workbook"""
+        company = self.main_window.company_input.text().strip() or "workbook"
+        path, _ = QFileDialog.getSaveFileName(
+            self.main_window, "Export .xlsx", f"{company}.xlsx", "Excel Workbook (*.xlsx)"
+        )
+        if not path:
+            return
+        if not path.lower().endswith(".xlsx"):
+            path += ".xlsx"
+        try:
+            count = self.export_path(path)
+        except Exception as e:
+            logger.error(f"Failed to export {path}: {e}")
+            QMessageBox.warning(self.main_window, "Export Error", f"Failed to export file: {str(e)}")
+            return
+        QMessageBox.information(self.main_window, "Export .xlsx", f"Exported {count} sheets to {path}.")
+
+    def export_path(self, path):
+        """Write the open sheets in tab order, then the others; returns the number of sheets written"""
+        start = time.time()
+        sheets = self._sheets_in_tab_order()
+        with XlsxWriter(path) as writer:
+            for sheet in sheets:
+                header_rows, merges = self._export_headers(sheet)
+                writer.write_sheet(
+                    sheet.name,
+                    self._sheet_rows(sheet, header_rows, merges),
+                    merges=merges,
+                    column_widths=[max(sheet.columnWidth(c), 40) / 7.0 for c in range(sheet.columnCount())],
+                    freeze_rows=len(header_rows) or getattr(sheet, "_frozen_row_count", 0),
+                )
+        logger.info(f"Exported {len(sheets)} sheets to {path} in {time.time() - start:.2f}s")
+        return len(sheets)
+
+    def _sheets_in_tab_order(self):
+        """Every sheet: the open tabs in tab order, then the sheets without a tab (generated payable details)"""
+        sheets = []
+        for i in range(self.main_window.tabs.count()):
+            widget = self.main_window.tabs.widget(i)
+            if widget in self.main_window.sheets:
+                sheets.append(widget)
+        opened = set(sheets)
+        sheets += [sheet for sheet in self.main_window.sheets if sheet not in opened]
+        return sheets
+
+    @staticmethod
+    def _export_headers(sheet):
+        """Header rows to write above the cells; aggregate sheets keep theirs in rows 0-1."""
+        if sheet.type == "aggregate":
+            return [], []
+        labels = []
+        for col in range(sheet.columnCount()):
+            header_item = sheet.horizontalHeaderItem(col)
+            labels.append(header_item.text() if header_item else "")
+        return _header_rows(labels)
+
+    @staticmethod
+    def _sheet_rows(sheet, header_rows, merges):
+        """Yield export rows (headers, cells, pinned totals), adding cell spans to ``merges``."""
+        col_count = sheet.columnCount()
+        for row in header_rows:
+            yield [(text, STYLE_HEADER) for text in row]
+        offset = len(header_rows)
+
+        amount_cols = set()
+        for col in range(col_count):
+            if sheet.type == "aggregate":
+                sub_headers = getattr(sheet, "_sub_headers", [])
+                label = sub_headers[col] if col < len(sub_headers) and sub_headers[col] else ""
+                if "原币(" in label:
+                    amount_cols.add(col)
+                continue
+            header_item = sheet.horizontalHeaderItem(col)
+            if header_item and any(m in header_item.text() for m in _AMOUNT_MARKERS):
+                amount_cols.add(col)
+        first_data_row = getattr(sheet, "_frozen_row_count", 0) if sheet.type == "aggregate" else 0
+
+        last_row = sheet._first_free_row()
+        merges.extend((row + offset, col, rows, cols)
+                      for row, col, rows, cols in sheet.spans.in_rows(0, last_row - 1) if col < col_count)
+        for row in range(last_row):
+            values = []
+            for col in range(col_count):
+                text = sheet.cell_text(row, col)
+                if text and col in amount_cols and row >= first_data_row and _NUMBER.match(text.strip()):
+                    values.append((sheet.parse_number(text), STYLE_AMOUNT))
+                else:
+                    values.append(text)
+            yield values
+
+        # Pinned totals, merged over the first three columns like on screen
+        total_row = last_row + offset
+        for label, totals in sheet.pinned_row_values():
+            values = [(label, STYLE_TOTAL)] + [("", STYLE_TOTAL)] * (col_count - 1)
+            for col, value in totals.items():
+                if col < col_count:
+                    values[col] = (round(value, 2), STYLE_TOTAL_AMOUNT)
+            if col_count >= 3:
+                merges.append((total_row, 0, 1, 3))
+            yield values
+            total_row += 1
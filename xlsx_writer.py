@@ -0,0 +1,229 @@
+"""Write-only streaming .xlsx writer built on zipfile.
+
+Rows are written to the zip entry as they are produced, so memory use does
+not grow with the number of rows. Strings are stored inline (no shared
+string table) for the same reason.
+"""
+import re
+import zipfile
+
+# Cell styles (indexes into cellXfs of STYLES_XML)
+STYLE_DEFAULT = 0
+STYLE_HEADER = 1
+STYLE_AMOUNT = 2
+STYLE_TOTAL = 3
+STYLE_TOTAL_AMOUNT = 4
+
+_INVALID_XML_CHARS = re.compile("[\x00-\x08\x0b\x0c\x0e-\x1f]")
+_INVALID_SHEET_CHARS = re.compile(r"[\[\]:*?/\\]")
+_FLUSH_SIZE = 1 << 16
+
+CONTENT_TYPES_HEAD = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+    '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+    '<Default Extension="xml" ContentType="application/xml"/>'
+    '<Override PartName="/xl/workbook.xml" '
+    'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+    '<Override PartName="/xl/styles.xml" '
+    'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.styles+xml"/>'
+)
+
+ROOT_RELS_XML = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '<Relationship Id="rId1" '
+    'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" '
+    'Target="xl/workbook.xml"/>'
+    '</Relationships>'
+)
+
+STYLES_XML = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<styleSheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main">'
+    '<numFmts count="1"><numFmt numFmtId="164" formatCode="#,##0.00;(#,##0.00)"/></numFmts>'
+    '<fonts count="2"><font><sz val="11"/><name val="Calibri"/></font>'
+    '<font><b/><sz val="11"/><name val="Calibri"/></font></fonts>'
+    '<fills count="4"><fill><patternFill patternType="none"/></fill>'
+    '<fill><patternFill patternType="gray125"/></fill>'
+    '<fill><patternFill patternType="solid"><fgColor rgb="FFDCDCDC"/><bgColor indexed="64"/></patternFill></fill>'
+    '<fill><patternFill patternType="solid"><fgColor rgb="FFF0F0F0"/><bgColor indexed="64"/></patternFill></fill>'
+    '</fills>'
+    '<borders count="2"><border><left/><right/><top/><bottom/><diagonal/></border>'
+    '<border><left style="thin"/><right style="thin"/><top style="thin"/><bottom style="thin"/><diagonal/></border>'
+    '</borders>'
+    '<cellStyleXfs count="1"><xf numFmtId="0" fontId="0" fillId="0" borderId="0"/></cellStyleXfs>'
+    '<cellXfs count="5">'
+    '<xf numFmtId="0" fontId="0" fillId="0" borderId="0" xfId="0"/>'
+    '<xf numFmtId="0" fontId="1" fillId="2" borderId="1" xfId="0" applyFont="1" applyFill="1" applyBorder="1" '
+    'applyAlignment="1"><alignment horizontal="center" vertical="center"/></xf>'
+    '<xf numFmtId="164" fontId="0" fillId="0" borderId="0" xfId="0" applyNumberFormat="1"/>'
+    '<xf numFmtId="0" fontId="1" fillId="3" borderId="1" xfId="0" applyFont="1" applyFill="1" applyBorder="1"/>'
+    '<xf numFmtId="164" fontId="1" fillId="3" borderId="1" xfId="0" applyNumberFormat="1" applyFont="1" '
+    'applyFill="1" applyBorder="1"/>'
+    '</cellXfs>'
+    '<cellStyles count="1"><cellStyle name="Normal" xfId="0" builtinId="0"/></cellStyles>'
+    '</styleSheet>'
+)
+
+
+def column_letter(n):
+    """0 -> A, 25 -> Z, 26 -> AA"""
+    name = ""
+    while n >= 0:
+        name = chr(n % 26 + 65) + name
+        n = n // 26 - 1
+    return name
+
+
+def _escape(text):
+    if "&" in text or "<" in text or ">" in text:
+        text = text.replace("&", "&amp;").replace("<", "&lt;").replace(">", "&gt;")
+    if '"' in text:
+        text = text.replace('"', "&quot;")
+    return _INVALID_XML_CHARS.sub("", text)
+
+
+class XlsxWriter:
+    """Streaming .xlsx writer.
+
+    Usage::
+
+        with XlsxWriter(path) as writer:
+            writer.write_sheet("Sheet1", rows, merges=[(0, 0, 2, 1)])
+
+    ``rows`` is any iterable of lists; a cell is None, a str, a number, or a
+    (value, style) tuple using the STYLE_* constants. ``merges`` is an iterable
+    of (row, col, row_span, col_span); it is consumed after the rows, so it may
+    be filled while the rows are being generated.
+    """
+
+    def __init__(self, path):
+        self._zip = zipfile.ZipFile(path, "w", zipfile.ZIP_DEFLATED)
+        self._sheet_names = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def _unique_sheet_name(self, name):
+        # Excel: at most 31 characters, no []:*?/\ and unique ignoring case
+        base = _INVALID_SHEET_CHARS.sub("_", str(name)).strip("'")[:31] or "Sheet"
+        taken = {n.lower() for n in self._sheet_names}
+        candidate = base
+        counter = 2
+        while candidate.lower() in taken:
+            suffix = f" ({counter})"
+            candidate = base[:31 - len(suffix)] + suffix
+            counter += 1
+        return candidate
+
+    def write_sheet(self, name, rows, merges=(), column_widths=None, freeze_rows=0):
+        """Stream one worksheet; returns the sheet name actually used."""
+        name = self._unique_sheet_name(name)
+        self._sheet_names.append(name)
+        index = len(self._sheet_names)
+        letters = []
+        with self._zip.open(f"xl/worksheets/sheet{index}.xml", "w", force_zip64=True) as stream:
+            parts = [
+                '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+                '<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+                'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">'
+            ]
+            if freeze_rows:
+                parts.append(
+                    f'<sheetViews><sheetView workbookViewId="0"><pane ySplit="{freeze_rows}" '
+                    f'topLeftCell="A{freeze_rows + 1}" activePane="bottomLeft" state="frozen"/>'
+                    '</sheetView></sheetViews>'
+                )
+            if column_widths:
+                parts.append("<cols>")
+                for col, width in enumerate(column_widths):
+                    parts.append(f'<col min="{col + 1}" max="{col + 1}" width="{width:.2f}" customWidth="1"/>')
+                parts.append("</cols>")
+            parts.append("<sheetData>")
+            size = 0
+            for row_number, row in enumerate(rows, start=1):
+                if len(row) > len(letters):
+                    letters.extend(column_letter(c) for c in range(len(letters), len(row)))
+                cells = [f'<row r="{row_number}">']
+                for col, value in enumerate(row):
+                    style = STYLE_DEFAULT
+                    if type(value) is tuple:
+                        value, style = value
+                    if value is None or value == "":
+                        if style:
+                            cells.append(f'<c r="{letters[col]}{row_number}" s="{style}"/>')
+                        continue
+                    s_attr = f' s="{style}"' if style else ""
+                    if isinstance(value, (int, float)) and not isinstance(value, bool):
+                        cells.append(f'<c r="{letters[col]}{row_number}"{s_attr}><v>{value!r}</v></c>')
+                    else:
+                        text = _escape(str(value))
+                        space = ' xml:space="preserve"' if text[:1].isspace() or text[-1:].isspace() else ""
+                        cells.append(
+                            f'<c r="{letters[col]}{row_number}"{s_attr} t="inlineStr"><is><t{space}>{text}</t></is></c>'
+                        )
+                cells.append("</row>")
+                chunk = "".join(cells)
+                parts.append(chunk)
+                size += len(chunk)
+                if size >= _FLUSH_SIZE:
+                    stream.write("".join(parts).encode("utf-8"))
+                    parts = []
+                    size = 0
+            parts.append("</sheetData>")
+            merge_refs = [
+                f'<mergeCell ref="{column_letter(col)}{row + 1}:{column_letter(col + cs - 1)}{row + rs}"/>'
+                for row, col, rs, cs in merges if rs > 1 or cs > 1
+            ]
+            if merge_refs:
+                parts.append(f'<mergeCells count="{len(merge_refs)}">')
+                parts.extend(merge_refs)
+                parts.append("</mergeCells>")
+            parts.append("</worksheet>")
+            stream.write("".join(parts).encode("utf-8"))
+        return name
+
+    def close(self):
+        if self._zip is None:
+            return
+        if not self._sheet_names:
+            # A workbook needs at least one sheet
+            self.write_sheet("Sheet1", [])
+        sheets = "".join(
+            f'<sheet name="{_escape(name)}" sheetId="{i}" r:id="rId{i}"/>'
+            for i, name in enumerate(self._sheet_names, start=1)
+        )
+        self._zip.writestr("xl/workbook.xml", (
+            '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+            '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+            'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">'
+            f'<sheets>{sheets}</sheets></workbook>'
+        ))
+        rels = "".join(
+            f'<Relationship Id="rId{i}" '
+            'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet" '
+            f'Target="worksheets/sheet{i}.xml"/>'
+            for i in range(1, len(self._sheet_names) + 1)
+        )
+        styles_id = len(self._sheet_names) + 1
+        self._zip.writestr("xl/_rels/workbook.xml.rels", (
+            '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+            '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+            f'{rels}<Relationship Id="rId{styles_id}" '
+            'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/styles" '
+            'Target="styles.xml"/></Relationships>'
+        ))
+        self._zip.writestr("xl/styles.xml", STYLES_XML)
+        self._zip.writestr("_rels/.rels", ROOT_RELS_XML)
+        overrides = "".join(
+            f'<Override PartName="/xl/worksheets/sheet{i}.xml" '
+            'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+            for i in range(1, len(self._sheet_names) + 1)
+        )
+        self._zip.writestr("[Content_Types].xml", CONTENT_TYPES_HEAD + overrides + "</Types>")
+        self._zip.close()
+        self._zip = None